@@ -37,17 +37,22 @@ class HttpApiProvider(object):
             provider_root, provider._app
         )
 
-    async def create_server(self, host: str, port: int) -> None:
+    async def create_server(
+            self, host: str, port: int, reuse_port: bool = False
+    ) -> None:
         """
         Factory function that creates fully-functional aiohttp server
 
         :param host: a server hostname or address
         :param port: a server port
+        :param reuse_port: allows several processes to listen on the same
+               port (SO_REUSEPORT), so incoming connections are distributed
+               between them by the kernel
         :return: None
         """
         self._handler = self._app.make_handler(loop=self._loop)
         self._server = await self._loop.create_server(
-            self._handler, host, port
+            self._handler, host, port, reuse_port=reuse_port or None
         )
 
     async def shutdown_server(self) -> None:
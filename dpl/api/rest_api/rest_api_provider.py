@@ -81,7 +81,8 @@ class RestApiProvider(HttpApiProvider):
             self, things: web.Application, placements: web.Application,
             auth_context: AuthContext,
             auth_service: AbsAuthService,
-            loop: asyncio.AbstractEventLoop = None
+            loop: asyncio.AbstractEventLoop = None,
+            streaming: web.Application = None
     ):
         self._cors_middleware = CorsMiddleware(
             is_enabled=True,
@@ -116,6 +117,13 @@ class RestApiProvider(HttpApiProvider):
             '/placements/', self._placements
         )
 
+        # introspection of the Streaming API is available only if the
+        # Streaming API is served by the same process
+        if streaming is not None:
+            self._app.add_subapp(
+                '/streaming/', streaming
+            )
+
         self._router = self._app.router  # type: web.UrlDispatcher
 
         self._router.add_get(path='/', handler=root_get_handler)
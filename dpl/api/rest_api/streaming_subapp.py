@@ -0,0 +1,192 @@
+"""
+This module contains definitions of an aiohttp
+application controlling the /streaming/ route
+"""
+from typing import Mapping
+
+import aiohttp.web as web
+from dpl.utils.empty_mapping import EMPTY_MAPPING
+
+from dpl.auth.exceptions import (
+    AuthInsufficientPrivilegesError
+)
+from dpl.api.streaming_api.streaming_api_provider import StreamingApiProvider
+from dpl.api.api_errors import ERROR_TEMPLATES
+
+from .common import make_json_response
+from .restricted_access_decorator import restricted_access
+
+
+def build_streaming_subapp(
+        streaming_api: StreamingApiProvider,
+        additional_data: Mapping = EMPTY_MAPPING
+) -> web.Application:
+    """
+    A factory of aiohttp's Applications. Initializes and returns
+    an Application for introspection of the Streaming API
+
+    :param streaming_api: an instance of StreamingApiProvider (usually
+           wrapped with an authorization interceptor) which statistics
+           will be exposed
+    :param additional_data: additional data to be saved in app's
+           context (data store)
+    :return: an instance of aiohttp Application
+    """
+    app = web.Application()
+    app['streaming_api'] = streaming_api
+    app.update(additional_data)
+    router = app.router
+
+    router.add_get(path='/sessions/', handler=sessions_get_handler)
+    router.add_route(method='OPTIONS', path='/sessions/', handler=sessions_options_handler)
+    router.add_get(path='/sessions/{id}', handler=session_get_handler)
+    router.add_route(method='OPTIONS', path='/sessions/{id}', handler=sessions_options_handler)
+    router.add_get(path='/pipeline', handler=pipeline_get_handler)
+    router.add_route(method='DELETE', path='/pipeline', handler=pipeline_delete_handler)
+    router.add_route(method='OPTIONS', path='/pipeline', handler=pipeline_options_handler)
+
+    return app
+
+
+def _make_forbidden_response(
+        action: str = "viewing of Streaming API statistics"
+) -> web.Response:
+    """
+    Creates a response to requests that were denied due to
+    insufficient privileges
+
+    :param action: a description of the denied action
+    :return: a response with the 2110 error
+    """
+    error_dict = ERROR_TEMPLATES[2110].to_dict()
+
+    error_dict["user_message"] = error_dict["user_message"].format(
+        action=action
+    )
+
+    return make_json_response(
+        status=403,
+        content=error_dict
+    )
+
+
+@restricted_access
+async def sessions_get_handler(request: web.Request) -> web.Response:
+    """
+    A handler for GET requests for path /streaming/sessions/.
+    Returns delivery statistics of all Streaming API Sessions
+
+    :param request: request to be processed
+    :return: a response to request
+    """
+    streaming_api = request.app['streaming_api']
+
+    try:
+        sessions = streaming_api.view_all_session_stats()
+
+        return make_json_response({"sessions": sessions})
+
+    except AuthInsufficientPrivilegesError:
+        return _make_forbidden_response()
+
+
+@restricted_access
+async def session_get_handler(request: web.Request) -> web.Response:
+    """
+    A handler for GET requests for path /streaming/sessions/{id}.
+    Returns delivery statistics of a single Streaming API Session
+
+    :param request: request to be processed
+    :return: a response to request
+    """
+    session_id = request.match_info['id']
+    streaming_api = request.app['streaming_api']
+
+    try:
+        session = streaming_api.view_session_stats(session_id)
+
+    except AuthInsufficientPrivilegesError:
+        return _make_forbidden_response()
+
+    if session is None:
+        return make_json_response(
+            status=404,
+            content=ERROR_TEMPLATES[1005].to_dict()
+        )
+
+    return make_json_response(session)
+
+
+@restricted_access
+async def pipeline_get_handler(request: web.Request) -> web.Response:
+    """
+    A handler for GET requests for path /streaming/pipeline.
+    Returns latency histograms of the stages of the event pipeline
+
+    :param request: request to be processed
+    :return: a response to request
+    """
+    streaming_api = request.app['streaming_api']
+
+    try:
+        timings = streaming_api.view_pipeline_timings()
+
+    except AuthInsufficientPrivilegesError:
+        return _make_forbidden_response()
+
+    return make_json_response(timings)
+
+
+@restricted_access
+async def pipeline_delete_handler(request: web.Request) -> web.Response:
+    """
+    A handler for DELETE requests for path /streaming/pipeline.
+    Removes all the recorded latencies of the event pipeline
+
+    :param request: request to be processed
+    :return: a response to request
+    """
+    streaming_api = request.app['streaming_api']
+
+    try:
+        streaming_api.reset_pipeline_timings()
+
+    except AuthInsufficientPrivilegesError:
+        return _make_forbidden_response(
+            action="resetting of Streaming API statistics"
+        )
+
+    return web.Response(body=None, status=204)
+
+
+async def sessions_options_handler(request: web.Request) -> web.Response:
+    """
+    A handler for OPTIONS request for paths /streaming/sessions/
+    and /streaming/sessions/{id}.
+
+    Returns a response that contains 'Allow' header with all allowed HTTP methods.
+
+    :param request: request to be handled
+    :return: a response to request
+    """
+    return web.Response(
+        body=None,
+        status=204,
+        headers={'Allow': 'GET, HEAD, OPTIONS'}
+    )
+
+
+async def pipeline_options_handler(request: web.Request) -> web.Response:
+    """
+    A handler for OPTIONS request for path /streaming/pipeline.
+
+    Returns a response that contains 'Allow' header with all allowed HTTP methods.
+
+    :param request: request to be handled
+    :return: a response to request
+    """
+    return web.Response(
+        body=None,
+        status=204,
+        headers={'Allow': 'GET, HEAD, DELETE, OPTIONS'}
+    )
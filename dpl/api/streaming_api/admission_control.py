@@ -0,0 +1,242 @@
+"""
+This module contains a definition of AdmissionController - of a limiter of
+the number of concurrent Streaming API connections
+"""
+import random
+from typing import Dict, Optional
+
+
+class AdmissionRejectedError(Exception):
+    """
+    An exception to be raised if a new connection exceeds one of the limits
+    and must to be rejected
+    """
+    def __init__(self, reason: str):
+        """
+        Constructor
+
+        :param reason: a description of the exceeded limit
+        """
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionTicket(object):
+    """
+    AdmissionTicket represents an admitted connection. It must to be marked
+    as authenticated after a successful authentication and must to be
+    released when the connection is closed
+    """
+    __slots__ = ('_controller', '_peer', '_is_authenticated', '_is_released')
+
+    def __init__(
+            self, controller: 'AdmissionController', peer: Optional[str]
+    ):
+        """
+        Constructor
+
+        :param controller: a controller which admitted the connection
+        :param peer: an address of the client; None if unknown
+        """
+        self._controller = controller
+        self._peer = peer
+        self._is_authenticated = False
+        self._is_released = False
+
+    @property
+    def peer(self) -> Optional[str]:
+        """
+        Returns an address of the client
+
+        :return: an address of the client; None if unknown
+        """
+        return self._peer
+
+    @property
+    def is_authenticated(self) -> bool:
+        """
+        Indicates that the client passed the authentication
+
+        :return: True if the client is authenticated, False otherwise
+        """
+        return self._is_authenticated
+
+    def mark_authenticated(self) -> None:
+        """
+        Reports that the client passed the authentication. Does nothing if
+        the ticket is already marked or released
+
+        :return: None
+        """
+        if self._is_authenticated or self._is_released:
+            return
+
+        self._is_authenticated = True
+        self._controller._on_authenticated(self)
+
+    def release(self) -> None:
+        """
+        Reports that the connection was closed. Does nothing if the ticket
+        is already released
+
+        :return: None
+        """
+        if self._is_released:
+            return
+
+        self._is_released = True
+        self._controller._on_released(self)
+
+
+class AdmissionController(object):
+    """
+    AdmissionController limits the total number of concurrent connections,
+    the number of connections that haven't passed the authentication yet
+    (i.e. the number of concurrent authentication attempts) and the number
+    of connections from the same address. Zero value of a limit means no
+    limit.
+
+    After a restart of the server all clients reconnect at once. To spread
+    their next attempts over time, rejected clients (and clients of
+    a stopped server) are suggested to wait for a random delay before
+    reconnection
+    """
+    def __init__(
+            self, max_connections: int = 0, max_unauthenticated: int = 0,
+            max_per_peer: int = 0, min_retry_delay: float = 1,
+            max_retry_delay: float = 30
+    ):
+        """
+        Constructor
+
+        :param max_connections: the maximum number of concurrent
+               connections
+        :param max_unauthenticated: the maximum number of concurrent
+               connections which haven't passed the authentication yet
+        :param max_per_peer: the maximum number of concurrent connections
+               from the same address
+        :param min_retry_delay: the minimal suggested reconnection delay,
+               seconds
+        :param max_retry_delay: the maximal suggested reconnection delay,
+               seconds
+        """
+        self._max_connections = max_connections
+        self._max_unauthenticated = max_unauthenticated
+        self._max_per_peer = max_per_peer
+        self._min_retry_delay = min_retry_delay
+        self._max_retry_delay = max(min_retry_delay, max_retry_delay)
+
+        self._connections = 0
+        self._unauthenticated = 0
+        self._by_peer = dict()  # type: Dict[str, int]
+        self._rejected_count = 0
+
+    @property
+    def connections(self) -> int:
+        """
+        Returns the current number of admitted connections
+
+        :return: the number of connections
+        """
+        return self._connections
+
+    @property
+    def unauthenticated(self) -> int:
+        """
+        Returns the current number of admitted connections which haven't
+        passed the authentication yet
+
+        :return: the number of unauthenticated connections
+        """
+        return self._unauthenticated
+
+    @property
+    def rejected_count(self) -> int:
+        """
+        Returns the total number of rejected connections
+
+        :return: the number of rejected connections
+        """
+        return self._rejected_count
+
+    def admit(self, peer: Optional[str] = None) -> AdmissionTicket:
+        """
+        Admits a new connection if none of the limits will be exceeded
+
+        :param peer: an address of the client; the limit per address is
+               not applied if not specified
+        :return: a ticket of the admitted connection
+        :raises AdmissionRejectedError: if the connection must to be
+                rejected
+        """
+        if 0 < self._max_connections <= self._connections:
+            self._reject("too many connections")
+
+        if 0 < self._max_unauthenticated <= self._unauthenticated:
+            self._reject("too many concurrent authentication attempts")
+
+        peer_count = self._by_peer.get(peer, 0) if peer is not None else 0
+
+        if 0 < self._max_per_peer <= peer_count:
+            self._reject("too many connections from the same address")
+
+        self._connections += 1
+        self._unauthenticated += 1
+
+        if peer is not None:
+            self._by_peer[peer] = peer_count + 1
+
+        return AdmissionTicket(self, peer)
+
+    def suggest_retry_delay(self) -> float:
+        """
+        Returns a random delay to be waited by a client before the next
+        connection attempt
+
+        :return: a delay, seconds
+        """
+        return random.uniform(self._min_retry_delay, self._max_retry_delay)
+
+    def _reject(self, reason: str) -> None:
+        """
+        Counts a rejected connection and raises AdmissionRejectedError
+
+        :param reason: a description of the exceeded limit
+        :return: None
+        :raises AdmissionRejectedError: always
+        """
+        self._rejected_count += 1
+        raise AdmissionRejectedError(reason)
+
+    def _on_authenticated(self, ticket: AdmissionTicket) -> None:
+        """
+        Updates counters after an authentication of a client
+
+        :param ticket: a ticket of the connection
+        :return: None
+        """
+        self._unauthenticated -= 1
+
+    def _on_released(self, ticket: AdmissionTicket) -> None:
+        """
+        Updates counters after a connection was closed
+
+        :param ticket: a ticket of the connection
+        :return: None
+        """
+        self._connections -= 1
+
+        if not ticket.is_authenticated:
+            self._unauthenticated -= 1
+
+        peer = ticket.peer
+
+        if peer is None:
+            return
+
+        peer_count = self._by_peer[peer] - 1
+
+        if peer_count:
+            self._by_peer[peer] = peer_count
+        else:
+            del self._by_peer[peer]
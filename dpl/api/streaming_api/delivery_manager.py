@@ -4,64 +4,66 @@ controls delivery of the messages and stores all the undelivered messages
 """
 import asyncio
 import logging
-from typing import Dict, Optional
+import time
+from typing import (
+    Any, Callable, Dict, Optional, Mapping, Iterable, List, Set, Tuple
+)
 from collections import OrderedDict
+from operator import attrgetter
 
 from dpl.model.domain_id import TDomainId
+from dpl.events.topic_tree import TopicTree
 from .message import Message
+from .pending_queue import PendingQueue, OverflowPolicy
+from .retained_store import AbsRetainedStore, InMemoryRetainedStore
+from .session_stats import SessionStats
+from .timer_wheel import TimerWheel, TimerHandle
 
 
 LOGGER = logging.getLogger(__name__)
 
 
-def clear_queue(queue: asyncio.Queue) -> None:
-    """
-    Removes all elements from the specified Queue
-
-    :param queue: a Queue to be cleared
-    :return: None
-    """
-    try:
-        while not queue.empty():
-            queue.get_nowait()
-    except asyncio.QueueEmpty:
-        LOGGER.error("Multitasking issue: something exhausted the queue while "
-                     "queue cleaning was in progress")
-
-
 class RescheduledItem(object):
     """
     RescheduledItem is structure data type used for storage of information for
     re-scheduled (i.e. not acknowledged) Tracked Messages. The information to
-    be saved is a message itself, a re-scheduling task and a number of
-    re-schedules already performed.
+    be saved is an identifier of a message, the time of the next
+    retransmission attempt, a number of re-schedules already performed and
+    the time of the last transmission. Messages themselves are kept in
+    a retained message store
     """
+    __slots__ = (
+        'message_id', 'next_attempt', 'number_of_reschedules', 'last_sent'
+    )
 
     def __init__(
-            self, message: Message,
-            delayed_reschedule: Optional[asyncio.Future] = None,
-            number_of_reschedules: int = 0
+            self, message_id: int,
+            next_attempt: float = 0.0,
+            number_of_reschedules: int = 0,
+            last_sent: float = 0.0
     ):
         """
         Constructor. Sets the specified field values
 
-        :param message: a message to be sent
-        :param delayed_reschedule: a Task for a coroutine that adds a message
-               back to the queue of pending messages after some delay
+        :param message_id: an identifier of a message to be sent
+        :param next_attempt: the time of the next retransmission attempt in
+               terms of the EventLoop time
         :param number_of_reschedules: number of re-schedule attempts
                already performed
+        :param last_sent: the time the message was queued for delivery
+               for the last time in terms of the EventLoop time
         """
-        assert message.message_id is not None
-        self.message = message
-        self.delayed_reschedule = delayed_reschedule
+        self.message_id = message_id
+        self.next_attempt = next_attempt
         self.number_of_reschedules = number_of_reschedules
+        self.last_sent = last_sent
 
 
 class SessionRetainedStorage(object):
     """
     A structure that contains information about the list of retained
-    undelivered messages, the number of retransmissions already performed and
-    the Future that is currently handling retransmissions for this Session
+    undelivered messages, their retransmission schedule, the timer of the
+    next retransmission round and the timer of expiration of this Session
     """
     def __init__(self, loop: asyncio.AbstractEventLoop = None):
         """
@@ -71,12 +73,16 @@ class SessionRetainedStorage(object):
         :param loop: an instance of EventLoop to be used for asyncio Lock
                instantiation
         """
-        self.messages = OrderedDict()  # type: OrderedDict[int, Message]
-        self.delay = 1
-        self.retransmission_handler = None  # type: Optional[asyncio.Future]
-        self.messages_lock = asyncio.Lock(loop=None)
+        # type: OrderedDict[int, RescheduledItem]
+        self.messages = OrderedDict()
+        self.messages_lock = asyncio.Lock()
         self.last_message_number = 0
-        self.has_retained_event = asyncio.Event(loop=loop)
+        # retransmissions are performed only while the Session is active
+        self.is_active = False
+        self.retransmission_timer = None  # type: Optional[TimerHandle]
+        # retained messages are discarded if the Session is not resumed
+        # before this timer fires
+        self.expiration_timer = None  # type: Optional[TimerHandle]
 
 
 # SessionRescheduledRegistry is Mapping of a unique message identifier and
@@ -89,12 +95,37 @@ class DeliveryManager(object):
     This class controls the delivery of all messages outcoming from a server.
     It stores all undelivered messages, provides a queue of pending messages,
     control acknowledgements and automatically re-schedules delivery of
-    unacknowledged messages if the delivery was not acknowledged by a client
+    unacknowledged messages if the delivery was not acknowledged by a client.
+
+    Each unacknowledged message has its own retransmission schedule: the delay
+    before the next attempt is doubled after each retransmission of this
+    message. On each retransmission round all the messages that are due are
+    re-sent at once (or a batch of them, if the size of the batch was
+    limited). Retransmission rounds of all Sessions are driven by a single
+    shared TimerWheel.
+
+    Retained messages themselves are kept in a pluggable retained message
+    store, which may save them to disk. Retained messages of Sessions that
+    were not resumed within a TTL are discarded.
+
+    Delivery counters of each Session are kept until all the data of the
+    Session is discarded
     """
     MAX_MESSAGE_ID = 65536
+    INITIAL_RETRANSMISSION_DELAY = 1
     MAX_RETRANSMISSION_DELAY = 14400
 
-    def __init__(self, *, loop: asyncio.AbstractEventLoop = None):
+    def __init__(
+            self, *, loop: asyncio.AbstractEventLoop = None,
+            max_pending_messages: int = 0,
+            overflow_policy: OverflowPolicy = OverflowPolicy.drop_oldest,
+            conflated_topics: Iterable[str] = (),
+            retransmission_batch_size: int = 0,
+            timer_wheel: TimerWheel = None,
+            retained_store: AbsRetainedStore = None,
+            session_ttl: float = 0,
+            on_session_expired: Callable[[TDomainId], None] = None
+    ):
         """
         Constructor. Receives an instance of EventLoop that will handle message
         re-scheduling and will be bonded with a queue of pending messages.
@@ -102,16 +133,75 @@ class DeliveryManager(object):
 
         :param loop: an instance of EventLoop that will be used for message
                re-scheduling and that will be associated with a message queue
+        :param max_pending_messages: the maximum number of pending messages
+               for each Session; zero means an unlimited number of messages
+        :param overflow_policy: a policy to be applied if the maximum number
+               of pending messages was reached
+        :param conflated_topics: topic patterns of messages to be conflated
+               in queues of pending messages: only the last pending untracked
+               message is kept for each matching topic
+        :param retransmission_batch_size: the maximum number of messages to
+               be re-sent on each retransmission round; zero means that all
+               the messages that are due are re-sent at once
+        :param timer_wheel: a TimerWheel to be used for scheduling of
+               retransmissions; a new one is created if not specified
+        :param retained_store: a store of retained messages; messages are
+               restored from the store on creation. An in-memory store
+               without limits is created if not specified
+        :param session_ttl: the time after a disconnection of a Session
+               after which all its retained messages are discarded, seconds;
+               zero means that messages are never discarded
+        :param on_session_expired: a callback to be called with an
+               identifier of Session when its retained messages were
+               discarded due to the TTL expiration
         """
+        if timer_wheel is None:
+            timer_wheel = TimerWheel(loop=loop)
+
+        if retained_store is None:
+            retained_store = InMemoryRetainedStore()
+
         self._loop = loop
+        self._timer_wheel = timer_wheel
+        self._max_pending_messages = max_pending_messages
+        self._overflow_policy = overflow_policy
+        self._retransmission_batch_size = retransmission_batch_size
+        self._retained_store = retained_store
+        self._session_ttl = session_ttl
+        self._on_session_expired = on_session_expired
+
+        self._conflated_topics = None  # type: Optional[TopicTree]
+
+        for pattern in conflated_topics:
+            if self._conflated_topics is None:
+                self._conflated_topics = TopicTree()
+
+            self._conflated_topics.add(pattern=pattern, key=None)
 
         # contains a query of ready-to-be-sent messages for each opened session
-        self._pending_messages = dict()  # type: Dict[TDomainId, asyncio.Queue]
+        self._pending_messages = dict()  # type: Dict[TDomainId, PendingQueue]
 
         # contains a per-session registry of unacknowledged messages and
         # related information
         self._retained = dict()  # type: Dict[TDomainId,SessionRetainedStorage]
 
+        # contains delivery counters of each known session
+        self._stats = dict()  # type: Dict[TDomainId, SessionStats]
+
+        self._restore_retained()
+
+    def close(self) -> None:
+        """
+        Cancels all timers and closes the store of retained messages
+
+        :return: None
+        """
+        for session_retained in self._retained.values():
+            self._cancel_retransmissions(session_retained)
+            self._cancel_expiration(session_retained)
+
+        self._retained_store.close()
+
     async def get_message(self, session_id: TDomainId) -> Message:
         """
         Attempts to extract the new message from a queue of pending messages.
@@ -120,24 +210,151 @@ class DeliveryManager(object):
         :param session_id: an identifier of Session for which the new message
                must to be retrieved
         :return: a new message from a queue of pending message
-        :raises KeyError: if a queue for the specified Session can't be found
+        :raises SlowConsumerError: if the queue of pending messages overflowed
+                and the Session must to be disconnected
+        """
+        session_queue = self._get_pending_queue(session_id)
+
+        return await session_queue.get()
+
+    async def get_messages(
+            self, session_id: TDomainId, max_count: int,
+            flush_interval: float = 0
+    ) -> List[Message]:
+        """
+        Extracts a batch of messages from a queue of pending messages. Blocks
+        if there is not pending messages in the queue. After the first
+        message was received, waits for the specified flush interval for
+        more messages, unless the batch is already full
+
+        :param session_id: an identifier of Session for which messages must
+               to be retrieved
+        :param max_count: the maximum number of messages in a batch
+        :param flush_interval: the time to wait for more messages, seconds
+        :return: a list of messages from a queue of pending messages
+        :raises SlowConsumerError: if the queue of pending messages overflowed
+                and the Session must to be disconnected
         """
-        session_queue = self._pending_messages.setdefault(
-            session_id, asyncio.Queue(loop=self._loop)
+        session_queue = self._get_pending_queue(session_id)
+
+        return await session_queue.get_batch(
+            max_count=max_count, flush_interval=flush_interval
+        )
+
+    def get_queue_stats(self, session_id: TDomainId) -> Mapping[str, int]:
+        """
+        Returns statistics of the queue of pending messages for the
+        specified Session
+
+        :param session_id: an identifier of Session of interest
+        :return: a mapping with the current number of pending messages
+                 ('pending'), the total number of queued messages
+                 ('queued'), the total number of messages dropped on
+                 queue overflows ('dropped') and the total number of
+                 conflated messages ('conflated')
+        """
+        session_queue = self._pending_messages.get(session_id)
+
+        if session_queue is None:
+            return {'pending': 0, 'queued': 0, 'dropped': 0, 'conflated': 0}
+
+        return {
+            'pending': session_queue.qsize(),
+            'queued': session_queue.queued_count,
+            'dropped': session_queue.dropped_count,
+            'conflated': session_queue.conflated_count
+        }
+
+    def get_session_stats(self, session_id: TDomainId) -> SessionStats:
+        """
+        Returns delivery counters of the specified Session. Counters of
+        messages sent to a client are expected to be updated by the caller
+
+        :param session_id: an identifier of Session of interest
+        :return: delivery counters of the Session
+        """
+        stats = self._stats.get(session_id)
+
+        if stats is None:
+            stats = SessionStats()
+            self._stats[session_id] = stats
+
+        return stats
+
+    def list_sessions(self) -> Set[TDomainId]:
+        """
+        Returns identifiers of all Sessions with delivery counters or
+        retained messages
+
+        :return: a set of identifiers of Sessions
+        """
+        return set(self._stats).union(self._retained)
+
+    def describe_session(self, session_id: TDomainId) -> Dict[str, Any]:
+        """
+        Returns all delivery statistics of the specified Session
+
+        :param session_id: an identifier of Session of interest
+        :return: a dict with statistics of the queue of pending messages
+                 (see get_queue_stats), the total number of sent
+                 ('sent'), re-sent ('retransmitted') and acknowledged
+                 ('acked') messages, the total size of sent frames
+                 ('bytes_sent'), the number of times the sending was
+                 paused due to a full outgoing buffer ('write_pauses'), the
+                 current number of retained messages ('retained'), the
+                 total number of retained messages which were missing in
+                 the store on retransmission ('retained_lost') and the
+                 smoothed and the last round-trip times of
+                 acknowledgements in seconds ('ack_rtt' and
+                 'last_ack_rtt', None if there were no acknowledgements)
+        """
+        stats = self._stats.get(session_id)
+
+        if stats is None:
+            stats = SessionStats()
+
+        session_retained = self._retained.get(session_id)
+
+        result = dict(self.get_queue_stats(session_id))
+        result.update(
+            sent=stats.sent,
+            bytes_sent=stats.bytes_sent,
+            retransmitted=stats.retransmitted,
+            acked=stats.acked,
+            write_pauses=stats.write_pauses,
+            retained_lost=stats.retained_lost,
+            retained=(
+                len(session_retained.messages)
+                if session_retained is not None else 0
+            ),
+            ack_rtt=stats.ack_rtt,
+            last_ack_rtt=stats.last_ack_rtt
         )
 
-        result = await session_queue.get()
-        session_queue.task_done()
         return result
 
+    def set_conflate_all(
+            self, session_id: TDomainId, is_enabled: bool
+    ) -> None:
+        """
+        Enables or disables conflation of untracked data messages with any
+        topics in the queue of pending messages of the specified Session
+
+        :param session_id: an identifier of Session of interest
+        :param is_enabled: True to conflate messages with all topics, False
+               to conflate only the ones with configured topics
+        :return: None
+        """
+        self._get_pending_queue(session_id).conflate_all = is_enabled
+
     async def put_message(
             self, session_id: TDomainId, message: Message,
             ensure_delivery: bool = False
     ) -> None:
         """
         Attempts to put a new message in a queue of pending messages for the
-        specified Session. Blocks if the maximum number of pending messages
-        was reached
+        specified Session. Applies the overflow policy if the maximum number
+        of pending messages was reached
 
         :param session_id: an identifier of Session for which the new message
                must to be added to the list of pending messages
@@ -147,10 +364,14 @@ class DeliveryManager(object):
                acknowledged by client
         :return: None
         """
-        await self._add_to_pending(session_id=session_id, message=message)
+        # message_id must to be assigned before the message will be queued,
+        # tracked messages are never replaced in the queue
+        if ensure_delivery and not await self._add_to_retained(
+                session_id=session_id, message=message
+        ):
+            return
 
-        if ensure_delivery:
-            await self._add_to_retained(session_id=session_id, message=message)
+        self._add_to_pending(session_id=session_id, message=message)
 
     async def ack_delivery(
             self, session_id: TDomainId, message_id: int
@@ -173,32 +394,235 @@ class DeliveryManager(object):
             return
 
         async with session_retained.messages_lock:
-            if message_id in session_retained.messages:
-                self._remove_retained(message_id, session_retained)
+            item = session_retained.messages.get(message_id)
+
+            if item is not None:
+                self._remove_retained(
+                    session_id, message_id, session_retained
+                )
+                self._count_acked(session_id, 1, item)
             else:
                 LOGGER.info(
                     "Message #%d was already acknowledged, ignored. "
                     "Session %s.", message_id, session_id
                 )
 
-    @staticmethod
+    async def ack_delivery_ranges(
+            self, session_id: TDomainId,
+            ranges: Iterable[Tuple[int, int]] = (), up_to: int = None
+    ) -> int:
+        """
+        Acknowledges the delivery of several TrackedMessages at once.
+        Identifiers are assigned sequentially and wrap around at
+        MAX_MESSAGE_ID, so both ranges and the cumulative acknowledgement
+        are resolved with respect to the order of assignment of identifiers
+
+        :param session_id: an identifier of Session for which messages
+               must to be acknowledged
+        :param ranges: inclusive ranges of identifiers of messages to be
+               acknowledged; a range with the first identifier greater than
+               the last one wraps around MAX_MESSAGE_ID
+        :param up_to: an identifier of a message; this message and all
+               the messages that were sent before it are acknowledged
+        :return: the number of acknowledged messages
+        """
+        session_retained = self._retained.get(session_id)
+
+        if session_retained is None:
+            LOGGER.warning(
+                "Acknowledge received for a closed or unopened Session: %s",
+                session_id
+            )
+            return 0
+
+        async with session_retained.messages_lock:
+            acked = 0
+
+            if up_to is not None:
+                acked += self._ack_up_to(session_id, up_to, session_retained)
+
+            for first, last in ranges:
+                acked += self._ack_range(
+                    session_id, first, last, session_retained
+                )
+
+            self._stop_retransmissions_if_empty(session_retained)
+
+        return acked
+
+    def _ack_up_to(
+            self, session_id: TDomainId, up_to: int,
+            session_retained: SessionRetainedStorage
+    ) -> int:
+        """
+        Removes the specified message and all the messages that were retained
+        before it. Takes a time proportional to the number of removed
+        messages
+
+        :param session_id: an identifier of Session messages belong to
+        :param up_to: an identifier of the last message to be removed
+        :param session_retained: a storage of retained messages
+        :return: the number of removed messages
+        """
+        messages = session_retained.messages
+        newest = session_retained.last_message_number
+        threshold = self._get_age(newest, up_to)
+        first = last = None
+        last_item = None
+        removed = 0
+
+        # messages are ordered by the assignment of their identifiers, so
+        # the oldest messages are always at the beginning
+        while messages:
+            message_id = next(iter(messages))
+
+            if self._get_age(newest, message_id) < threshold:
+                break
+
+            last_item = messages.popitem(last=False)[1]
+            removed += 1
+            last = message_id
+
+            if first is None:
+                first = message_id
+
+        if removed:
+            self._remove_range_from_store(session_id, first, last)
+            self._count_acked(session_id, removed, last_item)
+
+        return removed
+
+    def _ack_range(
+            self, session_id: TDomainId, first: int, last: int,
+            session_retained: SessionRetainedStorage
+    ) -> int:
+        """
+        Removes all the messages with identifiers in the specified range.
+        Takes a time proportional to the length of the range or to the
+        number of retained messages, whichever is smaller
+
+        :param session_id: an identifier of Session messages belong to
+        :param first: the first identifier in the range
+        :param last: the last identifier in the range (inclusive)
+        :param session_retained: a storage of retained messages
+        :return: the number of removed messages
+        """
+        messages = session_retained.messages
+        length = (last - first) % self.MAX_MESSAGE_ID + 1
+
+        if length <= len(messages):
+            message_ids = [
+                (first + i) % self.MAX_MESSAGE_ID for i in range(length)
+            ]
+        else:
+            message_ids = [
+                message_id for message_id in messages
+                if (message_id - first) % self.MAX_MESSAGE_ID < length
+            ]
+
+        removed = 0
+        last_item = None
+
+        for message_id in message_ids:
+            item = messages.pop(message_id, None)
+
+            if item is not None:
+                removed += 1
+                last_item = item
+
+        if removed:
+            self._remove_range_from_store(session_id, first, last)
+            self._count_acked(session_id, removed, last_item)
+
+        return removed
+
+    def _count_acked(
+            self, session_id: TDomainId, count: int, item: RescheduledItem
+    ) -> None:
+        """
+        Updates counters of acknowledged messages of the Session. Takes
+        a sample of the round-trip time from the specified message if it
+        was not re-sent yet
+
+        :param session_id: an identifier of Session messages belong to
+        :param count: the number of acknowledged messages
+        :param item: information about one of the acknowledged messages
+        :return: None
+        """
+        stats = self._stats.get(session_id)
+
+        if stats is None:
+            return
+
+        stats.acked += count
+
+        if item.number_of_reschedules == 0:
+            stats.add_ack_rtt(self._timer_wheel.time() - item.last_sent)
+
+    def _get_age(self, newest: int, message_id: int) -> int:
+        """
+        Returns the number of identifiers that were assigned after the
+        specified one
+
+        :param newest: the last assigned identifier
+        :param message_id: an identifier of interest
+        :return: the number of identifiers assigned after it
+        """
+        return (newest - message_id) % self.MAX_MESSAGE_ID
+
+    def _remove_range_from_store(
+            self, session_id: TDomainId, first: int, last: int
+    ) -> None:
+        """
+        Removes a range of messages from the store of retained messages,
+        splitting the range if it wraps around MAX_MESSAGE_ID
+
+        :param session_id: an identifier of Session messages belong to
+        :param first: the first identifier in the range
+        :param last: the last identifier in the range (inclusive)
+        :return: None
+        """
+        store = self._retained_store
+
+        if first <= last:
+            store.remove_range(session_id, first, last)
+        else:
+            store.remove_range(session_id, first, self.MAX_MESSAGE_ID - 1)
+            store.remove_range(session_id, 0, last)
+
     def _remove_retained(
-            message_id: int, session_retained: SessionRetainedStorage
+            self, session_id: TDomainId, message_id: int,
+            session_retained: SessionRetainedStorage
     ):
         """
-        Removes the message from a list of retained messages. Sets the number
-        of retransmissions to zero and stops the has_retained_event if there
-        is no messages left.
+        Removes the message from a list of retained messages. Stops
+        retransmissions if there is no messages left.
 
+        :param session_id: an identifier of Session the message belongs to
         :param message_id: an identifier of a message to be removed
         :param session_retained: a storage of retained messages
         :return: None
         """
         session_retained.messages.pop(message_id)
-        session_retained.delay = 1
+        self._retained_store.remove(session_id, message_id)
+        self._stop_retransmissions_if_empty(session_retained)
+
+    @staticmethod
+    def _stop_retransmissions_if_empty(
+            session_retained: SessionRetainedStorage
+    ) -> None:
+        """
+        Stops retransmissions if there is no retained messages left
 
-        if not session_retained.messages:  # if there is no messages left
-            session_retained.has_retained_event.clear()  # ...stop event
+        :param session_retained: a storage of retained messages
+        :return: None
+        """
+        timer = session_retained.retransmission_timer
+
+        # if there is no messages left, then stop retransmissions
+        if not session_retained.messages and timer is not None:
+            timer.cancel()
+            session_retained.retransmission_timer = None
 
     async def pause_for(self, session_id: TDomainId) -> None:
         """
@@ -212,18 +636,22 @@ class DeliveryManager(object):
         session_retained = self._retained.get(session_id)
 
         if session_retained is not None:
-            assert session_retained.retransmission_handler is not None
-            session_retained.retransmission_handler.cancel()
-            # await session_retained.retransmission_handler
+            session_retained.is_active = False
+            self._cancel_retransmissions(session_retained)
+            self._retained_store.mark_seen(session_id, time.time())
+            self._schedule_expiration(
+                session_id, session_retained, self._session_ttl
+            )
 
         queue = self._pending_messages.get(session_id)
 
         if queue is not None:
-            clear_queue(queue)
+            queue.clear()
 
     async def resume_for(self, session_id: TDomainId) -> None:
         """
         Adds back all undelivered messages to the queue of pending messages
+        immediately and resets their retransmission schedule
 
         :param session_id: an identifier of Session for which communication
                must to be resumed
@@ -233,20 +661,43 @@ class DeliveryManager(object):
             session_id, SessionRetainedStorage()
         )
 
-        session_retained.delay = 1
-        old_handler = session_retained.retransmission_handler
+        # all pending messages was cleared on pause, so the queue may contain
+        # only retained messages which will be re-sent anyway
+        queue = self._pending_messages.get(session_id)
+
+        if queue is not None:
+            queue.clear()
 
-        if old_handler is not None and not old_handler.done():
+        if session_retained.is_active:
             LOGGER.warning(
-                "The old session retransmission task was still alive for "
+                "The old session retransmissions were still active for "
                 "%s Session. Old connection is dead?", session_id
             )
-            old_handler.cancel()
+            self._cancel_retransmissions(session_retained)
 
-        session_retained.retransmission_handler = asyncio.ensure_future(
-            self._retransmission_handler(session_id, session_retained),
-            loop=self._loop
-        )
+        session_retained.is_active = True
+        self._cancel_expiration(session_retained)
+        self._retained_store.mark_seen(session_id, time.time())
+        stats = self.get_session_stats(session_id)
+
+        async with session_retained.messages_lock:
+            now = self._timer_wheel.time()
+            next_attempt = now + self.INITIAL_RETRANSMISSION_DELAY
+
+            for item in tuple(session_retained.messages.values()):
+                item.number_of_reschedules = 0
+                item.next_attempt = next_attempt
+                item.last_sent = now
+
+                if self._add_retained_to_pending(
+                        session_id, item, session_retained
+                ):
+                    stats.retransmitted += 1
+
+            if session_retained.messages:
+                self._schedule_retransmission(
+                    session_id, session_retained, next_attempt
+                )
 
     async def discard_for(self, session_id: TDomainId) -> None:
         """
@@ -262,9 +713,13 @@ class DeliveryManager(object):
             self._pending_messages.pop(session_id)
 
         if session_id in self._retained:
-            self._retained.pop(session_id)
+            session_retained = self._retained.pop(session_id)
+            self._cancel_expiration(session_retained)
 
-    async def _add_to_pending(
+        self._stats.pop(session_id, None)
+        self._retained_store.remove_all_for(session_id)
+
+    def _add_to_pending(
             self, session_id: TDomainId, message: Message
     ) -> None:
         """
@@ -276,76 +731,338 @@ class DeliveryManager(object):
                for this Session
         :return: None
         """
-        session_queue = self._pending_messages.setdefault(
-            session_id, asyncio.Queue(loop=self._loop)
-        )
-        await session_queue.put(message)
+        session_queue = self._get_pending_queue(session_id)
+        session_queue.put_nowait(message)
         LOGGER.debug(
             "Pending %d messages for %s", session_queue.qsize(), session_id
         )
 
+    def _add_retained_to_pending(
+            self, session_id: TDomainId, item: RescheduledItem,
+            session_retained: SessionRetainedStorage
+    ) -> bool:
+        """
+        Loads a retained message from the store and adds it to the list of
+        pending messages. Forgets the message and counts it as lost if it's
+        missing in the store
+
+        :param session_id: an identifier of Session the message belongs to
+        :param item: information about the retained message
+        :param session_retained: information about retained messages
+        :return: True if the message was added to the list of pending
+                 messages, False if it was lost
+        """
+        message = self._retained_store.get(session_id, item.message_id)
+
+        if message is None:
+            LOGGER.warning(
+                "Retained message #%d of %s Session is missing in the "
+                "store and will never be delivered",
+                item.message_id, session_id
+            )
+            self.get_session_stats(session_id).retained_lost += 1
+            self._remove_retained(
+                session_id, item.message_id, session_retained
+            )
+            return False
+
+        self._add_to_pending(session_id, message)
+        return True
+
+    def _get_pending_queue(self, session_id: TDomainId) -> PendingQueue:
+        """
+        Returns a queue of pending messages for the specified Session. Creates
+        a new queue if it wasn't created yet
+
+        :param session_id: an identifier of Session of interest
+        :return: a queue of pending messages
+        """
+        session_queue = self._pending_messages.get(session_id)
+
+        if session_queue is None:
+            session_queue = PendingQueue(
+                max_size=self._max_pending_messages,
+                overflow_policy=self._overflow_policy,
+                loop=self._loop,
+                conflated_topics=self._conflated_topics
+            )
+            self._pending_messages[session_id] = session_queue
+
+        return session_queue
+
     async def _add_to_retained(
             self, session_id: TDomainId, message: Message
-    ) -> None:
+    ) -> bool:
         """
-        Adds a Message to the list of retained messages
+        Adds a Message to the list of retained messages. Messages for
+        Sessions that were never resumed or were already discarded (i.e.
+        expired) are dropped, so a message routed to a Session right before
+        its expiration will not bring it back
 
         :param session_id: an identifier of Session for which the new message
                must to be added to the list of retained messages
         :param message: a message to be added to the list of retained messages
                for this Session
-        :return: None
+        :return: True if the message was added, False if it was dropped
         """
         assert message.message_id is None
 
-        session_retained = self._retained.setdefault(
-            session_id, SessionRetainedStorage()
-        )
+        session_retained = self._retained.get(session_id)
 
-        if session_retained.retransmission_handler is None:
-            session_retained.retransmission_handler = asyncio.ensure_future(
-                self._retransmission_handler(session_id, session_retained),
-                loop=self._loop
+        if session_retained is None:
+            LOGGER.debug(
+                "Retained message for unknown or expired %s Session dropped",
+                session_id
             )
+            return False
 
         async with session_retained.messages_lock:
+            if self._retained.get(session_id) is not session_retained:
+                # the Session expired while the lock was being acquired
+                return False
+
             last_message_id = session_retained.last_message_number
             message.message_id = (last_message_id + 1) % self.MAX_MESSAGE_ID
             session_retained.last_message_number = message.message_id
-            session_retained.messages[message.message_id] = message
-            session_retained.has_retained_event.set()
 
-    async def _retransmission_handler(
+            now = self._timer_wheel.time()
+            next_attempt = now + self.INITIAL_RETRANSMISSION_DELAY
+            # a new message replaces the oldest one if all identifiers
+            # are in use; it is moved to the end of the retransmission order
+            session_retained.messages.pop(message.message_id, None)
+            session_retained.messages[message.message_id] = RescheduledItem(
+                message_id=message.message_id, next_attempt=next_attempt,
+                last_sent=now
+            )
+            self._retained_store.add(session_id, message)
+
+            if session_retained.is_active:
+                self._schedule_retransmission(
+                    session_id, session_retained, next_attempt
+                )
+
+        return True
+
+    def _schedule_retransmission(
+            self, session_id: TDomainId,
+            session_retained: SessionRetainedStorage, when: float
+    ) -> None:
+        """
+        Schedules the next retransmission round for the Session to the
+        specified time, if it's not already scheduled to an earlier moment
+
+        :param session_id: an identifier of Session messages belong to
+        :param session_retained: information about retained messages
+        :param when: the time of the retransmission round in terms of the
+               EventLoop time
+        :return: None
+        """
+        timer = session_retained.retransmission_timer
+
+        if timer is not None:
+            if timer.when <= when:
+                return
+
+            timer.cancel()
+
+        session_retained.retransmission_timer = self._timer_wheel.call_at(
+            when, self._on_retransmission_timer, session_id, session_retained
+        )
+
+    @staticmethod
+    def _cancel_retransmissions(
+            session_retained: SessionRetainedStorage
+    ) -> None:
+        """
+        Cancels the scheduled retransmission round
+
+        :param session_retained: information about retained messages
+        :return: None
+        """
+        timer = session_retained.retransmission_timer
+
+        if timer is not None:
+            timer.cancel()
+            session_retained.retransmission_timer = None
+
+    def _on_retransmission_timer(
             self, session_id: TDomainId,
             session_retained: SessionRetainedStorage
     ) -> None:
         """
-        Watches the list of retained messages and adds them to the queue of
-        to-be-sent (pending) messages after some delay. Delay is growing
-        with a number of retransmission attempts already performed
+        A TimerWheel callback. Performs a retransmission round and schedules
+        the next one
 
-        :param session_id: an identifier of Session this handler is assigned to
-        :param session_retained: information about retained messages and
-               retransmissions performed by this handler
+        :param session_id: an identifier of Session messages belong to
+        :param session_retained: information about retained messages
         :return: None
         """
-        session_retained.delay = 1
+        session_retained.retransmission_timer = None
 
-        while True:  # interrupted with future cancellation
-            # block if there is no retained messages in the storage
-            await session_retained.has_retained_event.wait()
+        next_round = self._retransmit_due(session_id, session_retained)
 
-            # wait the specified amount of time between retransmissions
-            await asyncio.sleep(session_retained.delay, loop=self._loop)
+        if next_round is not None:
+            self._schedule_retransmission(
+                session_id, session_retained, next_round
+            )
 
-            # fetch one message (any) and send it to the list of pending
-            async with session_retained.messages_lock:
-                for message in session_retained.messages.values():
-                    await self._add_to_pending(session_id, message)
-                    break  # add only one message to the queue at a time
+    def _retransmit_due(
+            self, session_id: TDomainId,
+            session_retained: SessionRetainedStorage
+    ) -> Optional[float]:
+        """
+        Adds all the retained messages that are due (or a limited batch of
+        them, the longest overdue first) to the queue of pending messages
+        and schedules the next retransmission of each of them with an
+        exponentially growing delay
+
+        :param session_id: an identifier of Session messages belong to
+        :param session_retained: information about retained messages
+        :return: the time of the next retransmission round or None if there
+                 is no retained messages
+        """
+        now = self._timer_wheel.time()
+        batch_size = self._retransmission_batch_size
+        sent = 0
+        next_round = None  # type: Optional[float]
+        due = []  # type: List[RescheduledItem]
+
+        for item in session_retained.messages.values():
+            if item.next_attempt > now:
+                if next_round is None or item.next_attempt < next_round:
+                    next_round = item.next_attempt
+            else:
+                due.append(item)
+
+        if 0 < batch_size < len(due):
+            # messages which are overdue for the longest time go first, so
+            # they are not starved by messages with shorter delays
+            due.sort(key=attrgetter('next_attempt'))
+            del due[batch_size:]
+
+            # the rest of messages will be re-sent on the next round
+            next_round = min(
+                next_round or float('inf'),
+                now + self.INITIAL_RETRANSMISSION_DELAY
+            )
 
-            # increase the delay between retransmissions (2^n growth)
-            session_retained.delay = min(
-                session_retained.delay * 2,
+        for item in due:
+            if not self._add_retained_to_pending(
+                    session_id, item, session_retained
+            ):
+                continue
+
+            sent += 1
+            item.number_of_reschedules += 1
+            item.last_sent = now
+            item.next_attempt = now + min(
+                self.INITIAL_RETRANSMISSION_DELAY *
+                2 ** min(item.number_of_reschedules, 32),
                 self.MAX_RETRANSMISSION_DELAY
             )
+
+        if sent:
+            self.get_session_stats(session_id).retransmitted += sent
+
+        return next_round
+
+    def _schedule_expiration(
+            self, session_id: TDomainId,
+            session_retained: SessionRetainedStorage, delay: float
+    ) -> None:
+        """
+        Schedules discarding of retained messages of an inactive Session
+
+        :param session_id: an identifier of Session
+        :param session_retained: information about retained messages
+        :param delay: the time before expiration, seconds
+        :return: None
+        """
+        self._cancel_expiration(session_retained)
+
+        if self._session_ttl <= 0:
+            return
+
+        session_retained.expiration_timer = self._timer_wheel.call_later(
+            max(delay, 0), self._on_expiration_timer, session_id,
+            session_retained
+        )
+
+    @staticmethod
+    def _cancel_expiration(session_retained: SessionRetainedStorage) -> None:
+        """
+        Cancels the scheduled expiration of a Session
+
+        :param session_retained: information about retained messages
+        :return: None
+        """
+        timer = session_retained.expiration_timer
+
+        if timer is not None:
+            timer.cancel()
+            session_retained.expiration_timer = None
+
+    def _on_expiration_timer(
+            self, session_id: TDomainId,
+            session_retained: SessionRetainedStorage
+    ) -> None:
+        """
+        A TimerWheel callback. Discards all retained messages of a Session
+        that was not resumed in time
+
+        :param session_id: an identifier of Session
+        :param session_retained: information about retained messages
+        :return: None
+        """
+        session_retained.expiration_timer = None
+
+        if session_retained.is_active:
+            return
+
+        LOGGER.info(
+            "Session %s was not resumed in time, %d retained messages "
+            "discarded", session_id, len(session_retained.messages)
+        )
+
+        self._cancel_retransmissions(session_retained)
+        self._retained.pop(session_id, None)
+        self._pending_messages.pop(session_id, None)
+        self._stats.pop(session_id, None)
+        self._retained_store.remove_all_for(session_id)
+
+        if self._on_session_expired is not None:
+            self._on_session_expired(session_id)
+
+    def _restore_retained(self) -> None:
+        """
+        Restores retained messages saved in the store before restart. All
+        restored Sessions are inactive until they will be resumed
+
+        :return: None
+        """
+        now = time.time()
+
+        for session_id, (last_seen, messages) in \
+                self._retained_store.restore().items():
+            session_retained = SessionRetainedStorage()
+
+            for message in messages:
+                session_retained.messages[message.message_id] = \
+                    RescheduledItem(message_id=message.message_id)
+                session_retained.last_message_number = message.message_id
+
+            self._retained[session_id] = session_retained
+
+            if last_seen is None:
+                last_seen = now
+
+            self._schedule_expiration(
+                session_id, session_retained,
+                last_seen + self._session_ttl - now
+            )
+
+        if self._retained:
+            LOGGER.info(
+                "Restored retained messages of %d Sessions",
+                len(self._retained)
+            )
@@ -0,0 +1,158 @@
+"""
+This module contains a definition of DeltaEncoder - of a per-connection
+encoder which replaces full bodies of data messages with patches against
+the last body delivered to the same client for the same topic
+"""
+from typing import Any, Dict, List, Mapping, Optional
+
+from dpl.events.topic_tree import TopicTree
+from .message import Message
+
+
+class _TopicState(object):
+    """
+    The state of delta encoding of a single topic
+    """
+    __slots__ = ('last_body', 'last_timestamp', 'seq', 'deltas_left')
+
+    def __init__(self):
+        self.last_body = None  # type: Optional[Mapping]
+        self.last_timestamp = 0.0
+        # the sequence number of the last message sent for this topic
+        self.seq = -1
+        # the number of patches to be sent before the next snapshot
+        self.deltas_left = 0
+
+
+class DeltaEncoder(object):
+    """
+    DeltaEncoder remembers the last body of a data message delivered to the
+    client for each matching topic and replaces bodies of the following
+    messages with patches that contain changed fields only. Bodies of
+    encoded messages have one of the following forms:
+
+    - ``{"seq": 0, "snapshot": {...}}`` - a full body of the message;
+    - ``{"seq": 1, "patch": {...}, "removed": [...]}`` - changed and added
+      fields of the body and names of removed fields (``removed`` is
+      present only if some fields were removed).
+
+    Sequence numbers are assigned separately for each topic, starting from
+    zero, and are incremented by one with each message. A snapshot is sent
+    on the first message for each topic, on a resync request and after each
+    ``snapshot_interval`` patches.
+
+    A single instance of encoder must to be used for a single connection,
+    so all the state is discarded on disconnection. Tracked messages (i.e.
+    messages with a message_id) are never encoded and don't affect the
+    state, because they can be re-sent in any order
+    """
+    def __init__(self, topics: TopicTree, snapshot_interval: int):
+        """
+        Constructor
+
+        :param topics: a tree of topic patterns of data messages to be
+               delta-encoded
+        :param snapshot_interval: the maximum number of patches sent in a row
+               before the next full snapshot
+        """
+        self._topics = topics
+        self._snapshot_interval = snapshot_interval
+        self._states = dict()  # type: Dict[str, _TopicState]
+
+    @property
+    def snapshot_interval(self) -> int:
+        """
+        Returns the maximum number of patches sent in a row
+
+        :return: the maximum number of patches between snapshots
+        """
+        return self._snapshot_interval
+
+    def encode(self, message: Message) -> Message:
+        """
+        Encodes the message if it's applicable
+
+        :param message: a message to be sent
+        :return: a message with a snapshot or a patch in its body; or the
+                 original message if delta encoding isn't applicable to it
+        """
+        if (message.type != "data" or message.message_id is not None or
+                not isinstance(message.body, Mapping) or
+                not self._topics.has_matching(message.topic)):
+            return message
+
+        state = self._states.get(message.topic)
+
+        if state is None:
+            state = _TopicState()
+            self._states[message.topic] = state
+
+        previous = state.last_body
+        state.last_body = message.body
+        state.last_timestamp = message.timestamp
+        state.seq += 1
+
+        if previous is None or state.deltas_left <= 0:
+            state.deltas_left = self._snapshot_interval
+            body = {'seq': state.seq, 'snapshot': message.body}
+        else:
+            state.deltas_left -= 1
+            body = self._build_patch(previous, message.body)
+            body['seq'] = state.seq
+
+        return Message(
+            timestamp=message.timestamp, type_=message.type,
+            topic=message.topic, body=body, event_seq=message.event_seq
+        )
+
+    def resync(self, topic: str = None) -> List[Message]:
+        """
+        Builds snapshots of the last delivered bodies. The following patches
+        are built against these snapshots
+
+        :param topic: a topic to be resynchronized; all topics if None
+        :return: a list of messages with snapshots to be sent to the client
+        """
+        if topic is None:
+            topics = list(self._states.keys())
+        elif topic in self._states:
+            topics = [topic]
+        else:
+            topics = []
+
+        result = []
+
+        for topic in topics:
+            state = self._states[topic]
+            state.seq += 1
+            state.deltas_left = self._snapshot_interval
+
+            result.append(Message(
+                timestamp=state.last_timestamp, type_="data", topic=topic,
+                body={'seq': state.seq, 'snapshot': state.last_body}
+            ))
+
+        return result
+
+    @staticmethod
+    def _build_patch(previous: Mapping, current: Mapping) -> Dict[str, Any]:
+        """
+        Compares two bodies field by field
+
+        :param previous: the last delivered body
+        :param current: a body to be delivered
+        :return: a body of a message with changed and removed fields
+        """
+        changed = {
+            key: value for key, value in current.items()
+            if key not in previous or previous[key] != value
+        }
+
+        result = {'patch': changed}
+
+        removed = [key for key in previous if key not in current]
+
+        if removed:
+            result['removed'] = removed
+
+        return result
@@ -15,7 +15,9 @@ from dpl.auth.exceptions import AuthInvalidTokenError
 from dpl.api.api_errors import ERROR_TEMPLATES
 from .error_message_utlis import send_error_message_by_code, send_error_message
 from .message import MessageFormatViolationError
-from .receive_utils import NotTextFrame
+from .receive_utils import NotTextFrame, NotBinaryFrame
+from .message_codecs import MessageDecodeError
+from .pending_queue import SlowConsumerError
 from .streaming_flow_error import StreamingFlowError
 
 
@@ -105,6 +107,26 @@ async def _(exc_val, exc_tb, ws_con):
     return True
 
 
+@_handle_exception.register(NotBinaryFrame)
+async def _(exc_val, exc_tb, ws_con):
+    await send_error_message_by_code(ws=ws_con, error_code=5006)
+    return True
+
+
+@_handle_exception.register(MessageDecodeError)
+async def _(exc_val, exc_tb, ws_con):
+    await send_error_message_by_code(
+        ws=ws_con, error_code=5007, format_params=(str(exc_val),)
+    )
+    return True
+
+
+@_handle_exception.register(SlowConsumerError)
+async def _(exc_val, exc_tb, ws_con):
+    await send_error_message_by_code(ws=ws_con, error_code=5005)
+    return True
+
+
 @_handle_exception.register(json.JSONDecodeError)
 async def _(exc_val, exc_tb, ws_con):
     await send_error_message_by_code(ws=ws_con, error_code=5002)
@@ -0,0 +1,116 @@
+"""
+This module contains a definition of Heartbeat - of a liveness checker for
+WebSocket connections which is driven by a shared TimerWheel
+"""
+import asyncio
+from typing import Optional
+
+from aiohttp import WSCloseCode
+from aiohttp.web import WebSocketResponse
+
+from .timer_wheel import TimerWheel, TimerHandle
+
+
+class Heartbeat(object):
+    """
+    Heartbeat checks that a WebSocket connection is still alive. If nothing
+    was received from a client during the heartbeat interval, then a PING
+    frame is sent to the client. The connection is closed if nothing was
+    received during a half of the interval after the PING.
+
+    Any received frame (including PONG) must to be reported with the touch
+    method. Touches are cheap: they just save the time of the last activity,
+    the only timer of the Heartbeat is re-scheduled lazily
+    """
+    __slots__ = (
+        '_ws', '_wheel', '_interval', '_last_activity', '_ping_sent_at',
+        '_timer'
+    )
+
+    def __init__(
+            self, ws: WebSocketResponse, timer_wheel: TimerWheel,
+            interval: float
+    ):
+        """
+        Constructor
+
+        :param ws: an instance of WebSocketResponse to be watched; autoping
+               must to be disabled for it
+        :param timer_wheel: a TimerWheel to be used for scheduling
+        :param interval: a heartbeat interval, seconds
+        """
+        self._ws = ws
+        self._wheel = timer_wheel
+        self._interval = interval
+        self._last_activity = 0.0
+        self._ping_sent_at = None  # type: Optional[float]
+        self._timer = None  # type: Optional[TimerHandle]
+
+    def start(self) -> None:
+        """
+        Starts watching the connection
+
+        :return: None
+        """
+        self._last_activity = self._wheel.time()
+        self._schedule(self._last_activity + self._interval)
+
+    def stop(self) -> None:
+        """
+        Stops watching the connection
+
+        :return: None
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def touch(self) -> None:
+        """
+        Reports that a frame was received from the client
+
+        :return: None
+        """
+        self._last_activity = self._wheel.time()
+
+    def _schedule(self, when: float) -> None:
+        """
+        Schedules the next check of the connection
+
+        :param when: the time of the next check
+        :return: None
+        """
+        self._timer = self._wheel.call_at(when, self._on_timer)
+
+    def _on_timer(self) -> None:
+        """
+        Checks the connection: sends a PING frame or closes the connection
+        if the client didn't respond to the previous one
+
+        :return: None
+        """
+        self._timer = None
+
+        if self._ws.closed:
+            return
+
+        now = self._wheel.time()
+        ping_sent_at = self._ping_sent_at
+
+        if ping_sent_at is not None and self._last_activity < ping_sent_at:
+            asyncio.ensure_future(
+                self._ws.close(code=WSCloseCode.GOING_AWAY),
+                loop=self._wheel.loop
+            )
+            return
+
+        self._ping_sent_at = None
+        next_check = self._last_activity + self._interval
+
+        if next_check > now:
+            self._schedule(next_check)
+            return
+
+        self._ws.ping()
+        self._ping_sent_at = now
+        self._schedule(now + self._interval / 2)
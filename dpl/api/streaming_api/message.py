@@ -4,6 +4,8 @@ transreceived via Streaming API connection.
 """
 from typing import Mapping, Type, Union, Any, Optional
 
+from dpl.utils.stage_timing import StageTrace
+
 
 class MessageFormatViolationError(Exception):
     """
@@ -103,7 +105,8 @@ class Message(object):
     """
     def __init__(
             self, timestamp: float, type_: str, topic: str, body: Mapping,
-            message_id: int = None
+            message_id: int = None, frame: 'PreparedFrame' = None,
+            event_seq: int = None, trace: StageTrace = None
     ):
         """
         Constructor. Sets values of the properties to the specified values
@@ -115,6 +118,14 @@ class Message(object):
         :param body: the body, payload of the message
         :param message_id: a lifetime identifier of this message; can't
                be changed once set
+        :param frame: an optional pre-serialized representation of the
+               message content, shared between several Messages with the same
+               timestamp, type, topic and body
+        :param event_seq: a sequence number of the event this data message
+               was built from, if the event was saved to EventJournal
+        :param trace: a trace of stages of the event pipeline passed by
+               the event this data message was built from, if the stage
+               timing is enabled
         :raises: MessageFormatViolationError - if there is an issue with one
                  of the specified parameters
         """
@@ -125,6 +136,9 @@ class Message(object):
         self._topic = topic
         self._body = body
         self._message_id = message_id
+        self._frame = frame
+        self._event_seq = event_seq
+        self._trace = trace
 
     @property
     def timestamp(self) -> float:
@@ -184,3 +198,32 @@ class Message(object):
         :raises ValueError: if an identifier was already set
         """
         self._message_id = new_value
+
+    @property
+    def frame(self) -> Optional['PreparedFrame']:
+        """
+        Returns a pre-serialized representation of the content of this Message
+        if it was set
+
+        :return: an instance of PreparedFrame or None
+        """
+        return self._frame
+
+    @property
+    def event_seq(self) -> Optional[int]:
+        """
+        Returns a sequence number of the event this Message was built from
+
+        :return: a sequence number of the event or None if it's not set
+        """
+        return self._event_seq
+
+    @property
+    def trace(self) -> Optional[StageTrace]:
+        """
+        Returns a trace of stages of the event pipeline passed by the event
+        this Message was built from
+
+        :return: an instance of StageTrace or None if it's not set
+        """
+        return self._trace
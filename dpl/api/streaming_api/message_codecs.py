@@ -0,0 +1,282 @@
+"""
+This module contains definitions of MessageCodecs - of pluggable encoders
+and decoders of Streaming API messages which convert Messages to WebSocket
+frame payloads and vice versa
+"""
+import json
+from typing import Any, Dict, List, Mapping, Sequence, Union
+
+from .message import Message
+from .message_json import message_to_text, messages_to_text
+from .message_utils import parse_message
+from . import msgpack_format
+
+
+class MessageDecodeError(ValueError):
+    """
+    An exception to be raised if the content of a frame can't be decoded
+    to a Message by a binary codec
+    """
+    pass
+
+
+class MessageCodec(object):
+    """
+    MessageCodec is an abstract base class for all message codecs. A single
+    instance of codec is used for a single connection, so codecs are allowed
+    to keep per-connection state (like tables of interned topics)
+    """
+    # a unique name of the codec used in negotiation
+    name = None  # type: str
+
+    # True if the codec produces BINARY frames, False for TEXT frames
+    is_binary = False
+
+    def encode(self, message: Message) -> Union[str, bytes]:
+        """
+        Encodes a single message
+
+        :param message: a message to be encoded
+        :return: a payload of the frame
+        """
+        raise NotImplementedError()
+
+    def encode_batch(self, messages: Sequence[Message]) -> Union[str, bytes]:
+        """
+        Encodes several messages into a single payload (an array of messages)
+
+        :param messages: messages to be encoded
+        :return: a payload of the frame
+        """
+        raise NotImplementedError()
+
+    def decode(self, data: Union[str, bytes]) -> Message:
+        """
+        Decodes a message from a payload of the received frame
+
+        :param data: a payload of the frame
+        :return: the decoded message
+        :raises MessageFormatViolationError: if the decoded message has
+                invalid content
+        """
+        raise NotImplementedError()
+
+
+class JsonCodec(MessageCodec):
+    """
+    The default codec of the Streaming API. Messages are encoded as JSON
+    objects and transmitted in TEXT frames
+    """
+    name = 'json'
+    is_binary = False
+
+    def encode(self, message: Message) -> str:
+        return message_to_text(message)
+
+    def encode_batch(self, messages: Sequence[Message]) -> str:
+        return messages_to_text(messages)
+
+    def decode(self, data: str) -> Message:
+        """
+        Decodes a message from a JSON object
+
+        :param data: a payload of the frame
+        :return: the decoded message
+        :raises json.JSONDecodeError: if the data is not a valid JSON
+        :raises MessageFormatViolationError: if the decoded message has
+                invalid content
+        """
+        return parse_message(json.loads(data))
+
+
+class MessagePackCodec(MessageCodec):
+    """
+    A compact binary codec. Each message is encoded as a MessagePack array
+    of the following items: type (0 for control and 1 for data messages),
+    topic, timestamp, body, an optional message_id and an optional event_seq
+    (message_id is encoded as nil if only event_seq is present). Messages
+    are transmitted in BINARY frames.
+
+    Topics are interned separately for each direction of the connection.
+    A topic is encoded as:
+
+    - a string - a plain topic which is not interned;
+    - an array of an integer and a string - a topic to be interned with the
+      specified index (indexes are assigned sequentially, starting from 0);
+    - an integer - an index of a previously interned topic.
+
+    Encoded bodies of shared messages are cached in their PreparedFrames,
+    so each body is encoded at most once for all sessions
+    """
+    name = 'msgpack'
+    is_binary = True
+
+    # the maximum number of topics to be interned in each direction
+    MAX_INTERNED_TOPICS = 1024
+
+    _TYPE_CODES = {"control": 0, "data": 1}
+    _TYPE_NAMES = ("control", "data")
+
+    def __init__(self):
+        """
+        Constructor. Initializes empty tables of interned topics
+        """
+        self._outgoing_topics = {}  # type: Dict[str, int]
+        self._incoming_topics = []  # type: List[str]
+
+    def encode(self, message: Message) -> bytes:
+        parts = []
+        self._encode_into(message, parts)
+
+        return b''.join(parts)
+
+    def encode_batch(self, messages: Sequence[Message]) -> bytes:
+        parts = [msgpack_format.pack_array_header(len(messages))]
+
+        for message in messages:
+            self._encode_into(message, parts)
+
+        return b''.join(parts)
+
+    def decode(self, data: bytes) -> Message:
+        """
+        Decodes a message from a MessagePack array
+
+        :param data: a payload of the frame
+        :return: the decoded message
+        :raises MessageDecodeError: if the data is not a valid MessagePack
+                array or refers to an unknown topic
+        :raises MessageFormatViolationError: if the decoded message has
+                invalid content
+        """
+        try:
+            raw = msgpack_format.unpackb(data)
+        except msgpack_format.MsgPackDecodeError as e:
+            raise MessageDecodeError(str(e))
+
+        if not isinstance(raw, list) or len(raw) not in (4, 5, 6):
+            raise MessageDecodeError("Message is not an array of 4-6 items")
+
+        type_code, topic, timestamp, body = raw[:4]
+
+        if (not isinstance(type_code, int) or
+                not 0 <= type_code < len(self._TYPE_NAMES)):
+            raise MessageDecodeError("Unknown message type: %s" % type_code)
+
+        source = {
+            'timestamp': timestamp,
+            'type': self._TYPE_NAMES[type_code],
+            'topic': self._decode_topic(topic),
+            'body': body
+        }
+
+        return parse_message(source)
+
+    def _encode_into(self, message: Message, parts: List[bytes]) -> None:
+        """
+        Encodes a message and appends encoded parts to the list
+
+        :param message: a message to be encoded
+        :param parts: a list of encoded parts
+        :return: None
+        """
+        has_id = message.message_id is not None
+        has_seq = message.event_seq is not None
+
+        if has_seq:
+            length = 6
+        elif has_id:
+            length = 5
+        else:
+            length = 4
+
+        parts.append(msgpack_format.pack_array_header(length))
+        parts.append(msgpack_format.packb(self._TYPE_CODES[message.type]))
+        parts.append(self._encode_topic(message.topic))
+        parts.append(msgpack_format.packb(message.timestamp))
+
+        frame = message.frame
+
+        if frame is not None:
+            parts.append(
+                frame.get_encoded_body(self.name, msgpack_format.packb)
+            )
+        else:
+            parts.append(msgpack_format.packb(message.body))
+
+        if has_id or has_seq:
+            parts.append(msgpack_format.packb(message.message_id))
+
+        if has_seq:
+            parts.append(msgpack_format.packb(message.event_seq))
+
+    def _encode_topic(self, topic: str) -> bytes:
+        """
+        Encodes a topic, interning it if possible
+
+        :param topic: a topic to be encoded
+        :return: encoded topic
+        """
+        index = self._outgoing_topics.get(topic)
+
+        if index is not None:
+            return msgpack_format.packb(index)
+
+        if len(self._outgoing_topics) >= self.MAX_INTERNED_TOPICS:
+            return msgpack_format.packb(topic)
+
+        index = len(self._outgoing_topics)
+        self._outgoing_topics[topic] = index
+
+        return msgpack_format.packb((index, topic))
+
+    def _decode_topic(self, topic: Any) -> Any:
+        """
+        Decodes a topic, interns it if requested
+
+        :param topic: a decoded value of the topic field
+        :return: a topic string or the value as is if it's not a valid topic
+                 (will be rejected by parse_message)
+        :raises MessageDecodeError: if the topic refers to an unknown index
+                or the interning is invalid
+        """
+        if isinstance(topic, bool):
+            return topic
+
+        if isinstance(topic, int):
+            if not 0 <= topic < len(self._incoming_topics):
+                raise MessageDecodeError("Unknown topic index: %d" % topic)
+
+            return self._incoming_topics[topic]
+
+        if isinstance(topic, list):
+            if (len(topic) != 2 or
+                    topic[0] != len(self._incoming_topics) or
+                    not isinstance(topic[1], str)):
+                raise MessageDecodeError("Invalid topic definition")
+
+            if len(self._incoming_topics) >= self.MAX_INTERNED_TOPICS:
+                raise MessageDecodeError("Too many interned topics")
+
+            self._incoming_topics.append(topic[1])
+            return topic[1]
+
+        return topic
+
+
+# all available codecs by their names
+CODECS = {
+    JsonCodec.name: JsonCodec,
+    MessagePackCodec.name: MessagePackCodec
+}  # type: Mapping[str, type]
+
+
+def create_codec(name: str) -> MessageCodec:
+    """
+    Creates a new instance of codec with the specified name
+
+    :param name: a name of the codec
+    :return: a new instance of codec
+    :raises KeyError: if there is no such codec
+    """
+    return CODECS[name]()
@@ -4,7 +4,7 @@ to JSON-serializable objects
 """
 import functools
 from json import JSONEncoder, dumps
-from typing import Mapping
+from typing import Mapping, Iterable
 
 from .message import Message
 
@@ -27,6 +27,9 @@ class MessageJSONEncoder(JSONEncoder):
             'body': o.body
         }
 
+        if o.event_seq is not None:
+            result["event_seq"] = o.event_seq
+
         if o.message_id is not None:
             result["message_id"] = o.message_id
 
@@ -34,3 +37,31 @@ class MessageJSONEncoder(JSONEncoder):
 
 
 message_dumps = functools.partial(dumps, cls=MessageJSONEncoder)
+
+
+def message_to_text(message: Message) -> str:
+    """
+    Converts the specified Message to a JSON-encoded string. Reuses a shared
+    pre-serialized frame of the Message if it's present
+
+    :param message: a Message to be encoded
+    :return: JSON-encoded Message
+    """
+    frame = message.frame
+
+    if frame is None:
+        return message_dumps(message)
+
+    return frame.with_message_id(message.message_id)
+
+
+def messages_to_text(messages: Iterable[Message]) -> str:
+    """
+    Converts the specified Messages to a JSON-encoded array of messages.
+    Each message is encoded separately, so shared pre-serialized frames of
+    Messages are reused
+
+    :param messages: Messages to be encoded
+    :return: JSON-encoded array of Messages
+    """
+    return '[%s]' % ', '.join(message_to_text(m) for m in messages)
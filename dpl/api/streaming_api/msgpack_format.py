@@ -0,0 +1,364 @@
+"""
+This module contains a pure-Python implementation of encoding and decoding
+of MessagePack [1] - of a compact self-describing binary serialization
+format. Only types that are representable in JSON (and raw bytes) are
+supported, extension types are not supported.
+
+[1]: https://github.com/msgpack/msgpack/blob/master/spec.md
+"""
+import struct
+from typing import Any, Mapping
+
+
+class MsgPackDecodeError(ValueError):
+    """
+    An exception to be raised if the data is not a valid MessagePack object
+    """
+    pass
+
+
+_pack_u8 = struct.Struct('>BB').pack
+_pack_u16 = struct.Struct('>BH').pack
+_pack_u32 = struct.Struct('>BI').pack
+_pack_u64 = struct.Struct('>BQ').pack
+_pack_i8 = struct.Struct('>Bb').pack
+_pack_i16 = struct.Struct('>Bh').pack
+_pack_i32 = struct.Struct('>Bi').pack
+_pack_i64 = struct.Struct('>Bq').pack
+_pack_f64 = struct.Struct('>Bd').pack
+
+
+def pack_array_header(length: int) -> bytes:
+    """
+    Returns a header of an array with the specified number of items
+
+    :param length: the number of items in an array
+    :return: encoded header of an array
+    """
+    if length < 16:
+        return bytes((0x90 | length,))
+
+    if length <= 0xffff:
+        return _pack_u16(0xdc, length)
+
+    return _pack_u32(0xdd, length)
+
+
+def _pack_map_header(length: int) -> bytes:
+    """
+    Returns a header of a map with the specified number of items
+
+    :param length: the number of key-value pairs in a map
+    :return: encoded header of a map
+    """
+    if length < 16:
+        return bytes((0x80 | length,))
+
+    if length <= 0xffff:
+        return _pack_u16(0xde, length)
+
+    return _pack_u32(0xdf, length)
+
+
+def _pack_int(obj: int) -> bytes:
+    """
+    Encodes an integer in the most compact form
+
+    :param obj: an integer to be encoded
+    :return: encoded integer
+    :raises OverflowError: if the integer doesn't fit into 64 bits
+    """
+    if 0 <= obj < 0x80:
+        return bytes((obj,))
+
+    if -32 <= obj < 0:
+        return bytes((obj & 0xff,))
+
+    if obj > 0:
+        if obj <= 0xff:
+            return _pack_u8(0xcc, obj)
+        if obj <= 0xffff:
+            return _pack_u16(0xcd, obj)
+        if obj <= 0xffffffff:
+            return _pack_u32(0xce, obj)
+        if obj <= 0xffffffffffffffff:
+            return _pack_u64(0xcf, obj)
+    else:
+        if obj >= -0x80:
+            return _pack_i8(0xd0, obj)
+        if obj >= -0x8000:
+            return _pack_i16(0xd1, obj)
+        if obj >= -0x80000000:
+            return _pack_i32(0xd2, obj)
+        if obj >= -0x8000000000000000:
+            return _pack_i64(0xd3, obj)
+
+    raise OverflowError("Integer is too big to be encoded: %d" % obj)
+
+
+def _pack_str(obj: str) -> bytes:
+    """
+    Encodes a string
+
+    :param obj: a string to be encoded
+    :return: encoded string
+    """
+    data = obj.encode('utf-8')
+    length = len(data)
+
+    if length < 32:
+        return bytes((0xa0 | length,)) + data
+
+    if length <= 0xff:
+        return _pack_u8(0xd9, length) + data
+
+    if length <= 0xffff:
+        return _pack_u16(0xda, length) + data
+
+    return _pack_u32(0xdb, length) + data
+
+
+def _pack_bin(obj: bytes) -> bytes:
+    """
+    Encodes a binary string
+
+    :param obj: bytes to be encoded
+    :return: encoded bytes
+    """
+    length = len(obj)
+
+    if length <= 0xff:
+        return _pack_u8(0xc4, length) + obj
+
+    if length <= 0xffff:
+        return _pack_u16(0xc5, length) + obj
+
+    return _pack_u32(0xc6, length) + obj
+
+
+def _pack(obj: Any, out: list) -> None:
+    """
+    Encodes the specified object and appends encoded parts to the list
+
+    :param obj: an object to be encoded
+    :param out: a list of encoded parts
+    :return: None
+    :raises TypeError: if the object or one of its items has an
+            unsupported type
+    """
+    if obj is None:
+        out.append(b'\xc0')
+    elif obj is True:
+        out.append(b'\xc3')
+    elif obj is False:
+        out.append(b'\xc2')
+    elif isinstance(obj, str):
+        out.append(_pack_str(obj))
+    elif isinstance(obj, int):
+        out.append(_pack_int(obj))
+    elif isinstance(obj, float):
+        out.append(_pack_f64(0xcb, obj))
+    elif isinstance(obj, (list, tuple)):
+        out.append(pack_array_header(len(obj)))
+
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, Mapping):
+        out.append(_pack_map_header(len(obj)))
+
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    elif isinstance(obj, (bytes, bytearray)):
+        out.append(_pack_bin(bytes(obj)))
+    else:
+        raise TypeError(
+            "Object of type %s is not MessagePack serializable" %
+            type(obj).__name__
+        )
+
+
+def packb(obj: Any) -> bytes:
+    """
+    Encodes the specified object to MessagePack
+
+    :param obj: an object to be encoded; can contain None, booleans,
+           integers, floats, strings, bytes, lists, tuples and mappings
+    :return: encoded object
+    :raises TypeError: if the object or one of its items has an
+            unsupported type
+    """
+    out = []
+    _pack(obj, out)
+
+    return b''.join(out)
+
+
+class _Unpacker(object):
+    """
+    A decoder of a single MessagePack object from a buffer
+    """
+    __slots__ = ('_data', '_pos')
+
+    _U8 = struct.Struct('>B')
+    _U16 = struct.Struct('>H')
+    _U32 = struct.Struct('>I')
+    _U64 = struct.Struct('>Q')
+    _I8 = struct.Struct('>b')
+    _I16 = struct.Struct('>h')
+    _I32 = struct.Struct('>i')
+    _I64 = struct.Struct('>q')
+    _F32 = struct.Struct('>f')
+    _F64 = struct.Struct('>d')
+
+    def __init__(self, data: bytes):
+        """
+        Constructor
+
+        :param data: a buffer to be decoded
+        """
+        self._data = data
+        self._pos = 0
+
+    def is_done(self) -> bool:
+        """
+        Checks if the whole buffer was decoded
+
+        :return: True if there is no data left
+        """
+        return self._pos == len(self._data)
+
+    def _read(self, size: int) -> bytes:
+        """
+        Reads the specified number of bytes from the buffer
+
+        :param size: the number of bytes to be read
+        :return: read bytes
+        :raises MsgPackDecodeError: if there is not enough data
+        """
+        pos = self._pos
+        end = pos + size
+
+        if end > len(self._data):
+            raise MsgPackDecodeError("Unexpected end of data")
+
+        self._pos = end
+        return self._data[pos:end]
+
+    def _read_struct(self, fmt: struct.Struct):
+        return fmt.unpack(self._read(fmt.size))[0]
+
+    def _read_str(self, length: int) -> str:
+        try:
+            return self._read(length).decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise MsgPackDecodeError("Invalid UTF-8 string: %s" % e)
+
+    def _read_array(self, length: int) -> list:
+        return [self.unpack() for _ in range(length)]
+
+    def _read_map(self, length: int) -> dict:
+        result = {}
+
+        for _ in range(length):
+            key = self.unpack()
+
+            try:
+                result[key] = self.unpack()
+            except TypeError:
+                raise MsgPackDecodeError("Unhashable map key")
+
+        return result
+
+    def unpack(self) -> Any:
+        """
+        Decodes the next object from the buffer
+
+        :return: decoded object
+        :raises MsgPackDecodeError: if the data is invalid
+        """
+        code = self._read_struct(self._U8)
+
+        if code <= 0x7f:
+            return code
+        if code >= 0xe0:
+            return code - 0x100
+        if 0xa0 <= code <= 0xbf:
+            return self._read_str(code & 0x1f)
+        if 0x90 <= code <= 0x9f:
+            return self._read_array(code & 0x0f)
+        if 0x80 <= code <= 0x8f:
+            return self._read_map(code & 0x0f)
+
+        if code == 0xc0:
+            return None
+        if code == 0xc2:
+            return False
+        if code == 0xc3:
+            return True
+
+        if code == 0xcc:
+            return self._read_struct(self._U8)
+        if code == 0xcd:
+            return self._read_struct(self._U16)
+        if code == 0xce:
+            return self._read_struct(self._U32)
+        if code == 0xcf:
+            return self._read_struct(self._U64)
+        if code == 0xd0:
+            return self._read_struct(self._I8)
+        if code == 0xd1:
+            return self._read_struct(self._I16)
+        if code == 0xd2:
+            return self._read_struct(self._I32)
+        if code == 0xd3:
+            return self._read_struct(self._I64)
+        if code == 0xca:
+            return self._read_struct(self._F32)
+        if code == 0xcb:
+            return self._read_struct(self._F64)
+
+        if code == 0xd9:
+            return self._read_str(self._read_struct(self._U8))
+        if code == 0xda:
+            return self._read_str(self._read_struct(self._U16))
+        if code == 0xdb:
+            return self._read_str(self._read_struct(self._U32))
+        if code == 0xc4:
+            return self._read(self._read_struct(self._U8))
+        if code == 0xc5:
+            return self._read(self._read_struct(self._U16))
+        if code == 0xc6:
+            return self._read(self._read_struct(self._U32))
+        if code == 0xdc:
+            return self._read_array(self._read_struct(self._U16))
+        if code == 0xdd:
+            return self._read_array(self._read_struct(self._U32))
+        if code == 0xde:
+            return self._read_map(self._read_struct(self._U16))
+        if code == 0xdf:
+            return self._read_map(self._read_struct(self._U32))
+
+        raise MsgPackDecodeError("Unsupported type code: 0x%02x" % code)
+
+
+def unpackb(data: bytes) -> Any:
+    """
+    Decodes a single MessagePack object
+
+    :param data: encoded object
+    :return: decoded object
+    :raises MsgPackDecodeError: if the data is not a valid MessagePack
+            object or contains unsupported types
+    """
+    unpacker = _Unpacker(bytes(data))
+
+    try:
+        result = unpacker.unpack()
+    except RecursionError:
+        raise MsgPackDecodeError("Nesting is too deep")
+
+    if not unpacker.is_done():
+        raise MsgPackDecodeError("Extra data after the end of object")
+
+    return result
@@ -0,0 +1,481 @@
+"""
+This module contains a definition of PendingQueue - of a bounded queue of
+messages pending for delivery to a single Session
+"""
+import asyncio
+import collections
+from enum import Enum
+from typing import Dict, List, Optional
+
+from dpl.events.topic_tree import TopicTree
+from .message import Message
+
+
+class OverflowPolicy(Enum):
+    """
+    An enumeration of actions to be performed when a new message is added to
+    a PendingQueue that has already reached its maximum size
+    """
+    drop_oldest = 'drop_oldest'
+    drop_newest = 'drop_newest'
+    coalesce_by_topic = 'coalesce_by_topic'
+    disconnect = 'disconnect'
+
+
+class SlowConsumerError(Exception):
+    """
+    An exception to be raised on attempts to fetch messages from a PendingQueue
+    which overflowed with a 'disconnect' overflow policy. Indicates that the
+    consumer of this queue is too slow and must to be disconnected
+    """
+    pass
+
+
+class _Slot(object):
+    """
+    A single position in a PendingQueue. The message stored in a slot can be
+    replaced with a newer one while the slot keeps its position in the queue
+    """
+    __slots__ = ('message',)
+
+    def __init__(self, message: Message):
+        self.message = message
+
+
+def is_coalescable(message: Message) -> bool:
+    """
+    Checks if the specified message is allowed to be replaced in a queue by
+    a newer message with the same topic. Only untracked (not retained) data
+    messages can be replaced
+
+    :param message: a message to be checked
+    :return: True if the message can be replaced, False otherwise
+    """
+    return message.type == "data" and message.message_id is None
+
+
+class PendingQueue(object):
+    """
+    PendingQueue is a FIFO queue of messages pending for delivery to a single
+    Session. In difference to asyncio.Queue, put operations never block. If
+    the maximum size of the queue was reached, then the new data message is
+    handled according to the specified OverflowPolicy:
+
+    - drop_oldest: the oldest pending data message is dropped;
+    - drop_newest: the new message is dropped;
+    - coalesce_by_topic: the new message replaces a pending message with
+      the same topic (keeping its position in the queue); the oldest data
+      message is dropped if there is no message to be replaced;
+    - disconnect: all pending messages are dropped and all the following
+      attempts to get messages from the queue will raise SlowConsumerError
+      until the queue will be cleared.
+
+    Control messages (acknowledgements, snapshots and so on) are never
+    dropped on overflows: they are added to the queue even if it's full and
+    only data messages are dropped to free the space. If there is no
+    pending data message to be dropped, then the new data message is
+    dropped. The 'disconnect' policy still drops all pending messages.
+
+    Independently of the overflow policy, the queue is able to conflate
+    messages with the specified topics: if a newer untracked data message
+    arrives while an older one with the same topic is still pending, the
+    newer message replaces the older one in place and keeps its position
+    in the queue. Conflation of all topics can be enabled temporarily (i.e.
+    while the consumer is lagging behind). Control messages and tracked
+    (retained) messages are never conflated.
+
+    The queue also counts all messages that were put into it, all messages
+    that were dropped on overflows and all messages that were replaced by
+    conflation.
+    """
+    def __init__(
+            self, max_size: int = 0,
+            overflow_policy: OverflowPolicy = OverflowPolicy.drop_oldest,
+            loop: asyncio.AbstractEventLoop = None,
+            conflated_topics: Optional[TopicTree] = None
+    ):
+        """
+        Constructor. Initializes an empty queue
+
+        :param max_size: the maximum number of pending messages; zero or
+               a negative number means an unlimited queue size
+        :param overflow_policy: a policy to be applied on overflows
+        :param loop: an instance of EventLoop to be used for waiting
+        :param conflated_topics: a tree of topic patterns; messages with
+               matching topics are conflated (only the last value is kept)
+        """
+        if loop is None:
+            loop = asyncio.get_event_loop()
+
+        self._loop = loop
+        self._max_size = max_size
+        self._overflow_policy = overflow_policy
+        self._conflated_topics = conflated_topics
+        self._conflate_all = False
+
+        self._slots = collections.deque()  # type: collections.deque
+        # the last pending coalescable message for each topic
+        self._by_topic = dict()  # type: Dict[str, _Slot]
+        self._getters = collections.deque()  # type: collections.deque
+
+        self._queued_count = 0
+        self._dropped_count = 0
+        self._conflated_count = 0
+        self._is_overflowed = False
+
+    @property
+    def max_size(self) -> int:
+        """
+        Returns the maximum number of pending messages
+
+        :return: the maximum number of pending messages; zero means an
+                 unlimited queue size
+        """
+        return self._max_size
+
+    @property
+    def overflow_policy(self) -> OverflowPolicy:
+        """
+        Returns the policy which is applied on overflows
+
+        :return: an overflow policy
+        """
+        return self._overflow_policy
+
+    @property
+    def queued_count(self) -> int:
+        """
+        Returns the total number of messages put into the queue, including
+        the dropped and conflated ones
+
+        :return: the total number of queued messages
+        """
+        return self._queued_count
+
+    @property
+    def dropped_count(self) -> int:
+        """
+        Returns the total number of messages dropped on overflows
+
+        :return: the total number of dropped messages
+        """
+        return self._dropped_count
+
+    @property
+    def conflated_count(self) -> int:
+        """
+        Returns the total number of pending messages that were replaced by
+        newer messages with the same topic (conflated)
+
+        :return: the total number of conflated messages
+        """
+        return self._conflated_count
+
+    @property
+    def conflate_all(self) -> bool:
+        """
+        Indicates that messages with any topics are conflated, not only
+        the ones with the specified topics
+
+        :return: True if messages with all topics are conflated
+        """
+        return self._conflate_all
+
+    @conflate_all.setter
+    def conflate_all(self, value: bool) -> None:
+        """
+        Enables or disables conflation of messages with any topics
+
+        :param value: True to conflate messages with all topics, False to
+               conflate only the ones with the specified topics
+        :return: None
+        """
+        self._conflate_all = value
+
+    @property
+    def is_overflowed(self) -> bool:
+        """
+        Indicates that the queue overflowed with the 'disconnect' policy and
+        the consumer must to be disconnected
+
+        :return: True if the consumer must to be disconnected
+        """
+        return self._is_overflowed
+
+    def qsize(self) -> int:
+        """
+        Returns the number of pending messages
+
+        :return: the number of pending messages
+        """
+        return len(self._slots)
+
+    def empty(self) -> bool:
+        """
+        Checks if there is no pending messages in the queue
+
+        :return: True if the queue is empty, False otherwise
+        """
+        return not self._slots
+
+    def full(self) -> bool:
+        """
+        Checks if the maximum size of the queue was reached
+
+        :return: True if the queue is full, False otherwise
+        """
+        return 0 < self._max_size <= len(self._slots)
+
+    def put_nowait(self, message: Message) -> None:
+        """
+        Adds the specified message to the end of the queue. Applies the
+        overflow policy if the queue is full. Never blocks
+
+        :param message: a message to be added
+        :return: None
+        """
+        self._queued_count += 1
+
+        if self._is_overflowed:
+            self._dropped_count += 1
+            return
+
+        if self._conflate(message):
+            return
+
+        if (self.full() and message.type != "control" and
+                not self._handle_overflow(message)):
+            return
+
+        self._append(message)
+        self._wakeup_next()
+
+    def get_nowait(self) -> Message:
+        """
+        Removes and returns the first message from the queue
+
+        :return: the first pending message
+        :raises SlowConsumerError: if the queue overflowed with the
+                'disconnect' overflow policy
+        :raises asyncio.QueueEmpty: if there is no pending messages
+        """
+        if self._is_overflowed:
+            raise SlowConsumerError()
+
+        if not self._slots:
+            raise asyncio.QueueEmpty()
+
+        return self._pop_left()
+
+    async def get(self) -> Message:
+        """
+        Removes and returns the first message from the queue. Blocks until
+        a message will be available
+
+        :return: the first pending message
+        :raises SlowConsumerError: if the queue overflowed with the
+                'disconnect' overflow policy
+        """
+        while not self._slots and not self._is_overflowed:
+            getter = self._loop.create_future()
+            self._getters.append(getter)
+
+            try:
+                await getter
+            except asyncio.CancelledError:
+                getter.cancel()
+
+                try:
+                    self._getters.remove(getter)
+                except ValueError:
+                    pass
+
+                if self._slots and not getter.cancelled():
+                    self._wakeup_next()
+
+                raise
+
+        return self.get_nowait()
+
+    async def get_batch(
+            self, max_count: int, flush_interval: float = 0
+    ) -> List[Message]:
+        """
+        Removes and returns up to the specified number of messages from the
+        queue. Blocks until the first message will be available and then
+        waits for the specified flush interval for more messages to arrive,
+        unless the batch is already full
+
+        :param max_count: the maximum number of messages to be returned
+        :param flush_interval: the time to wait for more messages, seconds
+        :return: a list of pending messages, contains at least one message
+        :raises SlowConsumerError: if the queue overflowed with the
+                'disconnect' overflow policy
+        """
+        batch = [await self.get()]
+
+        if flush_interval > 0 and len(self._slots) < max_count - 1:
+            await asyncio.sleep(flush_interval)
+
+        while len(batch) < max_count and self._slots:
+            batch.append(self.get_nowait())
+
+        return batch
+
+    def clear(self) -> None:
+        """
+        Removes all pending messages and resets an overflow state of the queue
+
+        :return: None
+        """
+        self._slots.clear()
+        self._by_topic.clear()
+        self._is_overflowed = False
+
+    def _append(self, message: Message) -> None:
+        """
+        Adds a message to the end of the queue
+
+        :param message: a message to be added
+        :return: None
+        """
+        slot = _Slot(message)
+        self._slots.append(slot)
+
+        if is_coalescable(message):
+            self._by_topic[message.topic] = slot
+
+    def _pop_left(self) -> Message:
+        """
+        Removes and returns the first message from the queue
+
+        :return: the first pending message
+        """
+        slot = self._slots.popleft()
+        topic = slot.message.topic
+
+        if self._by_topic.get(topic) is slot:
+            del self._by_topic[topic]
+
+        return slot.message
+
+    def _coalesce(self, message: Message) -> bool:
+        """
+        Replaces a pending message with the same topic by the specified one
+
+        :param message: a new message
+        :return: True if a message was replaced, False otherwise
+        """
+        if not is_coalescable(message):
+            return False
+
+        slot = self._by_topic.get(message.topic)
+
+        if slot is None:
+            return False
+
+        slot.message = message
+        return True
+
+    def _conflate(self, message: Message) -> bool:
+        """
+        Replaces a pending message with the same topic by the specified one
+        if the topic of the message must to be conflated
+
+        :param message: a new message
+        :return: True if a message was replaced, False otherwise
+        """
+        if message.topic not in self._by_topic:
+            return False
+
+        if not self._conflate_all:
+            conflated_topics = self._conflated_topics
+
+            if conflated_topics is None or \
+                    not conflated_topics.has_matching(message.topic):
+                return False
+
+        if self._coalesce(message):
+            self._conflated_count += 1
+            return True
+
+        return False
+
+    def _handle_overflow(self, message: Message) -> bool:
+        """
+        Applies the overflow policy for the specified new message
+
+        :param message: a new message which caused an overflow
+        :return: True if the new message still needs to be appended to the
+                 queue, False otherwise
+        """
+        policy = self._overflow_policy
+        self._dropped_count += 1
+
+        if policy is OverflowPolicy.drop_newest:
+            return False
+
+        if policy is OverflowPolicy.coalesce_by_topic:
+            if self._coalesce(message):
+                return False
+
+            return self._drop_oldest_data()
+
+        if policy is OverflowPolicy.disconnect:
+            self._dropped_count += len(self._slots)
+            self.clear()
+            self._is_overflowed = True
+            self._wakeup_all()
+            return False
+
+        # OverflowPolicy.drop_oldest
+        return self._drop_oldest_data()
+
+    def _drop_oldest_data(self) -> bool:
+        """
+        Removes the oldest pending data message from the queue. Control
+        messages are skipped and stay in the queue
+
+        :return: True if a message was removed, False if there are only
+                 control messages in the queue
+        """
+        slots = self._slots
+
+        for index, slot in enumerate(slots):
+            if slot.message.type == "control":
+                continue
+
+            del slots[index]
+            topic = slot.message.topic
+
+            if self._by_topic.get(topic) is slot:
+                del self._by_topic[topic]
+
+            return True
+
+        return False
+
+    def _wakeup_next(self) -> None:
+        """
+        Wakes up the first of the consumers waiting for messages
+
+        :return: None
+        """
+        while self._getters:
+            getter = self._getters.popleft()
+
+            if not getter.done():
+                getter.set_result(None)
+                break
+
+    def _wakeup_all(self) -> None:
+        """
+        Wakes up all consumers waiting for messages
+
+        :return: None
+        """
+        while self._getters:
+            getter = self._getters.popleft()
+
+            if not getter.done():
+                getter.set_result(None)
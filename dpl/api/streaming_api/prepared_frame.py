@@ -0,0 +1,111 @@
+"""
+This module contains a definition of PreparedFrame - of an immutable
+pre-serialized representation of a Message which can be shared between all
+the Sessions the same Message must to be delivered to
+"""
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from .message_json import message_dumps
+
+
+class PreparedFrame(object):
+    """
+    PreparedFrame carries the JSON-encoded content of a Message (timestamp,
+    type, topic, body and an optional event_seq) without a message_id. The
+    content is encoded lazily, at most once, on the first access.
+    Per-session message identifiers of Tracked Messages are spliced into the
+    shared frame instead of a full re-encoding of the message.
+
+    Binary codecs are also able to cache their own encoded representation of
+    the message body in the frame
+    """
+    __slots__ = (
+        '_timestamp', '_type', '_topic', '_body', '_event_seq', '_text',
+        '_encoded_bodies'
+    )
+
+    def __init__(
+            self, timestamp: float, type_: str, topic: str, body: Mapping,
+            event_seq: int = None
+    ):
+        """
+        Constructor. Saves the content of the message to be encoded
+
+        :param timestamp: the moment of creation of the Message in UNIX time
+               format with floating point
+        :param type_: the type of the message (either "control" or "data")
+        :param topic: the topic of the message
+        :param body: the body, payload of the message
+        :param event_seq: a sequence number of the event the message was
+               built from, if any
+        """
+        self._timestamp = timestamp
+        self._type = type_
+        self._topic = topic
+        self._body = body
+        self._event_seq = event_seq
+        self._text = None  # type: Optional[str]
+        self._encoded_bodies = None  # type: Optional[Dict[str, Any]]
+
+    @property
+    def text(self) -> str:
+        """
+        Returns the JSON-encoded message content without a message_id. Encodes
+        the content on the first call
+
+        :return: JSON-encoded message content
+        """
+        if self._text is None:
+            content = {
+                'timestamp': self._timestamp,
+                'type': self._type,
+                'topic': self._topic,
+                'body': self._body
+            }
+
+            if self._event_seq is not None:
+                content['event_seq'] = self._event_seq
+
+            self._text = message_dumps(content)
+
+        return self._text
+
+    def with_message_id(self, message_id: Optional[int]) -> str:
+        """
+        Returns the JSON-encoded message content with the specified message_id
+        spliced into it. The result is equal to the one produced by
+        message_dumps for a Message with the same content and message_id
+
+        :param message_id: an identifier of a Tracked Message or None
+        :return: JSON-encoded message content
+        """
+        text = self.text
+
+        if message_id is None:
+            return text
+
+        # the encoded content is always a JSON object, i.e. it always ends
+        # with the closing curly bracket
+        return '%s, "message_id": %d}' % (text[:-1], message_id)
+
+    def get_encoded_body(
+            self, codec_name: str, encode: Callable[[Mapping], Any]
+    ) -> Any:
+        """
+        Returns the body of the message encoded with the specified codec.
+        Encodes the body on the first call for each codec
+
+        :param codec_name: a unique name of the codec
+        :param encode: a callable that encodes the body
+        :return: encoded body
+        """
+        if self._encoded_bodies is None:
+            self._encoded_bodies = {}
+
+        result = self._encoded_bodies.get(codec_name)
+
+        if result is None:
+            result = encode(self._body)
+            self._encoded_bodies[codec_name] = result
+
+        return result
@@ -3,9 +3,13 @@ This module contains utility functions and definitions which are useful for
 receiving and processing WebSocket messages
 """
 import json
+from typing import Callable
 
 from aiohttp.web import WebSocketResponse, WSMsgType
 
+from .message import Message
+from .message_codecs import MessageCodec
+
 
 class NotTextFrame(Exception):
     """
@@ -15,23 +19,100 @@ class NotTextFrame(Exception):
     pass
 
 
+class NotBinaryFrame(Exception):
+    """
+    An exception to be raised if the client sent a frame that is not a BINARY
+    frame while a binary encoding of messages was negotiated
+    """
+    pass
+
+
+async def _receive_data_frame(
+        ws: WebSocketResponse, timeout: int = None,
+        on_frame: Callable[[], None] = None
+):
+    """
+    Receives the next frame which is not a PING or PONG frame. Answers PING
+    frames with PONG frames if autoping was disabled for the
+    WebSocketResponse
+
+    :param ws: an instance of WebSocketResponse used for message receiving
+    :param timeout: timeout for receive operation.
+    :param on_frame: a callable to be called on each received frame
+           (i.e. Heartbeat.touch)
+    :return: the received frame
+    """
+    while True:
+        frame = await ws.receive(timeout=timeout)
+
+        if on_frame is not None:
+            on_frame()
+
+        if frame.type == WSMsgType.PING:
+            ws.pong(frame.data)
+        elif frame.type != WSMsgType.PONG:
+            return frame
+
+
+async def own_receive_message(
+        ws: WebSocketResponse, *, codec: MessageCodec, timeout: int = None,
+        on_frame: Callable[[], None] = None
+) -> Message:
+    """
+    Receives the next frame and decodes a Message from it with the
+    specified codec
+
+    :param ws: an instance of WebSocketResponse used for message receiving
+    :param codec: a codec negotiated for this connection
+    :param timeout: timeout for receive operation.
+    :param on_frame: a callable to be called on each received frame
+           (i.e. Heartbeat.touch)
+    :return: the received message
+    :raises NotTextFrame: if message is not TEXT for a text codec.
+    :raises NotBinaryFrame: if message is not BINARY for a binary codec.
+    :raises json.JSONDecodeError: if message is not valid JSON.
+    :raises MessageDecodeError: if message can't be decoded by a binary codec
+    :raises MessageFormatViolationError: if the decoded message has
+            invalid content
+    """
+    frame = await _receive_data_frame(
+        ws, timeout=timeout, on_frame=on_frame
+    )
+
+    if codec.is_binary:
+        if frame.type != WSMsgType.BINARY:
+            raise NotBinaryFrame()
+    elif frame.type != WSMsgType.TEXT:
+        raise NotTextFrame()
+
+    return codec.decode(frame.data)
+
+
 async def own_receive_json(
-        ws: WebSocketResponse, *, loads=json.loads, timeout: int = None
+        ws: WebSocketResponse, *, loads=json.loads, timeout: int = None,
+        on_frame: Callable[[], None] = None
 ):
     """
     This coroutine emulates the behaviour of a receive_json method of
     WebSocketResponse. In difference to the original method, a NotTextFrame
     error is raised instead of generic TypeError.
 
+    If autoping was disabled for the WebSocketResponse, then PING frames are
+    answered with PONG frames here, and PING and PONG frames are skipped.
+
     :param ws: an instance of WebSocketResponse used for message receiving
     :param loads: any callable that accepts str and returns dict with parsed
            JSON (json.loads() by default).
     :param timeout: timeout for receive operation.
+    :param on_frame: a callable to be called on each received frame
+           (i.e. Heartbeat.touch)
     :return: loaded JSON content
     :raises NotTextFrame: if message is not TEXT.
     :raises json.JSONDecodeError: if message is not valid JSON.
     """
-    frame = await ws.receive(timeout=timeout)
+    frame = await _receive_data_frame(
+        ws, timeout=timeout, on_frame=on_frame
+    )
 
     if frame.type == WSMsgType.TEXT:
         return loads(frame.data)
@@ -0,0 +1,478 @@
+"""
+This module contains definitions of retained message stores - of pluggable
+storages of Tracked Messages which were not acknowledged by clients yet
+"""
+import asyncio
+import json
+import sqlite3
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from dpl.model.domain_id import TDomainId
+from .message import Message
+from .message_json import message_to_text
+
+
+# an identifier of a retained message in a store
+RetainedKey = Tuple[TDomainId, int]
+
+# information about a Session restored from a store: the last time the
+# Session was seen connected (in UNIX time format; None if unknown) and its
+# retained messages in the order of their addition
+RestoredSession = Tuple[Optional[float], List[Message]]
+
+
+class AbsRetainedStore(object):
+    """
+    A pure abstract base class of retained message stores. Messages are
+    identified by an identifier of a Session and their message_id
+    """
+    def add(self, session_id: TDomainId, message: Message) -> None:
+        """
+        Saves a new retained message
+
+        :param session_id: an identifier of Session the message belongs to
+        :param message: a message to be saved; must have a message_id set
+        :return: None
+        """
+        raise NotImplementedError()
+
+    def get(self, session_id: TDomainId, message_id: int) -> Optional[Message]:
+        """
+        Returns a retained message
+
+        :param session_id: an identifier of Session the message belongs to
+        :param message_id: an identifier of the message
+        :return: the message or None if it's not present in the store
+        """
+        raise NotImplementedError()
+
+    def remove(self, session_id: TDomainId, message_id: int) -> None:
+        """
+        Removes a retained message. Does nothing if there is no such message
+
+        :param session_id: an identifier of Session the message belongs to
+        :param message_id: an identifier of the message
+        :return: None
+        """
+        raise NotImplementedError()
+
+    def remove_range(
+            self, session_id: TDomainId, first: int, last: int
+    ) -> None:
+        """
+        Removes all retained messages with identifiers in the specified
+        range. Takes a time proportional to the number of removed messages
+        (or to the length of the range, whichever is smaller)
+
+        :param session_id: an identifier of Session messages belong to
+        :param first: the first identifier in the range
+        :param last: the last identifier in the range (inclusive); must be
+               not lower than the first one
+        :return: None
+        """
+        raise NotImplementedError()
+
+    def remove_all_for(self, session_id: TDomainId) -> None:
+        """
+        Removes all retained messages and other data of the Session
+
+        :param session_id: an identifier of Session to be forgotten
+        :return: None
+        """
+        raise NotImplementedError()
+
+    def mark_seen(self, session_id: TDomainId, timestamp: float) -> None:
+        """
+        Saves the last time the Session was connected
+
+        :param session_id: an identifier of Session
+        :param timestamp: the time in UNIX time format
+        :return: None
+        """
+        raise NotImplementedError()
+
+    def restore(self) -> Dict[TDomainId, RestoredSession]:
+        """
+        Returns all Sessions and messages saved before restart
+
+        :return: a mapping of Session identifiers to restored information
+        """
+        raise NotImplementedError()
+
+    def flush(self) -> None:
+        """
+        Saves all the changes which were postponed by the store
+
+        :return: None
+        """
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        """
+        Saves all the postponed changes and releases all resources used by
+        the store
+
+        :return: None
+        """
+        raise NotImplementedError()
+
+
+class InMemoryRetainedStore(AbsRetainedStore):
+    """
+    A store which keeps all retained messages in memory. Messages are never
+    dropped by the store, they are kept until they are acknowledged or
+    discarded with their Session. Messages are lost on restart
+    """
+    def __init__(self):
+        """
+        Constructor. Creates an empty store
+        """
+        # all messages kept in memory, from the oldest to the newest one
+        # type: OrderedDict[RetainedKey, Message]
+        self._cache = OrderedDict()
+
+    def add(self, session_id: TDomainId, message: Message) -> None:
+        assert message.message_id is not None
+        self._add_to_cache((session_id, message.message_id), message)
+
+    def get(self, session_id: TDomainId, message_id: int) -> Optional[Message]:
+        return self._cache.get((session_id, message_id))
+
+    def remove(self, session_id: TDomainId, message_id: int) -> None:
+        self._remove_from_cache((session_id, message_id))
+
+    def remove_range(
+            self, session_id: TDomainId, first: int, last: int
+    ) -> None:
+        if last - first < len(self._cache):
+            keys = [(session_id, i) for i in range(first, last + 1)]
+        else:
+            keys = [
+                k for k in self._cache
+                if k[0] == session_id and first <= k[1] <= last
+            ]
+
+        for key in keys:
+            self._remove_from_cache(key)
+
+    def remove_all_for(self, session_id: TDomainId) -> None:
+        for key in [k for k in self._cache if k[0] == session_id]:
+            self._remove_from_cache(key)
+
+    def mark_seen(self, session_id: TDomainId, timestamp: float) -> None:
+        pass
+
+    def restore(self) -> Dict[TDomainId, RestoredSession]:
+        return {}
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self._cache.clear()
+
+    def _add_to_cache(self, key: RetainedKey, message: Message) -> None:
+        """
+        Puts a message into memory. A message with the same identifier is
+        replaced and the new one is moved to the end
+
+        :param key: an identifier of the message
+        :param message: a message to be saved
+        :return: None
+        """
+        self._remove_from_cache(key)
+        self._cache[key] = message
+
+    def _remove_from_cache(self, key: RetainedKey) -> None:
+        """
+        Removes a message from memory if it's present
+
+        :param key: an identifier of the message
+        :return: None
+        """
+        self._cache.pop(key, None)
+
+
+class SqliteRetainedStore(InMemoryRetainedStore):
+    """
+    A store which saves all retained messages to an SQLite database, so they
+    survive restarts. The newest messages are also cached in memory within
+    the memory budget of all Sessions; the oldest ones are kept on disk only
+    and are loaded back on demand.
+
+    Writes are not executed on each call: they are accumulated and saved
+    in a single transaction by a flush which is scheduled to the event loop
+    after the flush interval. So the event loop is not blocked by a commit
+    on each sent or acknowledged message
+    """
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS retained_messages ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " session_id TEXT NOT NULL,"
+        " message_id INTEGER NOT NULL,"
+        " data TEXT NOT NULL,"
+        " UNIQUE (session_id, message_id))",
+        "CREATE TABLE IF NOT EXISTS retained_sessions ("
+        " session_id TEXT PRIMARY KEY,"
+        " last_seen REAL NOT NULL)"
+    )
+
+    _INSERT_MESSAGE = (
+        "INSERT OR REPLACE INTO retained_messages "
+        "(session_id, message_id, data) VALUES (?, ?, ?)"
+    )
+    _DELETE_MESSAGE = (
+        "DELETE FROM retained_messages "
+        "WHERE session_id = ? AND message_id = ?"
+    )
+    _DELETE_MESSAGE_RANGE = (
+        "DELETE FROM retained_messages "
+        "WHERE session_id = ? AND message_id BETWEEN ? AND ?"
+    )
+    _DELETE_SESSION_MESSAGES = (
+        "DELETE FROM retained_messages WHERE session_id = ?"
+    )
+    _DELETE_SESSION = "DELETE FROM retained_sessions WHERE session_id = ?"
+    _MARK_SEEN = (
+        "INSERT OR REPLACE INTO retained_sessions "
+        "(session_id, last_seen) VALUES (?, ?)"
+    )
+
+    def __init__(
+            self, path: str, memory_budget: int = 0,
+            flush_interval: float = 0.1,
+            loop: asyncio.AbstractEventLoop = None
+    ):
+        """
+        Constructor. Opens (or creates) the database
+
+        :param path: a path to the database file
+        :param memory_budget: the maximum total size of messages cached in
+               memory, bytes; zero means no limit
+        :param flush_interval: the maximum time changes are kept in memory
+               before they are saved to the database, seconds; zero means
+               that changes are saved on the next iteration of the event
+               loop
+        :param loop: an event loop to be used for scheduling of flushes;
+               the current event loop if not specified
+        """
+        super().__init__()
+
+        self._memory_budget = memory_budget
+        self._memory_usage = 0
+        # estimated sizes of messages kept in memory
+        self._sizes = dict()  # type: Dict[RetainedKey, int]
+        self._flush_interval = flush_interval
+        self._loop = loop
+        self._flush_handle = None  # type: Optional[asyncio.Handle]
+
+        # postponed writes in order of their addition: SQL statements and
+        # their parameters
+        # type: List[Tuple[str, Tuple[Any, ...]]]
+        self._pending_writes = []
+
+        self._connection = sqlite3.connect(path, isolation_level=None)
+        # WAL with NORMAL synchronization doesn't fsync on each commit, but
+        # the database is still safe on crashes of the process
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+
+        for statement in self._SCHEMA:
+            self._connection.execute(statement)
+
+    @property
+    def memory_usage(self) -> int:
+        """
+        Returns the total estimated size of messages kept in memory (sizes
+        are estimated by the length of JSON-encoded messages)
+
+        :return: the size of messages, bytes
+        """
+        return self._memory_usage
+
+    @property
+    def pending_writes(self) -> int:
+        """
+        Returns the number of writes which were not saved to the database
+        yet
+
+        :return: the number of postponed writes
+        """
+        return len(self._pending_writes)
+
+    def add(self, session_id: TDomainId, message: Message) -> None:
+        assert message.message_id is not None
+        data = message_to_text(message)
+
+        self._postpone(
+            self._INSERT_MESSAGE, (session_id, message.message_id, data)
+        )
+
+        key = (session_id, message.message_id)
+        self._add_to_cache(key, message)
+        self._sizes[key] = len(data)
+        self._memory_usage += len(data)
+        self._trim_cache()
+
+    def get(self, session_id: TDomainId, message_id: int) -> Optional[Message]:
+        message = super().get(session_id, message_id)
+
+        if message is not None:
+            return message
+
+        # messages missing in the cache may be added by postponed writes
+        self.flush()
+
+        row = self._connection.execute(
+            "SELECT data FROM retained_messages "
+            "WHERE session_id = ? AND message_id = ?",
+            (session_id, message_id)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        # spilled messages are not cached back, so the budget is kept
+        return self._load_message(row[0])
+
+    def remove(self, session_id: TDomainId, message_id: int) -> None:
+        super().remove(session_id, message_id)
+        self._postpone(self._DELETE_MESSAGE, (session_id, message_id))
+
+    def remove_range(
+            self, session_id: TDomainId, first: int, last: int
+    ) -> None:
+        super().remove_range(session_id, first, last)
+
+        # the unique index on (session_id, message_id) is used here
+        self._postpone(self._DELETE_MESSAGE_RANGE, (session_id, first, last))
+
+    def remove_all_for(self, session_id: TDomainId) -> None:
+        super().remove_all_for(session_id)
+
+        self._postpone(self._DELETE_SESSION_MESSAGES, (session_id,))
+        self._postpone(self._DELETE_SESSION, (session_id,))
+
+    def mark_seen(self, session_id: TDomainId, timestamp: float) -> None:
+        self._postpone(self._MARK_SEEN, (session_id, timestamp))
+
+    def restore(self) -> Dict[TDomainId, RestoredSession]:
+        self.flush()
+        result = {}  # type: Dict[TDomainId, RestoredSession]
+
+        for session_id, last_seen in self._connection.execute(
+                "SELECT session_id, last_seen FROM retained_sessions"
+        ):
+            result[session_id] = (last_seen, [])
+
+        for session_id, data in self._connection.execute(
+                "SELECT session_id, data FROM retained_messages ORDER BY id"
+        ):
+            if session_id not in result:
+                # the Session was never seen before the restart
+                result[session_id] = (None, [])
+
+            result[session_id][1].append(self._load_message(data))
+
+        return result
+
+    def flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        writes = self._pending_writes
+
+        if not writes:
+            return
+
+        self._pending_writes = []
+        connection = self._connection
+        start = 0
+
+        with connection:
+            # runs of the same statement are executed at once
+            while start < len(writes):
+                statement = writes[start][0]
+                end = start + 1
+
+                while end < len(writes) and writes[end][0] == statement:
+                    end += 1
+
+                connection.executemany(
+                    statement, [params for _, params in writes[start:end]]
+                )
+                start = end
+
+    def close(self) -> None:
+        self.flush()
+        super().close()
+        self._sizes.clear()
+        self._memory_usage = 0
+        self._connection.close()
+
+    def _postpone(self, statement: str, params: Tuple[Any, ...]) -> None:
+        """
+        Adds a write to the list of postponed writes and schedules a flush
+        if it's not scheduled yet
+
+        :param statement: an SQL statement to be executed
+        :param params: parameters of the statement
+        :return: None
+        """
+        self._pending_writes.append((statement, params))
+
+        if self._flush_handle is None:
+            self._flush_handle = self._get_loop().call_later(
+                self._flush_interval, self.flush
+            )
+
+    def _remove_from_cache(self, key: RetainedKey) -> None:
+        super()._remove_from_cache(key)
+        size = self._sizes.pop(key, None)
+
+        if size is not None:
+            self._memory_usage -= size
+
+    def _trim_cache(self) -> None:
+        """
+        Removes the oldest messages from memory if the memory budget was
+        exceeded. Removed messages are still saved on disk
+
+        :return: None
+        """
+        budget = self._memory_budget
+
+        # the newest message is always kept in memory
+        while 0 < budget < self._memory_usage and len(self._cache) > 1:
+            old_key, _ = self._cache.popitem(last=False)
+            self._memory_usage -= self._sizes.pop(old_key)
+
+    @staticmethod
+    def _load_message(data: str) -> Message:
+        """
+        Decodes a message saved to the database
+
+        :param data: a JSON-encoded message
+        :return: a decoded message with its message_id
+        """
+        source = json.loads(data)
+
+        return Message(
+            timestamp=source.get('timestamp'), type_=source.get('type'),
+            topic=source.get('topic'), body=source.get('body'),
+            message_id=source['message_id'],
+            event_seq=source.get('event_seq')
+        )
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Returns the event loop to be used for scheduling of flushes
+
+        :return: an event loop
+        """
+        if self._loop is None:
+            self._loop = asyncio.get_event_loop()
+
+        return self._loop
@@ -0,0 +1,126 @@
+"""
+This module contains a definition of SessionActor - of an executor of
+state-changing operations of a single Streaming API Session
+"""
+import asyncio
+import inspect
+from collections import deque
+from typing import Callable, Deque, Optional, Tuple
+
+from dpl.model.domain_id import TDomainId
+
+# a function to be called, its positional and keyword arguments and
+# a future to receive its result
+MailboxItem = Tuple[Callable, tuple, dict, asyncio.Future]
+
+
+class SessionActor(object):
+    """
+    SessionActor owns all the state-changing operations of a single
+    Session: registration and closing of connections, management of
+    subscriptions and of retained messages. Operations are sent to the
+    actor's mailbox and are executed one by one, in order of their receipt,
+    so operations of the same Session never interleave while operations of
+    different Sessions never wait for each other.
+
+    The task of the actor is started on demand and finishes as soon as the
+    mailbox becomes empty, so idle Sessions cost nothing. Operations
+    executed by the actor must not call the same actor and wait for the
+    result, otherwise they will wait forever
+    """
+    def __init__(
+            self, session_id: TDomainId,
+            on_idle: Callable[['SessionActor'], None] = None
+    ):
+        """
+        Constructor
+
+        :param session_id: an identifier of the Session owned by this actor
+        :param on_idle: a function to be called with this actor as an
+               argument each time the mailbox becomes empty
+        """
+        self._session_id = session_id
+        self._on_idle = on_idle
+        self._mailbox = deque()  # type: Deque[MailboxItem]
+        self._task = None  # type: Optional[asyncio.Task]
+
+    @property
+    def session_id(self) -> TDomainId:
+        """
+        Returns an identifier of the Session owned by this actor
+
+        :return: an identifier of the Session
+        """
+        return self._session_id
+
+    @property
+    def is_idle(self) -> bool:
+        """
+        Checks if the actor has nothing to execute
+
+        :return: True if the mailbox is empty and no operation is being
+                 executed, False otherwise
+        """
+        return self._task is None
+
+    def call(self, func: Callable, *args, **kwargs) -> asyncio.Future:
+        """
+        Sends an operation to the mailbox of the actor
+
+        :param func: a function or a coroutine function to be called
+        :param args: positional arguments of the function
+        :param kwargs: keyword arguments of the function
+        :return: a future to be resolved with the result of the function or
+                 with an exception raised by it. Operations which futures
+                 were cancelled before the start of execution are skipped
+        """
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._mailbox.append((func, args, kwargs, future))
+
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+        return future
+
+    async def _run(self) -> None:
+        """
+        Executes operations from the mailbox until it becomes empty
+
+        :return: None
+        """
+        mailbox = self._mailbox
+
+        try:
+            while mailbox:
+                func, args, kwargs, future = mailbox.popleft()
+
+                if future.cancelled():
+                    continue
+
+                try:
+                    result = func(*args, **kwargs)
+
+                    if inspect.isawaitable(result):
+                        result = await result
+
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+
+                except Exception as exc:
+                    if not future.cancelled():
+                        future.set_exception(exc)
+
+                else:
+                    if not future.cancelled():
+                        future.set_result(result)
+
+        finally:
+            while mailbox:
+                mailbox.popleft()[3].cancel()
+
+            self._task = None
+
+            if self._on_idle is not None:
+                self._on_idle(self)
@@ -0,0 +1,337 @@
+"""
+This module contains definitions of SessionOptions - of optional
+capabilities negotiated for a single Streaming API connection, and of
+SessionOptionsNegotiator which negotiates them on client authentication
+"""
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from dpl.api.api_errors import ERROR_TEMPLATES
+from dpl.events.topic_tree import TopicTree
+from .delta_encoder import DeltaEncoder
+from .message_codecs import MessageCodec, JsonCodec, CODECS, create_codec
+from .streaming_flow_error import StreamingFlowError
+
+
+class BatchingOptions(object):
+    """
+    Parameters of batching of outgoing messages: all messages pending within
+    a flush interval (but no more than the specified number of messages) are
+    packed into a single frame
+    """
+    __slots__ = ('flush_interval', 'max_messages')
+
+    def __init__(self, flush_interval: float, max_messages: int):
+        """
+        Constructor
+
+        :param flush_interval: the time to wait for more messages after the
+               first one was fetched, seconds
+        :param max_messages: the maximum number of messages in a frame
+        """
+        self.flush_interval = flush_interval
+        self.max_messages = max_messages
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns a representation of these options to be sent to a client
+
+        :return: a dict with a flush interval (in milliseconds) and the
+                 maximum number of messages in a frame
+        """
+        return {
+            'flush_interval': self.flush_interval * 1000,
+            'max_messages': self.max_messages
+        }
+
+
+class ReplayRequest(object):
+    """
+    A request of a reconnecting client to replay all the events it missed
+    after the specified one
+    """
+    __slots__ = ('epoch', 'last_seq')
+
+    def __init__(self, epoch: str, last_seq: int):
+        """
+        Constructor
+
+        :param epoch: an identifier of the epoch of EventJournal the
+               sequence number belongs to
+        :param last_seq: a sequence number of the last event seen by the
+               client
+        """
+        self.epoch = epoch
+        self.last_seq = last_seq
+
+
+class SessionOptions(object):
+    """
+    SessionOptions contains optional capabilities which were requested by
+    a client in the auth message and accepted by a server. Options are
+    negotiated on each connection and aren't saved between connections
+    """
+    __slots__ = ('batching', 'codec', 'delta', 'replay')
+
+    def __init__(
+            self, batching: Optional[BatchingOptions] = None,
+            codec: MessageCodec = None, delta: Optional[DeltaEncoder] = None,
+            replay: Optional[ReplayRequest] = None
+    ):
+        """
+        Constructor
+
+        :param batching: parameters of message batching; None if batching
+               is disabled
+        :param codec: a codec to be used for encoding and decoding of
+               messages; JsonCodec by default
+        :param delta: an encoder of data messages to patches; None if delta
+               encoding is disabled
+        :param replay: a request to replay missed events; None if the client
+               doesn't need a replay
+        """
+        if codec is None:
+            codec = JsonCodec()
+
+        self.batching = batching
+        self.codec = codec
+        self.delta = delta
+        self.replay = replay
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns a representation of accepted capabilities to be sent to
+        a client in the body of the auth_ack message
+
+        :return: a dict with accepted capabilities only
+        """
+        result = {}
+
+        if self.batching is not None:
+            result['batching'] = self.batching.to_dict()
+
+        if self.codec.name != JsonCodec.name:
+            result['encoding'] = self.codec.name
+
+        if self.delta is not None:
+            result['delta'] = {
+                'snapshot_interval': self.delta.snapshot_interval
+            }
+
+        return result
+
+
+def _raise_invalid_body(description: str) -> None:
+    """
+    Raises a StreamingFlowError with 5030 error code
+
+    :param description: a description of an issue
+    :return: None
+    :raises StreamingFlowError: always
+    """
+    error = ERROR_TEMPLATES[5030].to_dict()
+    error['devel_message'] %= description
+    raise StreamingFlowError(error_info=error)
+
+
+class SessionOptionsNegotiator(object):
+    """
+    SessionOptionsNegotiator parses capabilities requested by a client in
+    the body of the auth message and limits them with server-side limits
+    """
+    def __init__(
+            self, max_batch_flush_interval: float = 0.005,
+            max_batch_messages: int = 100,
+            delta_topics: Iterable[str] = (),
+            max_delta_snapshot_interval: int = 50
+    ):
+        """
+        Constructor
+
+        :param max_batch_flush_interval: the maximum flush interval of
+               message batching allowed by server, seconds; zero means that
+               only already pending messages are packed together
+        :param max_batch_messages: the maximum number of messages in
+               a batch allowed by server; a value lower than 2 disables
+               batching
+        :param delta_topics: topic patterns of data messages which are
+               allowed to be delta-encoded; delta encoding is disabled if
+               there are no patterns
+        :param max_delta_snapshot_interval: the maximum number of patches
+               sent in a row before the next full snapshot
+        """
+        self._max_batch_flush_interval = max_batch_flush_interval
+        self._max_batch_messages = max_batch_messages
+        self._max_delta_snapshot_interval = max_delta_snapshot_interval
+        self._delta_topics = None  # type: Optional[TopicTree]
+
+        for pattern in delta_topics:
+            if self._delta_topics is None:
+                self._delta_topics = TopicTree()
+
+            self._delta_topics.add(pattern=pattern, key=None)
+
+    def negotiate(self, auth_body: Mapping) -> SessionOptions:
+        """
+        Parses the capabilities requested in the body of the auth message
+
+        :param auth_body: a body of the auth message
+        :return: the accepted options
+        :raises StreamingFlowError: if the requested capabilities have
+                invalid format
+        """
+        return SessionOptions(
+            batching=self._negotiate_batching(auth_body.get('batching')),
+            codec=self._negotiate_codec(auth_body.get('encoding')),
+            delta=self._negotiate_delta(auth_body.get('delta')),
+            replay=self._negotiate_replay(auth_body.get('replay'))
+        )
+
+    @staticmethod
+    def _negotiate_replay(requested) -> Optional[ReplayRequest]:
+        """
+        Parses the request to replay missed events
+
+        :param requested: a value of the 'replay' field: None or a mapping
+               with 'epoch' and 'last_seq' fields
+        :return: a parsed request or None if a replay wasn't requested
+        :raises StreamingFlowError: if the request has invalid format
+        """
+        if requested is None:
+            return None
+
+        if not isinstance(requested, Mapping):
+            _raise_invalid_body("replay is not an object")
+
+        epoch = requested.get('epoch')
+        last_seq = requested.get('last_seq')
+
+        if not isinstance(epoch, str):
+            _raise_invalid_body("replay.epoch is missing or is not a string")
+
+        if (isinstance(last_seq, bool) or not isinstance(last_seq, int) or
+                last_seq < 0):
+            _raise_invalid_body(
+                "replay.last_seq is not a non-negative integer"
+            )
+
+        return ReplayRequest(epoch=epoch, last_seq=last_seq)
+
+    @staticmethod
+    def _negotiate_codec(requested) -> MessageCodec:
+        """
+        Creates a codec for the requested encoding of messages
+
+        :param requested: a value of the 'encoding' field: None or a name of
+               the encoding
+        :return: a codec for the requested encoding if it's supported,
+                 a default (JSON) codec otherwise
+        :raises StreamingFlowError: if the requested encoding is not a string
+        """
+        if requested is None:
+            return JsonCodec()
+
+        if not isinstance(requested, str):
+            _raise_invalid_body("encoding is not a string")
+
+        if requested not in CODECS:
+            return JsonCodec()
+
+        return create_codec(requested)
+
+    def _negotiate_delta(self, requested) -> Optional[DeltaEncoder]:
+        """
+        Parses the requested parameters of delta encoding
+
+        :param requested: a value of the 'delta' field: True, False, None or
+               a mapping with an optional 'snapshot_interval' field
+        :return: a new DeltaEncoder for the connection or None if delta
+                 encoding will not be used
+        :raises StreamingFlowError: if the requested parameters have
+                invalid format
+        """
+        if requested is None or requested is False:
+            return None
+
+        if requested is True:
+            requested = {}
+
+        if not isinstance(requested, Mapping):
+            _raise_invalid_body("delta is not a boolean or an object")
+
+        snapshot_interval = requested.get('snapshot_interval')
+
+        if snapshot_interval is None:
+            snapshot_interval = self._max_delta_snapshot_interval
+        elif (isinstance(snapshot_interval, bool) or
+                not isinstance(snapshot_interval, int) or
+                snapshot_interval < 0):
+            _raise_invalid_body(
+                "delta.snapshot_interval is not a non-negative integer"
+            )
+        else:
+            snapshot_interval = min(
+                snapshot_interval, self._max_delta_snapshot_interval
+            )
+
+        if self._delta_topics is None or snapshot_interval < 1:
+            # delta encoding is disabled on the server or senseless
+            return None
+
+        return DeltaEncoder(
+            topics=self._delta_topics, snapshot_interval=snapshot_interval
+        )
+
+    def _negotiate_batching(self, requested) -> Optional[BatchingOptions]:
+        """
+        Parses the requested batching parameters
+
+        :param requested: a value of the 'batching' field: True, False,
+               None or a mapping with optional 'flush_interval' (in
+               milliseconds) and 'max_messages' fields
+        :return: the accepted batching options or None if batching will not
+                 be used
+        :raises StreamingFlowError: if the requested parameters have
+                invalid format
+        """
+        if requested is None or requested is False:
+            return None
+
+        if requested is True:
+            requested = {}
+
+        if not isinstance(requested, Mapping):
+            _raise_invalid_body("batching is not a boolean or an object")
+
+        flush_interval = requested.get('flush_interval')
+        max_messages = requested.get('max_messages')
+
+        if flush_interval is None:
+            flush_interval = self._max_batch_flush_interval
+        elif (isinstance(flush_interval, bool) or
+                not isinstance(flush_interval, (int, float)) or
+                flush_interval < 0):
+            _raise_invalid_body(
+                "batching.flush_interval is not a non-negative number"
+            )
+        else:
+            flush_interval = max(min(
+                flush_interval / 1000, self._max_batch_flush_interval
+            ), 0)
+
+        if max_messages is None:
+            max_messages = self._max_batch_messages
+        elif (isinstance(max_messages, bool) or
+                not isinstance(max_messages, int) or max_messages < 1):
+            _raise_invalid_body(
+                "batching.max_messages is not a positive integer"
+            )
+        else:
+            max_messages = min(max_messages, self._max_batch_messages)
+
+        if max_messages < 2:
+            # batching is disabled on the server or senseless
+            return None
+
+        return BatchingOptions(
+            flush_interval=flush_interval, max_messages=max_messages
+        )
@@ -0,0 +1,54 @@
+"""
+This module contains a definition of SessionStats - of a set of delivery
+counters of a single Streaming API Session
+"""
+from typing import Optional
+
+
+class SessionStats(object):
+    """
+    SessionStats keeps delivery counters of a single Session which are not
+    tracked by the queue of pending messages of this Session. Counters are
+    plain attributes, so updating them on the hot path costs a single
+    attribute increment.
+
+    The round-trip time of acknowledgements is smoothed the same way as
+    in TCP: each new sample contributes 1/8 of its value. Only messages
+    that were not re-sent yet are sampled, so the time is not inflated by
+    retransmissions
+    """
+    __slots__ = (
+        'sent', 'bytes_sent', 'retransmitted', 'acked', 'ack_rtt',
+        'last_ack_rtt', 'write_pauses', 'retained_lost'
+    )
+
+    # the weight of a new sample in the smoothed round-trip time
+    RTT_GAIN = 0.125
+
+    def __init__(self):
+        """
+        Constructor. Sets all counters to zero
+        """
+        self.sent = 0
+        self.bytes_sent = 0
+        self.retransmitted = 0
+        self.acked = 0
+        self.ack_rtt = None  # type: Optional[float]
+        self.last_ack_rtt = None  # type: Optional[float]
+        self.write_pauses = 0
+        self.retained_lost = 0
+
+    def add_ack_rtt(self, rtt: float) -> None:
+        """
+        Adds a new sample of the round-trip time of acknowledgements
+
+        :param rtt: the time between sending of a message and the receipt
+               of its acknowledgement, seconds
+        :return: None
+        """
+        self.last_ack_rtt = rtt
+
+        if self.ack_rtt is None:
+            self.ack_rtt = rtt
+        else:
+            self.ack_rtt += (rtt - self.ack_rtt) * self.RTT_GAIN
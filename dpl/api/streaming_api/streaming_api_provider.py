@@ -2,42 +2,73 @@
 This module contains definition of StreamingApiProvider
 """
 import asyncio
+import inspect
 import logging
+import time
 import weakref
 import functools
-from typing import Mapping, Dict, Tuple
+from collections import deque
+from typing import (
+    Any, Awaitable, Callable, Deque, Mapping, Dict, Tuple, Iterable, List,
+    Optional, Sequence
+)
 
 from aiohttp import WSCloseCode
 from aiohttp.web import Request, WebSocketResponse, UrlDispatcher, Application
 
 from dpl.model.domain_id import TDomainId
 from dpl.api.http_api_provider import HttpApiProvider
-from dpl.utils.observer import Observer
 from dpl.auth.auth_context import AuthContext
 from dpl.auth.auth_service import (
     AbsAuthService, AuthInvalidTokenError, ServiceEntityResolutionError
 )
 from dpl.events.event import Event
 from dpl.events.object_related_event import ObjectRelatedEvent
-from dpl.events.event_hub import EventHub
+from dpl.events.event_hub import EventHub, BatchObserver
+from dpl.utils.observer import SelectiveObserver
+from dpl.utils.stage_timing import STAGE_TIMINGS, StageTrace, ROUTE
+from dpl.events.event_journal import EventJournal
+from dpl.events.topic_tree import TopicTree
+from dpl.services.abs_entity_service import AbsEntityService
 from dpl.api.api_errors import ERROR_TEMPLATES
-from .receive_utils import own_receive_json
+from .receive_utils import own_receive_json, own_receive_message
 from .message import Message
 from .message_json import message_dumps
 from .message_utils import (
     build_message, parse_message
 )
 from .error_message_utlis import (
-    send_error_message_by_code
+    send_error_message, send_error_message_by_code
 )
 from .subscription_storage import SubscriptionStorage
 from .delivery_manager import DeliveryManager
+from .pending_queue import OverflowPolicy
+from .retained_store import AbsRetainedStore
+from .prepared_frame import PreparedFrame
+from .timer_wheel import TimerWheel
+from .heartbeat import Heartbeat
+from .session_options import SessionOptions, SessionOptionsNegotiator
+from .session_stats import SessionStats
+from .session_actor import SessionActor
+from .write_buffer_monitor import WriteBufferMonitor, LaggingPolicy
+from .admission_control import (
+    AdmissionController, AdmissionRejectedError, AdmissionTicket
+)
 from .streaming_flow_error import StreamingFlowError
 from .error_handling_context import ErrorHandler
 
 StreamingSessionData = Tuple[WebSocketResponse, asyncio.Task]
 ActiveSessionsRegistry = Dict[TDomainId, StreamingSessionData]
 
+# a message held back for a Session and its ensure_delivery flag
+BufferedMessage = Tuple[Message, bool]
+ReplayBuffersRegistry = Dict[TDomainId, Deque[BufferedMessage]]
+
+# topic patterns of snapshots sent to a Session and sequence numbers of
+# the last events reflected by them
+SnapshotFence = Tuple[TopicTree, int]
+SnapshotFencesRegistry = Dict[TDomainId, List[SnapshotFence]]
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -49,7 +80,8 @@ async def streaming_connection_handler(request: Request) -> WebSocketResponse:
     :param request: a request to be handled
     :return: an instance of WebSocketResponse
     """
-    ws = WebSocketResponse(heartbeat=60)
+    # heartbeats are handled by StreamingApiProvider with a shared TimerWheel
+    ws = WebSocketResponse(autoping=False)
     await ws.prepare(request)
 
     app = request.app
@@ -57,7 +89,9 @@ async def streaming_connection_handler(request: Request) -> WebSocketResponse:
 
     try:
         async with ErrorHandler(ws_con=ws):
-            await api_provider.handle_established_connection(ws)
+            await api_provider.handle_established_connection(
+                ws, transport=request.transport
+            )
 
     except Exception as exc:
         LOGGER.error(
@@ -68,16 +102,71 @@ async def streaming_connection_handler(request: Request) -> WebSocketResponse:
     return ws
 
 
-class StreamingApiProvider(HttpApiProvider, Observer):
+class StreamingApiProvider(
+        HttpApiProvider, BatchObserver, SelectiveObserver
+):
     """
     StreamingApiProvider implements handling of Streaming API logic. It handles
     attempts to establish WebSocket connection, Authentication flow, handling
-    of incoming messages and sending system-side events
+    of incoming messages and sending system-side events.
+
+    All timers of all Sessions (authentication deadlines, heartbeats,
+    retransmissions and checks of outgoing buffers) are driven by a single
+    shared TimerWheel.
+
+    No new messages are taken from the queue of pending messages of a Session
+    while the outgoing buffer of its connection is above the high water
+    mark. If the buffer stays above the mark for too long, then the
+    configured LaggingPolicy is applied.
+
+    New connections are checked by an AdmissionController. Rejected clients
+    and clients of a stopped server are suggested to wait for a random delay
+    before the next connection attempt, so their reconnections are spread
+    over time.
+
+    State-changing operations of each Session (registration and closing of
+    connections, subscriptions, acknowledgements and discarding of retained
+    messages) are executed by a SessionActor of this Session, so there are
+    no locks shared between Sessions. Routing of events reads only the
+    immutable subscription index and never waits for any actor.
+
+    Events with topics nobody is subscribed to are not interesting for the
+    provider, so their sources may skip them (and their payloads are never
+    built)
     """
+    # the default time given to a client to send an auth message, seconds
+    AUTH_TIMEOUT = 20
+
+    # the time of inactivity after which a PING is sent to a client, seconds
+    HEARTBEAT_INTERVAL = 60
+
     def __init__(
             self, auth_context: AuthContext, auth_service: AbsAuthService,
             api_root: str = '/',
-            loop: asyncio.AbstractEventLoop = None
+            loop: asyncio.AbstractEventLoop = None,
+            max_pending_messages: int = 0,
+            overflow_policy: OverflowPolicy = OverflowPolicy.drop_oldest,
+            conflated_topics: Iterable[str] = (),
+            retransmission_batch_size: int = 0,
+            max_batch_flush_interval: float = 0.005,
+            max_batch_messages: int = 100,
+            delta_topics: Iterable[str] = (),
+            max_delta_snapshot_interval: int = 50,
+            retained_store: AbsRetainedStore = None,
+            retained_session_ttl: float = 0,
+            event_journal: EventJournal = None,
+            snapshot_sources: Mapping[str, AbsEntityService] = None,
+            event_hub: EventHub = None,
+            write_buffer_high_mark: int = 0,
+            write_buffer_low_mark: int = None,
+            max_write_lag: float = 10,
+            lagging_client_policy: LaggingPolicy = LaggingPolicy.conflate,
+            max_connections: int = 0,
+            max_unauthenticated_connections: int = 0,
+            max_connections_per_ip: int = 0,
+            auth_timeout: float = None,
+            min_reconnect_delay: float = 1,
+            max_reconnect_delay: float = 30
     ):
         """
         Constructor. Initializes internal data structures and saves references
@@ -89,6 +178,64 @@ class StreamingApiProvider(HttpApiProvider, Observer):
                access rights for different information in the system
         :param api_root: a path for the API root
         :param loop: event tool to be used for this provider
+        :param max_pending_messages: the maximum number of messages pending
+               for delivery to each Session; zero means an unlimited number
+        :param overflow_policy: a policy to be applied if the maximum number
+               of pending messages was reached
+        :param conflated_topics: topic patterns of data messages for which
+               only the last undelivered value is kept in a queue
+        :param retransmission_batch_size: the maximum number of
+               unacknowledged messages to be re-sent to a Session at once;
+               zero means no limit
+        :param max_batch_flush_interval: the maximum time to wait for more
+               messages to be packed into a single frame for clients that
+               enabled message batching, seconds
+        :param max_batch_messages: the maximum number of messages to be
+               packed into a single frame; a value lower than 2 disables
+               message batching
+        :param delta_topics: topic patterns of data messages to be
+               delta-encoded for clients that enabled delta encoding
+        :param max_delta_snapshot_interval: the maximum number of patches
+               to be sent in a row before the next full snapshot
+        :param retained_store: a store of retained messages; an in-memory
+               store without limits is used if not specified
+        :param retained_session_ttl: the time after a disconnection of
+               a Session after which all its retained messages and
+               subscriptions are discarded, seconds; zero means never
+        :param event_journal: a journal of events used to replay missed
+               events to reconnecting clients; replays are not possible if
+               not specified
+        :param snapshot_sources: services which provide the current state of
+               objects for snapshots on subscription, by root topics of
+               their objects (like "things")
+        :param event_hub: an EventHub which dispatches events to this
+               provider; its queued and coalesced events are flushed before
+               a snapshot is taken, so the snapshot never reflects events
+               which are not journaled yet
+        :param write_buffer_high_mark: the size of the outgoing buffer of
+               a connection above which no new messages are sent to the
+               client, bytes; zero disables the check
+        :param write_buffer_low_mark: the size of the outgoing buffer at
+               which the sending is resumed, bytes; a quarter of the high
+               mark if not specified
+        :param max_write_lag: the maximum time the outgoing buffer may stay
+               above the high mark before the lagging client policy is
+               applied, seconds
+        :param lagging_client_policy: a policy to be applied to clients
+               which are lagging behind for longer than max_write_lag
+        :param max_connections: the maximum number of concurrent
+               connections; zero means no limit
+        :param max_unauthenticated_connections: the maximum number of
+               concurrent connections which haven't passed the
+               authentication yet; zero means no limit
+        :param max_connections_per_ip: the maximum number of concurrent
+               connections from the same IP address; zero means no limit
+        :param auth_timeout: the time given to a client to send an auth
+               message, seconds; AUTH_TIMEOUT if not specified
+        :param min_reconnect_delay: the minimal reconnection delay to be
+               suggested to clients, seconds
+        :param max_reconnect_delay: the maximal reconnection delay to be
+               suggested to clients, seconds
         """
         super().__init__(loop=loop)
 
@@ -96,18 +243,62 @@ class StreamingApiProvider(HttpApiProvider, Observer):
         self._app.on_shutdown.append(self.on_shutdown)
         self._auth_context = auth_context
         self._auth_service = auth_service
-        self._subs_lock = asyncio.Lock(loop=self._loop)
         self._subs_storage = SubscriptionStorage()
         self._active_sessions = dict()  # type: ActiveSessionsRegistry
-        self._active_sessions_lock = asyncio.Lock(loop=self._loop)
-        self._delivery_manager = DeliveryManager(loop=self._loop)
+        # actors of Sessions which have operations pending, by identifiers
+        # of Sessions; actors are removed as soon as they become idle
+        self._actors = dict()  # type: Dict[TDomainId, SessionActor]
+        self._timer_wheel = TimerWheel(loop=self._loop)
+        self._event_journal = event_journal
+        # sequence numbers of the last events replayed to Sessions; events
+        # up to these numbers are not delivered to Sessions for the second
+        # time
+        self._replay_fences = dict()  # type: Dict[TDomainId, int]
+        # messages received by Sessions during the replay of missed events
+        # or during sending of snapshots
+        self._replay_buffers = dict()  # type: ReplayBuffersRegistry
+        # events already reflected by snapshots sent to Sessions
+        self._snapshot_fences = dict()  # type: SnapshotFencesRegistry
+        self._snapshot_sources = dict(snapshot_sources or {})
+        self._event_hub = event_hub
+        self._write_buffer_high_mark = write_buffer_high_mark
+        self._write_buffer_low_mark = write_buffer_low_mark
+        self._max_write_lag = max_write_lag
+        self._lagging_client_policy = lagging_client_policy
+        self._auth_timeout = (
+            auth_timeout if auth_timeout is not None else self.AUTH_TIMEOUT
+        )
+        self._admission = AdmissionController(
+            max_connections=max_connections,
+            max_unauthenticated=max_unauthenticated_connections,
+            max_per_peer=max_connections_per_ip,
+            min_retry_delay=min_reconnect_delay,
+            max_retry_delay=max_reconnect_delay
+        )
+        self._options_negotiator = SessionOptionsNegotiator(
+            max_batch_flush_interval=max_batch_flush_interval,
+            max_batch_messages=max_batch_messages,
+            delta_topics=delta_topics,
+            max_delta_snapshot_interval=max_delta_snapshot_interval
+        )
+        self._delivery_manager = DeliveryManager(
+            loop=self._loop, timer_wheel=self._timer_wheel,
+            max_pending_messages=max_pending_messages,
+            overflow_policy=overflow_policy,
+            conflated_topics=conflated_topics,
+            retransmission_batch_size=retransmission_batch_size,
+            retained_store=retained_store,
+            session_ttl=retained_session_ttl,
+            on_session_expired=self._on_session_expired
+        )
 
         router = self._app.router  # type: UrlDispatcher
         router.add_get(path=api_root, handler=streaming_connection_handler)
 
     async def on_shutdown(self, app: Application) -> None:
         """
-        Closes all opened sessions
+        Closes all opened sessions. Each client receives its own random
+        reconnection delay in the reason of the close frame
 
         :param app: an instance of aiohttp Application which is shutting down
         :return: None
@@ -115,9 +306,145 @@ class StreamingApiProvider(HttpApiProvider, Observer):
         session_info_items = tuple(self._active_sessions.values())
 
         for ws, task in session_info_items:
-            await ws.close(code=WSCloseCode.GOING_AWAY)
+            await ws.close(
+                code=WSCloseCode.GOING_AWAY,
+                message=self._build_close_reason(
+                    self._admission.suggest_retry_delay()
+                )
+            )
             await task
 
+        self._delivery_manager.close()
+        self._timer_wheel.close()
+
+    def _get_actor(self, session_id: TDomainId) -> SessionActor:
+        """
+        Returns an actor of the specified Session, creates a new one if
+        there is no actor with pending operations for this Session
+
+        :param session_id: an identifier of Session of interest
+        :return: an actor of the Session
+        """
+        actor = self._actors.get(session_id)
+
+        if actor is None:
+            actor = SessionActor(session_id, on_idle=self._on_actor_idle)
+            self._actors[session_id] = actor
+
+        return actor
+
+    def _on_actor_idle(self, actor: SessionActor) -> None:
+        """
+        Removes an actor which has no pending operations from the registry
+        of actors
+
+        :param actor: an actor that became idle
+        :return: None
+        """
+        if self._actors.get(actor.session_id) is actor:
+            del self._actors[actor.session_id]
+
+    def _on_session_expired(self, session_id: TDomainId) -> None:
+        """
+        Removes all subscriptions of a Session which retained messages were
+        discarded by DeliveryManager, so no new messages will be retained
+        for an abandoned Session. Subscriptions are removed immediately and
+        not by an actor of the Session, so no message can be routed to the
+        Session after its expiration
+
+        :param session_id: an identifier of the expired Session
+        :return: None
+        """
+        try:
+            self._subs_storage.remove_all_for(session_id)
+        except Exception:
+            LOGGER.exception(
+                "Failed to remove subscriptions of the expired %s Session",
+                session_id
+            )
+
+    def view_session_stats(
+            self, session_id: TDomainId
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Returns delivery statistics of the specified Session
+
+        :param session_id: an identifier of Session of interest
+        :return: a dict with an identifier of the Session ('session_id'),
+                 its connection state ('is_active'), the number of its
+                 subscriptions ('subscriptions') and all the statistics
+                 returned by DeliveryManager.describe_session; None if
+                 the Session is not known
+        """
+        if session_id not in self._active_sessions and \
+                session_id not in self._subs_storage.list_sessions() and \
+                session_id not in self._delivery_manager.list_sessions():
+            return None
+
+        result = self._delivery_manager.describe_session(session_id)
+        result.update(
+            session_id=session_id,
+            is_active=session_id in self._active_sessions,
+            subscriptions=self._subs_storage.count_for(session_id)
+        )
+
+        return result
+
+    def view_all_session_stats(self) -> List[Dict[str, Any]]:
+        """
+        Returns delivery statistics of all known Sessions, connected or
+        not
+
+        :return: a list of dicts as returned by view_session_stats
+        """
+        session_ids = self._delivery_manager.list_sessions()
+        session_ids.update(self._active_sessions)
+        session_ids.update(self._subs_storage.list_sessions())
+
+        return [self.view_session_stats(s) for s in session_ids]
+
+    def view_pipeline_timings(self) -> Dict[str, Any]:
+        """
+        Returns latency histograms of the stages of the event pipeline,
+        from an update of a Thing to a message written to a connection.
+        Durations are recorded only if the stage timing is enabled
+
+        :return: a dict as returned by StageTimings.snapshot
+        """
+        return STAGE_TIMINGS.snapshot()
+
+    def reset_pipeline_timings(self) -> None:
+        """
+        Removes all the durations recorded by the stage timing
+
+        :return: None
+        """
+        STAGE_TIMINGS.reset()
+
+    async def request_resync(self) -> None:
+        """
+        Asks all connected clients to fetch the current state of objects.
+        Used if some events were missed by this provider. Each client
+        receives a resync_needed message with the current position of the
+        event journal
+
+        :return: None
+        """
+        body = {}  # type: Dict[str, Any]
+        journal = self._event_journal
+
+        if journal is not None:
+            body = self._get_journal_position()
+            body['first_seq'] = journal.first_seq
+
+        for session_id in tuple(self._active_sessions):
+            message = build_message(
+                type_="control", topic="resync_needed", body=dict(body)
+            )
+            await self._delivery_manager.put_message(
+                session_id=session_id, message=message
+            )
+
     async def invalidate_session(self, session_id: TDomainId) -> None:
         """
         Removes all session-related data from the internal storage and
@@ -134,10 +461,25 @@ class StreamingApiProvider(HttpApiProvider, Observer):
             await ws.close()
             await task
 
-        await self._subs_storage.remove_all_for(session_id)
+        await self._get_actor(session_id).call(
+            self._discard_session, session_id
+        )
+
+    async def _discard_session(self, session_id: TDomainId) -> None:
+        """
+        Removes all subscriptions and retained messages of a Session. Must
+        to be executed by an actor of this Session
+
+        :param session_id: an identifier of Session to be discarded
+        :return: None
+        """
+        self._subs_storage.remove_all_for(session_id)
         await self._delivery_manager.discard_for(session_id)
 
-    async def handle_established_connection(self, ws: WebSocketResponse):
+    async def handle_established_connection(
+            self, ws: WebSocketResponse,
+            transport: asyncio.WriteTransport = None
+    ):
         """
         This function handles communication over WebSockets after the
         connection was established. It starts from authentication flow and then
@@ -145,85 +487,444 @@ class StreamingApiProvider(HttpApiProvider, Observer):
 
         :param ws: an instance of WebSocketResponse which represents WebSocket
                connection
+        :param transport: a transport of the connection; the outgoing buffer
+               is not watched if not specified
         :return: None
         :raises AuthInvalidTokenError: if the specified access token was
                 revoked or is not valid for some other reason
         """
-        token = await self._handle_auth_flow(ws=ws)
+        peer = self._get_peer_address(transport)
+
+        try:
+            ticket = self._admission.admit(peer)
+        except AdmissionRejectedError as e:
+            await self._reject_connection(ws, peer, e.reason)
+            return
+
+        heartbeat = Heartbeat(
+            ws=ws, timer_wheel=self._timer_wheel,
+            interval=self.HEARTBEAT_INTERVAL
+        )
+        heartbeat.start()
+
+        write_monitor = None
+
+        if transport is not None and self._write_buffer_high_mark > 0:
+            write_monitor = WriteBufferMonitor(
+                transport=transport, timer_wheel=self._timer_wheel,
+                high_water_mark=self._write_buffer_high_mark,
+                low_water_mark=self._write_buffer_low_mark
+            )
+
+        try:
+            await self._handle_session(ws, heartbeat, write_monitor, ticket)
+        finally:
+            heartbeat.stop()
+            ticket.release()
+
+    @staticmethod
+    def _get_peer_address(
+            transport: Optional[asyncio.BaseTransport]
+    ) -> Optional[str]:
+        """
+        Returns an IP address of the client
+
+        :param transport: a transport of the connection
+        :return: an IP address; None if the transport is not specified or
+                 is not an IP connection
+        """
+        if transport is None:
+            return None
+
+        peername = transport.get_extra_info('peername')
+
+        if isinstance(peername, (tuple, list)) and peername:
+            return peername[0]
+
+        return None
+
+    @staticmethod
+    def _build_close_reason(retry_after: float) -> bytes:
+        """
+        Builds a reason of the close frame with a suggested reconnection
+        delay
+
+        :param retry_after: a reconnection delay, seconds
+        :return: a reason to be sent in the close frame
+        """
+        return ('retry_after=%.1f' % retry_after).encode()
+
+    async def _reject_connection(
+            self, ws: WebSocketResponse, peer: Optional[str], reason: str
+    ) -> None:
+        """
+        Rejects a connection which exceeded one of the admission limits.
+        Sends a 5009 error with a suggested reconnection delay and closes
+        the connection
+
+        :param ws: an instance of WebSocketResponse which represents WebSocket
+               connection
+        :param peer: an IP address of the client
+        :param reason: a description of the exceeded limit
+        :return: None
+        """
+        retry_after = self._admission.suggest_retry_delay()
+
+        LOGGER.debug(
+            "Streaming API connection from %s rejected: %s", peer, reason
+        )
+
+        error = ERROR_TEMPLATES[5009].to_dict()
+        error['devel_message'] %= reason
+        error['retry_after'] = round(retry_after, 1)
+
+        await send_error_message(ws=ws, error_info=error)
+        await ws.close(
+            code=WSCloseCode.TRY_AGAIN_LATER,
+            message=self._build_close_reason(retry_after)
+        )
+
+    async def _handle_session(
+            self, ws: WebSocketResponse, heartbeat: Heartbeat,
+            write_monitor: Optional[WriteBufferMonitor],
+            ticket: AdmissionTicket
+    ) -> None:
+        """
+        Authenticates the client, registers a new Session and handles
+        all the messages of this Session
+
+        :param ws: an instance of WebSocketResponse which represents WebSocket
+               connection
+        :param heartbeat: a Heartbeat which watches this connection
+        :param write_monitor: a monitor of the outgoing buffer of this
+               connection; None if the buffer is not watched
+        :param ticket: an admission ticket of this connection
+        :return: None
+        :raises AuthInvalidTokenError: if the specified access token was
+                revoked or is not valid for some other reason
+        """
+        token, options = await self._handle_auth_flow(
+            ws=ws, heartbeat=heartbeat
+        )
 
         try:
             session = self._auth_service.view_current_session(
                 access_token=token
             )
+
+            if inspect.isawaitable(session):
+                # sessions are validated by the core process in workers
+                session = await session
         except ServiceEntityResolutionError:
             raise AuthInvalidTokenError()
 
+        ticket.mark_authenticated()
         session_id = session['domain_id']
 
-        await self._register_session(session_id=session_id, ws=ws)
+        if options.replay is not None:
+            # new events are held back until missed ones are replayed
+            self._replay_buffers[session_id] = deque()
+
+        try:
+            await self._register_session(session_id=session_id, ws=ws)
+        except BaseException:
+            self._replay_buffers.pop(session_id, None)
+            raise
+
+        auth_ack_body = options.to_dict()
+
+        if self._event_journal is not None:
+            auth_ack_body['event_journal'] = self._get_journal_position()
 
         auth_ack_message = build_message(
             type_="control",
             topic="auth_ack",
-            body={}
+            body=auth_ack_body
         )
 
         # FIXME: CC41: Open the session explicitly in DeliveryManager
 
         try:
             ws.send_json(auth_ack_message, dumps=message_dumps)
-            await self._message_loop(ws, session_id)
+
+            if options.replay is not None:
+                await self._replay_events(session_id, ws, options)
+
+            await self._message_loop(
+                ws, session_id, heartbeat, options, write_monitor
+            )
         finally:
+            self._replay_buffers.pop(session_id, None)
             await self._cancel_session(session_id=session_id)
 
+    def _get_journal_position(self) -> Dict[str, Any]:
+        """
+        Returns the current position of the event journal to be reported
+        to clients
+
+        :return: a dict with the epoch of the journal and the sequence
+                 number of the last event
+        """
+        return {
+            'epoch': self._event_journal.epoch,
+            'last_seq': self._event_journal.last_seq
+        }
+
+    async def _replay_events(
+            self, session_id: TDomainId, ws: WebSocketResponse,
+            options: SessionOptions
+    ) -> None:
+        """
+        Puts all the events missed by a reconnecting client to the queue of
+        pending messages, in order of their sequence numbers. Only events
+        on topics the Session is subscribed to without retention are
+        replayed, because retained messages are delivered anyway. If missed
+        events are not available anymore, then a "resync_needed" control
+        message is sent instead.
+
+        Messages for the Session received during the replay are held back
+        and are delivered after replayed ones. The buffer of held back
+        messages must to be created before the Session is registered
+
+        :param session_id: an identifier of the current Session
+        :param ws: an instance of WebSocketResponse which represents WebSocket
+               connection
+        :param options: options negotiated for the current connection
+        :return: None
+        """
+        journal = self._event_journal
+        request = options.replay
+        entries = None
+
+        if journal is not None and request.epoch == journal.epoch:
+            entries = journal.read_since(request.last_seq)
+
+        fence = journal.last_seq if journal is not None else 0
+        self._replay_fences[session_id] = fence
+
+        if entries is None:
+            body = {}  # type: Dict[str, Any]
+
+            if journal is not None:
+                body = self._get_journal_position()
+                body['first_seq'] = journal.first_seq
+
+            resync_message = build_message(
+                type_="control", topic="resync_needed", body=body
+            )
+            self._send_messages(
+                ws, [resync_message], options,
+                self._delivery_manager.get_session_stats(session_id)
+            )
+            entries = []
+
+        is_replayed = {}  # type: Dict[str, bool]
+
+        for entry in entries:
+            topic = entry.topic
+
+            if topic not in is_replayed:
+                subscribers = self._subs_storage.resolve_subscribers(topic)
+                is_replayed[topic] = subscribers.get(session_id) is False
+
+            if not is_replayed[topic]:
+                continue
+
+            await self._delivery_manager.put_message(
+                session_id=session_id,
+                message=Message(
+                    timestamp=entry.timestamp, type_="data", topic=topic,
+                    body=entry.body if entry.body is not None else {},
+                    event_seq=entry.seq
+                ),
+                ensure_delivery=False
+            )
+
+        await self._flush_replay_buffer(session_id)
+
+    async def _flush_replay_buffer(self, session_id: TDomainId) -> None:
+        """
+        Delivers all messages held back for the Session, except the ones
+        with events already replayed or reflected by snapshots, and stops
+        holding back new messages
+
+        :param session_id: an identifier of the current Session
+        :return: None
+        """
+        buffer = self._replay_buffers.get(session_id)
+
+        while buffer:
+            message, ensure_delivery = buffer.popleft()
+
+            if self._is_fenced(
+                    session_id, message.topic, message.event_seq,
+                    ensure_delivery
+            ):
+                continue
+
+            await self._delivery_manager.put_message(
+                session_id=session_id, message=message,
+                ensure_delivery=ensure_delivery
+            )
+
+        # no more messages can be added to the buffer after this point
+        self._replay_buffers.pop(session_id, None)
+
+    def _is_fenced(
+            self, session_id: TDomainId, topic: str,
+            event_seq: Optional[int], is_retained: bool
+    ) -> bool:
+        """
+        Checks if the event was already delivered to the Session by a replay
+        of missed events or was reflected in a snapshot of objects. Replays
+        include only events without retention, so retained events are never
+        fenced by a replay
+
+        :param session_id: an identifier of the Session
+        :param topic: a topic of the event
+        :param event_seq: a sequence number of the event
+        :param is_retained: is the event delivered with retention
+        :return: True if the event must not be delivered to the Session
+        """
+        if event_seq is None:
+            return False
+
+        if (not is_retained and
+                event_seq <= self._replay_fences.get(session_id, 0)):
+            return True
+
+        fences = self._snapshot_fences.get(session_id)
+
+        if not fences:
+            return False
+
+        # events are dispatched in order of their sequence numbers, so
+        # older fences will never be needed again
+        fences[:] = [f for f in fences if f[1] >= event_seq]
+
+        return any(patterns.has_matching(topic) for patterns, _ in fences)
+
+    def is_interested(self, source: EventHub, *args, **kwargs) -> bool:
+        """
+        Checks if any Session is subscribed to the topic of an event
+
+        :param source: an EventHub which is going to dispatch the event
+        :param args: positional arguments, ignored
+        :param kwargs: keyword arguments; must to contain the topic of the
+               event as ``topic``
+        :return: True if there is a subscribed Session, False otherwise
+        """
+        return self._subs_storage.has_subscribers(kwargs['topic'])
+
     def update(self, source: EventHub, *args, **kwargs) -> None:
+        event = kwargs.get('event', args[0])  # type: Event
+
+        self.update_batch(source, (event,))
+
+    def update_batch(self, source: EventHub, events: Sequence[Event]) -> None:
+        """
+        Schedules routing of the specified events to subscribed Sessions.
+        A single task routes all the events of the batch in order
+
+        :param source: an EventHub which dispatches events
+        :param events: events to be routed
+        :return: None
+        """
         if not isinstance(source, EventHub):
             raise TypeError(
                 "StreamingApiProvider can subscribe only on updates "
                 "from EventHub instances"
             )
 
-        event = kwargs.get('event', args[0])  # type: Event
-        assert isinstance(event, Event)
-
-        if isinstance(event, ObjectRelatedEvent):
-            message_body = event.object_dto
-        else:
-            message_body = {}
+        assert all(isinstance(event, Event) for event in events)
 
         asyncio.ensure_future(
-            self._send_data_to_all(event.timestamp, event.topic, message_body),
-            loop=self._loop
+            self._route_events(events), loop=self._loop
         )
 
+    async def _route_events(self, events: Sequence[Event]) -> None:
+        """
+        Routes the specified events to subscribed Sessions one by one
+
+        :param events: events to be routed
+        :return: None
+        """
+        for event in events:
+            if not self._subs_storage.has_subscribers(event.topic):
+                # the payload of the event is not built at all
+                continue
+
+            if isinstance(event, ObjectRelatedEvent):
+                message_body = event.object_dto
+            else:
+                message_body = {}
+
+            await self._send_data_to_all(
+                event.timestamp, event.topic, message_body, event.seq,
+                event.trace
+            )
+
     async def _send_data_to_all(
-            self, timestamp: float, topic: str, body: Mapping
+            self, timestamp: float, topic: str, body: Mapping,
+            event_seq: Optional[int] = None, trace: Optional[StageTrace] = None
     ) -> None:
         """
-        Constructs the data message and sends it to all corresponding Clients
+        Constructs the data message and sends it to all corresponding Clients.
+        The content of the message is encoded at most once and the result is
+        shared between all of the Sessions
 
         :param timestamp: the time moment of message formation to be set
         :param topic: the topic of the message
         :param body: the content (payload) of the message
+        :param event_seq: a sequence number of the event in EventJournal
+        :param trace: a trace of stages passed by the event, if the stage
+               timing is enabled
         :return: None
         """
-        for session_id in self._subs_storage.list_sessions():
-            is_retained = self._subs_storage.resolve_subscription_params(
-                session_id=session_id, topic=topic
-            )
+        frame = PreparedFrame(
+            timestamp=timestamp, type_="data", topic=topic, body=body,
+            event_seq=event_seq
+        )
+
+        # a single instance of message is shared by all non-retained
+        # deliveries; it will never receive a message_id
+        shared_message = Message(
+            timestamp=timestamp, type_="data", topic=topic, body=body,
+            frame=frame, event_seq=event_seq, trace=trace
+        )
+
+        subscribers = self._subs_storage.resolve_subscribers(topic)
 
-            if is_retained is None:
-                continue  # this Session is not subscribed to this message
+        if trace is not None:
+            trace.mark(ROUTE)
 
-            if is_retained or session_id in self._active_sessions:
+        for session_id, is_retained in subscribers.items():
+            if is_retained:
+                # each Tracked Message receives its own message_id, but the
+                # encoded content is still shared via frame
                 message = Message(
-                    timestamp=timestamp, type_="data", topic=topic, body=body
+                    timestamp=timestamp, type_="data", topic=topic, body=body,
+                    frame=frame, event_seq=event_seq, trace=trace
                 )
+            elif session_id in self._active_sessions:
+                message = shared_message
+            else:
+                continue
 
-                await self._delivery_manager.put_message(
-                    session_id=session_id, message=message,
-                    ensure_delivery=is_retained
-                )
+            if self._is_fenced(session_id, topic, event_seq, is_retained):
+                # the event was already replayed to this Session
+                continue
+
+            buffer = self._replay_buffers.get(session_id)
+
+            if buffer is not None:
+                buffer.append((message, is_retained))
+                continue
+
+            await self._delivery_manager.put_message(
+                session_id=session_id, message=message,
+                ensure_delivery=is_retained
+            )
 
     async def _handle_old_session(
             self, session_id: TDomainId,
@@ -269,30 +970,47 @@ class StreamingApiProvider(HttpApiProvider, Observer):
             self, session_id: TDomainId, ws: WebSocketResponse
     ) -> None:
         """
-        Removes Session from the registry of opened sessions
+        Adds Session to the registry of opened sessions. An old connection
+        of the same Session is closed beforehand; it is handled outside of
+        the actor of the Session, because the old connection closes itself
+        via the same actor
 
         :param session_id: an identifier of a Session to be registered
         :param ws: an instance of WebSocketResponse which represents WebSocket
                connection
         :return: None
-        :raises
         """
         LOGGER.debug("Starting new streaming session: %s", session_id)
 
         current_task = asyncio.Task.current_task(loop=self._loop)
-
-        async with self._active_sessions_lock:
-            old_session_data = self._active_sessions.get(session_id)
+        old_session_data = self._active_sessions.get(session_id)
 
         if old_session_data is not None:
             await self._handle_old_session(session_id, old_session_data)
 
-        async with self._active_sessions_lock:
-            await self._delivery_manager.resume_for(session_id)
-            self._active_sessions[session_id] = ws, current_task
+        await self._get_actor(session_id).call(
+            self._open_session, session_id, ws, current_task
+        )
 
         LOGGER.debug("Streaming session started: %s", session_id)
 
+    async def _open_session(
+            self, session_id: TDomainId, ws: WebSocketResponse,
+            task: asyncio.Task
+    ) -> None:
+        """
+        Resumes delivery of retained messages and registers the connection
+        of a Session. Must to be executed by an actor of this Session
+
+        :param session_id: an identifier of a Session to be registered
+        :param ws: an instance of WebSocketResponse which represents WebSocket
+               connection
+        :param task: a task which handles this connection
+        :return: None
+        """
+        await self._delivery_manager.resume_for(session_id)
+        self._active_sessions[session_id] = ws, task
+
     async def _cancel_session(
             self, session_id: TDomainId, code: int = 1000
     ) -> None:
@@ -306,17 +1024,32 @@ class StreamingApiProvider(HttpApiProvider, Observer):
         """
         LOGGER.debug("Closing streaming session: %s", session_id)
 
-        async with self._active_sessions_lock:
-            if session_id not in self._active_sessions:
-                LOGGER.error(
-                    "Session with such id isn't present: %s",
-                    session_id
-                )
+        await self._get_actor(session_id).call(
+            self._close_session, session_id, code
+        )
+
+    async def _close_session(self, session_id: TDomainId, code: int) -> None:
+        """
+        Pauses delivery of retained messages, closes the connection of
+        a Session and removes it from the registry of opened sessions. Must
+        to be executed by an actor of this Session
+
+        :param session_id: an identifier of a Session to be closed
+        :param code: a code to be passed to client in WS close message
+        :return: None
+        """
+        if session_id not in self._active_sessions:
+            LOGGER.error(
+                "Session with such id isn't present: %s",
+                session_id
+            )
 
-            await self._delivery_manager.pause_for(session_id)
-            ws, current_task = self._active_sessions[session_id]
-            await ws.close(code=code)
-            self._active_sessions.pop(session_id)
+        await self._delivery_manager.pause_for(session_id)
+        ws, current_task = self._active_sessions[session_id]
+        await ws.close(code=code)
+        self._active_sessions.pop(session_id)
+        self._replay_fences.pop(session_id, None)
+        self._snapshot_fences.pop(session_id, None)
 
     async def _handle_subscription_message(
             self, message: Message, session_id: TDomainId
@@ -332,10 +1065,11 @@ class StreamingApiProvider(HttpApiProvider, Observer):
         """
         target_topic = message.body.get('target_topic')
         retain_messages = message.body.get('retain_messages', False)
+        with_snapshot = message.body.get('with_snapshot', False)
 
         LOGGER.debug(
-            "Subscription request from %s: %s %s", session_id,
-            target_topic, retain_messages
+            "Subscription request from %s: %s %s %s", session_id,
+            target_topic, retain_messages, with_snapshot
         )
 
         if not isinstance(target_topic, str):
@@ -352,20 +1086,96 @@ class StreamingApiProvider(HttpApiProvider, Observer):
             )
             raise StreamingFlowError(error_info=error)
 
-        async with self._subs_lock:
+        if not isinstance(with_snapshot, bool):
+            error = ERROR_TEMPLATES[5030].to_dict()
+            error['devel_message'] %= (
+                "with_snapshot is not a boolean"
+            )
+            raise StreamingFlowError(error_info=error)
+
+        if with_snapshot:
+            # new events are held back until the snapshot is sent
+            self._replay_buffers[session_id] = deque()
+
+        try:
             self._subs_storage.add_subscription(
                 session_id=session_id,
                 topic=target_topic, is_retained=retain_messages
             )
 
-        message = build_message(
-            type_="control",
-            topic="subscribe_ack",
-            body={"target_topic": target_topic}
-        )
+            # the snapshot is built without any context switches after the
+            # subscription was added, so no events can be missed
+            snapshot = None
 
-        await self._delivery_manager.put_message(
-            session_id=session_id, message=message
+            if with_snapshot:
+                snapshot = self._build_snapshot(session_id, target_topic)
+
+            message = build_message(
+                type_="control",
+                topic="subscribe_ack",
+                body={"target_topic": target_topic}
+            )
+
+            await self._delivery_manager.put_message(
+                session_id=session_id, message=message
+            )
+
+            if snapshot is not None:
+                await self._delivery_manager.put_message(
+                    session_id=session_id, message=snapshot
+                )
+        finally:
+            if with_snapshot:
+                await self._flush_replay_buffer(session_id)
+
+    def _build_snapshot(
+            self, session_id: TDomainId, target_topic: str
+    ) -> Message:
+        """
+        Builds a snapshot of the current state of all objects with topics
+        matching the specified pattern. Events reflected by the snapshot
+        will not be delivered to the Session
+
+        :param session_id: an identifier of the current Session
+        :param target_topic: a topic pattern of the subscription
+        :return: a control message with the snapshot
+        """
+        if self._event_hub is not None:
+            # updates which are still queued or held by coalescing windows
+            # are already reflected by the state of objects, so they must
+            # to be journaled before the fence is taken
+            self._event_hub.flush()
+
+        patterns = TopicTree()
+        patterns.add(pattern=target_topic, key=None)
+
+        first_part = target_topic.split('/', 1)[0]
+        objects = {}  # type: Dict[str, Mapping]
+
+        for root_topic, service in self._snapshot_sources.items():
+            if first_part not in (root_topic, '+', '#'):
+                continue
+
+            for dto in service.view_all():
+                for what_happened in ('modified', 'added'):
+                    topic = '%s/%s/%s' % (root_topic, dto['id'], what_happened)
+
+                    if patterns.has_matching(topic):
+                        objects[topic] = dto
+                        break
+
+        event_seq = None
+
+        if self._event_journal is not None:
+            event_seq = self._event_journal.last_seq
+            self._snapshot_fences.setdefault(session_id, []).append(
+                (patterns, event_seq)
+            )
+
+        return Message(
+            timestamp=time.time(), type_="control", topic="snapshot",
+            body={"target_topic": target_topic, "objects": objects},
+            event_seq=event_seq
         )
 
     async def _handle_unsubscription_message(
@@ -393,10 +1203,9 @@ class StreamingApiProvider(HttpApiProvider, Observer):
             )
             raise StreamingFlowError(error_info=error)
 
-        async with self._subs_lock:
-            self._subs_storage.remove_subscription(
-                session_id=session_id, topic=target_topic
-            )
+        self._subs_storage.remove_subscription(
+            session_id=session_id, topic=target_topic
+        )
 
         message = build_message(
             type_="control",
@@ -413,7 +1222,9 @@ class StreamingApiProvider(HttpApiProvider, Observer):
     ) -> None:
         """
         Analyzes the received delivery_ack message and removes the
-        corresponding message from the list of undelivered
+        corresponding messages from the list of undelivered. A single
+        message, all the messages up to the specified one and ranges of
+        messages can be acknowledged by a single delivery_ack message
 
         :param message: a received message
         :param session_id: an identifier of the current Session
@@ -421,21 +1232,134 @@ class StreamingApiProvider(HttpApiProvider, Observer):
         :raises StreamingFlowError: if client violated the format of
                 message body
         """
-        message_id = message.body['message_id']
+        message_id = message.body.get('message_id')
+        up_to = message.body.get('up_to')
+        ranges = message.body.get('ranges')
 
-        if not isinstance(message_id, int):
+        if message_id is None and up_to is None and ranges is None:
+            self._raise_invalid_ack(
+                "message_id, up_to or ranges must to be specified"
+            )
+
+        if message_id is not None and not self._is_message_id(message_id):
+            self._raise_invalid_ack("message_id is not a valid identifier")
+
+        if up_to is not None and not self._is_message_id(up_to):
+            self._raise_invalid_ack("up_to is not a valid identifier")
+
+        if ranges is not None:
+            if not isinstance(ranges, list) or not all(
+                    isinstance(r, list) and len(r) == 2 and
+                    self._is_message_id(r[0]) and self._is_message_id(r[1])
+                    for r in ranges
+            ):
+                self._raise_invalid_ack(
+                    "ranges is not a list of pairs of valid identifiers"
+                )
+        else:
+            ranges = []
+
+        if up_to is None and not ranges:
+            await self._delivery_manager.ack_delivery(
+                session_id=session_id, message_id=message_id
+            )
+            return
+
+        if message_id is not None:
+            ranges.append((message_id, message_id))
+
+        await self._delivery_manager.ack_delivery_ranges(
+            session_id=session_id, ranges=ranges, up_to=up_to
+        )
+
+    @staticmethod
+    def _is_message_id(value) -> bool:
+        """
+        Checks if the value is a valid identifier of a Tracked Message
+
+        :param value: a value to be checked
+        :return: True if the value is valid, False otherwise
+        """
+        return (
+            isinstance(value, int) and not isinstance(value, bool) and
+            0 <= value < DeliveryManager.MAX_MESSAGE_ID
+        )
+
+    @staticmethod
+    def _raise_invalid_ack(description: str) -> None:
+        """
+        Raises a StreamingFlowError with 5030 error code
+
+        :param description: a description of an issue
+        :return: None
+        :raises StreamingFlowError: always
+        """
+        error = ERROR_TEMPLATES[5030].to_dict()
+        error['devel_message'] %= description
+        raise StreamingFlowError(error_info=error)
+
+    async def _handle_resync_message(
+            self, message: Message, session_id: TDomainId,
+            ws: WebSocketResponse, options: SessionOptions
+    ) -> None:
+        """
+        Handles the request on resynchronization of delta-encoded topics.
+        Snapshots are sent immediately, bypassing the queue of pending
+        messages, so the following patches are always built against them
+
+        :param message: a message to be handled
+        :param session_id: an identifier of the current Session
+        :param ws: an instance of WebSocketResponse which represents WebSocket
+               connection
+        :param options: options negotiated for the current connection
+        :return: None
+        :raises StreamingFlowError: if client violated the format of
+                Resync message body
+        """
+        target_topic = message.body.get('target_topic')
+
+        if target_topic is not None and not isinstance(target_topic, str):
             error = ERROR_TEMPLATES[5030].to_dict()
             error['devel_message'] %= (
-                "message_id is missing or is not an integer"
+                "target_topic is not a string"
             )
             raise StreamingFlowError(error_info=error)
 
-        await self._delivery_manager.ack_delivery(
-            session_id=session_id, message_id=message_id
+        if options.delta is None:
+            LOGGER.debug("Resync request without delta encoding, ignored")
+            return
+
+        snapshots = options.delta.resync(target_topic)
+
+        if snapshots:
+            self._send_messages(
+                ws, snapshots, options,
+                self._delivery_manager.get_session_stats(session_id)
+            )
+
+    async def _handle_session_stats_message(
+            self, session_id: TDomainId
+    ) -> None:
+        """
+        Handles the request on delivery statistics of the current Session.
+        Statistics are sent in a "session_stats" control message
+
+        :param session_id: an identifier of the current Session
+        :return: None
+        """
+        message = build_message(
+            type_="control",
+            topic="session_stats",
+            body=self.view_session_stats(session_id)
+        )
+
+        await self._delivery_manager.put_message(
+            session_id=session_id, message=message
         )
 
     async def _handle_control_message(
-            self, message: Message, session_id: TDomainId
+            self, message: Message, session_id: TDomainId,
+            ws: WebSocketResponse, options: SessionOptions
     ) -> None:
         """
         Analyses the new Control message from a client and, if needed,
@@ -443,16 +1367,32 @@ class StreamingApiProvider(HttpApiProvider, Observer):
 
         :param message: a message from a client to be analyzed
         :param session_id: an identifier of the current Session
+        :param ws: an instance of WebSocketResponse which represents WebSocket
+               connection
+        :param options: options negotiated for the current connection
         :return: None
         :raises StreamingFlowError: if client violated the format of
                 message body
         """
+        # changes of the Session state are executed by its actor
         if message.topic == "subscribe":
-            await self._handle_subscription_message(message, session_id)
+            await self._get_actor(session_id).call(
+                self._handle_subscription_message, message, session_id
+            )
         elif message.topic == "unsubscribe":
-            await self._handle_unsubscription_message(message, session_id)
+            await self._get_actor(session_id).call(
+                self._handle_unsubscription_message, message, session_id
+            )
         elif message.topic == "delivery_ack":
-            await self._handle_delivery_ack(message, session_id)
+            await self._get_actor(session_id).call(
+                self._handle_delivery_ack, message, session_id
+            )
+        elif message.topic == "resync":
+            await self._handle_resync_message(
+                message, session_id, ws, options
+            )
+        elif message.topic == "session_stats":
+            await self._handle_session_stats_message(session_id)
         else:
             LOGGER.warning(
                 "Unhandled control message from %s, ignored:\n"
@@ -461,7 +1401,8 @@ class StreamingApiProvider(HttpApiProvider, Observer):
             )
 
     async def _handle_incoming_message(
-            self, message: Message, session_id: TDomainId
+            self, message: Message, session_id: TDomainId,
+            ws: WebSocketResponse, options: SessionOptions
     ) -> None:
         """
         Analyses the new message from a client and, if needed, adds the new
@@ -469,12 +1410,17 @@ class StreamingApiProvider(HttpApiProvider, Observer):
 
         :param message: a message from a client to be analyzed
         :param session_id: an identifier of the current Session
+        :param ws: an instance of WebSocketResponse which represents WebSocket
+               connection
+        :param options: options negotiated for the current connection
         :return: None
         :raises StreamingFlowError: if client violated the format of
                 message body
         """
         if message.type == "control":
-            await self._handle_control_message(message, session_id)
+            await self._handle_control_message(
+                message, session_id, ws, options
+            )
 
         else:
             LOGGER.warning(
@@ -483,30 +1429,84 @@ class StreamingApiProvider(HttpApiProvider, Observer):
                 message.topic, message.body
             )
 
-    async def _handle_outcoming_message(
-            self, ws: WebSocketResponse, message: Message
+    async def _handle_outcoming_messages(
+            self, ws: WebSocketResponse, messages: List[Message],
+            options: SessionOptions, stats: SessionStats
     ) -> None:
         """
-        Analyses the new message to be sent to a client and sends it if it's
-        appropriate (i.e., for example, if the client have an access to read
-        that message)
+        Analyses the new messages to be sent to a client and sends them if
+        it's appropriate (i.e., for example, if the client have an access to
+        read that messages). Replaces bodies of data messages with patches
+        if the client enabled delta encoding
 
         :param ws: an instance of WebSocketResponse which represents WebSocket
                connection
-        :param message: a message to be sent to the client
+        :param messages: messages to be sent to the client
+        :param options: options negotiated for the current connection
+        :param stats: delivery counters of the current Session
         :return: None
         """
         # FIXME: Check access rights here
-        ws.send_json(data=message, dumps=message_dumps)
+        traces = None  # type: Optional[List[StageTrace]]
+        started = 0.0
+
+        if STAGE_TIMINGS.enabled:
+            started = time.perf_counter()
+            traces = [m.trace for m in messages if m.trace is not None]
+
+        if options.delta is not None:
+            messages = [options.delta.encode(m) for m in messages]
+
+        self._send_messages(ws, messages, options, stats)
+
+        if traces:
+            STAGE_TIMINGS.record_delivery(traces, started)
+
+    @staticmethod
+    def _send_messages(
+            ws: WebSocketResponse, messages: List[Message],
+            options: SessionOptions, stats: SessionStats
+    ) -> None:
+        """
+        Sends messages to a client. Messages are encoded with the codec
+        negotiated for this connection. Packs all messages into a single
+        frame if the client enabled message batching
+
+        :param ws: an instance of WebSocketResponse which represents WebSocket
+               connection
+        :param messages: messages to be sent to the client
+        :param options: options negotiated for the current connection
+        :param stats: delivery counters of the current Session
+        :return: None
+        """
+        codec = options.codec
+        send = ws.send_bytes if codec.is_binary else ws.send_str
+
+        stats.sent += len(messages)
+
+        if options.batching is not None:
+            data = codec.encode_batch(messages)
+            send(data)
+            stats.bytes_sent += len(data)
+            return
+
+        for message in messages:
+            data = codec.encode(message)
+            send(data)
+            stats.bytes_sent += len(data)
 
     async def _on_incoming_waiter_finished(
-            self, task: asyncio.Task, session_id: TDomainId
+            self, ws: WebSocketResponse, task: asyncio.Task,
+            session_id: TDomainId, options: SessionOptions
     ) -> None:
         """
         A method to be executed if incoming_waiter_task finished its execution
 
+        :param ws: an instance of WebSocketResponse which represents WebSocket
+               connection
         :param task: an instance of incoming_waiter_task
         :param session_id: an identifier of the current Streaming Session
+        :param options: options negotiated for the current connection
         :return: None
         """
 
@@ -515,15 +1515,15 @@ class StreamingApiProvider(HttpApiProvider, Observer):
         if exception is not None:
             raise exception
 
-        result = task.result()
-        message = parse_message(result)
+        message = task.result()
 
         await self._handle_incoming_message(
-            message=message, session_id=session_id
+            message=message, session_id=session_id, ws=ws, options=options
         )
 
     async def _on_outcoming_waiter_finished(
-            self, ws: WebSocketResponse, task: asyncio.Task
+            self, ws: WebSocketResponse, task: asyncio.Task,
+            options: SessionOptions, stats: SessionStats
     ) -> None:
         """
         A method to be executed if outcoming_waiter_task finished its execution
@@ -531,6 +1531,8 @@ class StreamingApiProvider(HttpApiProvider, Observer):
         :param ws: an instance of WebSocketResponse which represents WebSocket
                connection
         :param task: an instance of outcoming_waiter_task
+        :param options: options negotiated for the current connection
+        :param stats: delivery counters of the current Session
         :return: None
         """
         exception = task.exception()
@@ -540,12 +1542,14 @@ class StreamingApiProvider(HttpApiProvider, Observer):
 
         result = task.result()
 
-        await self._handle_outcoming_message(
-            ws=ws, message=result
+        await self._handle_outcoming_messages(
+            ws=ws, messages=result, options=options, stats=stats
         )
 
     async def _message_loop(
-            self, ws: WebSocketResponse, session_id: TDomainId
+            self, ws: WebSocketResponse, session_id: TDomainId,
+            heartbeat: Heartbeat, options: SessionOptions,
+            write_monitor: Optional[WriteBufferMonitor] = None
     ) -> None:
         """
         Is responsible for handling of all incoming messages from client and
@@ -555,18 +1559,46 @@ class StreamingApiProvider(HttpApiProvider, Observer):
         :param ws: an instance of WebSocketResponse which represents WebSocket
                connection
         :param session_id: an identifier of the current session
+        :param heartbeat: a Heartbeat which watches this connection
+        :param options: options negotiated for the current connection
+        :param write_monitor: a monitor of the outgoing buffer of this
+               connection; None if the buffer is not watched
         :return: None
         """
         start_task = functools.partial(
             asyncio.ensure_future, loop=self._loop
         )
-        get_message = functools.partial(
-            self._delivery_manager.get_message,
-            session_id=session_id
+
+        if options.batching is not None:
+            get_messages = functools.partial(
+                self._delivery_manager.get_messages,
+                session_id=session_id,
+                max_count=options.batching.max_messages,
+                flush_interval=options.batching.flush_interval
+            )
+        else:
+            get_messages = functools.partial(
+                self._delivery_manager.get_messages,
+                session_id=session_id, max_count=1
+            )
+
+        receive_message = functools.partial(
+            own_receive_message, ws, codec=options.codec,
+            on_frame=heartbeat.touch
         )
 
-        incoming_waiter_task = start_task(own_receive_json(ws))
-        outcoming_waiter_task = start_task(get_message())
+        # counters are updated directly, without lookups for each message
+        stats = self._delivery_manager.get_session_stats(session_id)
+
+        if write_monitor is not None:
+            get_messages = functools.partial(
+                self._get_messages_when_writable, get_messages=get_messages,
+                session_id=session_id, write_monitor=write_monitor,
+                stats=stats
+            )
+
+        incoming_waiter_task = start_task(receive_message())
+        outcoming_waiter_task = start_task(get_messages())
 
         try:
             while not ws.closed:
@@ -578,38 +1610,115 @@ class StreamingApiProvider(HttpApiProvider, Observer):
 
                 if incoming_waiter_task in done:
                     await self._on_incoming_waiter_finished(
-                        task=incoming_waiter_task, session_id=session_id
+                        ws=ws, task=incoming_waiter_task,
+                        session_id=session_id, options=options
                     )
 
-                    incoming_waiter_task = start_task(own_receive_json(ws))
+                    incoming_waiter_task = start_task(receive_message())
 
                 if outcoming_waiter_task in done:
                     await self._on_outcoming_waiter_finished(
-                        ws=ws, task=outcoming_waiter_task
+                        ws=ws, task=outcoming_waiter_task, options=options,
+                        stats=stats
                     )
 
-                    outcoming_waiter_task = start_task(get_message())
+                    outcoming_waiter_task = start_task(get_messages())
 
         finally:
             incoming_waiter_task.cancel()
             outcoming_waiter_task.cancel()
 
-    async def _handle_auth_flow(self, ws: WebSocketResponse) -> str:
+    async def _get_messages_when_writable(
+            self, get_messages: Callable[[], Awaitable[List[Message]]],
+            session_id: TDomainId, write_monitor: WriteBufferMonitor,
+            stats: SessionStats
+    ) -> List[Message]:
+        """
+        Fetches the next messages to be sent to a client. If the outgoing
+        buffer of the connection is above the high water mark, then waits
+        until it will be drained first. Applies the lagging client policy
+        if the buffer wasn't drained in time
+
+        :param get_messages: a function which fetches the next messages
+               from the queue of pending messages
+        :param session_id: an identifier of the current Session
+        :param write_monitor: a monitor of the outgoing buffer of the
+               connection
+        :param stats: delivery counters of the current Session
+        :return: messages to be sent
+        :raises StreamingFlowError: if the client is lagging behind and the
+                'disconnect' lagging client policy is applied
+        """
+        if write_monitor.is_above_high_water_mark():
+            stats.write_pauses += 1
+
+            is_drained = await write_monitor.wait_drained(
+                timeout=self._max_write_lag
+            )
+
+            if not is_drained:
+                await self._handle_lagging_client(session_id, write_monitor)
+
+        return await get_messages()
+
+    async def _handle_lagging_client(
+            self, session_id: TDomainId, write_monitor: WriteBufferMonitor
+    ) -> None:
+        """
+        Applies the lagging client policy to a client which outgoing buffer
+        stayed above the high water mark for too long. With the 'conflate'
+        policy, waits until the buffer will be drained while only the last
+        pending message is kept for each topic
+
+        :param session_id: an identifier of the current Session
+        :param write_monitor: a monitor of the outgoing buffer of the
+               connection
+        :return: None
+        :raises StreamingFlowError: if the 'disconnect' policy is applied
+        """
+        LOGGER.warning(
+            "Client of %s Session is lagging behind: %s bytes are buffered, "
+            "applying the '%s' policy", session_id,
+            write_monitor.get_buffer_size(), self._lagging_client_policy.value
+        )
+
+        if self._lagging_client_policy is LaggingPolicy.disconnect:
+            raise StreamingFlowError(
+                error_info=ERROR_TEMPLATES[5008].to_dict()
+            )
+
+        self._delivery_manager.set_conflate_all(session_id, True)
+
+        try:
+            await write_monitor.wait_drained()
+        finally:
+            self._delivery_manager.set_conflate_all(session_id, False)
+
+    async def _handle_auth_flow(
+            self, ws: WebSocketResponse, heartbeat: Heartbeat
+    ) -> Tuple[str, SessionOptions]:
         """
         This method handles client authentication flow:
 
         - waits for an "auth" message from client;
         - checks message validity;
         - extracts auth token;
-        - returns authentication toke to the caller
+        - negotiates optional capabilities requested by client;
+        - returns authentication toke and session options to the caller
 
         :param ws: an instance of WebSocketResponse which represents WebSocket
                connection
-        :return: an extracted authentication token
+        :param heartbeat: a Heartbeat which watches this connection
+        :return: an extracted authentication token and accepted options
         :raises StreamingFlowError: if the content of a message was different
                 from expected
+        :raises asyncio.TimeoutError: if the auth message wasn't received in
+                time
         """
-        raw_message = await own_receive_json(ws, timeout=20)
+        raw_message = await self._timer_wheel.wait_for(
+            own_receive_json(ws, on_frame=heartbeat.touch),
+            timeout=self._auth_timeout
+        )
         parsed_message = parse_message(raw_message)
 
         if parsed_message.type != "control":
@@ -632,4 +1741,6 @@ class StreamingApiProvider(HttpApiProvider, Observer):
             )
             raise StreamingFlowError(error_info=error)
 
-        return token
+        options = self._options_negotiator.negotiate(parsed_message.body)
+
+        return token, options
@@ -0,0 +1,299 @@
+"""
+This module contains definitions of StreamingWorkers and run_worker - of
+a multi-process mode of the Streaming API. In this mode StreamingApiProviders
+run in separate worker processes which share the same listening port
+(SO_REUSEPORT) and receive events from the core process over the event bus
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+from typing import Any, Dict, List, Mapping
+
+from dpl.auth.auth_context import AuthContext
+from dpl.auth.remote_auth_service import RemoteAuthService
+from dpl.events.event import Event
+from dpl.events.event_bus import EventBusClient
+from dpl.events.event_hub import EventHub
+from dpl.events.event_journal import EventJournal
+from .pending_queue import OverflowPolicy
+from .retained_store import InMemoryRetainedStore
+from .streaming_api_provider import StreamingApiProvider
+from .write_buffer_monitor import LaggingPolicy
+
+
+LOGGER = logging.getLogger(__name__)
+
+# a path where the Streaming API is served by workers
+WORKER_API_ROOT = '/api/streaming/v1/'
+
+# a delay between attempts to connect to the event bus again, seconds
+BUS_RECONNECT_DELAY = 1
+
+
+def provider_options_from_config(config: Mapping) -> Dict[str, Any]:
+    """
+    Builds parameters of StreamingApiProvider from the streaming_api section
+    of the configuration. Parameters which require resources of the core
+    process (retained message stores, event journals and snapshot sources)
+    are not included
+
+    :param config: the streaming_api section of the configuration
+    :return: keyword arguments for the StreamingApiProvider constructor
+    """
+    return dict(
+        max_pending_messages=config.get('max_pending_messages', 0),
+        overflow_policy=OverflowPolicy(
+            config.get('overflow_policy', 'drop_oldest')
+        ),
+        conflated_topics=config.get('conflated_topics', ()),
+        retransmission_batch_size=config.get('retransmission_batch_size', 0),
+        max_batch_flush_interval=config.get(
+            'max_batch_flush_interval', 0.005
+        ),
+        max_batch_messages=config.get('max_batch_messages', 100),
+        delta_topics=config.get('delta_topics', ()),
+        max_delta_snapshot_interval=config.get(
+            'max_delta_snapshot_interval', 50
+        ),
+        retained_session_ttl=config.get('retained_session_ttl', 0),
+        write_buffer_high_mark=config.get('write_buffer_high_mark', 0),
+        write_buffer_low_mark=config.get('write_buffer_low_mark'),
+        max_write_lag=config.get('max_write_lag', 10),
+        lagging_client_policy=LaggingPolicy(
+            config.get('lagging_client_policy', 'conflate')
+        ),
+        max_connections=config.get('max_connections', 0),
+        max_unauthenticated_connections=config.get(
+            'max_unauthenticated_connections', 0
+        ),
+        max_connections_per_ip=config.get('max_connections_per_ip', 0),
+        auth_timeout=config.get('auth_timeout'),
+        min_reconnect_delay=config.get('min_reconnect_delay', 1),
+        max_reconnect_delay=config.get('max_reconnect_delay', 30)
+    )
+
+
+def _pass_bus_event(source: EventBusClient, event: Event) -> Event:
+    """
+    Passes events received from the bus to the EventHub of a worker as is
+
+    :param source: a client of the bus
+    :param event: a received event
+    :return: the same event
+    """
+    return event
+
+
+async def _reconnect(
+        bus_client: EventBusClient, stopped: asyncio.Event
+) -> bool:
+    """
+    Connects to the event bus again, until succeeded or until the worker
+    is stopped
+
+    :param bus_client: a client of the bus which lost its connection
+    :param stopped: an event which is set when the worker must to stop
+    :return: True if connected, False if the worker was stopped
+    """
+    await bus_client.close()
+
+    while not stopped.is_set():
+        try:
+            await bus_client.connect()
+            return True
+        except (OSError, asyncio.IncompleteReadError) as e:
+            LOGGER.debug("Failed to connect to the event bus: %r", e)
+
+        try:
+            await asyncio.wait_for(stopped.wait(), BUS_RECONNECT_DELAY)
+        except asyncio.TimeoutError:
+            pass
+
+    return False
+
+
+async def _serve(
+        loop: asyncio.AbstractEventLoop, bus_path: str, host: str, port: int,
+        config: Mapping, journal_capacity: int
+) -> None:
+    """
+    Serves the Streaming API in a worker process until SIGTERM is received.
+    If the connection to the core process is lost (i.e. the worker was
+    disconnected for lagging behind), then the worker connects again, its
+    journal continues from the current position of the core journal and
+    all clients are asked to resynchronize
+
+    :param loop: an event loop of the worker
+    :param bus_path: a path to the Unix socket of the event bus
+    :param host: a host to listen on
+    :param port: a port to listen on
+    :param config: the streaming_api section of the configuration
+    :param journal_capacity: the capacity of the journal of the worker
+    :return: None
+    """
+    bus_client = EventBusClient(path=bus_path)
+    await bus_client.connect()
+
+    journal = None
+
+    if journal_capacity and bus_client.epoch is not None:
+        # sequence numbers are assigned by the core process
+        journal = EventJournal(
+            capacity=journal_capacity, epoch=bus_client.epoch,
+            last_seq=bus_client.last_seq
+        )
+
+    event_hub = EventHub(journal=journal)
+    event_hub.register_handler(EventBusClient, _pass_bus_event)
+    bus_client.subscribe(event_hub)
+
+    # retained messages are kept by the worker the client is connected to
+    provider = StreamingApiProvider(
+        auth_context=AuthContext(),
+        auth_service=RemoteAuthService(bus_client),
+        api_root=WORKER_API_ROOT,
+        loop=loop,
+        retained_store=InMemoryRetainedStore(),
+        event_journal=journal,
+        event_hub=event_hub,
+        **provider_options_from_config(config)
+    )
+    event_hub.subscribe(provider)
+
+    await provider.create_server(host=host, port=port, reuse_port=True)
+
+    stopped = asyncio.Event()
+    loop.add_signal_handler(signal.SIGTERM, stopped.set)
+    stop_waiter = asyncio.ensure_future(stopped.wait())
+
+    while True:
+        await asyncio.wait(
+            [stop_waiter, asyncio.ensure_future(bus_client.wait_closed())],
+            return_when=asyncio.FIRST_COMPLETED
+        )
+
+        if stopped.is_set():
+            break
+
+        LOGGER.warning("Connection to the event bus was lost, reconnecting")
+
+        if not await _reconnect(bus_client, stopped):
+            break
+
+        # events missed while the worker was disconnected are never
+        # replayed, clients must to fetch the current state instead
+        if journal is not None:
+            journal.restart(bus_client.epoch, bus_client.last_seq)
+
+        await provider.request_resync()
+
+    await provider.shutdown_server()
+    await bus_client.close()
+
+
+def run_worker(
+        bus_path: str, host: str, port: int, config: Mapping,
+        journal_capacity: int, logging_level: str
+) -> None:
+    """
+    An entry point of a worker process
+
+    :param bus_path: a path to the Unix socket of the event bus
+    :param host: a host to listen on
+    :param port: a port to listen on
+    :param config: the streaming_api section of the configuration
+    :param journal_capacity: the capacity of the journal of the worker
+    :param logging_level: a name of the minimum level of logging messages
+    :return: None
+    """
+    logging.basicConfig(level=logging_level.upper())
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    try:
+        loop.run_until_complete(
+            _serve(loop, bus_path, host, port, config, journal_capacity)
+        )
+    finally:
+        loop.close()
+
+
+class StreamingWorkers(object):
+    """
+    StreamingWorkers starts and stops worker processes of the Streaming API.
+    Workers are started with the 'spawn' method, so they don't inherit
+    database connections and threads of the core process
+    """
+    def __init__(
+            self, count: int, bus_path: str, config: Mapping,
+            journal_capacity: int = 10000, logging_level: str = 'warning'
+    ):
+        """
+        Constructor
+
+        :param count: the number of worker processes
+        :param bus_path: a path to the Unix socket of the event bus
+        :param config: the streaming_api section of the configuration
+        :param journal_capacity: the capacity of event journals of workers;
+               zero disables replays of missed events
+        :param logging_level: a name of the minimum level of logging
+               messages in workers
+        """
+        self._count = count
+        self._bus_path = bus_path
+        self._config = dict(config)
+        self._journal_capacity = journal_capacity
+        self._logging_level = logging_level
+        self._processes = []  # type: List[multiprocessing.Process]
+
+    def start(self, host: str, port: int) -> None:
+        """
+        Starts worker processes. The event bus must to be started already
+
+        :param host: a host to listen on
+        :param port: a port to listen on
+        :return: None
+        """
+        context = multiprocessing.get_context('spawn')
+
+        for number in range(self._count):
+            process = context.Process(
+                target=run_worker,
+                name='everpl-streaming-%d' % number,
+                args=(
+                    self._bus_path, host, port, self._config,
+                    self._journal_capacity, self._logging_level
+                ),
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+
+        LOGGER.info(
+            "Started %d Streaming API workers on %s:%s",
+            self._count, host, port
+        )
+
+    def stop(self, timeout: float = 10) -> None:
+        """
+        Asks all worker processes to stop and waits for them
+
+        :param timeout: the time to wait for each process, seconds; the
+               process is killed if it didn't stop in time
+        :return: None
+        """
+        for process in self._processes:
+            process.terminate()
+
+        for process in self._processes:
+            process.join(timeout)
+
+            if process.is_alive():
+                LOGGER.error("Worker %s didn't stop, killed", process.name)
+                os.kill(process.pid, signal.SIGKILL)
+                process.join()
+
+        self._processes.clear()
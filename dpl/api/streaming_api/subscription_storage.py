@@ -2,24 +2,34 @@
 This module contains a definition of SubscriptionStorage
 """
 
-from typing import Dict, Set, List, Tuple, Optional, KeysView
+from typing import Dict, Optional, KeysView
 
 from dpl.model.domain_id import TDomainId
-from dpl.events.topic import topic_to_list
+from dpl.events.topic_tree import FrozenTopicTree
 
 
 class SubscriptionStorage(object):
     """
     This object is responsible for storage of subscriptions and their
     management. Allows to add, remove and check subscriptions for the
-    specified sessions
+    specified sessions.
+
+    Subscriptions of all Sessions are indexed by a single shared
+    FrozenTopicTree. Leaves of the tree hold identifiers of subscribed
+    Sessions and the corresponding message retention flags, so a single walk
+    through the tree returns all Sessions subscribed to the specified topic.
+
+    The index is never modified in place: each change of subscriptions
+    replaces it with an updated copy. Thus lookups never observe a partially
+    applied change and routing of messages doesn't need to be synchronized
+    with subscription management of individual Sessions
     """
     def __init__(self):
         """
         Constructor. Initializes internal storage
         """
-        self._subs_tree = {}  # type: Dict[TDomainId, Dict]
-        self._plain_subs = {}  # type: Dict[TDomainId, Set[str]]
+        self._subs_tree = FrozenTopicTree()
+        self._plain_subs = {}  # type: Dict[TDomainId, Dict[str, bool]]
 
     def list_sessions(self) -> KeysView[TDomainId]:
         """
@@ -29,46 +39,36 @@ class SubscriptionStorage(object):
         """
         return self._plain_subs.keys()
 
+    def count_for(self, session_id: TDomainId) -> int:
+        """
+        Returns the number of subscriptions of the specified Session
+
+        :param session_id: an identifier of Session of interest
+        :return: the number of subscriptions
+        """
+        return len(self._plain_subs.get(session_id, ()))
+
     def add_subscription(
             self, session_id: TDomainId, topic: str, is_retained: bool = False
     ) -> None:
         """
-        Adds a new subscription for the specified Session
+        Adds a new subscription for the specified Session. Updates the message
+        retention flag if such subscription is already present
 
         :param session_id: a unique identifier of Session
         :param topic: a topic this Session is subscribed to
         :param is_retained: are messages must to be retained for this topic
         :return: None
         """
-        subs_for_session = self._plain_subs.setdefault(session_id, set())
+        subs_for_session = self._plain_subs.setdefault(session_id, dict())
 
-        if topic in subs_for_session:
+        if subs_for_session.get(topic) is is_retained:
             return
 
-        subs_for_session.add(topic)
-        topic_parts = topic_to_list(topic)
-
-        p_current = self._subs_tree.setdefault(session_id, dict())
-
-        for part in topic_parts:
-            p_current = p_current.setdefault(part, {})
-
-        p_current[None] = is_retained
-
-    @staticmethod
-    def _remove_empty_nodes(chain: List[Tuple[Dict, str]]) -> None:
-        """
-        Removes all nodes without children from the chain of nodes, starting
-        from the last node in the chain
-
-        :param chain: a list of nodes to be cleaned
-        :return: None
-        """
-        for container, value in reversed(chain):
-            sub_container = container[value]
-
-            if not sub_container:  # if sub-container is empty...
-                container.pop(value)  # ...remove container
+        subs_for_session[topic] = is_retained
+        self._subs_tree = self._subs_tree.with_added(
+            pattern=topic, key=session_id, value=is_retained
+        )
 
     def remove_subscription(self, session_id: TDomainId, topic: str) -> None:
         """
@@ -78,28 +78,18 @@ class SubscriptionStorage(object):
         :param topic: a topic for which unsubscription was requested
         :return: None
         """
-        subs_for_session = self._plain_subs.setdefault(session_id, set())
+        subs_for_session = self._plain_subs.get(session_id)
 
-        if topic not in subs_for_session:
+        if subs_for_session is None or topic not in subs_for_session:
             return
 
-        topic_parts = topic_to_list(topic)
-
-        # this list contains a chain of subscription tree nodes,
-        # will be used for backward traversal and node removal
-        chain = list()  # type: List[Tuple[Dict, str]]
-
-        p_current = self._subs_tree.setdefault(session_id, dict())
-
-        for part in topic_parts:
-            chain.append((p_current, part))
-            p_current = p_current[part]
-
-        del p_current[None]
-
-        self._remove_empty_nodes(chain=chain)
+        del subs_for_session[topic]
+        self._subs_tree = self._subs_tree.with_removed(
+            pattern=topic, key=session_id
+        )
 
-        subs_for_session.remove(topic)
+        if not subs_for_session:
+            del self._plain_subs[session_id]
 
     def remove_all_for(self, session_id: TDomainId) -> None:
         """
@@ -109,8 +99,47 @@ class SubscriptionStorage(object):
                be removed
         :return: None
         """
-        self._plain_subs.pop(session_id)
-        self._subs_tree.pop(session_id)
+        subs_for_session = self._plain_subs.pop(session_id, dict())
+        subs_tree = self._subs_tree
+
+        for topic in subs_for_session:
+            subs_tree = subs_tree.with_removed(pattern=topic, key=session_id)
+
+        self._subs_tree = subs_tree
+
+    def resolve_subscribers(self, topic: str) -> Dict[TDomainId, bool]:
+        """
+        Finds all Sessions subscribed to the specified Message topic. The cost
+        of this operation is proportional to the number of matching
+        subscriptions
+
+        :param topic: a topic of the message
+        :return: a mapping of identifiers of subscribed Sessions to
+                 message retention flags; the flag is True if message
+                 retention was activated for at least one of the matching
+                 subscriptions of the Session
+        """
+        result = {}  # type: Dict[TDomainId, bool]
+
+        for subscribers in self._subs_tree.iter_matching(topic):
+            if not result:
+                result.update(subscribers)
+                continue
+
+            for session_id, is_retained in subscribers.items():
+                result[session_id] = result.get(session_id) or is_retained
+
+        return result
+
+    def has_subscribers(self, topic: str) -> bool:
+        """
+        Checks if at least one Session is subscribed to the specified Message
+        topic
+
+        :param topic: a topic of the message
+        :return: True if there is a matching subscription, False otherwise
+        """
+        return self._subs_tree.has_matching(topic)
 
     def resolve_subscription_params(
             self, session_id: TDomainId, topic: str
@@ -126,23 +155,18 @@ class SubscriptionStorage(object):
                  message retention was activated for this topic,
                  False otherwise
         """
-        topic_parts = topic_to_list(topic)
-        session_subs = self._subs_tree.get(session_id)
+        result = None
+
+        for subscribers in self._subs_tree.iter_matching(topic):
+            is_retained = subscribers.get(session_id)
 
-        p_current = session_subs
+            if is_retained:
+                return True
 
-        for part in topic_parts:
-            if part in p_current:
-                p_current = p_current[part]
-            elif '+' in p_current:
-                p_current = p_current['+']
-            elif '#' in p_current:
-                p_current = p_current['#']
-                break
-            else:
-                return None
+            if is_retained is not None:
+                result = False
 
-        return p_current[None]
+        return result
 
     def is_subscribed(self, session_id: TDomainId, topic: str) -> bool:
         """
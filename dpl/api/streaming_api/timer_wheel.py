@@ -0,0 +1,392 @@
+"""
+This module contains a definition of TimerWheel - of a hierarchical timing
+wheel which drives a large number of timers (retransmission deadlines,
+heartbeats, authentication timeouts) with a single EventLoop callback
+"""
+import asyncio
+import logging
+import math
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TimerHandle(object):
+    """
+    TimerHandle is an object returned by TimerWheel scheduling methods.
+    Allows to cancel the scheduled call
+    """
+    __slots__ = (
+        '_wheel', '_when', '_tick', '_callback', '_args', '_bucket',
+        '_cancelled'
+    )
+
+    def __init__(
+            self, wheel: 'TimerWheel', when: float, tick: int,
+            callback: Callable[..., Any], args: Tuple
+    ):
+        """
+        Constructor. Saves the scheduled call
+
+        :param wheel: a TimerWheel this handle belongs to
+        :param when: the time the callback is scheduled to, in terms of
+               the EventLoop time
+        :param tick: the number of the wheel tick the callback will be
+               called on
+        :param callback: a callable to be called
+        :param args: positional arguments to be passed to the callback
+        """
+        self._wheel = wheel
+        self._when = when
+        self._tick = tick
+        self._callback = callback
+        self._args = args
+        self._bucket = None  # type: Optional[Set[TimerHandle]]
+        self._cancelled = False
+
+    @property
+    def when(self) -> float:
+        """
+        Returns the time the callback is scheduled to
+
+        :return: the scheduled time in terms of the EventLoop time
+        """
+        return self._when
+
+    def cancelled(self) -> bool:
+        """
+        Checks if the call was cancelled
+
+        :return: True if the call was cancelled, False otherwise
+        """
+        return self._cancelled
+
+    def cancel(self) -> None:
+        """
+        Cancels the scheduled call. Does nothing if the callback was already
+        called or cancelled. Takes a constant time
+
+        :return: None
+        """
+        if self._cancelled:
+            return
+
+        self._cancelled = True
+
+        if self._bucket is not None:
+            self._bucket.discard(self)
+            self._bucket = None
+            self._wheel._count -= 1
+
+        # release references to the callback and its arguments
+        self._callback = None
+        self._args = None
+
+
+class TimerWheel(object):
+    """
+    TimerWheel is a hierarchical timing wheel. Time is divided into ticks of
+    a fixed resolution; each level of the wheel contains a fixed number of
+    slots and each slot of the next level covers all the slots of the
+    previous one. Timers are placed into slots according to their deadlines,
+    and get moved to lower levels when their time is close enough.
+
+    Insertion and cancellation of timers take a constant time. The wheel
+    itself is driven by a single EventLoop callback that is scheduled only
+    while there are any pending timers.
+
+    Callbacks are called with an accuracy of a single tick, on the first tick
+    following their deadlines. Callbacks due on the same tick are called in
+    an arbitrary order
+    """
+    def __init__(
+            self, resolution: float = 0.1, slots_per_level: int = 256,
+            levels: int = 4, loop: asyncio.AbstractEventLoop = None
+    ):
+        """
+        Constructor. Initializes an empty wheel
+
+        :param resolution: the duration of a single tick, seconds
+        :param slots_per_level: the number of slots on each level
+        :param levels: the number of levels of the wheel
+        :param loop: an instance of EventLoop to be used
+        """
+        if loop is None:
+            loop = asyncio.get_event_loop()
+
+        self._loop = loop
+        self._resolution = resolution
+        self._slots_per_level = slots_per_level
+
+        # type: List[List[Set[TimerHandle]]]
+        self._levels = [
+            [set() for _ in range(slots_per_level)] for _ in range(levels)
+        ]
+
+        self._origin = loop.time()
+        self._current_tick = 0
+        self._count = 0
+        self._driver = None  # type: Optional[asyncio.Handle]
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Returns an EventLoop this wheel is bound to
+
+        :return: an instance of EventLoop
+        """
+        return self._loop
+
+    @property
+    def resolution(self) -> float:
+        """
+        Returns the duration of a single tick
+
+        :return: the duration of a tick, seconds
+        """
+        return self._resolution
+
+    def __len__(self) -> int:
+        """
+        Returns the number of pending timers
+
+        :return: the number of pending timers
+        """
+        return self._count
+
+    def time(self) -> float:
+        """
+        Returns the current time according to the EventLoop clock
+
+        :return: the current EventLoop time
+        """
+        return self._loop.time()
+
+    def call_later(
+            self, delay: float, callback: Callable[..., Any], *args
+    ) -> TimerHandle:
+        """
+        Schedules the callback to be called after the specified delay
+
+        :param delay: a delay in seconds
+        :param callback: a callable to be called
+        :param args: positional arguments to be passed to the callback
+        :return: a handle of the scheduled call
+        """
+        return self.call_at(self._loop.time() + delay, callback, *args)
+
+    def call_at(
+            self, when: float, callback: Callable[..., Any], *args
+    ) -> TimerHandle:
+        """
+        Schedules the callback to be called at the specified time
+
+        :param when: the time in terms of the EventLoop time
+        :param callback: a callable to be called
+        :param args: positional arguments to be passed to the callback
+        :return: a handle of the scheduled call
+        """
+        if not self._count:
+            # the wheel was idle, so its clock must to be synchronized
+            self._sync_current_tick()
+
+        tick = max(
+            int(math.ceil((when - self._origin) / self._resolution)),
+            self._current_tick + 1
+        )
+
+        handle = TimerHandle(
+            wheel=self, when=when, tick=tick, callback=callback, args=args
+        )
+        self._insert(handle)
+        self._count += 1
+
+        self._ensure_driver()
+
+        return handle
+
+    async def wait_for(self, fut, timeout: float):
+        """
+        Waits for the specified future or coroutine to complete with a
+        timeout. An equivalent of asyncio.wait_for which uses this wheel
+        instead of a separate EventLoop timer
+
+        :param fut: a future or coroutine to be awaited
+        :param timeout: a timeout in seconds
+        :return: the result of the future
+        :raises asyncio.TimeoutError: if the timeout expired; the future
+                is cancelled in this case
+        """
+        fut = asyncio.ensure_future(fut, loop=self._loop)
+        expired = []
+
+        def _on_timeout():
+            expired.append(True)
+            fut.cancel()
+
+        handle = self.call_later(timeout, _on_timeout)
+
+        try:
+            return await fut
+        except asyncio.CancelledError:
+            if expired:
+                raise asyncio.TimeoutError()
+
+            raise
+        finally:
+            handle.cancel()
+
+    def close(self) -> None:
+        """
+        Cancels all pending timers and stops the wheel
+
+        :return: None
+        """
+        if self._driver is not None:
+            self._driver.cancel()
+            self._driver = None
+
+        for level in self._levels:
+            for bucket in level:
+                for handle in tuple(bucket):
+                    handle.cancel()
+
+        assert self._count == 0
+
+    def _tick_time(self, tick: int) -> float:
+        """
+        Returns the EventLoop time of the specified tick
+
+        :param tick: the number of a tick
+        :return: the corresponding EventLoop time
+        """
+        return self._origin + tick * self._resolution
+
+    def _sync_current_tick(self) -> None:
+        """
+        Moves the current tick of an empty wheel to the current time
+
+        :return: None
+        """
+        assert not self._count
+
+        # a driver may be still scheduled to the old tick
+        if self._driver is not None:
+            self._driver.cancel()
+            self._driver = None
+
+        elapsed = self._loop.time() - self._origin
+        self._current_tick = max(
+            self._current_tick, int(elapsed // self._resolution)
+        )
+
+    def _insert(self, handle: TimerHandle) -> None:
+        """
+        Places the timer into the corresponding slot of the wheel
+
+        :param handle: a timer to be placed
+        :return: None
+        """
+        slots_per_level = self._slots_per_level
+        last_level = len(self._levels) - 1
+        delta = handle._tick - self._current_tick
+
+        level = 0
+        span = 1
+
+        while level < last_level and delta >= span * slots_per_level:
+            level += 1
+            span *= slots_per_level
+
+        bucket = self._levels[level][(handle._tick // span) % slots_per_level]
+        bucket.add(handle)
+        handle._bucket = bucket
+
+    def _advance(self) -> None:
+        """
+        Moves the wheel one tick forward, moves timers from the higher levels
+        to the lower ones and calls all the callbacks due on the new tick
+
+        :return: None
+        """
+        self._current_tick += 1
+        tick = self._current_tick
+        slots_per_level = self._slots_per_level
+
+        # find all levels whose slot boundary is reached on this tick
+        boundaries = []  # type: List[Tuple[int, int]]
+        level = 1
+        span = slots_per_level
+
+        while level < len(self._levels) and tick % span == 0:
+            boundaries.append((level, span))
+            level += 1
+            span *= slots_per_level
+
+        # cascade timers down, starting from the highest level
+        for level, span in reversed(boundaries):
+            index = (tick // span) % slots_per_level
+            bucket = self._levels[level][index]
+
+            if bucket:
+                self._levels[level][index] = set()
+
+                for handle in bucket:
+                    self._insert(handle)
+
+        index = tick % slots_per_level
+        bucket = self._levels[0][index]
+
+        if not bucket:
+            return
+
+        self._levels[0][index] = set()
+
+        # callbacks are allowed to cancel other timers from the same bucket
+        for handle in tuple(bucket):
+            if handle._cancelled:
+                continue
+
+            handle._bucket = None
+            self._count -= 1
+
+            callback, args = handle._callback, handle._args
+            handle._callback = handle._args = None
+
+            try:
+                callback(*args)
+            except Exception as e:
+                LOGGER.exception(
+                    "Unhandled exception in a timer callback %s: %s",
+                    callback, e
+                )
+
+    def _ensure_driver(self) -> None:
+        """
+        Schedules the next tick of the wheel if there are any pending timers
+
+        :return: None
+        """
+        if self._driver is None and self._count:
+            self._driver = self._loop.call_at(
+                self._tick_time(self._current_tick + 1), self._on_tick
+            )
+
+    def _on_tick(self) -> None:
+        """
+        An EventLoop callback. Processes all the ticks that are already due
+
+        :return: None
+        """
+        self._driver = None
+
+        # this callback is scheduled exactly to the next tick
+        self._advance()
+
+        now = self._loop.time()
+
+        while self._count and self._tick_time(self._current_tick + 1) <= now:
+            self._advance()
+
+        self._ensure_driver()
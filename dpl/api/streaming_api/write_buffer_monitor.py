@@ -0,0 +1,141 @@
+"""
+This module contains a definition of WriteBufferMonitor - of a watcher of
+the outgoing buffer of a WebSocket connection - and of LaggingPolicy
+"""
+import asyncio
+from enum import Enum
+from typing import Optional
+
+from .timer_wheel import TimerWheel, TimerHandle
+
+
+class LaggingPolicy(Enum):
+    """
+    An enumeration of actions to be performed when the outgoing buffer of
+    a connection stays above the high water mark for too long
+    """
+    # only the last pending message is kept for each topic until the buffer
+    # will be drained
+    conflate = 'conflate'
+
+    # the connection is closed
+    disconnect = 'disconnect'
+
+
+class WriteBufferMonitor(object):
+    """
+    WriteBufferMonitor watches the size of data buffered by a transport of
+    a connection and not sent yet. The buffer grows if the client (or its
+    network link) can't receive data as fast as it's sent.
+
+    The transport is owned by aiohttp, so the monitor can't receive
+    pause_writing and resume_writing notifications of the transport.
+    Instead, the size of the buffer is checked on each tick of the shared
+    TimerWheel while the monitor waits for the buffer to be drained
+    """
+    __slots__ = ('_transport', '_wheel', '_high_water_mark', '_low_water_mark')
+
+    def __init__(
+            self, transport: asyncio.WriteTransport, timer_wheel: TimerWheel,
+            high_water_mark: int, low_water_mark: int = None
+    ):
+        """
+        Constructor. Applies water marks to the transport
+
+        :param transport: a transport of the connection
+        :param timer_wheel: a TimerWheel to be used for scheduling of checks
+        :param high_water_mark: the size of the buffer above which the
+               sending must to be paused, bytes
+        :param low_water_mark: the size of the buffer at which the sending
+               may be resumed, bytes; a quarter of the high water mark if
+               not specified
+        """
+        if low_water_mark is None:
+            low_water_mark = high_water_mark // 4
+
+        self._transport = transport
+        self._wheel = timer_wheel
+        self._high_water_mark = high_water_mark
+        self._low_water_mark = low_water_mark
+
+        transport.set_write_buffer_limits(
+            high=high_water_mark, low=low_water_mark
+        )
+
+    @property
+    def high_water_mark(self) -> int:
+        """
+        Returns the size of the buffer above which the sending must to be
+        paused
+
+        :return: the high water mark, bytes
+        """
+        return self._high_water_mark
+
+    @property
+    def low_water_mark(self) -> int:
+        """
+        Returns the size of the buffer at which the sending may be resumed
+
+        :return: the low water mark, bytes
+        """
+        return self._low_water_mark
+
+    def get_buffer_size(self) -> int:
+        """
+        Returns the current size of the outgoing buffer
+
+        :return: the number of buffered bytes; zero if the transport is
+                 already closed
+        """
+        transport = self._transport
+
+        if transport.is_closing():
+            return 0
+
+        return transport.get_write_buffer_size()
+
+    def is_above_high_water_mark(self) -> bool:
+        """
+        Checks if the sending must to be paused
+
+        :return: True if the buffer is above the high water mark
+        """
+        return self.get_buffer_size() > self._high_water_mark
+
+    async def wait_drained(self, timeout: float = None) -> bool:
+        """
+        Waits until the size of the buffer drops to the low water mark or
+        until the transport will be closed
+
+        :param timeout: the maximum time to wait, seconds; waits forever
+               if not specified
+        :return: True if the buffer was drained, False if the timeout
+                 elapsed first
+        """
+        wheel = self._wheel
+        drained = wheel.loop.create_future()
+        deadline = None if timeout is None else wheel.time() + timeout
+        handle = None  # type: Optional[TimerHandle]
+
+        def _check():
+            nonlocal handle
+            handle = None
+
+            if drained.done():
+                return
+
+            if self.get_buffer_size() <= self._low_water_mark:
+                drained.set_result(True)
+            elif deadline is not None and wheel.time() >= deadline:
+                drained.set_result(False)
+            else:
+                handle = wheel.call_later(wheel.resolution, _check)
+
+        _check()
+
+        try:
+            return await drained
+        finally:
+            if handle is not None:
+                handle.cancel()
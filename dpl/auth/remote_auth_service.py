@@ -0,0 +1,49 @@
+"""
+This module contains a definition of RemoteAuthService - of an AuthService
+used by worker processes which validates access tokens against the session
+store of the core process over the event bus
+"""
+from dpl.dtos.session_dto import SessionDto
+from dpl.events.event_bus import EventBusClient, EventBusError
+from dpl.services.service_exceptions import ServiceEntityResolutionError
+
+from .abs_auth_service import AbsAuthService
+
+
+class RemoteAuthService(AbsAuthService):
+    """
+    A partial implementation of the AbsAuthService interface which forwards
+    requests to the AuthService of the core process. Only viewing of the
+    current Session is supported.
+
+    WARNING: Methods of this service are coroutines
+    """
+    # a name of the bus method which is handled by the core process
+    VIEW_CURRENT_SESSION = 'view_current_session'
+
+    def __init__(self, bus_client: EventBusClient):
+        """
+        Constructor
+
+        :param bus_client: a connected client of the event bus
+        """
+        self._bus_client = bus_client
+
+    async def view_current_session(self, access_token: str) -> SessionDto:
+        """
+        Allows to view information about the current Session
+        which is associated with the specified access token
+
+        :param access_token: an access token which is associated
+               with the current Session
+        :return: information about a current opened Session in
+                 a form of a DTO
+        :raises ServiceEntityResolutionError: if there is no Session
+                associated with the access token
+        """
+        try:
+            return await self._bus_client.request(
+                self.VIEW_CURRENT_SESSION, access_token=access_token
+            )
+        except EventBusError:
+            raise ServiceEntityResolutionError()
@@ -0,0 +1,5 @@
+"""
+This package contains benchmarks of everpl subsystems. Each benchmark is a
+module that can be started directly, like:
+``python -m dpl.bench.fan_out``
+"""
@@ -0,0 +1,139 @@
+"""
+This module contains a benchmark of acknowledgements of retained messages.
+It retains a burst of messages for a single Session and acknowledges all of
+them with one delivery_ack per message, with a single cumulative
+acknowledgement and with ranges. Reports the number of acknowledgement
+messages and the time spent on handling of them for both retained message
+stores.
+
+Usage: ``python -m dpl.bench.acks [--messages 500]``
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+from dpl.api.streaming_api.delivery_manager import DeliveryManager
+from dpl.api.streaming_api.message import Message
+from dpl.api.streaming_api.retained_store import (
+    InMemoryRetainedStore, SqliteRetainedStore
+)
+from dpl.api.streaming_api.timer_wheel import TimerWheel
+from .common import SAMPLE_THING_DTO
+
+
+SESSION_ID = 'bench'
+TOPIC = 'things/L1/modified'
+
+# a number of identifiers in each range for the 'ranges' mode; every
+# eleventh message is left unacknowledged to produce gaps between ranges
+RANGE_LENGTH = 10
+
+
+async def _ack(manager: DeliveryManager, mode: str, ids: list) -> int:
+    """
+    Acknowledges all the specified messages in the specified mode
+
+    :param manager: an instance of DeliveryManager
+    :param mode: 'single', 'up_to' or 'ranges'
+    :param ids: identifiers of retained messages in order of their sending
+    :return: the number of acknowledgement messages used
+    """
+    if mode == 'single':
+        for message_id in ids:
+            await manager.ack_delivery(SESSION_ID, message_id)
+
+        return len(ids)
+
+    if mode == 'up_to':
+        await manager.ack_delivery_ranges(SESSION_ID, up_to=ids[-1])
+        return 1
+
+    step = RANGE_LENGTH + 1
+    ranges = [
+        (ids[i], ids[min(i + RANGE_LENGTH, len(ids)) - 1])
+        for i in range(0, len(ids), step)
+    ]
+    await manager.ack_delivery_ranges(SESSION_ID, ranges=ranges)
+
+    return 1
+
+
+async def measure(store_factory, mode: str, messages: int) -> tuple:
+    """
+    Retains messages and acknowledges them
+
+    :param store_factory: a callable that creates a retained message store
+    :param mode: 'single', 'up_to' or 'ranges'
+    :param messages: the number of messages to be retained
+    :return: a tuple with the number of acknowledgement messages and the
+             time spent on acknowledgements, milliseconds
+    """
+    wheel = TimerWheel()
+    manager = DeliveryManager(
+        timer_wheel=wheel, retained_store=store_factory()
+    )
+    await manager.resume_for(SESSION_ID)
+
+    ids = []
+
+    for _ in range(messages):
+        message = Message(
+            timestamp=time.time(), type_="data", topic=TOPIC,
+            body=SAMPLE_THING_DTO
+        )
+        await manager.put_message(SESSION_ID, message, ensure_delivery=True)
+        ids.append(message.message_id)
+
+    started = time.perf_counter()
+    acks = await _ack(manager, mode, ids)
+    elapsed = time.perf_counter() - started
+
+    manager.close()
+    wheel.close()
+
+    return acks, elapsed * 1000
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Streaming API delivery acknowledgements benchmark"
+    )
+    arg_parser.add_argument(
+        '--messages', type=int, default=500, dest='messages',
+        help='a number of retained messages to be acknowledged'
+    )
+    args = arg_parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    counter = [0]
+
+    def _sqlite_store():
+        counter[0] += 1
+        return SqliteRetainedStore(
+            os.path.join(temp_dir, 'retained_%d.sqlite' % counter[0])
+        )
+
+    stores = (('memory', InMemoryRetainedStore), ('sqlite', _sqlite_store))
+    loop = asyncio.get_event_loop()
+
+    print("%8s %8s %8s %12s" % ("store", "mode", "acks", "time, ms"))
+
+    try:
+        for store_name, store_factory in stores:
+            for mode in ('single', 'up_to', 'ranges'):
+                acks, elapsed = loop.run_until_complete(
+                    measure(store_factory, mode, args.messages)
+                )
+
+                print("%8s %8s %8d %12.2f" % (
+                    store_name, mode, acks, elapsed
+                ))
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+This module contains a benchmark of batching of outgoing Streaming API
+messages. It simulates a storm of events and sends all of them through a
+local socket with one message per frame and with multi-message frames,
+and reports the number of frames, throughput and delivery latency.
+
+Usage: ``python -m dpl.bench.batching [--messages 20000]``
+"""
+import argparse
+import asyncio
+import socket
+import struct
+import time
+
+from dpl.api.streaming_api.message import Message
+from dpl.api.streaming_api.message_json import (
+    message_to_text, messages_to_text
+)
+from dpl.api.streaming_api.pending_queue import PendingQueue
+from dpl.api.streaming_api.prepared_frame import PreparedFrame
+from .common import SAMPLE_THING_DTO
+
+
+TOPIC = 'things/L1/modified'
+
+
+async def _drain(reader: asyncio.StreamReader) -> int:
+    """
+    Reads everything from the reader until EOF
+
+    :param reader: a reader to be drained
+    :return: the number of received bytes
+    """
+    received = 0
+
+    while True:
+        chunk = await reader.read(65536)
+
+        if not chunk:
+            return received
+
+        received += len(chunk)
+
+
+async def _produce(
+        queue: PendingQueue, messages: int, burst_size: int
+) -> None:
+    """
+    Puts messages into the queue by bursts, yielding control between bursts
+
+    :param queue: a queue of pending messages
+    :param messages: the total number of messages
+    :param burst_size: the number of messages in a burst
+    :return: None
+    """
+    loop = asyncio.get_event_loop()
+
+    for i in range(messages):
+        frame = PreparedFrame(
+            timestamp=time.time(), type_="data", topic=TOPIC,
+            body=SAMPLE_THING_DTO
+        )
+        # the loop time of creation is saved as a timestamp of the message
+        queue.put_nowait(Message(
+            timestamp=loop.time(), type_="data", topic=TOPIC,
+            body=SAMPLE_THING_DTO, frame=frame
+        ))
+
+        if (i + 1) % burst_size == 0:
+            await asyncio.sleep(0)
+
+
+async def run(
+        messages: int, burst_size: int, max_count: int,
+        flush_interval: float
+) -> tuple:
+    """
+    Sends the specified number of messages through a local socket
+
+    :param messages: the total number of messages
+    :param burst_size: the number of messages generated at once
+    :param max_count: the maximum number of messages in a frame; 1 means
+           no batching
+    :param flush_interval: a flush interval of batching, seconds
+    :return: a tuple with the number of sent frames, the number of sent
+             bytes, elapsed time and a sorted list of latencies (seconds)
+    """
+    loop = asyncio.get_event_loop()
+    server_sock, client_sock = socket.socketpair()
+    reader, client_writer = await asyncio.open_connection(sock=client_sock)
+    _, writer = await asyncio.open_connection(sock=server_sock)
+
+    drainer = asyncio.ensure_future(_drain(reader))
+    queue = PendingQueue()
+    latencies = []
+    frames = 0
+
+    started = loop.time()
+    producer = asyncio.ensure_future(_produce(queue, messages, burst_size))
+
+    while len(latencies) < messages:
+        batch = await queue.get_batch(
+            max_count=max_count, flush_interval=flush_interval
+        )
+
+        if max_count > 1:
+            texts = (messages_to_text(batch),)
+        else:
+            texts = (message_to_text(m) for m in batch)
+
+        for text in texts:
+            data = text.encode()
+            # a WebSocket-like length prefix of a frame
+            writer.write(struct.pack('!BQ', 0x81, len(data)) + data)
+            frames += 1
+            await writer.drain()
+
+        now = loop.time()
+        latencies.extend(now - m.timestamp for m in batch)
+
+    elapsed = loop.time() - started
+
+    await producer
+    writer.close()
+    sent_bytes = await drainer
+    client_writer.close()
+    latencies.sort()
+
+    return frames, sent_bytes, elapsed, latencies
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Streaming API message batching benchmark"
+    )
+    arg_parser.add_argument(
+        '--messages', type=int, default=20000, dest='messages',
+        help='the total number of messages to be sent'
+    )
+    arg_parser.add_argument(
+        '--burst-size', type=int, default=200, dest='burst_size',
+        help='the number of messages generated at once'
+    )
+    arg_parser.add_argument(
+        '--flush-interval', type=float, default=5.0, dest='flush_interval',
+        help='a flush interval of batching, milliseconds'
+    )
+    args = arg_parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    print("%14s %8s %10s %12s %12s %12s" % (
+        "frame size", "frames", "MiB", "msg/s", "mean, ms", "p99, ms"
+    ))
+
+    try:
+        for max_count in (1, 10, 100):
+            frames, sent_bytes, elapsed, latencies = loop.run_until_complete(
+                run(
+                    messages=args.messages, burst_size=args.burst_size,
+                    max_count=max_count,
+                    flush_interval=args.flush_interval / 1000
+                )
+            )
+
+            print("%14s %8d %10.1f %12.0f %12.2f %12.2f" % (
+                "%d msg max" % max_count, frames, sent_bytes / 2 ** 20,
+                args.messages / elapsed,
+                sum(latencies) / len(latencies) * 1e3,
+                latencies[int(len(latencies) * 0.99)] * 1e3
+            ))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+if __name__ == '__main__':
+    main()
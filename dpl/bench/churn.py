@@ -0,0 +1,362 @@
+"""
+This module contains a benchmark of subscription churn in Streaming API.
+A set of Sessions subscribed to all Thing modifications receives a steady
+flow of events while other Sessions subscribe, unsubscribe and reconnect in
+a tight loop. Reports the fan-out latency of events and the latency of
+churn operations for:
+
+- idle: no churn at all, a baseline;
+- locks: the former behaviour, a mutable subscription tree and global locks
+  for subscriptions and for registration of connections;
+- actors: an immutable subscription index and per-session actors.
+
+Closing of a WebSocket connection is simulated with a sleep of the
+specified duration; the former behaviour awaited it under the global lock.
+
+Usage: ``python -m dpl.bench.churn [--sessions 1000] [--churners 100]``
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+from dpl.api.streaming_api.delivery_manager import DeliveryManager
+from dpl.api.streaming_api.message import Message
+from dpl.api.streaming_api.message_utils import build_message
+from dpl.api.streaming_api.session_actor import SessionActor
+from dpl.api.streaming_api.subscription_storage import SubscriptionStorage
+from dpl.api.streaming_api.timer_wheel import TimerWheel
+from dpl.events.topic_tree import TopicTree
+from .common import SAMPLE_THING_DTO
+
+
+FAN_OUT_TOPIC = 'things/+/modified'
+EVENT_TOPIC = 'things/L1/modified'
+
+# each churning Session reconnects after this number of subscriptions
+RECONNECT_EVERY = 10
+
+
+class MutableSubscriptionStorage(SubscriptionStorage):
+    """
+    The former SubscriptionStorage which updated a shared TopicTree in place
+    """
+    def __init__(self):
+        super().__init__()
+        self._subs_tree = TopicTree()
+
+    def add_subscription(
+            self, session_id, topic: str, is_retained: bool = False
+    ) -> None:
+        self._plain_subs.setdefault(session_id, dict())[topic] = is_retained
+        self._subs_tree.add(pattern=topic, key=session_id, value=is_retained)
+
+    def remove_subscription(self, session_id, topic: str) -> None:
+        subs_for_session = self._plain_subs.get(session_id)
+
+        if subs_for_session is None or topic not in subs_for_session:
+            return
+
+        del subs_for_session[topic]
+        self._subs_tree.remove(pattern=topic, key=session_id)
+
+        if not subs_for_session:
+            del self._plain_subs[session_id]
+
+
+class BaseModel(object):
+    """
+    Common parts of both models: routing of events and acknowledgements of
+    subscription requests
+    """
+    def __init__(self, storage: SubscriptionStorage, close_delay: float):
+        self.storage = storage
+        self.manager = DeliveryManager(
+            timer_wheel=TimerWheel(), max_pending_messages=100
+        )
+        self.close_delay = close_delay
+
+    def close(self) -> None:
+        self.manager.close()
+
+    async def route(self, message: Message) -> int:
+        """
+        Puts the message to queues of all subscribed Sessions, the same way
+        as StreamingApiProvider does it
+
+        :param message: a message to be routed
+        :return: the number of subscribed Sessions
+        """
+        subscribers = self.storage.resolve_subscribers(message.topic)
+
+        for session_id, is_retained in subscribers.items():
+            await self.manager.put_message(
+                session_id=session_id, message=message,
+                ensure_delivery=is_retained
+            )
+
+        return len(subscribers)
+
+    async def _subscribe(self, session_id: str, topic: str) -> None:
+        self.storage.add_subscription(session_id, topic)
+        await self.manager.put_message(
+            session_id, build_message(
+                type_="control", topic="subscribe_ack",
+                body={"target_topic": topic}
+            )
+        )
+
+    async def _unsubscribe(self, session_id: str, topic: str) -> None:
+        self.storage.remove_subscription(session_id, topic)
+        await self.manager.put_message(
+            session_id, build_message(
+                type_="control", topic="unsubscribe_ack",
+                body={"target_topic": topic}
+            )
+        )
+
+    async def _close(self, session_id: str) -> None:
+        await self.manager.pause_for(session_id)
+        await asyncio.sleep(self.close_delay)
+
+
+class LockedModel(BaseModel):
+    """
+    The former behaviour: all changes are serialized by global locks
+    """
+    def __init__(self, close_delay: float):
+        super().__init__(MutableSubscriptionStorage(), close_delay)
+        self._subs_lock = asyncio.Lock()
+        self._sessions_lock = asyncio.Lock()
+
+    async def subscribe(self, session_id: str, topic: str) -> None:
+        async with self._subs_lock:
+            await self._subscribe(session_id, topic)
+
+    async def unsubscribe(self, session_id: str, topic: str) -> None:
+        async with self._subs_lock:
+            await self._unsubscribe(session_id, topic)
+
+    async def reconnect(self, session_id: str) -> None:
+        async with self._sessions_lock:
+            await self._close(session_id)
+
+        async with self._sessions_lock:
+            await self.manager.resume_for(session_id)
+
+
+class ActorModel(BaseModel):
+    """
+    The current behaviour: changes are executed by actors of Sessions
+    """
+    def __init__(self, close_delay: float):
+        super().__init__(SubscriptionStorage(), close_delay)
+        self._actors = {}  # type: Dict[str, SessionActor]
+
+    def _get_actor(self, session_id: str) -> SessionActor:
+        actor = self._actors.get(session_id)
+
+        if actor is None:
+            actor = SessionActor(session_id, on_idle=self._on_actor_idle)
+            self._actors[session_id] = actor
+
+        return actor
+
+    def _on_actor_idle(self, actor: SessionActor) -> None:
+        if self._actors.get(actor.session_id) is actor:
+            del self._actors[actor.session_id]
+
+    async def subscribe(self, session_id: str, topic: str) -> None:
+        await self._get_actor(session_id).call(
+            self._subscribe, session_id, topic
+        )
+
+    async def unsubscribe(self, session_id: str, topic: str) -> None:
+        await self._get_actor(session_id).call(
+            self._unsubscribe, session_id, topic
+        )
+
+    async def reconnect(self, session_id: str) -> None:
+        await self._get_actor(session_id).call(self._close, session_id)
+        await self._get_actor(session_id).call(
+            self.manager.resume_for, session_id
+        )
+
+
+async def churn(
+        model: BaseModel, session_id: str, topic: str, rate: float,
+        deadline: float, latencies: List[float]
+) -> None:
+    """
+    Subscribes, unsubscribes and reconnects the Session until the deadline.
+    A new cycle is not started until the previous one is finished, so the
+    resulting rate may be lower than the specified one
+
+    :param model: a model to be used
+    :param session_id: an identifier of a churning Session
+    :param topic: a topic to be subscribed to
+    :param rate: a number of subscribe-unsubscribe cycles per second
+    :param deadline: the time to stop at, by time.perf_counter
+    :param latencies: a list to save the latency of each operation to
+    :return: None
+    """
+    interval = 1.0 / rate
+    planned = time.perf_counter()
+    iteration = 0
+
+    while planned < deadline:
+        await asyncio.sleep(max(0.0, planned - time.perf_counter()))
+        planned += interval
+        iteration += 1
+        started = time.perf_counter()
+        await model.subscribe(session_id, topic)
+        subscribed = time.perf_counter()
+        await model.unsubscribe(session_id, topic)
+        unsubscribed = time.perf_counter()
+        latencies.extend((subscribed - started, unsubscribed - subscribed))
+
+        if iteration % RECONNECT_EVERY == 0:
+            await model.reconnect(session_id)
+            latencies.append(time.perf_counter() - unsubscribed)
+
+
+async def fan_out(
+        model: BaseModel, rate: float, deadline: float,
+        latencies: List[float]
+) -> None:
+    """
+    Routes events at the specified rate until the deadline. The latency
+    of an event is counted from the moment it had to be emitted, so delays
+    of the event loop are included
+
+    :param model: a model to be used
+    :param rate: a number of events per second
+    :param deadline: the time to stop at, by time.perf_counter
+    :param latencies: a list to save the latency of each event to
+    :return: None
+    """
+    interval = 1.0 / rate
+    planned = time.perf_counter()
+
+    while planned < deadline:
+        await asyncio.sleep(max(0.0, planned - time.perf_counter()))
+        message = Message(
+            timestamp=time.time(), type_="data", topic=EVENT_TOPIC,
+            body=SAMPLE_THING_DTO
+        )
+        await model.route(message)
+        latencies.append(time.perf_counter() - planned)
+        planned += interval
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Returns the specified percentile of values
+
+    :param values: a list of values
+    :param fraction: a percentile as a fraction of one
+    :return: the percentile; zero for an empty list
+    """
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run(mode: str, args) -> tuple:
+    """
+    Runs a single measurement
+
+    :param mode: 'idle', 'locks' or 'actors'
+    :param args: parsed command line arguments
+    :return: a tuple of fan-out latencies and churn latencies
+    """
+    close_delay = args.close_delay / 1000
+
+    if mode == 'locks':
+        model = LockedModel(close_delay)  # type: BaseModel
+    else:
+        model = ActorModel(close_delay)
+
+    for i in range(args.sessions):
+        session_id = 'S%d' % i
+        model.storage.add_subscription(session_id, FAN_OUT_TOPIC)
+        await model.manager.resume_for(session_id)
+
+    fan_out_latencies = []  # type: List[float]
+    churn_latencies = []  # type: List[float]
+    deadline = time.perf_counter() + args.duration
+    tasks = [fan_out(model, args.rate, deadline, fan_out_latencies)]
+
+    if mode != 'idle':
+        for i in range(args.churners):
+            tasks.append(churn(
+                model, 'C%d' % i, 'things/T%d/#' % i, args.churn_rate,
+                deadline, churn_latencies
+            ))
+
+    await asyncio.gather(*tasks)
+    model.close()
+
+    return fan_out_latencies, churn_latencies
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Streaming API subscription churn benchmark"
+    )
+    arg_parser.add_argument(
+        '--sessions', type=int, default=1000, dest='sessions',
+        help='a number of Sessions receiving events'
+    )
+    arg_parser.add_argument(
+        '--churners', type=int, default=100, dest='churners',
+        help='a number of Sessions subscribing and unsubscribing in a loop'
+    )
+    arg_parser.add_argument(
+        '--rate', type=float, default=50, dest='rate',
+        help='a number of routed events per second'
+    )
+    arg_parser.add_argument(
+        '--churn-rate', type=float, default=20, dest='churn_rate',
+        help='a number of subscribe-unsubscribe cycles per second for each '
+             'churning Session'
+    )
+    arg_parser.add_argument(
+        '--close-delay', type=float, default=5, dest='close_delay',
+        help='a simulated duration of closing of a connection, ms'
+    )
+    arg_parser.add_argument(
+        '--duration', type=float, default=5, dest='duration',
+        help='a duration of each measurement, seconds'
+    )
+    args = arg_parser.parse_args()
+
+    print("sessions: %d, churners: %d, rate: %.0f evt/s" % (
+        args.sessions, args.churners, args.rate
+    ))
+    print("%8s %16s %16s %12s %14s %14s" % (
+        "mode", "fan-out p50, ms", "fan-out p99, ms", "churn ops/s",
+        "churn p50, ms", "churn p99, ms"
+    ))
+
+    loop = asyncio.get_event_loop()
+
+    for mode in ('idle', 'locks', 'actors'):
+        fan_out_latencies, churn_latencies = loop.run_until_complete(
+            run(mode, args)
+        )
+
+        print("%8s %16.2f %16.2f %12.0f %14.2f %14.2f" % (
+            mode,
+            percentile(fan_out_latencies, 0.5) * 1000,
+            percentile(fan_out_latencies, 0.99) * 1000,
+            len(churn_latencies) / args.duration,
+            percentile(churn_latencies, 0.5) * 1000,
+            percentile(churn_latencies, 0.99) * 1000
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+This module contains a benchmark of Streaming API message codecs. It
+compares the size of frames and CPU time spent on encoding and decoding
+of typical ThingDto updates with JSON and MessagePack encodings.
+
+Usage: ``python -m dpl.bench.codecs [--repeat 20000]``
+"""
+import argparse
+
+from dpl.api.streaming_api.message import Message
+from dpl.api.streaming_api.message_codecs import create_codec
+from dpl.api.streaming_api.prepared_frame import PreparedFrame
+from .common import SAMPLE_THING_DTO, measure_cpu
+
+
+TOPIC = 'things/L1/modified'
+TIMESTAMP = 1517232368.30256
+
+
+def _build_message(frame: PreparedFrame) -> Message:
+    return Message(
+        timestamp=TIMESTAMP, type_="data", topic=TOPIC,
+        body=SAMPLE_THING_DTO, frame=frame
+    )
+
+
+def _new_frame() -> PreparedFrame:
+    return PreparedFrame(
+        timestamp=TIMESTAMP, type_="data", topic=TOPIC, body=SAMPLE_THING_DTO
+    )
+
+
+def measure(codec_name: str, repeat: int) -> tuple:
+    """
+    Measures the specified codec
+
+    :param codec_name: a name of the codec to be measured
+    :param repeat: a number of repetitions of each operation
+    :return: a tuple with a size of an encoded message, CPU time of
+             encoding of a message without and with a cached body and CPU
+             time of decoding, microseconds
+    """
+    codec = create_codec(codec_name)
+    # a separate peer decodes everything the server sent
+    peer = create_codec(codec_name)
+
+    # warm up: define the topic, so only references are measured
+    peer.decode(codec.encode(_build_message(_new_frame())))
+
+    shared_frame = _new_frame()
+    data = codec.encode(_build_message(shared_frame))
+
+    encode_cold = measure_cpu(
+        lambda: codec.encode(_build_message(_new_frame())), repeat
+    )
+    encode_cached = measure_cpu(
+        lambda: codec.encode(_build_message(shared_frame)), repeat
+    )
+
+    decode = measure_cpu(lambda: peer.decode(data), repeat)
+
+    return len(data), encode_cold * 1e6, encode_cached * 1e6, decode * 1e6
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Streaming API message codecs benchmark"
+    )
+    arg_parser.add_argument(
+        '--repeat', type=int, default=20000, dest='repeat',
+        help='a number of repetitions of each operation'
+    )
+    args = arg_parser.parse_args()
+
+    print("%10s %8s %14s %16s %12s" % (
+        "encoding", "bytes", "encode, us", "encode (shared)", "decode, us"
+    ))
+
+    for codec_name in ('json', 'msgpack'):
+        size, encode_cold, encode_cached, decode = measure(
+            codec_name, args.repeat
+        )
+
+        print("%10s %8d %14.1f %16.1f %12.1f" % (
+            codec_name, size, encode_cold, encode_cached, decode
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+This module contains sample data and utility functions shared by
+all benchmarks
+"""
+import time
+from typing import Callable, Mapping
+
+
+# a sample of ThingDto of a typical dimmable light
+SAMPLE_THING_DTO = {
+    'id': 'L1',
+    'type': 'dimmable_light',
+    'friendly_name': 'Living room ceiling light',
+    'placement': 'R1',
+    'is_enabled': True,
+    'is_available': True,
+    'last_updated': 1517232368.30256,
+    'capabilities': [
+        'actuator', 'has_state', 'is_active', 'on_off', 'has_brightness'
+    ],
+    'commands': [
+        'activate', 'deactivate', 'toggle', 'on', 'off', 'set_brightness'
+    ],
+    'state': 'on',
+    'is_active': True,
+    'is_powered_on': True,
+    'brightness': 75
+}  # type: Mapping
+
+
+def measure_cpu(func: Callable[[], None], repeat: int) -> float:
+    """
+    Calls the specified function for the specified number of times and
+    returns an average CPU time spent per call
+
+    :param func: a function to be measured
+    :param repeat: a number of calls to be performed
+    :return: average CPU time per call, in seconds
+    """
+    started = time.process_time()
+
+    for _ in range(repeat):
+        func()
+
+    return (time.process_time() - started) / repeat
@@ -0,0 +1,140 @@
+"""
+This module contains a benchmark of the last-value conflation of pending
+messages. It simulates a bursty sensor which reports its state much more
+often than a slow client is able to receive messages and compares the number
+of bytes sent to the client with and without conflation.
+
+Usage: ``python -m dpl.bench.conflation [--duration 60]``
+"""
+import argparse
+import asyncio
+import copy
+
+from dpl.api.streaming_api.message import Message
+from dpl.api.streaming_api.message_json import message_to_text
+from dpl.api.streaming_api.pending_queue import PendingQueue
+from dpl.events.topic_tree import TopicTree
+from .common import SAMPLE_THING_DTO
+
+
+TOPIC = 'things/L1/modified'
+
+# simulation step, seconds
+TICK = 0.01
+
+
+def simulate(
+        duration: float, burst_rate: float, burst_length: float,
+        burst_period: float, client_rate: float, conflate: bool,
+        loop: asyncio.AbstractEventLoop
+) -> tuple:
+    """
+    Simulates a sensor with bursts of updates and a slow client. Uses
+    a simulated clock instead of a real one
+
+    :param duration: a duration of the simulation, seconds
+    :param burst_rate: a rate of updates during bursts, updates per second
+    :param burst_length: a duration of each burst, seconds
+    :param burst_period: a period between starts of bursts, seconds
+    :param client_rate: a number of messages a client is able to receive
+           per second
+    :param conflate: is conflation of updates enabled
+    :param loop: an event loop to be used by a pending queue
+    :return: a tuple with a number of generated updates, a number of sent
+             messages, a number of sent bytes and a number of messages that
+             were still pending at the end of the simulation
+    """
+    conflated_topics = None
+
+    if conflate:
+        conflated_topics = TopicTree()
+        conflated_topics.add(TOPIC, key=None)
+
+    queue = PendingQueue(loop=loop, conflated_topics=conflated_topics)
+
+    generated = sent = sent_bytes = 0
+    update_credit = client_credit = 0.0
+    ticks = int(duration / TICK)
+
+    for tick in range(ticks):
+        now = tick * TICK
+
+        if now % burst_period < burst_length:
+            update_credit += burst_rate * TICK
+
+        while update_credit >= 1:
+            update_credit -= 1
+            generated += 1
+
+            body = copy.copy(SAMPLE_THING_DTO)
+            body['brightness'] = generated % 100
+            body['last_updated'] = now
+
+            queue.put_nowait(
+                Message(timestamp=now, type_="data", topic=TOPIC, body=body)
+            )
+
+        client_credit += client_rate * TICK
+
+        while client_credit >= 1 and not queue.empty():
+            client_credit -= 1
+            sent += 1
+            sent_bytes += len(message_to_text(queue.get_nowait()))
+
+        # the client can't accumulate its bandwidth while it is idle
+        client_credit = min(client_credit, 1.0)
+
+    return generated, sent, sent_bytes, queue.qsize()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Streaming API last-value conflation benchmark"
+    )
+    arg_parser.add_argument(
+        '--duration', type=float, default=60.0, dest='duration',
+        help='a duration of the simulation, seconds'
+    )
+    arg_parser.add_argument(
+        '--burst-rate', type=float, default=100.0, dest='burst_rate',
+        help='a rate of sensor updates during bursts, updates per second'
+    )
+    arg_parser.add_argument(
+        '--burst-length', type=float, default=2.0, dest='burst_length',
+        help='a duration of each burst of updates, seconds'
+    )
+    arg_parser.add_argument(
+        '--burst-period', type=float, default=10.0, dest='burst_period',
+        help='a period between starts of bursts, seconds'
+    )
+    arg_parser.add_argument(
+        '--client-rate', type=float, default=5.0, dest='client_rate',
+        help='a number of messages the client receives per second'
+    )
+    args = arg_parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+
+    print("%12s %10s %10s %12s %10s" % (
+        "conflation", "updates", "sent", "bytes", "backlog"
+    ))
+
+    try:
+        for conflate in (False, True):
+            generated, sent, sent_bytes, backlog = simulate(
+                duration=args.duration, burst_rate=args.burst_rate,
+                burst_length=args.burst_length,
+                burst_period=args.burst_period,
+                client_rate=args.client_rate, conflate=conflate, loop=loop
+            )
+
+            print("%12s %10d %10d %12d %10d" % (
+                "on" if conflate else "off",
+                generated, sent, sent_bytes, backlog
+            ))
+    finally:
+        loop.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+This module contains a benchmark of delta encoding of ThingDto updates. It
+simulates a stream of updates of a dimmable light where only a brightness
+and a modification time are changed, and compares the number of bytes sent
+to a client with full bodies and with patches.
+
+Usage: ``python -m dpl.bench.delta [--updates 10000]``
+"""
+import argparse
+import copy
+
+from dpl.api.streaming_api.delta_encoder import DeltaEncoder
+from dpl.api.streaming_api.message import Message
+from dpl.api.streaming_api.message_json import message_to_text
+from dpl.events.topic_tree import TopicTree
+from .common import SAMPLE_THING_DTO, measure_cpu
+
+
+TOPIC = 'things/L1/modified'
+
+
+def _build_updates(count: int) -> list:
+    """
+    Builds a list of messages with consecutive updates of a Thing
+
+    :param count: the number of updates
+    :return: a list of messages
+    """
+    result = []
+
+    for i in range(count):
+        body = copy.copy(SAMPLE_THING_DTO)
+        body['brightness'] = i % 100
+        body['last_updated'] = SAMPLE_THING_DTO['last_updated'] + i
+
+        result.append(Message(
+            timestamp=body['last_updated'], type_="data", topic=TOPIC,
+            body=body
+        ))
+
+    return result
+
+
+def measure(updates: list, snapshot_interval: int) -> tuple:
+    """
+    Encodes all the updates with the specified snapshot interval
+
+    :param updates: a list of messages to be sent
+    :param snapshot_interval: the number of patches between snapshots;
+           zero means that delta encoding is disabled
+    :return: a tuple with the total number of sent bytes and CPU time per
+             message, microseconds
+    """
+    topics = TopicTree()
+    topics.add(TOPIC, key=None)
+
+    def _run():
+        encoder = DeltaEncoder(topics, snapshot_interval)
+        total = 0
+
+        for message in updates:
+            if snapshot_interval:
+                message = encoder.encode(message)
+
+            total += len(message_to_text(message))
+
+        return total
+
+    sent_bytes = _run()
+    cpu_time = measure_cpu(_run, 5) / len(updates)
+
+    return sent_bytes, cpu_time * 1e6
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Streaming API delta encoding benchmark"
+    )
+    arg_parser.add_argument(
+        '--updates', type=int, default=10000, dest='updates',
+        help='a number of updates to be sent'
+    )
+    args = arg_parser.parse_args()
+
+    updates = _build_updates(args.updates)
+
+    print("%18s %12s %18s" % ("snapshot interval", "bytes", "CPU per msg, us"))
+
+    for snapshot_interval in (0, 10, 50):
+        sent_bytes, cpu_time = measure(updates, snapshot_interval)
+
+        print("%18s %12d %18.1f" % (
+            snapshot_interval or "off", sent_bytes, cpu_time
+        ))
+
+
+if __name__ == '__main__':
+    main()
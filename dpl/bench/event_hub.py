@@ -0,0 +1,180 @@
+"""
+This module contains a benchmark of EventHub. A simulated Thing emits bursts
+of modification events which are converted to ObjectRelatedEvents, journaled
+and routed by a simulated Streaming API provider. Reports the time spent by
+the producer inside of EventHub.update, the end-to-end latency of events
+and the throughput for:
+
+- sync: the former behaviour, events are converted and dispatched in the
+  context of the producer, the provider schedules a task per event;
+- queued: events are queued and dispatched in batches, the provider
+  schedules a task per batch.
+
+Usage: ``python -m dpl.bench.event_hub [--events 50000] [--burst 100]``
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List, Sequence
+
+from dpl.events.event import Event
+from dpl.events.event_hub import EventHub, BatchObserver
+from dpl.events.event_journal import EventJournal
+from dpl.events.object_related_event import ObjectRelatedEvent
+from dpl.utils.observer import Observer
+from .common import SAMPLE_THING_DTO
+from .churn import percentile
+
+
+class FakeThing(object):
+    """
+    A source of events
+    """
+    pass
+
+
+def convert(source: FakeThing, emitted_at: float) -> Event:
+    """
+    Converts a notification of FakeThing to an event, copying the DTO the
+    same way as ThingService does it
+
+    :param source: a source of the event
+    :param emitted_at: the time of emission, by time.perf_counter
+    :return: an instance of Event
+    """
+    event = ObjectRelatedEvent(
+        topic='things/L1/modified', object_dto=dict(SAMPLE_THING_DTO)
+    )
+    event.emitted_at = emitted_at
+
+    return event
+
+
+class PerEventRouter(Observer):
+    """
+    The former behaviour of StreamingApiProvider: a task per event
+    """
+    def __init__(self, latencies: List[float]):
+        self.latencies = latencies
+
+    def update(self, source, *args, **kwargs) -> None:
+        asyncio.ensure_future(self._route((args[0], )))
+
+    async def _route(self, events: Sequence[Event]) -> None:
+        for event in events:
+            json.dumps(event.object_dto)
+            self.latencies.append(time.perf_counter() - event.emitted_at)
+
+
+class BatchRouter(PerEventRouter, BatchObserver):
+    """
+    The current behaviour of StreamingApiProvider: a task per batch
+    """
+    def update_batch(self, source, events: Sequence[Event]) -> None:
+        asyncio.ensure_future(self._route(events))
+
+
+async def produce(
+        hub: EventHub, events: int, burst: int, update_times: List[float]
+) -> None:
+    """
+    Emits events in bursts, yielding to the event loop between bursts
+
+    :param hub: an EventHub to send events to
+    :param events: the total number of events to be emitted
+    :param burst: the number of events emitted at once
+    :param update_times: a list to save the duration of each call to
+    :return: None
+    """
+    source = FakeThing()
+    perf_counter = time.perf_counter
+
+    for i in range(events):
+        started = perf_counter()
+        hub.update(source, started)
+        update_times.append(perf_counter() - started)
+
+        if i % burst == burst - 1:
+            await asyncio.sleep(0)
+
+
+async def run(mode: str, args) -> tuple:
+    """
+    Runs a single measurement
+
+    :param mode: 'sync' or 'queued'
+    :param args: parsed command line arguments
+    :return: a tuple of update durations, end-to-end latencies and the total
+             duration
+    """
+    latencies = []  # type: List[float]
+    update_times = []  # type: List[float]
+
+    if mode == 'sync':
+        hub = EventHub(journal=EventJournal(capacity=args.events))
+        router = PerEventRouter(latencies)  # type: PerEventRouter
+    else:
+        hub = EventHub(
+            journal=EventJournal(capacity=args.events),
+            max_queue_size=args.queue_size, batch_size=args.batch_size
+        )
+        router = BatchRouter(latencies)
+
+    hub.register_handler(FakeThing, convert)
+    hub.subscribe(router)
+
+    started = time.perf_counter()
+    await produce(hub, args.events, args.burst, update_times)
+
+    while len(latencies) < args.events:
+        await asyncio.sleep(0)
+
+    return update_times, latencies, time.perf_counter() - started
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="EventHub benchmark")
+    arg_parser.add_argument(
+        '--events', type=int, default=50000, dest='events',
+        help='a number of emitted events'
+    )
+    arg_parser.add_argument(
+        '--burst', type=int, default=100, dest='burst',
+        help='a number of events emitted without yielding to the event loop'
+    )
+    arg_parser.add_argument(
+        '--queue-size', type=int, default=10000, dest='queue_size',
+        help='the maximum size of the queue of EventHub'
+    )
+    arg_parser.add_argument(
+        '--batch-size', type=int, default=100, dest='batch_size',
+        help='the maximum number of events dispatched at once'
+    )
+    args = arg_parser.parse_args()
+
+    print("events: %d, burst: %d" % (args.events, args.burst))
+    print("%8s %15s %15s %15s %15s %10s" % (
+        "mode", "update p50, us", "update p99, us", "e2e p50, ms",
+        "e2e p99, ms", "evt/s"
+    ))
+
+    loop = asyncio.get_event_loop()
+
+    for mode in ('sync', 'queued'):
+        update_times, latencies, duration = loop.run_until_complete(
+            run(mode, args)
+        )
+
+        print("%8s %15.2f %15.2f %15.2f %15.2f %10.0f" % (
+            mode,
+            percentile(update_times, 0.5) * 1000000,
+            percentile(update_times, 0.99) * 1000000,
+            percentile(latencies, 0.5) * 1000,
+            percentile(latencies, 0.99) * 1000,
+            args.events / duration
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+This module contains a benchmark of the Streaming API message fan-out. It
+compares CPU time spent on encoding of a single event for all the subscribed
+Sessions with a per-session encoding and with a shared PreparedFrame.
+
+Usage: ``python -m dpl.bench.fan_out [--retained-share 0.1]``
+"""
+import argparse
+import time
+
+from dpl.api.streaming_api.message import Message
+from dpl.api.streaming_api.message_json import message_dumps, message_to_text
+from dpl.api.streaming_api.prepared_frame import PreparedFrame
+from .common import SAMPLE_THING_DTO, measure_cpu
+
+
+SUBSCRIBER_COUNTS = (1, 10, 100, 1000, 5000)
+TOPIC = 'things/L1/modified'
+
+
+def encode_per_session(subscribers: int, retained_every: int) -> None:
+    """
+    Encodes an event for each subscriber separately (the former behaviour)
+
+    :param subscribers: a number of subscribed Sessions
+    :param retained_every: each N-th Session has message retention enabled
+    :return: None
+    """
+    timestamp = time.time()
+
+    for i in range(subscribers):
+        message = Message(
+            timestamp=timestamp, type_="data", topic=TOPIC,
+            body=SAMPLE_THING_DTO
+        )
+
+        if retained_every and i % retained_every == 0:
+            message.message_id = i
+
+        message_dumps(message)
+
+
+def encode_shared(subscribers: int, retained_every: int) -> None:
+    """
+    Encodes an event once and shares the result between all subscribers
+
+    :param subscribers: a number of subscribed Sessions
+    :param retained_every: each N-th Session has message retention enabled
+    :return: None
+    """
+    timestamp = time.time()
+    frame = PreparedFrame(
+        timestamp=timestamp, type_="data", topic=TOPIC, body=SAMPLE_THING_DTO
+    )
+    shared = Message(
+        timestamp=timestamp, type_="data", topic=TOPIC, body=SAMPLE_THING_DTO,
+        frame=frame
+    )
+
+    for i in range(subscribers):
+        if retained_every and i % retained_every == 0:
+            message = Message(
+                timestamp=timestamp, type_="data", topic=TOPIC,
+                body=SAMPLE_THING_DTO, frame=frame, message_id=i
+            )
+        else:
+            message = shared
+
+        message_to_text(message)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Streaming API fan-out encoding benchmark"
+    )
+    arg_parser.add_argument(
+        '--retained-share', type=float, default=0.1, dest='retained_share',
+        help='a share of Sessions with message retention enabled'
+    )
+    arg_parser.add_argument(
+        '--events', type=int, default=50, dest='events',
+        help='a number of events to be encoded for each subscriber count'
+    )
+    args = arg_parser.parse_args()
+
+    if args.retained_share > 0:
+        retained_every = max(int(round(1 / args.retained_share)), 1)
+    else:
+        retained_every = 0
+
+    print("%12s %20s %20s %10s" % (
+        "subscribers", "per-session, us/evt", "shared, us/evt", "speedup"
+    ))
+
+    for subscribers in SUBSCRIBER_COUNTS:
+        old = measure_cpu(
+            lambda: encode_per_session(subscribers, retained_every),
+            repeat=args.events
+        )
+        new = measure_cpu(
+            lambda: encode_shared(subscribers, retained_every),
+            repeat=args.events
+        )
+
+        print("%12d %20.1f %20.1f %9.1fx" % (
+            subscribers, old * 1e6, new * 1e6, old / new if new else 0
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+This module contains a benchmark of Streaming API event routing. It measures
+the time needed to find all Sessions subscribed to a topic of an event with
+a shared SubscriptionStorage and compares it with a scan of per-session
+subscription trees (the former behaviour).
+
+Usage: ``python -m dpl.bench.routing [--sessions 10000]``
+"""
+import argparse
+import time
+
+from dpl.api.streaming_api.subscription_storage import SubscriptionStorage
+from dpl.events.topic_tree import TopicTree
+
+
+MATCHING_COUNTS = (1, 10, 100, 1000, 10000)
+
+
+def build_storages(sessions: int, matching: int):
+    """
+    Builds a shared SubscriptionStorage and a set of per-session topic trees.
+    Each Session is subscribed to all events of its own Thing; the first
+    ``matching`` Sessions are also subscribed to modifications of all Things
+
+    :param sessions: total number of Sessions
+    :param matching: number of Sessions subscribed to all Things
+    :return: a tuple of shared storage and per-session trees
+    """
+    storage = SubscriptionStorage()
+    per_session = {}
+
+    for i in range(sessions):
+        session_id = 'S%d' % i
+        own_tree = TopicTree()
+        per_session[session_id] = own_tree
+
+        topics = ['things/T%d/#' % i]
+
+        if i < matching:
+            topics.append('things/+/modified')
+
+        for topic in topics:
+            storage.add_subscription(session_id, topic, is_retained=False)
+            own_tree.add(topic, session_id, False)
+
+    return storage, per_session
+
+
+def route_shared(storage: SubscriptionStorage, topic: str) -> int:
+    """
+    Resolves subscribers of the topic with a single shared tree walk
+
+    :param storage: a shared storage of subscriptions
+    :param topic: a topic of the event
+    :return: a number of subscribed Sessions
+    """
+    return len(storage.resolve_subscribers(topic))
+
+
+def route_per_session(per_session, topic: str) -> int:
+    """
+    Resolves subscribers of the topic by checking a tree of each Session
+
+    :param per_session: a mapping of Session IDs to their subscription trees
+    :param topic: a topic of the event
+    :return: a number of subscribed Sessions
+    """
+    result = 0
+
+    for own_tree in per_session.values():
+        if own_tree.has_matching(topic):
+            result += 1
+
+    return result
+
+
+def measure(func, *args, repeat: int) -> float:
+    """
+    Returns an average wall time of a single call of the specified function
+
+    :param func: a function to be measured
+    :param args: arguments to be passed to the function
+    :param repeat: a number of calls to be performed
+    :return: average time per call, in seconds
+    """
+    started = time.perf_counter()
+
+    for _ in range(repeat):
+        func(*args)
+
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Streaming API event routing benchmark"
+    )
+    arg_parser.add_argument(
+        '--sessions', type=int, default=10000, dest='sessions',
+        help='a total number of subscribed Sessions'
+    )
+    arg_parser.add_argument(
+        '--events', type=int, default=20, dest='events',
+        help='a number of routed events per measurement'
+    )
+    args = arg_parser.parse_args()
+
+    topic = 'things/unknown/modified'
+
+    print("sessions: %d" % args.sessions)
+    print("%10s %22s %22s" % (
+        "matching", "shared tree, us/evt", "per-session, us/evt"
+    ))
+
+    for matching in MATCHING_COUNTS:
+        if matching > args.sessions:
+            break
+
+        storage, per_session = build_storages(args.sessions, matching)
+        assert route_shared(storage, topic) == matching
+        assert route_per_session(per_session, topic) == matching
+
+        shared = measure(route_shared, storage, topic, repeat=args.events)
+        scan = measure(
+            route_per_session, per_session, topic, repeat=args.events
+        )
+
+        print("%10d %22.1f %22.1f" % (matching, shared * 1e6, scan * 1e6))
+
+
+if __name__ == '__main__':
+    main()
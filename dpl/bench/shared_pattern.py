@@ -0,0 +1,94 @@
+"""
+This module contains a benchmark of subscription churn on a topic pattern
+shared by many Sessions. All Sessions are subscribed to modifications of all
+Things, while one more Session subscribes to and unsubscribes from the same
+pattern in a loop. Reports the time needed to subscribe all Sessions, the
+CPU time of a single subscribe or unsubscribe operation and the CPU time
+of resolution of subscribers after each change.
+
+Usage: ``python -m dpl.bench.shared_pattern [--sessions 1000 10000 20000]``
+"""
+import argparse
+import time
+
+from dpl.api.streaming_api.subscription_storage import SubscriptionStorage
+from .common import measure_cpu
+
+
+SHARED_TOPIC = 'things/+/modified'
+EVENT_TOPIC = 'things/L1/modified'
+
+
+def build_storage(sessions: int) -> SubscriptionStorage:
+    """
+    Builds a SubscriptionStorage where all Sessions are subscribed to the
+    same pattern
+
+    :param sessions: a number of Sessions to be subscribed
+    :return: a filled storage
+    """
+    storage = SubscriptionStorage()
+
+    for i in range(sessions):
+        storage.add_subscription('S%d' % i, SHARED_TOPIC)
+
+    return storage
+
+
+def run(sessions: int, repeat: int) -> tuple:
+    """
+    Runs all measurements for the specified number of Sessions
+
+    :param sessions: a number of Sessions subscribed to the shared pattern
+    :param repeat: a number of churn cycles to be measured
+    :return: a tuple of CPU time of subscription of all Sessions, CPU time
+             of a single churn operation and CPU time of resolution of
+             subscribers after a change (seconds)
+    """
+    started = time.process_time()
+    storage = build_storage(sessions)
+    build_time = time.process_time() - started
+
+    def _churn():
+        storage.add_subscription('C1', SHARED_TOPIC)
+        storage.remove_subscription('C1', SHARED_TOPIC)
+
+    def _churn_and_route():
+        _churn()
+        storage.resolve_subscribers(EVENT_TOPIC)
+
+    churn_time = measure_cpu(_churn, repeat) / 2
+    route_time = measure_cpu(_churn_and_route, repeat) - churn_time * 2
+
+    return build_time, churn_time, route_time
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Streaming API shared pattern churn benchmark"
+    )
+    arg_parser.add_argument(
+        '--sessions', type=int, nargs='+', default=[1000, 10000, 20000],
+        dest='sessions',
+        help='numbers of Sessions subscribed to the shared pattern'
+    )
+    arg_parser.add_argument(
+        '--repeat', type=int, default=1000, dest='repeat',
+        help='a number of churn cycles for each measurement'
+    )
+    args = arg_parser.parse_args()
+
+    print("%10s %12s %14s %20s" % (
+        "sessions", "build, s", "churn op, us", "route after op, ms"
+    ))
+
+    for sessions in args.sessions:
+        build_time, churn_time, route_time = run(sessions, args.repeat)
+
+        print("%10d %12.3f %14.1f %20.3f" % (
+            sessions, build_time, churn_time * 1e6, route_time * 1e3
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+This module contains a benchmark of the overhead of the stage timing. Updates
+of a Thing pass through ThingRepository, ThingService and EventHub to
+a simulated Streaming API provider which encodes the DTO of the Thing, like
+the real provider does it for a single subscriber. Reports the CPU time per
+update with the stage timing disabled and enabled.
+
+Usage: ``python -m dpl.bench.stage_timing [--updates 1000] [--rounds 200]
+[--sample-interval 32]``
+"""
+import argparse
+import functools
+import json
+from unittest.mock import Mock
+
+from dpl.connections import Connection
+from dpl.events.build_object_related_event import build_object_related_event
+from dpl.events.event_hub import EventHub
+from dpl.repo_impls.in_memory.thing_repository import ThingRepository
+from dpl.service_impls.thing_service import ThingService
+from dpl.things.capabilities import HasValue
+from dpl.things.thing import Thing
+from dpl.utils.observer import Observer
+from dpl.utils.stage_timing import STAGE_TIMINGS, ROUTE
+from .common import measure_cpu
+
+
+class FakeSensor(Thing, HasValue):
+    """
+    A source of updates
+    """
+    _type = 'value_sensor'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._value = 0
+
+    @property
+    def is_available(self) -> bool:
+        return True
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def increment(self) -> None:
+        self._value += 1
+        self._apply_update()
+
+
+class FakeProvider(Observer):
+    """
+    Routes events the same way as StreamingApiProvider does it for a single
+    subscriber, but synchronously
+    """
+    def update(self, source, *args, **kwargs) -> None:
+        event = args[0]
+        data = json.dumps(event.object_dto)
+        trace = event.trace
+
+        if trace is not None:
+            trace.mark(ROUTE)
+            STAGE_TIMINGS.record_delivery([trace], trace.last)
+
+        len(data)
+
+
+def build_pipeline() -> FakeSensor:
+    """
+    Builds a chain of a Thing, ThingRepository, ThingService, EventHub and
+    FakeProvider
+
+    :return: the Thing at the beginning of the chain
+    """
+    repo = ThingRepository()
+    service = ThingService(repo)
+    hub = EventHub()
+    hub.register_handler(
+        source_type=ThingService,
+        handler=functools.partial(
+            build_object_related_event, target_root_topic='things'
+        )
+    )
+    service.subscribe(hub)
+    hub.subscribe(FakeProvider())
+
+    sensor = FakeSensor(
+        domain_id='S1', con_instance=Mock(spec_set=Connection),
+        con_params={}, metadata={}
+    )
+    repo.add(sensor)
+
+    # the chain is kept alive by references from the Thing and the service
+    sensor.bench_refs = (repo, service, hub)
+
+    return sensor
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Stage timing overhead benchmark"
+    )
+    arg_parser.add_argument(
+        '--updates', type=int, default=1000, dest='updates',
+        help='a number of updates per round'
+    )
+    arg_parser.add_argument(
+        '--rounds', type=int, default=200, dest='rounds',
+        help='a number of rounds; the best round of each mode is reported'
+    )
+    arg_parser.add_argument(
+        '--sample-interval', type=int, default=32, dest='sample_interval',
+        help='one of how many updates is traced'
+    )
+    args = arg_parser.parse_args()
+
+    STAGE_TIMINGS.sample_interval = args.sample_interval
+    sensor = build_pipeline()
+    best = {False: float('inf'), True: float('inf')}
+
+    # short rounds of both modes are interleaved, so the best rounds are
+    # not affected by changes of the load of the machine
+    for _ in range(args.rounds):
+        for enabled in (False, True):
+            STAGE_TIMINGS.enabled = enabled
+            best[enabled] = min(
+                best[enabled], measure_cpu(sensor.increment, args.updates)
+            )
+
+    STAGE_TIMINGS.enabled = False
+
+    print("updates: %d, rounds: %d, sample interval: %d" % (
+        args.updates, args.rounds, args.sample_interval
+    ))
+    print("%10s %15s" % ("timing", "cpu/update, us"))
+    print("%10s %15.2f" % ("disabled", best[False] * 1000000))
+    print("%10s %15.2f" % ("enabled", best[True] * 1000000))
+    print("overhead: %.1f%%" % ((best[True] / best[False] - 1) * 100))
+
+
+if __name__ == '__main__':
+    main()
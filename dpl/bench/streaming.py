@@ -0,0 +1,686 @@
+"""
+This module contains a load generator and an end-to-end benchmark of the
+Streaming API fan-out. It starts a separate everpl hub process with a
+temporary configuration and a set of dummy lights, opens the specified
+number of authenticated WebSocket clients, subscribes them to the specified
+topics and toggles the lights with the specified rate over the REST API.
+Everything runs locally over the loopback interface.
+
+Reports percentiles of the event-to-client latency (the time between the
+creation of an event in the hub and the receipt of a message by a client),
+the number of delivered messages per second, CPU usage and the peak RSS of
+the hub (including Streaming API worker processes, if any). CPU and RSS are
+read from /proc and are available on Linux only.
+
+Usage: ``python -m dpl.bench.streaming [--clients 100] [--rate 50]
+[--duration 10] [--topic things/+/modified] [--retained-share 0.1]
+[--workers 0]``
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+import yaml
+from sqlalchemy import create_engine
+
+from dpl.core.configuration import PATH_OF_DEFAULT_CONFIG
+from dpl.core.controller import CONFIG_NAME, MAIN_DB_NAME
+from dpl.repo_impls.sql_alchemy.connection_settings_repo import (
+    ConnectionSettingsRepository
+)
+from dpl.repo_impls.sql_alchemy.db_mapper import DbMapper
+from dpl.repo_impls.sql_alchemy.db_session_manager import DbSessionManager
+from dpl.repo_impls.sql_alchemy.thing_settings_repo import (
+    ThingSettingsRepository
+)
+from dpl.settings.connection_settings import ConnectionSettings
+from dpl.settings.thing_settings import ThingSettings
+
+
+HOST = '127.0.0.1'
+USERNAME = 'admin'
+PASSWORD = 'admin'
+CONNECTION_ID = 'BC1'
+THING_ID_TEMPLATE = 'BL%d'
+HUB_LOG_NAME = 'hub.log'
+
+# the time to wait for the hub to start, seconds
+START_TIMEOUT = 60
+
+# the time to wait for messages in flight after the last update, seconds
+DRAIN_TIME = 2
+
+# the maximum number of clients which are connecting at the same time
+MAX_CONCURRENT_CONNECTS = 50
+
+PERCENTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def prepare_config_dir(
+        config_dir: str, things: int, rest_port: int, streaming_port: int,
+        workers: int
+) -> None:
+    """
+    Creates a configuration file and a database with dummy lights for the
+    hub to be benchmarked
+
+    :param config_dir: a path to an empty configuration directory
+    :param things: a number of dummy lights to be created
+    :param rest_port: a port of the REST API
+    :param streaming_port: a separate port of the Streaming API
+    :param workers: a number of Streaming API worker processes
+    :return: None
+    """
+    with open(PATH_OF_DEFAULT_CONFIG) as f:
+        config = yaml.safe_load(f)
+
+    config['core']['logging_level'] = 'warning'
+    config['core']['event_journal_segments'] = 0
+    config['apis']['enabled_apis'] = ['rest_api', 'streaming_api']
+    config['apis']['rest_api']['host'] = HOST
+    config['apis']['rest_api']['port'] = rest_port
+
+    streaming_config = config['apis']['streaming_api']
+    streaming_config['host'] = HOST
+    streaming_config['port'] = streaming_port
+    streaming_config['workers'] = workers
+    streaming_config['retained_store'] = 'memory'
+    # all the clients connect at once, admission limits would reject them
+    streaming_config['max_connections'] = 0
+    streaming_config['max_unauthenticated_connections'] = 0
+
+    config['integrations']['enabled_integrations'] = ['dummy']
+
+    with open(os.path.join(config_dir, CONFIG_NAME), 'w') as f:
+        yaml.safe_dump(config, f, default_flow_style=False)
+
+    engine = create_engine(
+        "sqlite:///%s" % os.path.join(config_dir, MAIN_DB_NAME)
+    )
+    db_mapper = DbMapper()
+    db_mapper.init_tables()
+    db_mapper.init_mappers()
+    db_mapper.create_all_tables(bind=engine)
+    db_session_manager = DbSessionManager(engine=engine)
+
+    ConnectionSettingsRepository(db_session_manager).add(
+        ConnectionSettings(
+            domain_id=CONNECTION_ID, integration='dummy',
+            con_type='dummy_connection', con_params={}
+        )
+    )
+
+    thing_settings_repo = ThingSettingsRepository(db_session_manager)
+
+    for thing_id in thing_ids(things):
+        thing_settings_repo.add(
+            ThingSettings(
+                domain_id=thing_id, integration='dummy', thing_type='light',
+                con_id=CONNECTION_ID,
+                con_params={'prefix': '[%s] ' % thing_id},
+                friendly_name=thing_id, placement_id=None
+            )
+        )
+
+    db_session_manager.get_session().commit()
+
+
+def thing_ids(things: int) -> List[str]:
+    """
+    Returns identifiers of dummy lights created for the benchmark
+
+    :param things: a number of dummy lights
+    :return: a list of identifiers
+    """
+    return [THING_ID_TEMPLATE % i for i in range(1, things + 1)]
+
+
+def percentile(sorted_values: Sequence[float], share: float) -> float:
+    """
+    Returns the specified percentile of values (nearest-rank method)
+
+    :param sorted_values: values sorted in ascending order
+    :param share: the percentile to be returned, from 0 to 1
+    :return: a value of the percentile; zero if there are no values
+    """
+    if not sorted_values:
+        return 0
+
+    index = max(int(round(share * len(sorted_values))) - 1, 0)
+
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class ProcessSampler(object):
+    """
+    ProcessSampler reads CPU times and RSS of a process and all of its
+    descendants (i.e. of worker processes) from /proc
+    """
+    def __init__(self, pid: int):
+        """
+        Constructor
+
+        :param pid: an identifier of the root process
+        """
+        self._pid = pid
+        self._ticks = os.sysconf('SC_CLK_TCK') if self.is_available else 100
+        self.peak_rss = 0
+
+    @property
+    def is_available(self) -> bool:
+        """
+        Checks if statistics of processes can be read on this system
+
+        :return: True if /proc is available
+        """
+        return os.path.exists('/proc/self/stat')
+
+    def cpu_time(self) -> float:
+        """
+        Returns the total CPU time consumed by the process tree
+
+        :return: user and system CPU time, seconds
+        """
+        total = 0
+
+        for pid in self._tree():
+            stat = self._read_stat(pid)
+
+            if stat is not None:
+                total += int(stat[11]) + int(stat[12])
+
+        return total / self._ticks
+
+    def sample_rss(self) -> int:
+        """
+        Reads the current total RSS of the process tree and updates the
+        peak value
+
+        :return: the current RSS, bytes
+        """
+        total = 0
+
+        for pid in self._tree():
+            try:
+                with open('/proc/%d/status' % pid) as f:
+                    for line in f:
+                        if line.startswith('VmRSS:'):
+                            total += int(line.split()[1]) * 1024
+                            break
+            except OSError:
+                continue
+
+        self.peak_rss = max(self.peak_rss, total)
+
+        return total
+
+    def _tree(self) -> List[int]:
+        """
+        Returns identifiers of the root process and all of its descendants
+
+        :return: a list of process identifiers
+        """
+        parents = {}  # type: Dict[int, int]
+
+        for name in os.listdir('/proc'):
+            if not name.isdigit():
+                continue
+
+            stat = self._read_stat(int(name))
+
+            if stat is not None:
+                parents[int(name)] = int(stat[1])
+
+        result = [self._pid]
+
+        for pid in result:
+            result.extend(
+                child for child, parent in parents.items() if parent == pid
+            )
+
+        return result
+
+    @staticmethod
+    def _read_stat(pid: int) -> Optional[List[str]]:
+        """
+        Reads /proc/<pid>/stat fields which follow the name of the process
+
+        :param pid: an identifier of the process
+        :return: a list of fields starting from the state of the process;
+                 None if the process is not available
+        """
+        try:
+            with open('/proc/%d/stat' % pid) as f:
+                content = f.read()
+        except OSError:
+            return None
+
+        return content.rpartition(')')[2].split()
+
+
+async def _send_json(ws: aiohttp.ClientWebSocketResponse, content) -> None:
+    """
+    Sends a JSON-encoded message to the WebSocket
+
+    :param ws: a WebSocket connection
+    :param content: a content of the message
+    :return: None
+    """
+    result = ws.send_str(json.dumps(content))
+
+    # send_str became a coroutine in aiohttp 3
+    if inspect.isawaitable(result):
+        await result
+
+
+def _control(topic: str, body: dict) -> dict:
+    """
+    Builds a content of a control message
+
+    :param topic: a topic of the message
+    :param body: a body of the message
+    :return: the content of the message
+    """
+    return {
+        'timestamp': time.time(), 'type': 'control', 'topic': topic,
+        'body': body
+    }
+
+
+class BenchClient(object):
+    """
+    A single client of the Streaming API which records the latency of each
+    received data message and acknowledges retained messages
+    """
+    def __init__(
+            self, url: str, token: str, topics: Sequence[str],
+            retain_messages: bool
+    ):
+        """
+        Constructor
+
+        :param url: a URL of the Streaming API
+        :param token: an access token
+        :param topics: topic patterns to subscribe to
+        :param retain_messages: if retention of messages must to be enabled
+               for subscriptions
+        """
+        self._url = url
+        self._token = token
+        self._topics = topics
+        self._retain_messages = retain_messages
+        self._ws = None  # type: Optional[aiohttp.ClientWebSocketResponse]
+        self.latencies = []  # type: List[float]
+
+    async def connect(self, session: aiohttp.ClientSession) -> None:
+        """
+        Connects to the Streaming API, authenticates and waits for all the
+        subscriptions to be acknowledged
+
+        :param session: a client session to be used
+        :return: None
+        :raises RuntimeError: if the server refused any of requests
+        """
+        self._ws = await session.ws_connect(self._url)
+
+        await _send_json(
+            self._ws, _control('auth', {'access_token': self._token})
+        )
+        await self._expect('auth_ack')
+
+        for topic in self._topics:
+            await _send_json(self._ws, _control('subscribe', {
+                'target_topic': topic,
+                'retain_messages': self._retain_messages
+            }))
+            await self._expect('subscribe_ack')
+
+    async def receive(self) -> None:
+        """
+        Receives messages until the connection is closed
+
+        :return: None
+        """
+        async for raw in self._ws:
+            if raw.type != aiohttp.WSMsgType.TEXT:
+                break
+
+            received = time.time()
+            content = json.loads(raw.data)
+
+            if content.get('type') != 'data':
+                continue
+
+            self.latencies.append(received - content['timestamp'])
+
+            message_id = content.get('message_id')
+
+            if message_id is not None:
+                await _send_json(self._ws, _control(
+                    'delivery_ack', {'message_id': message_id}
+                ))
+
+    async def close(self) -> None:
+        """
+        Closes the connection
+
+        :return: None
+        """
+        if self._ws is not None:
+            await self._ws.close()
+
+    async def _expect(self, topic: str) -> None:
+        """
+        Waits for a control message with the specified topic, skipping data
+        messages
+
+        :param topic: an expected topic
+        :return: None
+        :raises RuntimeError: if the server responded with an error or if
+                the connection was closed
+        """
+        while True:
+            raw = await self._ws.receive()
+
+            if raw.type != aiohttp.WSMsgType.TEXT:
+                raise RuntimeError("Connection closed while waiting for %s" %
+                                   topic)
+
+            content = json.loads(raw.data)
+
+            if content.get('topic') == topic:
+                return
+
+            if content.get('topic') == 'error':
+                raise RuntimeError("Server error: %s" % content.get('body'))
+
+
+async def _wait_until_ready(
+        session: aiohttp.ClientSession, rest_url: str,
+        hub: subprocess.Popen
+) -> str:
+    """
+    Waits for the REST API of the hub to start and logs in
+
+    :param session: a client session to be used
+    :param rest_url: a root URL of the REST API
+    :param hub: the hub process
+    :return: an access token
+    :raises RuntimeError: if the hub exited or didn't start in time
+    """
+    deadline = time.monotonic() + START_TIMEOUT
+
+    while time.monotonic() < deadline:
+        if hub.poll() is not None:
+            raise RuntimeError("Hub exited with code %s" % hub.returncode)
+
+        try:
+            async with session.post(
+                rest_url + 'auth',
+                json={'username': USERNAME, 'password': PASSWORD}
+            ) as response:
+                if response.status == 200:
+                    return (await response.json())['token']
+        except aiohttp.ClientError:
+            pass
+
+        await asyncio.sleep(0.2)
+
+    raise RuntimeError("Hub didn't start in %d seconds" % START_TIMEOUT)
+
+
+async def _drive_updates(
+        session: aiohttp.ClientSession, rest_url: str, token: str,
+        things: Sequence[str], rate: float, duration: float
+) -> Tuple[int, int]:
+    """
+    Toggles the lights one by one with the specified rate
+
+    :param session: a client session to be used
+    :param rest_url: a root URL of the REST API
+    :param token: an access token
+    :param things: identifiers of lights to be toggled
+    :param rate: a target number of updates per second
+    :param duration: the time to generate updates for, seconds
+    :return: a tuple with the number of accepted and failed commands
+    """
+    results = {'accepted': 0, 'failed': 0}
+    headers = {'Authorization': token}
+    payload = {'command': 'toggle', 'command_args': {}}
+
+    async def toggle(thing_id: str) -> None:
+        try:
+            async with session.post(
+                rest_url + 'things/%s/execute' % thing_id,
+                json=payload, headers=headers
+            ) as response:
+                if response.status == 202:
+                    results['accepted'] += 1
+                    return
+        except aiohttp.ClientError:
+            pass
+
+        results['failed'] += 1
+
+    loop = asyncio.get_event_loop()
+    started = loop.time()
+    total = int(rate * duration)
+    pending = []
+
+    for number in range(total):
+        delay = started + number / rate - loop.time()
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        pending.append(asyncio.ensure_future(
+            toggle(things[number % len(things)])
+        ))
+
+    if pending:
+        await asyncio.wait(pending)
+
+    return results['accepted'], results['failed']
+
+
+async def _sample_rss(sampler: ProcessSampler, interval: float) -> None:
+    """
+    Periodically samples RSS of the hub until cancelled
+
+    :param sampler: a sampler of the hub process
+    :param interval: an interval between samples, seconds
+    :return: None
+    """
+    while True:
+        sampler.sample_rss()
+        await asyncio.sleep(interval)
+
+
+async def run_benchmark(args: argparse.Namespace, hub: subprocess.Popen):
+    """
+    Connects clients to the started hub, generates the load and prints
+    results
+
+    :param args: parsed command-line arguments
+    :param hub: the hub process
+    :return: None
+    """
+    rest_url = 'http://%s:%d/api/rest/v1/' % (HOST, args.rest_port)
+    streaming_url = 'ws://%s:%d/api/streaming/v1/' % (
+        HOST, args.streaming_port
+    )
+
+    if args.retained_share > 0:
+        retained_every = max(int(round(1 / args.retained_share)), 1)
+    else:
+        retained_every = 0
+
+    sampler = ProcessSampler(hub.pid)
+    session = aiohttp.ClientSession()
+
+    try:
+        token = await _wait_until_ready(session, rest_url, hub)
+
+        clients = [
+            BenchClient(
+                url=streaming_url, token=token, topics=args.topics,
+                retain_messages=bool(
+                    retained_every and i % retained_every == 0
+                )
+            )
+            for i in range(args.clients)
+        ]
+
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CONNECTS)
+
+        async def connect(client: BenchClient) -> None:
+            async with semaphore:
+                await client.connect(session)
+
+        await asyncio.gather(*(connect(client) for client in clients))
+        print("Connected %d clients" % len(clients))
+
+        receivers = [
+            asyncio.ensure_future(client.receive()) for client in clients
+        ]
+        rss_sampling = None
+
+        if sampler.is_available:
+            rss_sampling = asyncio.ensure_future(_sample_rss(sampler, 0.5))
+            cpu_started = sampler.cpu_time()
+
+        started = time.monotonic()
+        accepted, failed = await _drive_updates(
+            session, rest_url, token, thing_ids(args.things), args.rate,
+            args.duration
+        )
+        await asyncio.sleep(DRAIN_TIME)
+        elapsed = time.monotonic() - started
+
+        if rss_sampling is not None:
+            cpu_used = sampler.cpu_time() - cpu_started
+            rss_sampling.cancel()
+
+        for client in clients:
+            await client.close()
+
+        await asyncio.wait(receivers)
+
+    finally:
+        await session.close()
+
+    latencies = sorted(
+        latency for client in clients for latency in client.latencies
+    )
+
+    print("%-28s %d accepted, %d failed" % ("updates:", accepted, failed))
+    print("%-28s %d" % ("messages delivered:", len(latencies)))
+    print("%-28s %.1f" % ("messages/s:", len(latencies) / elapsed))
+
+    for share in PERCENTILES:
+        print("%-28s %.2f" % (
+            "latency p%g, ms:" % (share * 100),
+            percentile(latencies, share) * 1e3
+        ))
+
+    if sampler.is_available:
+        print("%-28s %.1f" % ("hub CPU, %:", cpu_used / elapsed * 100))
+        print("%-28s %.1f" % (
+            "hub peak RSS, MiB:", sampler.peak_rss / (1024 * 1024)
+        ))
+    else:
+        print("hub CPU and RSS are not available on this system")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Streaming API load generator and fan-out latency "
+                    "benchmark"
+    )
+    arg_parser.add_argument(
+        '--clients', type=int, default=100, dest='clients',
+        help='a number of WebSocket clients'
+    )
+    arg_parser.add_argument(
+        '--things', type=int, default=10, dest='things',
+        help='a number of dummy lights to be toggled'
+    )
+    arg_parser.add_argument(
+        '--rate', type=float, default=50, dest='rate',
+        help='a target number of thing updates per second'
+    )
+    arg_parser.add_argument(
+        '--duration', type=float, default=10, dest='duration',
+        help='the time to generate updates for, seconds'
+    )
+    arg_parser.add_argument(
+        '--topic', action='append', dest='topics',
+        help='a topic pattern each client subscribes to; may be repeated '
+             '(things/+/modified by default)'
+    )
+    arg_parser.add_argument(
+        '--retained-share', type=float, default=0, dest='retained_share',
+        help='a share of clients with message retention enabled'
+    )
+    arg_parser.add_argument(
+        '--workers', type=int, default=0, dest='workers',
+        help='a number of Streaming API worker processes of the hub'
+    )
+    arg_parser.add_argument(
+        '--rest-port', type=int, default=18800, dest='rest_port',
+        help='a port of the REST API of the hub'
+    )
+    arg_parser.add_argument(
+        '--streaming-port', type=int, default=18801, dest='streaming_port',
+        help='a port of the Streaming API of the hub'
+    )
+    args = arg_parser.parse_args()
+
+    if not args.topics:
+        args.topics = ['things/+/modified']
+
+    with tempfile.TemporaryDirectory(prefix='everpl-bench-') as config_dir:
+        prepare_config_dir(
+            config_dir, args.things, args.rest_port, args.streaming_port,
+            args.workers
+        )
+
+        log_path = os.path.join(config_dir, HUB_LOG_NAME)
+
+        with open(log_path, 'w') as log:
+            hub = subprocess.Popen(
+                [sys.executable, '-m', 'dpl.run', '--config-dir', config_dir],
+                stdout=log, stderr=subprocess.STDOUT
+            )
+
+        loop = asyncio.get_event_loop()
+
+        try:
+            loop.run_until_complete(run_benchmark(args, hub))
+        except RuntimeError:
+            with open(log_path) as log:
+                sys.stderr.write(log.read()[-4000:])
+
+            raise
+        finally:
+            # the hub shuts down gracefully (and stops its workers) on SIGINT
+            hub.send_signal(signal.SIGINT)
+
+            try:
+                hub.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                hub.kill()
+                hub.wait()
+
+
+if __name__ == '__main__':
+    main()
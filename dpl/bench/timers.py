@@ -0,0 +1,172 @@
+"""
+This module contains a benchmark of timers of idle Streaming API sessions.
+It compares memory and CPU usage of a long-lived task and a separate EventLoop
+timer per session (retransmission handler and WebSocket heartbeat) with
+a single shared TimerWheel.
+
+Usage: ``python -m dpl.bench.timers [--sessions 50000]``
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from dpl.api.streaming_api.timer_wheel import TimerWheel
+
+
+HEARTBEAT_INTERVAL = 60
+RETRANSMISSION_DELAY = 3600
+
+
+def _noop() -> None:
+    pass
+
+
+class PerSessionTimers(object):
+    """
+    The former approach: a retransmission task sleeping in asyncio.sleep and
+    an EventLoop timer for heartbeats for each session
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._tasks = []
+        self._heartbeats = []
+
+    async def _retransmission_handler(self) -> None:
+        while True:
+            await asyncio.sleep(RETRANSMISSION_DELAY)
+
+    def open_sessions(self, count: int) -> None:
+        for _ in range(count):
+            self._tasks.append(
+                self._loop.create_task(self._retransmission_handler())
+            )
+            self._heartbeats.append(
+                self._loop.call_later(HEARTBEAT_INTERVAL, _noop)
+            )
+
+    def touch_all(self) -> None:
+        # each received frame resets the heartbeat timer
+        heartbeats = self._heartbeats
+
+        for i, handle in enumerate(heartbeats):
+            handle.cancel()
+            heartbeats[i] = self._loop.call_later(HEARTBEAT_INTERVAL, _noop)
+
+    def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+        for handle in self._heartbeats:
+            handle.cancel()
+
+
+class WheelTimers(object):
+    """
+    The current approach: a retransmission timer and a heartbeat timer for
+    each session in a shared TimerWheel
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._wheel = TimerWheel(loop=loop)
+        self._retransmissions = []
+        self._heartbeats = []
+
+    def open_sessions(self, count: int) -> None:
+        wheel = self._wheel
+
+        for _ in range(count):
+            self._retransmissions.append(
+                wheel.call_later(RETRANSMISSION_DELAY, _noop)
+            )
+            self._heartbeats.append(
+                wheel.call_later(HEARTBEAT_INTERVAL, _noop)
+            )
+
+    def touch_all(self) -> None:
+        heartbeats = self._heartbeats
+
+        for i, handle in enumerate(heartbeats):
+            handle.cancel()
+            heartbeats[i] = self._wheel.call_later(HEARTBEAT_INTERVAL, _noop)
+
+    def close(self) -> None:
+        self._wheel.close()
+
+
+def run(implementation, sessions: int, idle_time: float) -> tuple:
+    """
+    Measures memory and CPU usage of the specified implementation
+
+    :param implementation: a class of timers implementation
+    :param sessions: a number of sessions to be opened
+    :param idle_time: the time to keep sessions idle, seconds
+    :return: a tuple of allocated memory (bytes), CPU time of setup,
+             CPU time of re-scheduling of all heartbeats and CPU time spent
+             while idle (seconds)
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    try:
+        tracemalloc.start()
+        started = time.process_time()
+
+        timers = implementation(loop)
+        timers.open_sessions(sessions)
+        # let the tasks start and reach their first sleep
+        loop.run_until_complete(asyncio.sleep(0))
+
+        setup_cpu = time.process_time() - started
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        started = time.process_time()
+        timers.touch_all()
+        touch_cpu = time.process_time() - started
+
+        started = time.process_time()
+        loop.run_until_complete(asyncio.sleep(idle_time))
+        idle_cpu = time.process_time() - started
+
+        timers.close()
+        loop.run_until_complete(asyncio.sleep(0))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+    return memory, setup_cpu, touch_cpu, idle_cpu
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Streaming API session timers benchmark"
+    )
+    arg_parser.add_argument(
+        '--sessions', type=int, default=50000, dest='sessions',
+        help='a number of idle sessions'
+    )
+    arg_parser.add_argument(
+        '--idle-time', type=float, default=2.0, dest='idle_time',
+        help='the time to keep sessions idle, seconds'
+    )
+    args = arg_parser.parse_args()
+
+    print("%12s %12s %12s %12s %12s" % (
+        "timers", "memory, MiB", "setup, ms", "re-arm, ms", "idle, ms"
+    ))
+
+    for name, implementation in (
+            ('per-session', PerSessionTimers), ('wheel', WheelTimers)
+    ):
+        memory, setup_cpu, touch_cpu, idle_cpu = run(
+            implementation, args.sessions, args.idle_time
+        )
+
+        print("%12s %12.1f %12.1f %12.1f %12.1f" % (
+            name, memory / 2 ** 20, setup_cpu * 1e3, touch_cpu * 1e3,
+            idle_cpu * 1e3
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@ import os
 import logging
 import argparse
 import functools
+from typing import Mapping, Optional
 
 # Include 3rd-party modules
 from sqlalchemy import create_engine
@@ -35,16 +36,29 @@ from dpl.auth.auth_context import AuthContext
 from dpl.auth.auth_aspect import AuthAspect
 
 from dpl.utils.simple_interceptor import SimpleInterceptor
-
-from dpl.events.event_hub import EventHub
-from dpl.events.build_object_related_event import build_object_related_event
+from dpl.utils.stage_timing import STAGE_TIMINGS
+
+from dpl.events.event_hub import EventHub, QueueFullPolicy
+from dpl.events.event_journal import EventJournal
+from dpl.events.event_bus import EventBusServer
+from dpl.auth.remote_auth_service import RemoteAuthService
+from dpl.events.build_object_related_event import (
+    build_object_related_event, build_object_related_topic
+)
 
 from dpl.api.rest_api.things_subapp import build_things_subapp
 from dpl.api.rest_api.placements_subapp import build_placements_subapp
+from dpl.api.rest_api.streaming_subapp import build_streaming_subapp
 from dpl.api.http_api_provider import HttpApiProvider
 from dpl.api.rest_api.rest_api_provider import RestApiProvider
 
 from dpl.api.streaming_api.streaming_api_provider import StreamingApiProvider
+from dpl.api.streaming_api.streaming_workers import (
+    StreamingWorkers, provider_options_from_config
+)
+from dpl.api.streaming_api.retained_store import (
+    InMemoryRetainedStore, SqliteRetainedStore
+)
 
 
 module_logger = logging.getLogger(__name__)
@@ -57,6 +71,9 @@ DEFAULT_CONFIG_DIR = appdirs.user_config_dir(
 
 CONFIG_NAME = 'everpl_config.yaml'
 MAIN_DB_NAME = 'everpl_db.sqlite'
+RETAINED_DB_NAME = 'everpl_retained.sqlite'
+EVENT_BUS_SOCKET_NAME = 'everpl_bus.sock'
+EVENT_JOURNAL_DIR_NAME = 'event_journal'
 
 # Path to the configuration file to be used by default
 # like ~/.config/everpl/everpl_config.yaml)
@@ -108,6 +125,7 @@ class Controller(object):
         self._db_mapper.init_tables()
         self._db_mapper.init_mappers()
         self._db_mapper.create_all_tables(bind=self._engine)
+        self._db_mapper.add_missing_columns(bind=self._engine)
         self._db_session_manager = DbSessionManager(engine=self._engine)
 
         self._con_settings_repo = ConnectionSettingsRepository(self._db_session_manager)
@@ -163,9 +181,23 @@ class Controller(object):
 
         api_context_data = {'auth_context': self._auth_context}
 
-        self._event_hub = EventHub()
+        self._event_journal = self._init_event_journal()
+        self._event_hub = EventHub(
+            journal=self._event_journal,
+            max_queue_size=self._core_config.get('event_queue_size', 0),
+            queue_full_policy=QueueFullPolicy(
+                self._core_config.get('event_queue_full_policy', 'block')
+            ),
+            batch_size=self._core_config.get('event_batch_size', 100),
+            coalesce_windows=self._core_config.get('event_coalesce_windows')
+        )
         self._setup_event_hub(self._event_hub)
 
+        STAGE_TIMINGS.enabled = self._core_config.get('stage_timing', False)
+        STAGE_TIMINGS.sample_interval = self._core_config.get(
+            'stage_timing_sample_interval', 64
+        )
+
         self._user_service_raw.subscribe(self._event_hub)
         self._placement_service_raw.subscribe(self._event_hub)
         self._thing_service_raw.subscribe(self._event_hub)
@@ -182,11 +214,31 @@ class Controller(object):
 
         self._http_api = HttpApiProvider()
 
+        self._separate_streaming = False
+        self._streaming_api_provider = None
+        self._streaming_workers = None
+        self._event_bus = None
+
+        if 'streaming_api' in self._apis_config['enabled_apis']:
+            self._init_streaming_api()
+
+        self._rest_api_streaming = None
+
+        if self._streaming_api_provider is not None:
+            self._rest_api_streaming = build_streaming_subapp(
+                streaming_api=SimpleInterceptor(
+                    wrapped=self._streaming_api_provider,
+                    aspect=self._auth_aspect
+                ),
+                additional_data=api_context_data
+            )
+
         self._rest_api = RestApiProvider(
             things=self._rest_api_things,
             placements=self._rest_api_placements,
             auth_context=self._auth_context,
-            auth_service=self._auth_service
+            auth_service=self._auth_service,
+            streaming=self._rest_api_streaming
         )
 
         self._http_api.add_child_provider(
@@ -194,12 +246,6 @@ class Controller(object):
             provider_root='/api/rest/v1/'
         )
 
-        self._separate_streaming = False
-        self._streaming_api_provider = None
-
-        if 'streaming_api' in self._apis_config['enabled_apis']:
-            self._init_streaming_api()
-
         # None will indicate that this module was disabled
         self._local_announce = None
 
@@ -207,6 +253,37 @@ class Controller(object):
         if 'local_announce' in self._apis_config['enabled_apis']:
             self._initialize_local_announcement()
 
+    def _init_event_journal(self) -> Optional[EventJournal]:
+        """
+        Initializes a journal of events according to the core configuration
+
+        :return: an instance of EventJournal or None if it was disabled
+        """
+        capacity = self._core_config.get('event_journal_capacity', 10000)
+
+        if not capacity:
+            return None
+
+        segments = self._core_config.get('event_journal_segments', 0)
+        segment_dir = None
+
+        if segments:
+            segment_dir = self._core_config.get('event_journal_dir')
+
+            if segment_dir is None:
+                segment_dir = os.path.join(
+                    self._config_dir, EVENT_JOURNAL_DIR_NAME
+                )
+
+        return EventJournal(
+            capacity=capacity,
+            segment_dir=segment_dir,
+            segment_size=self._core_config.get(
+                'event_journal_segment_size', 4 * 1024 * 1024
+            ),
+            max_segments=segments
+        )
+
     def _init_streaming_api(self) -> None:
         """
         Initializes and sets up an Streaming API instance
@@ -226,10 +303,58 @@ class Controller(object):
         else:
             api_root = '/'
 
+        workers = streaming_api_config.get('workers', 0)
+
+        if workers and not self._separate_streaming:
+            module_logger.warning(
+                "Streaming API workers require a separate host or port of "
+                "the Streaming API. Streaming API will run in the main "
+                "process"
+            )
+        elif workers:
+            self._init_streaming_workers(streaming_api_config, workers)
+            return
+
+        retained_store_type = streaming_api_config.get(
+            'retained_store', 'memory'
+        )
+        if retained_store_type == 'sqlite':
+            retained_db_path = streaming_api_config.get('retained_db_path')
+
+            if retained_db_path is None:
+                retained_db_path = os.path.join(
+                    self._config_dir, RETAINED_DB_NAME
+                )
+
+            retained_store = SqliteRetainedStore(
+                path=retained_db_path,
+                memory_budget=streaming_api_config.get(
+                    'retained_memory_budget', 0
+                ),
+                flush_interval=streaming_api_config.get(
+                    'retained_flush_interval', 0.1
+                )
+            )
+        elif retained_store_type == 'memory':
+            retained_store = InMemoryRetainedStore()
+        else:
+            raise ValueError(
+                "Unknown type of retained message store: %s" %
+                retained_store_type
+            )
+
         self._streaming_api_provider = StreamingApiProvider(
             auth_context=self._auth_context,
             auth_service=self._auth_service,
-            api_root=api_root
+            api_root=api_root,
+            retained_store=retained_store,
+            event_journal=self._event_journal,
+            snapshot_sources={
+                'things': self._thing_service_raw,
+                'placements': self._placement_service_raw
+            },
+            event_hub=self._event_hub,
+            **provider_options_from_config(streaming_api_config)
         )
 
         if not self._separate_streaming:
@@ -240,6 +365,41 @@ class Controller(object):
 
         self._event_hub.subscribe(self._streaming_api_provider)
 
+    def _init_streaming_workers(
+            self, streaming_api_config: Mapping, workers: int
+    ) -> None:
+        """
+        Initializes an event bus and worker processes of the Streaming API
+
+        :param streaming_api_config: the streaming_api configuration section
+        :param workers: the number of worker processes
+        :return: None
+        """
+        bus_path = streaming_api_config.get('bus_path')
+
+        if bus_path is None:
+            bus_path = os.path.join(self._config_dir, EVENT_BUS_SOCKET_NAME)
+
+        self._event_bus = EventBusServer(
+            path=bus_path, journal=self._event_journal,
+            max_write_buffer=streaming_api_config.get(
+                'bus_max_write_buffer', 0
+            )
+        )
+        self._event_bus.register_handler(
+            RemoteAuthService.VIEW_CURRENT_SESSION,
+            self._auth_service.view_current_session
+        )
+        self._event_hub.subscribe(self._event_bus)
+
+        self._streaming_workers = StreamingWorkers(
+            count=workers, bus_path=bus_path, config=streaming_api_config,
+            journal_capacity=self._core_config.get(
+                'event_journal_capacity', 10000
+            ),
+            logging_level=self._core_config['logging_level']
+        )
+
     @staticmethod
     def _setup_event_hub(event_hub: EventHub) -> None:
         """
@@ -261,15 +421,24 @@ class Controller(object):
         )
 
         event_hub.register_handler(
-            source_type=UserService, handler=handler_users
+            source_type=UserService, handler=handler_users,
+            topic_builder=functools.partial(
+                build_object_related_topic, target_root_topic='users'
+            )
         )
 
         event_hub.register_handler(
-            source_type=PlacementService, handler=handler_placements
+            source_type=PlacementService, handler=handler_placements,
+            topic_builder=functools.partial(
+                build_object_related_topic, target_root_topic='placements'
+            )
         )
 
         event_hub.register_handler(
-            source_type=ThingService, handler=handler_things
+            source_type=ThingService, handler=handler_things,
+            topic_builder=functools.partial(
+                build_object_related_topic, target_root_topic='things'
+            )
         )
 
     def _initialize_local_announcement(self):
@@ -418,6 +587,11 @@ class Controller(object):
         host = streaming_api_config.get('host', rest_api_config['host'])
         port = streaming_api_config.get('port', rest_api_config['port'])
 
+        if self._streaming_workers is not None:
+            await self._event_bus.start()
+            self._streaming_workers.start(host=host, port=port)
+            return
+
         assert isinstance(self._streaming_api_provider, StreamingApiProvider)
 
         await self._streaming_api_provider.create_server(host=host, port=port)
@@ -482,8 +656,15 @@ class Controller(object):
         if self._local_announce is not None:
             self._local_announce.shutdown_server()
 
-        if self._separate_streaming:
+        if self._streaming_workers is not None:
+            self._streaming_workers.stop()
+            await self._event_bus.close()
+        elif self._separate_streaming:
             await self._streaming_api_provider.shutdown_server()
 
         await self._http_api.shutdown_server()
         self._thing_service_raw.disable_all()
+        self._event_hub.flush()
+
+        if self._event_journal is not None:
+            self._event_journal.close()
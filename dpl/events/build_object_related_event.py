@@ -1,8 +1,8 @@
 """
-This module contains functions for construction of ObjectRelatedEvents based on
-on a data sent by ObservableServices
+This module contains functions for construction of ObjectRelatedEvents (and
+of their topics) based on a data sent by ObservableServices
 """
-from typing import Optional
+from typing import Callable, Optional
 
 from dpl.model.domain_id import TDomainId
 from dpl.dtos.base_dto import BaseDto
@@ -11,12 +11,34 @@ from .topic import iterable_to_topic
 from .object_related_event import ObjectRelatedEvent
 
 
-def build_object_related_event(
+def build_object_related_topic(
         source: ObservableService,
         object_id: TDomainId, event_type: ServiceEventType,
-        object_dto: Optional[BaseDto],
         *,
         target_root_topic: str
+) -> str:
+    """
+    Builds a topic of ObjectRelatedEvent based on data received from
+    an ObservableService
+
+    :param source: source of the event
+    :param object_id: an identifier of an altered object
+    :param event_type: enum value, specifies what happened to the object
+    :param target_root_topic: a root topic to be used for construction
+    :return: a topic of the event
+    """
+    topic_parts = (target_root_topic, object_id, event_type.name)
+
+    return iterable_to_topic(topic_parts)
+
+
+def build_object_related_event(
+        source: ObservableService,
+        object_id: TDomainId, event_type: ServiceEventType,
+        object_dto: Optional[BaseDto] = None,
+        *,
+        target_root_topic: str,
+        dto_factory: Callable[[], Optional[BaseDto]] = None
 ) -> ObjectRelatedEvent:
     """
     Builds an instance of ObjectRelatedEvent based on data received from
@@ -27,17 +49,20 @@ def build_object_related_event(
     :param event_type: enum value, specifies what happened to the object
     :param object_dto: a DTO of the altered object or None if it was deleted
     :param target_root_topic: a root topic to be used for construction
+    :param dto_factory: a function to build the DTO of the altered object
+           lazily; used instead of object_dto if specified
     :return: an instance of ObjectRelatedEvent
     """
     assert isinstance(source, ObservableService)
 
-    last_topic_part = event_type.name
-    topic_parts = (target_root_topic, object_id, last_topic_part)
-    topic = iterable_to_topic(topic_parts)
+    topic = build_object_related_topic(
+        source, object_id, event_type, target_root_topic=target_root_topic
+    )
 
     event = ObjectRelatedEvent(
         topic=topic,
-        object_dto=object_dto
+        object_dto=object_dto,
+        dto_factory=dto_factory
     )
 
     return event
@@ -3,6 +3,9 @@ This module contains a definition of Event - a structure-like class that
 carries information about events that happened in the system
 """
 import time
+from typing import Optional
+
+from dpl.utils.stage_timing import StageTrace
 
 
 class Event(object):
@@ -16,15 +19,22 @@ class Event(object):
 
     All the remaining fields are defined by Event subclasses.
     """
-    def __init__(self, topic: str):
+    def __init__(self, topic: str, timestamp: float = None):
         """
         Constructor. Receives a topic - a hierarchical identifier of a theme,
         topic, event type this Event belongs to.
 
         :param topic: a hierarchical topic (category) this Event belongs to
+        :param timestamp: a time moment when this Event was generated; the
+               current time by default
         """
-        self._timestamp = time.time()
+        if timestamp is None:
+            timestamp = time.time()
+
+        self._timestamp = timestamp
         self._topic = topic
+        self._seq = None  # type: Optional[int]
+        self._trace = None  # type: Optional[StageTrace]
 
     @property
     def timestamp(self) -> float:
@@ -44,3 +54,43 @@ class Event(object):
         :return: a hierarchical topic (category) this Event belongs to
         """
         return self._topic
+
+    @property
+    def seq(self) -> Optional[int]:
+        """
+        Returns a sequence number assigned to this Event by EventJournal
+
+        :return: a sequence number of this Event; None if the Event wasn't
+                 saved to a journal
+        """
+        return self._seq
+
+    @seq.setter
+    def seq(self, new_value: int) -> None:
+        """
+        Sets a sequence number of this Event
+
+        :param new_value: a sequence number to be set
+        :return: None
+        """
+        self._seq = new_value
+
+    @property
+    def trace(self) -> Optional[StageTrace]:
+        """
+        Returns a trace of stages of the event pipeline passed by this Event
+
+        :return: an instance of StageTrace; None if the stage timing is
+                 disabled
+        """
+        return self._trace
+
+    @trace.setter
+    def trace(self, new_value: Optional[StageTrace]) -> None:
+        """
+        Sets a trace of stages of the event pipeline passed by this Event
+
+        :param new_value: a trace to be set
+        :return: None
+        """
+        self._trace = new_value
@@ -0,0 +1,440 @@
+"""
+This module contains definitions of EventBusServer and EventBusClient - of
+two ends of a local bus which delivers events of the core EventHub to
+worker processes over a Unix socket. Workers are also able to perform
+requests to the core process (like validation of access tokens) over the
+same connection.
+
+Each frame on the bus is a JSON object prefixed with its length (4 bytes,
+big-endian). The following kinds of frames are used:
+
+- ``hello`` - is sent by the server on connection, contains the epoch and
+  the last sequence number of the core EventJournal;
+- ``event`` - an event, contains its sequence number, timestamp, topic and
+  a body (a DTO of a related object);
+- ``request`` - a request from a worker, contains an identifier of the
+  request, a name of the method and its parameters;
+- ``response`` - a response to the request, contains the identifier of the
+  request and either a result or a name of the error.
+"""
+import asyncio
+import json
+import logging
+import os
+import struct
+from typing import Any, Callable, Dict, Mapping, MutableSet, Optional
+
+from dpl.utils.observable import Observable
+from dpl.utils.observer import Observer
+from .event import Event
+from .event_journal import EventJournal
+from .object_related_event import ObjectRelatedEvent
+
+
+LOGGER = logging.getLogger(__name__)
+
+_LENGTH = struct.Struct('>I')
+
+# a handler of requests from workers: receives request parameters and
+# returns a JSON-serializable result
+RequestHandler = Callable[..., Any]
+
+
+class EventBusError(Exception):
+    """
+    An exception to be raised if a request over the bus failed
+    """
+    def __init__(self, error: str):
+        """
+        Constructor
+
+        :param error: a name of the error returned by the server
+        """
+        super().__init__(error)
+        self.error = error
+
+
+def _encode_frame(content: Mapping) -> bytes:
+    """
+    Encodes a frame to be sent over the bus
+
+    :param content: a content of the frame
+    :return: encoded frame with its length
+    """
+    data = json.dumps(content).encode('utf-8')
+
+    return _LENGTH.pack(len(data)) + data
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    """
+    Reads a single frame from the bus
+
+    :param reader: a reader of the connection
+    :return: a decoded content of the frame
+    :raises asyncio.IncompleteReadError: if the connection was closed
+    """
+    header = await reader.readexactly(_LENGTH.size)
+    data = await reader.readexactly(_LENGTH.unpack(header)[0])
+
+    return json.loads(data.decode('utf-8'))
+
+
+class EventBusServer(Observer):
+    """
+    EventBusServer is a server side of the bus which runs in the core
+    process. It's subscribed to the core EventHub and broadcasts each event
+    to all connected workers. Each event is encoded only once for all
+    workers.
+
+    Workers which don't keep up with events are disconnected as soon as
+    their outgoing buffer exceeds the limit, so a single stuck worker can't
+    exhaust the memory of the core process. A disconnected worker connects
+    again and continues from the current position of the core journal
+    """
+    def __init__(
+            self, path: str, journal: EventJournal = None,
+            max_write_buffer: int = 0
+    ):
+        """
+        Constructor
+
+        :param path: a path to the Unix socket to listen on
+        :param journal: a journal of the core EventHub; its epoch and the
+               last sequence number are reported to workers on connection
+        :param max_write_buffer: the maximum size of the outgoing buffer of
+               a connection of a worker, bytes; zero means no limit
+        """
+        self._path = path
+        self._journal = journal
+        self._max_write_buffer = max_write_buffer
+        self._server = None  # type: Optional[asyncio.AbstractServer]
+        self._writers = set()  # type: MutableSet[asyncio.StreamWriter]
+        self._handlers = dict()  # type: Dict[str, RequestHandler]
+
+    @property
+    def path(self) -> str:
+        """
+        Returns a path to the Unix socket of the bus
+
+        :return: a path to the socket
+        """
+        return self._path
+
+    def register_handler(self, method: str, handler: RequestHandler) -> None:
+        """
+        Registers a handler of requests from workers
+
+        :param method: a name of the method
+        :param handler: a callable which receives parameters of the request
+               as keyword arguments and returns a JSON-serializable result;
+               exceptions raised by the handler are reported to workers by
+               their class names
+        :return: None
+        """
+        self._handlers[method] = handler
+
+    async def start(self) -> None:
+        """
+        Starts listening for connections of workers. Removes a stale socket
+        file left by a previous run if it's present
+
+        :return: None
+        """
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+        self._server = await asyncio.start_unix_server(
+            self._handle_connection, path=self._path
+        )
+
+    async def close(self) -> None:
+        """
+        Stops the server and closes all connections
+
+        :return: None
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+        for writer in tuple(self._writers):
+            writer.close()
+
+        self._writers.clear()
+
+    def update(self, source: Observable, *args, **kwargs) -> None:
+        event = kwargs.get('event', args[0])  # type: Event
+        assert isinstance(event, Event)
+
+        body = None
+
+        if isinstance(event, ObjectRelatedEvent):
+            body = event.object_dto
+
+        frame = _encode_frame({
+            'kind': 'event',
+            'seq': event.seq,
+            'timestamp': event.timestamp,
+            'topic': event.topic,
+            'body': body
+        })
+
+        limit = self._max_write_buffer
+
+        for writer in tuple(self._writers):
+            if limit and writer.transport.get_write_buffer_size() > limit:
+                self._disconnect_lagging(writer)
+                continue
+
+            writer.write(frame)
+
+    def _disconnect_lagging(self, writer: asyncio.StreamWriter) -> None:
+        """
+        Drops a connection of a worker which is lagging behind. Buffered
+        data is discarded, so the memory is released immediately
+
+        :param writer: a writer of the connection
+        :return: None
+        """
+        LOGGER.warning(
+            "A worker is lagging behind the event bus by %d bytes and will "
+            "be disconnected", writer.transport.get_write_buffer_size()
+        )
+
+        self._writers.discard(writer)
+        writer.transport.abort()
+
+    async def _handle_connection(
+            self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Handles a connection of a single worker
+
+        :param reader: a reader of the connection
+        :param writer: a writer of the connection
+        :return: None
+        """
+        hello = {'kind': 'hello', 'epoch': None, 'last_seq': 0}
+
+        if self._journal is not None:
+            hello['epoch'] = self._journal.epoch
+            hello['last_seq'] = self._journal.last_seq
+
+        # no events can be sent between the hello frame and the
+        # registration of the writer
+        writer.write(_encode_frame(hello))
+        self._writers.add(writer)
+
+        LOGGER.debug("Worker connected to the event bus")
+
+        try:
+            while True:
+                request = await _read_frame(reader)
+
+                if request.get('kind') == 'request':
+                    writer.write(_encode_frame(self._handle_request(request)))
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            LOGGER.debug("Worker disconnected from the event bus")
+
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def _handle_request(self, request: Mapping) -> Dict[str, Any]:
+        """
+        Handles a request from a worker
+
+        :param request: a content of the request frame
+        :return: a content of the response frame
+        """
+        response = {'kind': 'response', 'id': request.get('id')}
+        handler = self._handlers.get(request.get('method'))
+
+        if handler is None:
+            response['error'] = 'UnknownMethod'
+            return response
+
+        try:
+            response['result'] = handler(**request.get('params', {}))
+        except Exception as e:
+            response['error'] = type(e).__name__
+
+        return response
+
+
+class EventBusClient(Observable):
+    """
+    EventBusClient is a client side of the bus which runs in worker
+    processes. It notifies subscribers (i.e. the local EventHub of the
+    worker) about each event received from the core process. Events keep
+    their sequence numbers and timestamps assigned in the core process
+    """
+    def __init__(self, path: str):
+        """
+        Constructor
+
+        :param path: a path to the Unix socket of the server
+        """
+        self._path = path
+        self._observers = set()  # type: MutableSet[Observer]
+        self._reader = None  # type: Optional[asyncio.StreamReader]
+        self._writer = None  # type: Optional[asyncio.StreamWriter]
+        self._read_task = None  # type: Optional[asyncio.Task]
+        self._requests = dict()  # type: Dict[int, asyncio.Future]
+        self._last_request_id = 0
+        self._epoch = None  # type: Optional[str]
+        self._last_seq = 0
+
+    @property
+    def epoch(self) -> Optional[str]:
+        """
+        Returns the epoch of the core EventJournal reported on connection
+
+        :return: an identifier of the epoch; None if the core process has
+                 no journal
+        """
+        return self._epoch
+
+    @property
+    def last_seq(self) -> int:
+        """
+        Returns the sequence number of the last core event reported on
+        connection
+
+        :return: the last sequence number
+        """
+        return self._last_seq
+
+    def subscribe(self, observer: Observer) -> None:
+        self._observers.add(observer)
+
+    def unsubscribe(self, observer: Observer) -> None:
+        self._observers.discard(observer)
+
+    async def connect(self) -> None:
+        """
+        Connects to the server and starts receiving events
+
+        :return: None
+        """
+        self._reader, self._writer = await asyncio.open_unix_connection(
+            path=self._path
+        )
+
+        hello = await _read_frame(self._reader)
+        assert hello.get('kind') == 'hello'
+
+        self._epoch = hello['epoch']
+        self._last_seq = hello['last_seq']
+        self._read_task = asyncio.ensure_future(self._read_frames())
+
+    async def close(self) -> None:
+        """
+        Closes the connection
+
+        :return: None
+        """
+        if self._read_task is not None:
+            self._read_task.cancel()
+
+        if self._writer is not None:
+            self._writer.close()
+
+    async def wait_closed(self) -> None:
+        """
+        Waits until the connection is closed or lost
+
+        :return: None
+        """
+        if self._read_task is not None:
+            await asyncio.wait([self._read_task])
+
+    async def request(self, method: str, **params) -> Any:
+        """
+        Performs a request to the core process
+
+        :param method: a name of the method
+        :param params: parameters of the request
+        :return: a result of the request
+        :raises EventBusError: if the request failed
+        :raises ConnectionError: if the connection was lost
+        """
+        if self._writer is None or self._read_task.done():
+            raise ConnectionError("Event bus is not connected")
+
+        self._last_request_id += 1
+        request_id = self._last_request_id
+
+        future = asyncio.get_event_loop().create_future()
+        self._requests[request_id] = future
+
+        self._writer.write(_encode_frame({
+            'kind': 'request', 'id': request_id, 'method': method,
+            'params': params
+        }))
+
+        try:
+            return await future
+        finally:
+            self._requests.pop(request_id, None)
+
+    async def _read_frames(self) -> None:
+        """
+        Receives frames from the server until the connection is closed
+
+        :return: None
+        """
+        try:
+            while True:
+                frame = await _read_frame(self._reader)
+                kind = frame.get('kind')
+
+                if kind == 'event':
+                    self._on_event(frame)
+                elif kind == 'response':
+                    self._on_response(frame)
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            LOGGER.error("Connection to the event bus was lost")
+
+        finally:
+            for future in self._requests.values():
+                if not future.done():
+                    future.set_exception(
+                        ConnectionError("Event bus connection was lost")
+                    )
+
+    def _on_event(self, frame: Mapping) -> None:
+        """
+        Notifies subscribers about a received event
+
+        :param frame: a content of the event frame
+        :return: None
+        """
+        event = ObjectRelatedEvent(
+            topic=frame['topic'], object_dto=frame['body'],
+            timestamp=frame['timestamp']
+        )
+        event.seq = frame['seq']
+
+        for observer in self._observers:
+            observer.update(self, event)
+
+    def _on_response(self, frame: Mapping) -> None:
+        """
+        Completes a pending request
+
+        :param frame: a content of the response frame
+        :return: None
+        """
+        future = self._requests.get(frame.get('id'))
+
+        if future is None or future.done():
+            return
+
+        if 'error' in frame:
+            future.set_exception(EventBusError(frame['error']))
+        else:
+            future.set_result(frame.get('result'))
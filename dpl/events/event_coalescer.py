@@ -0,0 +1,191 @@
+"""
+This module contains a definition of EventCoalescer - of a stage of EventHub
+which merges bursts of modifications of the same object into a single event
+"""
+import asyncio
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from dpl.events.event import Event
+from dpl.events.object_related_event import ObjectRelatedEvent
+from dpl.events.topic import topic_to_list
+
+
+# a key of a held event: a root topic and an identifier of the object
+ObjectKey = Tuple[str, str]
+
+MODIFIED = 'modified'
+
+
+class EventCoalescer(object):
+    """
+    EventCoalescer holds ``<root>/<object_id>/modified`` events for a time
+    window configured for the root topic. All the modifications of the same
+    object received within the window are merged into one event - the last
+    one, which carries the latest state of the object. The window is
+    started by the first modification and is not prolonged by the next
+    ones, so the delay of an event never exceeds the window.
+
+    Any other event related to the same object (like ``added`` or
+    ``deleted``) releases the held modification first, so the order of
+    events of the same object is never changed. Events of other root
+    topics and events which are not related to objects are passed as is
+    """
+    def __init__(
+            self, windows: Mapping[str, float],
+            emit: Callable[[List[Event]], None],
+            loop: asyncio.AbstractEventLoop = None
+    ):
+        """
+        Constructor
+
+        :param windows: a mapping of root topics (like 'things') to the
+               duration of coalescing windows, seconds. Root topics with
+               a zero window are not coalesced
+        :param emit: a function to be called with events released by the
+               end of a window
+        :param loop: an event loop to be used for scheduling of the end of
+               windows; the current event loop if not specified
+        """
+        self._windows = {
+            root: window for root, window in windows.items() if window > 0
+        }  # type: Dict[str, float]
+        self._emit = emit
+        self._loop = loop
+        self._held = dict()  # type: Dict[ObjectKey, Event]
+        self._timers = dict()  # type: Dict[ObjectKey, asyncio.Handle]
+        self._received = dict.fromkeys(self._windows, 0)
+        self._emitted = dict.fromkeys(self._windows, 0)
+
+    @property
+    def held_count(self) -> int:
+        """
+        Returns the number of events held until the end of their windows
+
+        :return: the number of held events
+        """
+        return len(self._held)
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Returns the number of events of each coalesced root topic before and
+        after the coalescing
+
+        :return: a mapping of root topics to dicts with 'received' and
+                 'emitted' counters
+        """
+        return {
+            root: {
+                'received': self._received[root],
+                'emitted': self._emitted[root]
+            }
+            for root in self._windows
+        }
+
+    def process(self, events: Sequence[Event]) -> List[Event]:
+        """
+        Passes events through the coalescing stage
+
+        :param events: new events, in order of their receipt
+        :return: events to be dispatched right now, in order of their
+                 receipt; modifications which are held are excluded and
+                 will be passed to the emit function later
+        """
+        result = []  # type: List[Event]
+
+        for event in events:
+            key, kind = self._parse(event)
+
+            if key is None:
+                result.append(event)
+                continue
+
+            root = key[0]
+            self._received[root] += 1
+
+            if kind == MODIFIED:
+                if key in self._held:
+                    self._held[key] = event
+                    continue
+
+                self._held[key] = event
+                self._timers[key] = self._get_loop().call_later(
+                    self._windows[root], self._on_window_end, key
+                )
+                continue
+
+            held = self._release(key)
+
+            if held is not None:
+                result.append(held)
+
+            self._emitted[root] += 1
+            result.append(event)
+
+        return result
+
+    def flush(self) -> List[Event]:
+        """
+        Releases all the held events at once
+
+        :return: released events
+        """
+        return [self._release(key) for key in list(self._held)]
+
+    def _parse(self, event: Event) -> Tuple[Optional[ObjectKey], str]:
+        """
+        Determines if the event may be coalesced
+
+        :param event: an event to be checked
+        :return: a tuple of a key of the related object (None if the event
+                 is not coalesced) and of the last part of the topic
+        """
+        if not isinstance(event, ObjectRelatedEvent):
+            return None, ''
+
+        parts = topic_to_list(event.topic)
+
+        if len(parts) != 3 or parts[0] not in self._windows:
+            return None, ''
+
+        return (parts[0], parts[1]), parts[2]
+
+    def _release(self, key: ObjectKey) -> Optional[Event]:
+        """
+        Stops the window of the object and returns its held event
+
+        :param key: a key of the object
+        :return: the held event or None if there is no such event
+        """
+        event = self._held.pop(key, None)
+
+        if event is None:
+            return None
+
+        self._timers.pop(key).cancel()
+        self._emitted[key[0]] += 1
+
+        return event
+
+    def _on_window_end(self, key: ObjectKey) -> None:
+        """
+        Emits the held event at the end of its window
+
+        :param key: a key of the object
+        :return: None
+        """
+        event = self._release(key)
+
+        if event is not None:
+            self._emit([event])
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Returns the event loop to be used for scheduling of the end of
+        windows
+
+        :return: an event loop
+        """
+        if self._loop is None:
+            self._loop = asyncio.get_event_loop()
+
+        return self._loop
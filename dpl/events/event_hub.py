@@ -2,13 +2,35 @@
 This module contains a definition of EventHub - a central place for processing
 of all events in the system
 """
+import asyncio
+import collections
 import functools
+import logging
 import warnings
-from typing import Type, MutableSet, Callable
+from enum import Enum
+from typing import (
+    Any, Deque, Dict, Iterable, List, Mapping, Type, Tuple, Callable,
+    Optional, Sequence
+)
 
-from dpl.utils.observer import Observer
+from dpl.utils.observer import Observer, SelectiveObserver
 from dpl.utils.observable import Observable
+from dpl.utils.stage_timing import (
+    STAGE_TIMINGS, StageTrace, HUB_QUEUE, HUB_CONVERT
+)
 from dpl.events.event import Event
+from dpl.events.event_coalescer import EventCoalescer
+from dpl.events.event_journal import EventJournal
+from dpl.events.topic_tree import TopicTree
+
+
+LOGGER = logging.getLogger(__name__)
+
+# a topic pattern matching all topics
+ALL_TOPICS = '#'
+
+# the maximum number of topics which resolved subscribers are cached
+MAX_RESOLVED_TOPICS = 10000
 
 
 def _convert_to_event(source: Observable, *args, **kwargs) -> Event:
@@ -26,19 +48,208 @@ def _convert_to_event(source: Observable, *args, **kwargs) -> Event:
     )
 
 
-class EventHub(Observer, Observable):
+def _build_topic(source: Observable, *args, **kwargs) -> Optional[str]:
+    """
+    A skeleton of a function that determines a topic of an event to be
+    built from the specified data received from the specified event source
+
+    :param source: a source of this event
+    :param args: positional arguments, an information about event
+    :param kwargs: keyword arguments, an information about event
+    :return: a topic of the event or None if it can't be determined in
+             advance
+    """
+    return None
+
+
+class QueueFullPolicy(Enum):
+    """
+    An enumeration of actions to be performed when a new event is received
+    by EventHub which queue of events is full
+    """
+    # the oldest events are dispatched immediately, in the context of the
+    # caller, until there is a room for the new event
+    block = 'block'
+
+    # the new event is dropped
+    drop = 'drop'
+
+    # the new event replaces a queued event with the same topic (keeping
+    # its position in the queue); the oldest event is dropped if there is
+    # no event to be replaced
+    coalesce = 'coalesce'
+
+
+class BatchObserver(Observer):
+    """
+    BatchObserver is an Observer which is able to handle several events at
+    once. EventHub passes all the events of a dispatched batch to such
+    observers with a single call of update_batch
+    """
+    def update_batch(self, source: Any, events: Sequence[Event]) -> None:
+        """
+        A method to be called by EventHub for each batch of events
+
+        :param source: an EventHub which dispatches events
+        :param events: events to be handled, in order of their receipt
+        :return: None
+        """
+        for event in events:
+            self.update(source, event)
+
+
+class _QueuedEvent(object):
+    """
+    An item of the queue of EventHub: the data received from an event source,
+    an Event built from it, if it was already built, and a trace of stages
+    passed by the data, if the data is traced
+    """
+    __slots__ = ('source', 'args', 'kwargs', 'event', 'trace')
+
+    def __init__(
+            self, source: Observable, args: tuple, kwargs: dict,
+            event: Optional[Event] = None, trace: Optional[StageTrace] = None
+    ):
+        self.source = source
+        self.args = args
+        self.kwargs = kwargs
+        self.event = event
+        self.trace = trace
+
+
+class EventHub(SelectiveObserver, Observable):
     """
     EventHub is a central place for all events in the system. It's responsible
     for pre-processing of events, coming from all the services, APIs and other
     sources, and their distribution to other subscribers (like services, APIs,
-    loggers and other interested parties
+    loggers and other interested parties.
+
+    By default events are processed and dispatched synchronously, in the
+    context of the event source. If the size of the queue is specified,
+    then the data received from event sources is just queued and the
+    control is returned to the source immediately. Events are built,
+    journaled and dispatched to subscribers later, in batches, by
+    a callback scheduled on the event loop. Subscribers which implement
+    BatchObserver receive each batch with a single call.
+
+    Optionally, modifications of the same object received within a short
+    time window may be merged into a single event (see EventCoalescer).
+
+    Each subscriber receives only events which topics match one of topic
+    patterns specified on subscription. Patterns of all the subscribers are
+    kept in a single TopicTree and subscribers resolved for each topic are
+    cached, so the filtering costs a single dict lookup per event.
+    Subscribers which implement SelectiveObserver are additionally asked
+    if they are interested in a topic (the topic is passed as the ``topic``
+    keyword argument), so event sources are able to skip events nobody is
+    interested in (see is_interested)
     """
-    def __init__(self):
+    def __init__(
+            self, journal: EventJournal = None, max_queue_size: int = 0,
+            queue_full_policy: QueueFullPolicy = QueueFullPolicy.block,
+            batch_size: int = 100,
+            coalesce_windows: Mapping[str, float] = None,
+            loop: asyncio.AbstractEventLoop = None
+    ):
         """
         Constructor. Initializes internal variables
+
+        :param journal: a journal to save all events to; each event receives
+               a sequence number before it's broadcasted to subscribers
+        :param max_queue_size: the maximum number of events waiting to be
+               dispatched; zero means that events are dispatched
+               synchronously, without queueing
+        :param queue_full_policy: a policy to be applied if the queue is full
+        :param batch_size: the maximum number of events to be dispatched at
+               once, before the control will be returned to the event loop
+        :param coalesce_windows: a mapping of root topics (like 'things') to
+               the duration of time windows in which modifications of the
+               same object are merged into one event, seconds; events are
+               not coalesced if not specified
+        :param loop: an event loop to be used for dispatching of queued
+               events; the current event loop if not specified
         """
-        self._observers = set()  # type: MutableSet[Observer]
+        # topic patterns of each subscriber
+        self._observers = dict()  # type: Dict[Observer, Tuple[str, ...]]
+        self._matcher = TopicTree()
+        # subscribers resolved for each recently dispatched topic
+        self._resolved = dict()  # type: Dict[str, Tuple[Observer, ...]]
         self._converter = functools.singledispatch(_convert_to_event)
+        self._topic_builder = functools.singledispatch(_build_topic)
+        self._journal = journal
+
+        self._max_queue_size = max_queue_size
+        self._queue_full_policy = queue_full_policy
+        self._batch_size = max(1, batch_size)
+        self._loop = loop
+        self._queue = collections.deque()  # type: Deque[_QueuedEvent]
+        # the last queued event for each topic, for the 'coalesce' policy
+        self._by_topic = dict()  # type: Dict[str, _QueuedEvent]
+        self._is_dispatch_scheduled = False
+        self._dropped_count = 0
+        self._coalesced_count = 0
+
+        self._coalescer = None  # type: Optional[EventCoalescer]
+
+        if coalesce_windows:
+            self._coalescer = EventCoalescer(
+                windows=coalesce_windows, emit=self._deliver, loop=loop
+            )
+
+    @property
+    def journal(self) -> Optional[EventJournal]:
+        """
+        Returns the journal all events are saved to
+
+        :return: an instance of EventJournal or None if events are not
+                 journaled
+        """
+        return self._journal
+
+    @property
+    def dropped_count(self) -> int:
+        """
+        Returns the total number of events dropped on overflows of the queue
+
+        :return: the number of dropped events
+        """
+        return self._dropped_count
+
+    @property
+    def coalesced_count(self) -> int:
+        """
+        Returns the total number of queued events replaced by newer events
+        with the same topic
+
+        :return: the number of coalesced events
+        """
+        return self._coalesced_count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns counters of processed events
+
+        :return: a dict with the current size of the queue, the total
+                 numbers of dropped and coalesced queued events and, for
+                 each root topic with a coalescing window, the numbers of
+                 events before and after the coalescing
+        """
+        coalescer = self._coalescer
+
+        return {
+            'queue_size': len(self._queue),
+            'dropped': self._dropped_count,
+            'coalesced': self._coalesced_count,
+            'windows': coalescer.get_stats() if coalescer is not None else {}
+        }
+
+    def qsize(self) -> int:
+        """
+        Returns the number of events waiting to be dispatched
+
+        :return: the number of queued events
+        """
+        return len(self._queue)
 
     def update(self, source: Observable, *args, **kwargs) -> None:
         """
@@ -48,22 +259,243 @@ class EventHub(Observer, Observable):
         by the event source. The way of handling such parameters is determined
         registered event handlers.
 
+        If the queue of events is enabled, then the data is queued and
+        dispatched later; the queue full policy is applied if the queue is
+        full
+
         :param source: an object which generated an event
         :param args: positional arguments, information about event
         :param kwargs: keyword arguments, information about event
         :return: None
         """
+        trace = STAGE_TIMINGS.current
+
+        if self._max_queue_size <= 0:
+            self._dispatch([self._build_event(source, args, kwargs, trace)])
+            return
+
+        item = _QueuedEvent(source, args, kwargs, trace=trace)
+        policy = self._queue_full_policy
+
+        if policy is QueueFullPolicy.coalesce:
+            # topics are needed for coalescing, so events are built at once
+            item.event = self._build_event(source, args, kwargs, trace)
+
+            if self._coalesce(item):
+                return
+
+        if len(self._queue) >= self._max_queue_size:
+            if policy is QueueFullPolicy.drop:
+                self._dropped_count += 1
+                return
+
+            if policy is QueueFullPolicy.coalesce:
+                self._dropped_count += 1
+                self._pop_left()
+            else:
+                # QueueFullPolicy.block
+                while len(self._queue) >= self._max_queue_size:
+                    self._dispatch_batch()
+
+        self._queue.append(item)
+
+        if item.event is not None:
+            self._by_topic[item.event.topic] = item
+
+        self._schedule_dispatch()
+
+    def flush(self) -> None:
+        """
+        Dispatches all the queued events and all the events held by
+        coalescing windows immediately
+
+        :return: None
+        """
+        while self._queue:
+            self._dispatch_batch()
+
+        if self._coalescer is not None:
+            self._deliver(self._coalescer.flush())
+
+    def _build_event(
+            self, source: Observable, args: tuple, kwargs: dict,
+            trace: Optional[StageTrace] = None
+    ) -> Event:
+        """
+        Builds an Event from the data received from an event source
+
+        :param source: an object which generated an event
+        :param args: positional arguments, information about event
+        :param kwargs: keyword arguments, information about event
+        :param trace: a trace of stages passed by the data, if the data is
+               traced; it's attached to the built Event
+        :return: an instance of Event
+        """
         event = self._converter(source, *args, **kwargs)
-        self._notify(event)
 
-    def subscribe(self, observer: Observer) -> None:
+        if trace is not None:
+            event.trace = trace
+            trace.mark(HUB_CONVERT)
+
+        return event
+
+    def _coalesce(self, item: _QueuedEvent) -> bool:
+        """
+        Replaces a queued event with the same topic by the new one
+
+        :param item: a new item of the queue with a built event
+        :return: True if an event was replaced, False otherwise
+        """
+        queued = self._by_topic.get(item.event.topic)
+
+        if queued is None:
+            return False
+
+        queued.source = item.source
+        queued.args = item.args
+        queued.kwargs = item.kwargs
+        queued.event = item.event
+        queued.trace = item.trace
+        self._coalesced_count += 1
+
+        return True
+
+    def _pop_left(self) -> _QueuedEvent:
+        """
+        Removes and returns the oldest item of the queue
+
+        :return: the oldest queued item
+        """
+        item = self._queue.popleft()
+
+        if item.event is not None and \
+                self._by_topic.get(item.event.topic) is item:
+            del self._by_topic[item.event.topic]
+
+        return item
+
+    def _schedule_dispatch(self) -> None:
+        """
+        Schedules dispatching of queued events if it wasn't scheduled yet
+
+        :return: None
+        """
+        if self._is_dispatch_scheduled:
+            return
+
+        if self._loop is None:
+            self._loop = asyncio.get_event_loop()
+
+        self._is_dispatch_scheduled = True
+        self._loop.call_soon(self._on_dispatch_scheduled)
+
+    def _on_dispatch_scheduled(self) -> None:
+        """
+        Dispatches a single batch of queued events and schedules the next
+        one, so the event loop is never blocked for too long
+
+        :return: None
+        """
+        self._is_dispatch_scheduled = False
+
+        try:
+            self._dispatch_batch()
+        except Exception as e:
+            LOGGER.error(
+                "Failed to dispatch events: %s", e, exc_info=e
+            )
+        finally:
+            if self._queue:
+                self._schedule_dispatch()
+
+    def _dispatch_batch(self) -> None:
+        """
+        Builds, journals and dispatches up to batch_size queued events
+
+        :return: None
+        """
+        events = []  # type: List[Event]
+
+        while self._queue and len(events) < self._batch_size:
+            item = self._pop_left()
+            event = item.event
+
+            if item.trace is not None:
+                item.trace.mark(HUB_QUEUE)
+
+            if event is None:
+                try:
+                    event = self._build_event(
+                        item.source, item.args, item.kwargs, item.trace
+                    )
+                except Exception as e:
+                    LOGGER.error(
+                        "Failed to build an event from %s: %s",
+                        item.source, e, exc_info=e
+                    )
+                    continue
+
+            events.append(event)
+
+        self._dispatch(events)
+
+    def _dispatch(self, events: List[Event]) -> None:
         """
-        Adds the specified Observer to the list of subscribers
+        Passes the specified events through the coalescing stage (if it's
+        enabled) and delivers the rest of them
+
+        :param events: events to be dispatched, in order of their receipt
+        :return: None
+        """
+        if self._coalescer is not None:
+            events = self._coalescer.process(events)
+
+        self._deliver(events)
+
+    def _deliver(self, events: List[Event]) -> None:
+        """
+        Journals the specified events and sends them to all subscribers
+
+        :param events: events to be delivered, in order of their receipt
+        :return: None
+        """
+        if not events:
+            return
+
+        if self._journal is not None:
+            for event in events:
+                self._journal.append(event)
+
+        if len(events) == 1:
+            self._notify(events[0])
+        else:
+            self._notify_batch(events)
+
+    def subscribe(
+            self, observer: Observer, topic_patterns: Iterable[str] = None
+    ) -> None:
+        """
+        Adds the specified Observer to the list of subscribers. Replaces
+        topic patterns if the Observer is already subscribed
 
         :param observer: an instance of Observer to be added
+        :param topic_patterns: patterns of topics to be delivered to the
+               Observer; may contain ``+`` and ``#`` wildcards. All the
+               events are delivered if not specified
         :return: None
         """
-        self._observers.add(observer)
+        if topic_patterns is None:
+            topic_patterns = (ALL_TOPICS, )
+
+        self.unsubscribe(observer)
+
+        patterns = tuple(topic_patterns)
+        self._observers[observer] = patterns
+
+        for pattern in patterns:
+            self._matcher.add(pattern=pattern, key=observer)
+
+        self._resolved.clear()
 
     def unsubscribe(self, observer: Observer) -> None:
         """
@@ -72,19 +504,118 @@ class EventHub(Observer, Observable):
         :param observer: an instance of Observer to be deleted
         :return: None
         """
-        self._observers.discard(observer)
+        patterns = self._observers.pop(observer, None)
+
+        if patterns is None:
+            return
+
+        for pattern in patterns:
+            self._matcher.remove(pattern=pattern, key=observer)
+
+        self._resolved.clear()
+
+    def has_interest(self, topic: str) -> bool:
+        """
+        Checks if there is any subscriber interested in events with the
+        specified topic
+
+        :param topic: a topic to be checked
+        :return: True if the event with such topic will be delivered to at
+                 least one subscriber, False otherwise
+        """
+        for observer in self._resolve(topic):
+            if not isinstance(observer, SelectiveObserver):
+                return True
+
+            if observer.is_interested(self, topic=topic):
+                return True
+
+        return False
+
+    def is_interested(self, source: Observable, *args, **kwargs) -> bool:
+        """
+        Checks if an event, described by the specified data received from
+        an event source, will be delivered to any subscriber. Always returns
+        True if no topic builder was registered for the source
+
+        :param source: an object which is going to generate an event
+        :param args: positional arguments, information about event
+        :param kwargs: keyword arguments, information about event
+        :return: True if the event will be delivered, False if the source
+                 may skip it
+        """
+        topic = self._topic_builder(source, *args, **kwargs)
+
+        if topic is None:
+            return True
+
+        return self.has_interest(topic)
+
+    def _resolve(self, topic: str) -> Tuple[Observer, ...]:
+        """
+        Returns all subscribers interested in the specified topic
+
+        :param topic: a topic of an event
+        :return: a tuple of subscribers, in order of their subscription
+        """
+        resolved = self._resolved.get(topic)
+
+        if resolved is not None:
+            return resolved
+
+        matched = set()
+
+        for observers in self._matcher.iter_matching(topic):
+            matched.update(observers)
+
+        resolved = tuple(
+            observer for observer in self._observers if observer in matched
+        )
+
+        if len(self._resolved) >= MAX_RESOLVED_TOPICS:
+            self._resolved.clear()
+
+        self._resolved[topic] = resolved
+
+        return resolved
 
     def _notify(self, event: Event) -> None:
         """
-        Sends the specified event to all subscribers of EventHub
+        Sends the specified event to all interested subscribers of EventHub
 
         :param event: an event to be broadcasted
         :return: None
         """
-        for observer in self._observers:
+        for observer in self._resolve(event.topic):
             observer.update(self, event)
 
-    def register_handler(self, source_type: Type, handler: Callable) -> None:
+    def _notify_batch(self, events: List[Event]) -> None:
+        """
+        Sends the specified events to all interested subscribers of
+        EventHub. Instances of BatchObserver receive all their events at
+        once
+
+        :param events: events to be broadcasted
+        :return: None
+        """
+        by_observer = dict()  # type: Dict[Observer, List[Event]]
+
+        for event in events:
+            for observer in self._resolve(event.topic):
+                by_observer.setdefault(observer, []).append(event)
+
+        for observer, observer_events in by_observer.items():
+            if isinstance(observer, BatchObserver):
+                observer.update_batch(self, observer_events)
+                continue
+
+            for event in observer_events:
+                observer.update(self, event)
+
+    def register_handler(
+            self, source_type: Type, handler: Callable,
+            topic_builder: Callable[..., str] = None
+    ) -> None:
         """
         Registers a handler method (converter) that will generate Event objects
         based on data sent by the specified type of source objects
@@ -93,6 +624,12 @@ class EventHub(Observer, Observable):
         :param source_type: a type of Observable events from which will be
                processed by the specified handler
         :param handler: a callable to process events from the specified sources
+        :param topic_builder: a callable to determine a topic of the event
+               from the same arguments without building of the event; used
+               by is_interested
         :return: None
         """
         self._converter.register(source_type, handler)
+
+        if topic_builder is not None:
+            self._topic_builder.register(source_type, topic_builder)
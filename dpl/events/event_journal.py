@@ -0,0 +1,447 @@
+"""
+This module contains a definition of EventJournal - of a bounded log of the
+recent events in the system. Each event receives a sequence number, so
+clients that missed some events are able to request all the events after
+the last one they have seen
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import uuid
+from collections import deque
+from typing import Deque, List, Mapping, Optional
+
+from .event import Event
+from .object_related_event import ObjectRelatedEvent
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class JournalEntry(object):
+    """
+    A single event saved in the journal
+    """
+    __slots__ = ('seq', 'timestamp', 'topic', 'body')
+
+    def __init__(
+            self, seq: int, timestamp: float, topic: str,
+            body: Optional[Mapping]
+    ):
+        """
+        Constructor
+
+        :param seq: a sequence number of the event
+        :param timestamp: the time of the event in UNIX time format
+        :param topic: a topic of the event
+        :param body: a DTO of a related object or None if there is no such
+               object (or if it was deleted)
+        """
+        self.seq = seq
+        self.timestamp = timestamp
+        self.topic = topic
+        self.body = body
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the entry to be saved to disk
+
+        :return: JSON-encoded entry
+        """
+        return json.dumps(
+            [self.seq, self.timestamp, self.topic, self.body]
+        ).encode('utf-8')
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'JournalEntry':
+        """
+        Deserializes the entry saved to disk
+
+        :param data: JSON-encoded entry
+        :return: a restored entry
+        """
+        seq, timestamp, topic, body = json.loads(data.decode('utf-8'))
+
+        return cls(seq=seq, timestamp=timestamp, topic=topic, body=body)
+
+
+class _Segment(object):
+    """
+    A single memory-mapped file with a sequence of journal entries. Each
+    entry is prefixed with its sequence number and length; a zero sequence
+    number marks the end of written entries
+    """
+    _HEADER = struct.Struct('>QI')
+
+    def __init__(self, path: str, size: int):
+        """
+        Constructor. Opens or creates the segment file
+
+        :param path: a path to the segment file
+        :param size: the size of a new segment file, bytes; existing files
+               are opened with their own size
+        """
+        self.path = path
+
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.truncate(size)
+
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self.first_seq = 0
+        self.last_seq = 0
+        self._write_pos = 0
+
+        for entry_pos, seq, length in self._iter_headers():
+            if not self.first_seq:
+                self.first_seq = seq
+
+            self.last_seq = seq
+            self._write_pos = entry_pos + self._HEADER.size + length
+
+    def _iter_headers(self):
+        """
+        Iterates over headers of all written entries
+
+        :return: an iterator of tuples with a position, a sequence number
+                 and a length of each entry
+        """
+        pos = 0
+        header_size = self._HEADER.size
+        size = len(self._map)
+
+        while pos + header_size <= size:
+            seq, length = self._HEADER.unpack_from(self._map, pos)
+
+            if not seq or pos + header_size + length > size:
+                return
+
+            yield pos, seq, length
+            pos += header_size + length
+
+    def append(self, seq: int, data: bytes) -> bool:
+        """
+        Writes a new entry to the segment
+
+        :param seq: a sequence number of the entry
+        :param data: serialized entry
+        :return: True if the entry was written, False if the segment is full
+        """
+        end = self._write_pos + self._HEADER.size + len(data)
+
+        if end > len(self._map):
+            return False
+
+        self._HEADER.pack_into(self._map, self._write_pos, seq, len(data))
+        self._map[self._write_pos + self._HEADER.size:end] = data
+        self._write_pos = end
+
+        if not self.first_seq:
+            self.first_seq = seq
+
+        self.last_seq = seq
+
+        return True
+
+    def read_since(self, last_seen: int) -> List[JournalEntry]:
+        """
+        Reads all the entries with sequence numbers greater than specified
+
+        :param last_seen: the last sequence number to be skipped
+        :return: a list of entries
+        """
+        header_size = self._HEADER.size
+
+        return [
+            JournalEntry.from_bytes(
+                self._map[pos + header_size:pos + header_size + length]
+            )
+            for pos, seq, length in self._iter_headers()
+            if seq > last_seen
+        ]
+
+    def close(self) -> None:
+        """
+        Closes the segment file
+
+        :return: None
+        """
+        self._map.close()
+        self._file.close()
+
+
+class EventJournal(object):
+    """
+    EventJournal assigns sequence numbers to all events and keeps the most
+    recent of them in a ring buffer of a fixed capacity. Optionally, events
+    are also written to a fixed number of memory-mapped segment files, so
+    a longer history is kept and sequence numbers survive restarts.
+
+    Each journal has a unique epoch identifier. Sequence numbers are
+    comparable only within the same epoch; a new epoch starts if the journal
+    was created from scratch (i.e. on each start of the journal without
+    segment files or if segment files were lost)
+    """
+    _EPOCH_FILE = 'epoch'
+    _SEGMENT_SUFFIX = '.seg'
+
+    def __init__(
+            self, capacity: int = 10000, segment_dir: str = None,
+            segment_size: int = 4 * 1024 * 1024, max_segments: int = 8,
+            epoch: str = None, last_seq: int = 0
+    ):
+        """
+        Constructor. Restores the journal from segment files if they are
+        present
+
+        :param capacity: the maximum number of events kept in memory
+        :param segment_dir: a path to the directory with segment files;
+               None if events must to be kept in memory only
+        :param segment_size: the size of each segment file, bytes
+        :param max_segments: the maximum number of segment files; the
+               oldest file is deleted when this limit is reached
+        :param epoch: an epoch of another journal this one mirrors (i.e. of
+               the journal in the core process for worker processes); a new
+               epoch is started if not specified. Ignored if segment files
+               are used
+        :param last_seq: the last sequence number of the mirrored journal
+        """
+        self._ring = deque(maxlen=capacity)  # type: Deque[JournalEntry]
+        self._segment_dir = segment_dir
+        self._segment_size = segment_size
+        self._max_segments = max_segments
+        self._segments = []  # type: List[_Segment]
+        self._last_seq = 0
+        self._epoch = None  # type: Optional[str]
+
+        if segment_dir is not None:
+            self._open_segments()
+
+        if self._epoch is None and epoch is not None:
+            self._epoch = epoch
+            self._last_seq = last_seq
+
+        if self._epoch is None:
+            self._epoch = uuid.uuid4().hex
+
+    @property
+    def epoch(self) -> str:
+        """
+        Returns a unique identifier of the journal epoch
+
+        :return: an identifier of the epoch
+        """
+        return self._epoch
+
+    @property
+    def last_seq(self) -> int:
+        """
+        Returns the sequence number of the last event
+
+        :return: the last sequence number; zero if there was no events
+        """
+        return self._last_seq
+
+    @property
+    def first_seq(self) -> int:
+        """
+        Returns the sequence number of the oldest available event
+
+        :return: the oldest available sequence number; the next sequence
+                 number if the journal is empty
+        """
+        if self._segments and self._segments[0].first_seq:
+            return self._segments[0].first_seq
+
+        if self._ring:
+            return self._ring[0].seq
+
+        return self._last_seq + 1
+
+    def restart(self, epoch: str, last_seq: int) -> None:
+        """
+        Forgets all the events and continues to mirror another journal from
+        the specified position. Used if some events of the mirrored journal
+        were missed, so events before this position are never replayed
+
+        :param epoch: the epoch of the mirrored journal
+        :param last_seq: the last sequence number of the mirrored journal
+        :return: None
+        :raises ValueError: if the journal keeps events in segment files
+        """
+        if self._segment_dir is not None:
+            raise ValueError(
+                "A journal with segment files can't be restarted"
+            )
+
+        self._ring.clear()
+        self._epoch = epoch
+        self._last_seq = last_seq
+
+    def append(self, event: Event) -> JournalEntry:
+        """
+        Assigns the next sequence number to the event and saves it. Events
+        which already have a sequence number (i.e. events mirrored from
+        another journal) keep it
+
+        :param event: an event to be saved
+        :return: a saved journal entry
+        """
+        if event.seq is None:
+            self._last_seq += 1
+            event.seq = self._last_seq
+        else:
+            self._last_seq = event.seq
+
+        body = None
+
+        if isinstance(event, ObjectRelatedEvent):
+            body = event.object_dto
+
+        entry = JournalEntry(
+            seq=self._last_seq, timestamp=event.timestamp,
+            topic=event.topic, body=body
+        )
+
+        self._ring.append(entry)
+
+        if self._segment_dir is not None:
+            self._write_to_segment(entry)
+
+        return entry
+
+    def read_since(self, last_seen: int) -> Optional[List[JournalEntry]]:
+        """
+        Returns all the events after the specified one
+
+        :param last_seen: a sequence number of the last seen event
+        :return: a list of events in order of their sequence numbers;
+                 None if some of the requested events are not available
+                 anymore (or if the sequence number is from the future)
+        """
+        if last_seen > self._last_seq or last_seen < 0:
+            return None
+
+        if last_seen == self._last_seq:
+            return []
+
+        ring = self._ring
+
+        if ring and ring[0].seq <= last_seen + 1:
+            offset = last_seen + 1 - ring[0].seq
+            return [ring[i] for i in range(offset, len(ring))]
+
+        result = []  # type: List[JournalEntry]
+
+        for segment in self._segments:
+            if segment.last_seq > last_seen:
+                result.extend(segment.read_since(last_seen))
+
+        if not result or result[0].seq != last_seen + 1:
+            return None
+
+        for i in range(1, len(result)):
+            if result[i].seq != result[i - 1].seq + 1:
+                # some entries were not saved to disk
+                return None
+
+        return result
+
+    def close(self) -> None:
+        """
+        Closes all the segment files
+
+        :return: None
+        """
+        for segment in self._segments:
+            segment.close()
+
+        self._segments.clear()
+
+    def _open_segments(self) -> None:
+        """
+        Opens existing segment files and restores the epoch and the last
+        sequence number
+
+        :return: None
+        """
+        os.makedirs(self._segment_dir, exist_ok=True)
+        epoch_path = os.path.join(self._segment_dir, self._EPOCH_FILE)
+
+        names = sorted(
+            name for name in os.listdir(self._segment_dir)
+            if name.endswith(self._SEGMENT_SUFFIX)
+        )
+
+        if names and os.path.exists(epoch_path):
+            with open(epoch_path) as f:
+                self._epoch = f.read().strip() or None
+
+        if self._epoch is None:
+            # the history can't be trusted without its epoch
+            for name in names:
+                os.remove(os.path.join(self._segment_dir, name))
+
+            names = []
+            self._epoch = uuid.uuid4().hex
+
+            with open(epoch_path, 'w') as f:
+                f.write(self._epoch)
+
+        for name in names:
+            segment = _Segment(
+                os.path.join(self._segment_dir, name), self._segment_size
+            )
+
+            if not segment.first_seq:
+                segment.close()
+                os.remove(segment.path)
+                continue
+
+            self._segments.append(segment)
+            self._last_seq = max(self._last_seq, segment.last_seq)
+
+        LOGGER.debug(
+            "Event journal restored from %d segments, last seq: %d",
+            len(self._segments), self._last_seq
+        )
+
+    def _write_to_segment(self, entry: JournalEntry) -> None:
+        """
+        Writes the entry to the current segment file. Starts a new segment
+        if the current one is full, deletes the oldest segments
+
+        :param entry: an entry to be written
+        :return: None
+        """
+        data = entry.to_bytes()
+
+        if self._segments and self._segments[-1].append(entry.seq, data):
+            return
+
+        segment = _Segment(
+            os.path.join(
+                self._segment_dir,
+                '%020d%s' % (entry.seq, self._SEGMENT_SUFFIX)
+            ),
+            self._segment_size
+        )
+
+        if not segment.append(entry.seq, data):
+            LOGGER.warning(
+                "Event #%d is too big to be saved to the journal segment",
+                entry.seq
+            )
+            segment.close()
+            os.remove(segment.path)
+            return
+
+        self._segments.append(segment)
+
+        while len(self._segments) > self._max_segments:
+            oldest = self._segments.pop(0)
+            oldest.close()
+            os.remove(oldest.path)
@@ -3,7 +3,7 @@ This module contains a definition of ObjectRelatedEvent - a class for events
 that are related to some objects (i.e. to their creation, deletion or
 modification).
 """
-from typing import Optional
+from typing import Callable, Optional
 
 from dpl.dtos.base_dto import BaseDto
 from .event import Event
@@ -13,7 +13,11 @@ class ObjectRelatedEvent(Event):
     """
     Contains information about an event that happened with some object
     """
-    def __init__(self, topic: str, object_dto: Optional[BaseDto]):
+    def __init__(
+            self, topic: str, object_dto: Optional[BaseDto] = None,
+            timestamp: float = None,
+            dto_factory: Callable[[], Optional[BaseDto]] = None
+    ):
         """
         Constructor. Receives information about a topic of event (constructed
         like ``object_category/object_id/what_changed`` and an object DTO -
@@ -22,9 +26,14 @@ class ObjectRelatedEvent(Event):
         :param topic: a topic (category) of this Event
         :param object_dto: a current state of an object or None if it was
                deleted
+        :param timestamp: a time moment when this Event was generated; the
+               current time by default
+        :param dto_factory: a function to build the DTO of an object on the
+               first access to it; used instead of object_dto if specified
         """
-        super().__init__(topic)
+        super().__init__(topic, timestamp)
         self._object_dto = object_dto
+        self._dto_factory = dto_factory
 
     @property
     def object_dto(self) -> Optional[BaseDto]:
@@ -32,7 +41,15 @@ class ObjectRelatedEvent(Event):
         Returns the current DTO (representation) of the object this Event is
         related to
 
+        If the Event was created with a DTO factory, then the DTO is built on
+        the first access and cached, so it reflects the state of the object
+        at the moment of the first access and not at the moment of the Event
+
         :return: the current DTO (representation) of the object this Event is
                  related to
         """
+        if self._dto_factory is not None:
+            self._object_dto = self._dto_factory()
+            self._dto_factory = None
+
         return self._object_dto
@@ -0,0 +1,446 @@
+"""
+This module contains definitions of TopicTree - of a wildcard-aware tree of
+topic patterns - and of FrozenTopicTree, its immutable counterpart
+"""
+from itertools import chain
+from typing import (
+    Dict, List, Optional, Tuple, Hashable, Any, Iterator, Mapping
+)
+
+from .topic import topic_to_list
+
+
+def _rehash(
+        chunks: List[Dict[Hashable, Any]], chunk_count: int
+) -> List[Dict[Hashable, Any]]:
+    """
+    Redistributes keys and values of _FrozenMap over the specified number of
+    chunks
+
+    :param chunks: current chunks of the mapping
+    :param chunk_count: a new number of chunks, a power of two
+    :return: a list of new chunks
+    """
+    mask = chunk_count - 1
+    result = [dict() for _ in range(chunk_count)]
+
+    for chunk in chunks:
+        for key, value in chunk.items():
+            result[hash(key) & mask][key] = value
+
+    return result
+
+
+class _FrozenMap(Mapping):
+    """
+    An immutable mapping used for values of FrozenTopicTree. Keys are
+    spread by their hashes over a number of chunks which is kept close to the
+    square root of the number of keys. An updated version of the mapping
+    shares all the unchanged chunks with the original one, so an update
+    copies O(sqrt(n)) and not O(n) items. A plain dict with all the items is
+    built on the first lookup and is cached until the next update
+    """
+    __slots__ = ('chunks', '_size', '_dict')
+
+    def __init__(
+            self, chunks: List[Dict[Hashable, Any]] = None, size: int = 0
+    ):
+        """
+        Constructor. Initializes an empty mapping if no arguments are passed
+
+        :param chunks: chunks of the mapping, for internal use only
+        :param size: the number of keys, for internal use only
+        """
+        self.chunks = chunks if chunks is not None else [dict()]
+        self._size = size
+        self._dict = None  # type: Optional[Dict[Hashable, Any]]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, key: Hashable) -> Any:
+        chunks = self.chunks
+        return chunks[hash(key) & (len(chunks) - 1)][key]
+
+    def __contains__(self, key: Hashable) -> bool:
+        chunks = self.chunks
+        return key in chunks[hash(key) & (len(chunks) - 1)]
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return chain.from_iterable(self.chunks)
+
+    def as_dict(self) -> Dict[Hashable, Any]:
+        """
+        Returns a plain dict with all keys and values of this mapping. The
+        dict is shared between all callers and must not be modified
+
+        :return: a dict with the same content
+        """
+        if self._dict is None:
+            result = {}  # type: Dict[Hashable, Any]
+
+            for chunk in self.chunks:
+                result.update(chunk)
+
+            self._dict = result
+
+        return self._dict
+
+    def _updated(
+            self, index: int, chunk: Dict[Hashable, Any], size: int
+    ) -> '_FrozenMap':
+        """
+        Returns a new mapping where the specified chunk is replaced. Changes
+        the number of chunks if the number of keys went too far from the
+        square of the number of chunks
+
+        :param index: an index of the chunk to be replaced
+        :param chunk: the new content of the chunk
+        :param size: the new number of keys
+        :return: an updated mapping
+        """
+        chunks = list(self.chunks)
+        chunks[index] = chunk
+        chunk_count = len(chunks)
+
+        if size > 4 * chunk_count * chunk_count:
+            chunks = _rehash(chunks, chunk_count * 2)
+        elif chunk_count > 1 and 4 * size < chunk_count * chunk_count:
+            chunks = _rehash(chunks, chunk_count // 2)
+
+        return _FrozenMap(chunks, size)
+
+    def with_item(self, key: Hashable, value: Any) -> '_FrozenMap':
+        """
+        Returns a new mapping where the key is associated with the value
+
+        :param key: a key to be saved
+        :param value: a value to be saved for this key
+        :return: an updated mapping
+        """
+        index = hash(key) & (len(self.chunks) - 1)
+        chunk = dict(self.chunks[index])
+        size = self._size if key in chunk else self._size + 1
+        chunk[key] = value
+
+        return self._updated(index, chunk, size)
+
+    def without(self, key: Hashable) -> '_FrozenMap':
+        """
+        Returns a new mapping without the specified key
+
+        :param key: a key to be removed
+        :return: an updated mapping; the same mapping if there was no such
+                 key
+        """
+        index = hash(key) & (len(self.chunks) - 1)
+
+        if key not in self.chunks[index]:
+            return self
+
+        chunk = dict(self.chunks[index])
+        del chunk[key]
+
+        return self._updated(index, chunk, self._size - 1)
+
+
+class _Node(object):
+    """
+    A single node of TopicTree. Contains references to child nodes and values
+    associated with a topic pattern which ends on this node
+    """
+    __slots__ = ('children', 'values')
+
+    def __init__(self, values: Mapping[Hashable, Any] = None):
+        """
+        Constructor. Initializes an empty node
+
+        :param values: an empty container of values to be used; a dict is
+               used if not specified
+        """
+        self.children = {}  # type: Dict[str, _Node]
+        self.values = values if values is not None else {}
+
+    def is_empty(self) -> bool:
+        """
+        Checks if this node has neither children nor values
+
+        :return: True if this node can be removed from a tree
+        """
+        return not self.children and not self.values
+
+    def copy(self) -> '_Node':
+        """
+        Creates a shallow copy of this node: child nodes and values are
+        shared with the copy, a container of children is not. Used only by
+        FrozenTopicTree, where values are immutable
+
+        :return: a copy of this node
+        """
+        result = _Node(self.values)
+        result.children = dict(self.children)
+
+        return result
+
+
+class _BaseTopicTree(object):
+    """
+    A base class of topic trees which implements lookups of patterns
+    """
+    def __init__(self, root: _Node = None):
+        """
+        Constructor
+
+        :param root: the root node of the tree; an empty tree is created
+               if not specified
+        """
+        self._root = root if root is not None else _Node()
+
+    def iter_matching(self, topic: str) -> Iterator[Mapping[Hashable, Any]]:
+        """
+        Iterates over the mappings of keys and values for all patterns that
+        match the specified topic. The same key may be present in several
+        mappings if it was associated with several matching patterns
+
+        :param topic: a topic to be matched, must not contain wildcards
+        :return: an iterator over the key-value mappings
+        """
+        parts = topic_to_list(topic)
+        parts_count = len(parts)
+
+        # a stack of (node, index of the next topic part) pairs to be visited
+        stack = [(self._root, 0)]
+
+        while stack:
+            node, index = stack.pop()
+
+            if index == parts_count:
+                if node.values:
+                    yield node.values
+                continue
+
+            children = node.children
+
+            hash_node = children.get('#')
+
+            if hash_node is not None and hash_node.values:
+                yield hash_node.values
+
+            plus_node = children.get('+')
+
+            if plus_node is not None:
+                stack.append((plus_node, index + 1))
+
+            exact_node = children.get(parts[index])
+
+            if exact_node is not None:
+                stack.append((exact_node, index + 1))
+
+    def has_matching(self, topic: str) -> bool:
+        """
+        Checks if there is at least one pattern that matches the
+        specified topic
+
+        :param topic: a topic to be matched, must not contain wildcards
+        :return: True if there is a matching pattern, False otherwise
+        """
+        for _ in self.iter_matching(topic):
+            return True
+
+        return False
+
+    def is_empty(self) -> bool:
+        """
+        Checks if there is no patterns stored in the tree
+
+        :return: True if the tree is empty, False otherwise
+        """
+        return self._root.is_empty()
+
+
+class TopicTree(_BaseTopicTree):
+    """
+    TopicTree stores topic patterns in a form of a single shared tree. Topic
+    patterns may contain wildcards: ``+`` (any name on a single level of
+    hierarchy) and ``#`` (any topics below the specified level of hierarchy;
+    allowed only as the last part of a pattern).
+
+    Each pattern is associated with a mapping of keys (like identifiers of
+    subscribers) to values (like subscription parameters). A single walk
+    through the tree finds all the patterns that match the specified topic,
+    so the cost of a lookup is proportional to the number of matching
+    patterns and not to the total number of stored patterns
+    """
+    def __init__(self):
+        """
+        Constructor. Initializes an empty tree
+        """
+        super().__init__()
+
+    def add(self, pattern: str, key: Hashable, value: Any = None) -> None:
+        """
+        Associates the specified key and value with the specified topic
+        pattern. Overrides a value if such key was already associated with
+        this pattern
+
+        :param pattern: a topic pattern, may contain wildcards
+        :param key: a key to be associated with this pattern
+        :param value: a value to be saved for this key
+        :return: None
+        """
+        p_current = self._root
+
+        for part in topic_to_list(pattern):
+            p_next = p_current.children.get(part)
+
+            if p_next is None:
+                p_next = _Node()
+                p_current.children[part] = p_next
+
+            p_current = p_next
+
+        p_current.values[key] = value
+
+    def remove(self, pattern: str, key: Hashable) -> bool:
+        """
+        Removes an association between the specified topic pattern and key.
+        Removes all the tree nodes that became empty
+
+        :param pattern: a topic pattern, may contain wildcards
+        :param key: a key associated with this pattern
+        :return: True if such association was found and removed,
+                 False otherwise
+        """
+        # this list contains a chain of tree nodes, will be used for
+        # backward traversal and node removal
+        chain = list()  # type: List[Tuple[_Node, str]]
+
+        p_current = self._root
+
+        for part in topic_to_list(pattern):
+            p_next = p_current.children.get(part)
+
+            if p_next is None:
+                return False
+
+            chain.append((p_current, part))
+            p_current = p_next
+
+        if key not in p_current.values:
+            return False
+
+        del p_current.values[key]
+
+        for container, part in reversed(chain):
+            if not container.children[part].is_empty():
+                break
+
+            del container.children[part]
+
+        return True
+
+
+class FrozenTopicTree(_BaseTopicTree):
+    """
+    FrozenTopicTree is an immutable version of TopicTree. Each update
+    returns a new tree which shares all the unchanged nodes with the
+    original one, so only the nodes on the path to the updated pattern are
+    copied. The original tree stays valid and unchanged, so it can be read
+    at any moment without locks (i.e. while another version of the tree is
+    being built)
+
+    Values of each pattern are kept in an immutable mapping which is shared
+    between versions of the tree in the same way, so adding or removing a
+    key doesn't copy all the other keys associated with the same pattern
+    """
+    def __init__(self, root: _Node = None):
+        """
+        Constructor
+
+        :param root: the root node of the tree; an empty tree is created
+               if not specified
+        """
+        super().__init__(root if root is not None else _Node(_FrozenMap()))
+
+    def iter_matching(self, topic: str) -> Iterator[Mapping[Hashable, Any]]:
+        """
+        Iterates over the mappings of keys and values for all patterns that
+        match the specified topic. Returned mappings are shared with other
+        callers and must not be modified
+
+        :param topic: a topic to be matched, must not contain wildcards
+        :return: an iterator over the key-value mappings
+        """
+        for values in super().iter_matching(topic):
+            yield values.as_dict()
+    def with_added(
+            self, pattern: str, key: Hashable, value: Any = None
+    ) -> 'FrozenTopicTree':
+        """
+        Returns a new tree where the specified key and value are associated
+        with the specified topic pattern
+
+        :param pattern: a topic pattern, may contain wildcards
+        :param key: a key to be associated with this pattern
+        :param value: a value to be saved for this key
+        :return: an updated tree
+        """
+        root = self._root.copy()
+        p_current = root
+
+        for part in topic_to_list(pattern):
+            p_next = p_current.children.get(part)
+            p_next = p_next.copy() if p_next is not None else _Node(
+                _FrozenMap()
+            )
+            p_current.children[part] = p_next
+            p_current = p_next
+
+        p_current.values = p_current.values.with_item(key, value)
+
+        return FrozenTopicTree(root)
+
+    def with_removed(
+            self, pattern: str, key: Hashable
+    ) -> 'FrozenTopicTree':
+        """
+        Returns a new tree without an association between the specified
+        topic pattern and key. Nodes that became empty are not included
+        into the new tree
+
+        :param pattern: a topic pattern, may contain wildcards
+        :param key: a key associated with this pattern
+        :return: an updated tree; the same tree if there was no such
+                 association
+        """
+        parts = topic_to_list(pattern)
+        p_current = self._root  # type: Optional[_Node]
+
+        for part in parts:
+            p_current = p_current.children.get(part)
+
+            if p_current is None:
+                return self
+
+        if key not in p_current.values:
+            return self
+
+        root = self._root.copy()
+        chain = []  # type: List[Tuple[_Node, str]]
+        p_current = root
+
+        for part in parts:
+            p_next = p_current.children[part].copy()
+            p_current.children[part] = p_next
+            chain.append((p_current, part))
+            p_current = p_next
+
+        p_current.values = p_current.values.without(key)
+
+        for container, part in reversed(chain):
+            if not container.children[part].is_empty():
+                break
+
+            del container.children[part]
+
+        return FrozenTopicTree(root)
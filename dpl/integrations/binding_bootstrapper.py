@@ -131,3 +131,17 @@ class BindingBootstrapper(object):
             )
 
             self._things.add(thing_instance)
+
+            try:
+                publish_policy = item.publish_policy
+            except ValueError as e:
+                LOGGER.warning(
+                    "Invalid publish policy of thing \"%s\", all updates "
+                    "will be published: %s", item.domain_id, e
+                )
+                publish_policy = None
+
+            if publish_policy is not None:
+                self._things.set_publish_policy(
+                    item.domain_id, publish_policy
+                )
@@ -1,9 +1,12 @@
 import weakref
-from typing import Optional, Sequence, MutableSequence, MutableSet
+from typing import Dict, Optional, Sequence, MutableSequence, MutableSet
 
 from dpl.utils.observer import Observer
 from dpl.model.domain_id import TDomainId
 from dpl.things.thing import Thing
+from dpl.things.publish_gate import PublishGate
+from dpl.settings.publish_policy import PublishPolicy
+from dpl.utils.stage_timing import STAGE_TIMINGS, REPOSITORY
 from .base_repository import BaseRepository
 from dpl.repos.observable_repository import RepositoryEventType
 from dpl.repos.abs_thing_repository import AbsThingRepository
@@ -16,6 +19,7 @@ class ThingRepository(BaseRepository[Thing], AbsThingRepository):
     def __init__(self):
         super().__init__()
         self._observers = set()  # type: MutableSet[Observer]
+        self._publish_gates = dict()  # type: Dict[TDomainId, PublishGate]
         self._weak_self = weakref.proxy(self)
 
     def add(self, new_obj: Thing) -> None:
@@ -46,9 +50,54 @@ class ThingRepository(BaseRepository[Thing], AbsThingRepository):
         """
         thing = self.load(domain_id)
         thing.on_update = None
+        self._close_publish_gate(domain_id)
         super().delete(domain_id)
         self._notify_deleted(thing_id=domain_id)
 
+    def set_publish_policy(
+            self, domain_id: TDomainId, policy: Optional[PublishPolicy]
+    ) -> None:
+        """
+        Sets a policy which limits the rate of notifications about
+        updates of the specified Thing. Updates are filtered by
+        a PublishGate placed between the Thing and this Repository.
+        The state of the Thing itself is never affected by the policy
+
+        :param domain_id: an identifier of a stored Thing
+        :param policy: a policy to be enforced or None to notify
+               about each update of the Thing
+        :return: None
+        """
+        thing = self.load(domain_id)
+        old_gate = self._publish_gates.get(domain_id)
+
+        if old_gate is not None:
+            # a delayed update must not be lost
+            old_gate.flush()
+
+        self._close_publish_gate(domain_id)
+
+        if policy is None:
+            thing.on_update = self._thing_modified_callback
+            return
+
+        gate = PublishGate(policy, self._thing_modified_callback)
+        self._publish_gates[domain_id] = gate
+        thing.on_update = gate
+
+    def _close_publish_gate(self, domain_id: TDomainId) -> None:
+        """
+        Cancels delayed notifications of the specified Thing and
+        forgets its PublishGate if there is any
+
+        :param domain_id: an identifier of a stored Thing
+        :return: None
+        """
+        gate = self._publish_gates.pop(domain_id, None)
+
+        if gate is not None:
+            gate.close()
+
     def _notify_added(self, thing: Thing) -> None:
         """
         Notifies all Observers that the specified Thing was added to this Repo
@@ -84,6 +133,21 @@ class ThingRepository(BaseRepository[Thing], AbsThingRepository):
         :param thing: an instance of Thing that was modified
         :return: None
         """
+        if STAGE_TIMINGS.enabled:
+            # the trace starts at the moment of the update of the Thing
+            STAGE_TIMINGS.call_traced(
+                self._notify_modified, thing, REPOSITORY, thing.last_updated
+            )
+        else:
+            self._notify_modified(thing)
+
+    def _notify_modified(self, thing: Thing) -> None:
+        """
+        Notifies all Observers that the specified Thing was modified
+
+        :param thing: an instance of a Thing that was modified
+        :return: None
+        """
         self._notify(
             object_id=thing.domain_id,
             event_type=RepositoryEventType.modified,
@@ -104,7 +104,8 @@ class DbMapper(object):
             sa.Column('_con_id', sa.String(32), sa.ForeignKey("connection_settings._domain_id"), nullable=False),
             sa.Column('_con_params', sa.ext.mutable.MutableDict.as_mutable(JSONEncodedDict)),
             sa.Column('_friendly_name', sa.String(50), nullable=True),
-            sa.Column('_placement_id', sa.String(32), sa.ForeignKey("placements._domain_id"), nullable=True)
+            sa.Column('_placement_id', sa.String(32), sa.ForeignKey("placements._domain_id"), nullable=True),
+            sa.Column('_publish_policy', JSONEncodedDict, nullable=True)
         )
 
     def init_mappers(self) -> None:
@@ -130,6 +131,38 @@ class DbMapper(object):
         """
         self.metadata.create_all(bind=bind)
 
+    def add_missing_columns(self, bind: sa.engine.Connectable) -> None:
+        """
+        Adds nullable columns which were introduced after the
+        creation of existing tables (like _publish_policy of
+        thing_settings) to these tables
+
+        :param bind: an instance of connectable for which
+               the tables must be upgraded
+        :return: None
+        """
+        inspector = sa.inspect(bind)
+        existing_tables = inspector.get_table_names()
+
+        for table in self.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {
+                column['name'] for column in inspector.get_columns(table.name)
+            }
+
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+
+                bind.execute(
+                    'ALTER TABLE %s ADD COLUMN %s %s' % (
+                        table.name, column.name,
+                        column.type.compile(dialect=bind.dialect)
+                    )
+                )
+
     def drop_all_tables(self, bind: sa.engine.Connectable) -> None:
         """
         Calls drop_all on the stored metadata. Drops all
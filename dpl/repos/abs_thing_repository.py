@@ -2,6 +2,7 @@ from typing import Optional
 
 from .observable_repository import ObservableRepository, TDomainId
 from dpl.things import Thing
+from dpl.settings.publish_policy import PublishPolicy
 
 
 class AbsThingRepository(ObservableRepository[Thing]):
@@ -36,3 +37,18 @@ class AbsThingRepository(ObservableRepository[Thing]):
                  specified connection
         """
         raise NotImplementedError()
+
+    def set_publish_policy(
+            self, domain_id: TDomainId, policy: Optional[PublishPolicy]
+    ) -> None:
+        """
+        Sets a policy which limits the rate of notifications about
+        updates of the specified Thing. The state of the Thing
+        itself is never affected by the policy
+
+        :param domain_id: an identifier of a stored Thing
+        :param policy: a policy to be enforced or None to notify
+               about each update of the Thing
+        :return: None
+        """
+        raise NotImplementedError()
@@ -6,7 +6,7 @@ some settings from config files into the database
 # Include standard modules
 import os
 import argparse
-from typing import Mapping, Any
+from typing import Mapping, Any, Optional
 
 # Include 3rd-party modules
 from sqlalchemy import create_engine
@@ -19,6 +19,7 @@ from dpl.core.controller import DEFAULT_CONFIG_DIR, CONFIG_NAME, MAIN_DB_NAME
 from dpl.placements.placement_bootstrapper import PlacementBootstrapper
 
 from dpl.settings.thing_settings import ThingSettings
+from dpl.settings.publish_policy import PublishPolicy
 from dpl.settings.connection_settings import ConnectionSettings
 
 from dpl.repo_impls.sql_alchemy.db_session_manager import DbSessionManager
@@ -66,10 +67,31 @@ def thing_settings_deserialize(mapping_settings: Mapping[str, Any]) -> ThingSett
         con_params=mapping_settings['con_params'],
         # Optional parameters
         friendly_name=mapping_settings.get('friendly_name'),
-        placement_id=mapping_settings.get('placement')
+        placement_id=mapping_settings.get('placement'),
+        publish_policy=_publish_policy_deserialize(
+            mapping_settings.get('publish_policy')
+        )
     )
 
 
+def _publish_policy_deserialize(
+        mapping_policy: Optional[Mapping[str, Any]]
+) -> Optional[PublishPolicy]:
+    """
+    Converts an optional publish policy of a thing from
+    a dict-based format to an instance of PublishPolicy
+
+    :param mapping_policy: a publish policy stored as
+           a mapping (dict) or None if it wasn't specified
+    :return: a corresponding instance of PublishPolicy or
+             None
+    """
+    if mapping_policy is None:
+        return None
+
+    return PublishPolicy.from_dict(mapping_policy)
+
+
 def main():
     arg_parser = argparse.ArgumentParser(
         description='everpl configuration migration utility'
@@ -1,7 +1,7 @@
 import weakref
-from typing import TypeVar, MutableSet, Optional, Generic
+from typing import TypeVar, MutableSet, Optional, Generic, Callable
 
-from dpl.utils.observer import Observer
+from dpl.utils.observer import Observer, SelectiveObserver
 from dpl.dtos.base_dto import BaseDto
 from dpl.model.domain_id import TDomainId
 from dpl.model.base_entity import BaseEntity
@@ -47,24 +47,58 @@ class BaseObservableService(
         """
         self._observers.discard(observer)
 
+    def _is_observed(
+            self, object_id: TDomainId, event_type: ServiceEventType
+    ) -> bool:
+        """
+        Checks if any of the subscribers is interested in the specified
+        change of an object. Subscribers which don't implement
+        SelectiveObserver are considered to be interested in everything
+
+        :param object_id: an identifier of an altered object
+        :param event_type: enum value, specifies what happened to the object
+        :return: True if there is an interested subscriber, False otherwise
+        """
+        for o in self._observers:
+            if not isinstance(o, SelectiveObserver):
+                return True
+
+            if o.is_interested(
+                source=self._weak_self,
+                event_type=event_type,
+                object_id=object_id
+            ):
+                return True
+
+        return False
+
     def _notify(
             self, object_id: TDomainId, event_type: ServiceEventType,
-            object_dto: Optional[TEntityDto]
+            object_dto: Optional[TEntityDto] = None,
+            dto_factory: Callable[[], Optional[TEntityDto]] = None
     ) -> None:
         """
         Notifies all of the subscribers that an object, controlled by this
-        Service, was modified, added to or deleted from the system
+        Service, was modified, added to or deleted from the system. Does
+        nothing if none of the subscribers is interested in this change
 
         :param object_id: an identifier of an altered object
         :param event_type: enum value, specifies what happened to the object
         :param object_dto: a DTO of the altered object or None if it was
                deleted
+        :param dto_factory: a function to build a DTO of the altered object
+               on demand; passed to subscribers instead of object_dto if
+               specified, so the DTO is built only if it's needed
         :return: None
         """
+        if not self._is_observed(object_id, event_type):
+            return
+
         for o in self._observers:
             o.update(
                 source=self._weak_self,
                 event_type=event_type,
                 object_id=object_id,
-                object_dto=object_dto
+                object_dto=object_dto,
+                dto_factory=dto_factory
             )
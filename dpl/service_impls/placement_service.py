@@ -1,3 +1,4 @@
+import functools
 import uuid
 from typing import Optional
 
@@ -104,7 +105,7 @@ class PlacementService(
         self._notify(
             object_id=domain_id,
             event_type=ServiceEventType.added,
-            object_dto=build_dto(new_placement)
+            dto_factory=functools.partial(build_dto, new_placement)
         )
 
         return domain_id
@@ -133,7 +134,7 @@ class PlacementService(
         self._notify(
             object_id=placement_id,
             event_type=ServiceEventType.modified,
-            object_dto=build_dto(placement)
+            dto_factory=functools.partial(build_dto, placement)
         )
 
     def change_image_url(self, placement_id: TDomainId, new_image_url: Optional[str]) -> None:
@@ -161,5 +162,5 @@ class PlacementService(
         self._notify(
             object_id=placement_id,
             event_type=ServiceEventType.modified,
-            object_dto=build_dto(placement)
+            dto_factory=functools.partial(build_dto, placement)
         )
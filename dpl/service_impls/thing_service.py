@@ -1,3 +1,4 @@
+import functools
 import weakref
 from typing import Optional, Mapping, Any, Callable
 
@@ -10,6 +11,7 @@ from dpl.integrations.base_things import (
 from dpl.things.capabilities import Actuator
 from dpl.dtos.thing_dto import ThingDto
 from dpl.dtos.dto_builder import build_dto
+from dpl.utils.stage_timing import STAGE_TIMINGS, SERVICE, DTO_BUILD
 from dpl.services.abs_thing_service import (
     AbsThingService,
     ServiceEntityResolutionError,
@@ -91,14 +93,23 @@ class ThingService(BaseObservableService[Thing, ThingDto], AbsThingService):
         service_event_type = ServiceEventType(event_type.value)
 
         if service_event_type is ServiceEventType.deleted:
-            thing_dto = None
+            dto_factory = None
         else:
-            thing_dto = build_dto(object_ref)
+            # the DTO is built only if some subscriber will access it
+            dto_factory = functools.partial(build_dto, object_ref)
+
+        trace = STAGE_TIMINGS.current
+
+        if trace is not None:
+            trace.mark(SERVICE)
+
+            if dto_factory is not None:
+                dto_factory = STAGE_TIMINGS.timed(DTO_BUILD, dto_factory)
 
         self._notify(
             object_id=object_id,
             event_type=service_event_type,
-            object_dto=thing_dto
+            dto_factory=dto_factory
         )
 
     def view(self, domain_id: TDomainId) -> ThingDto:
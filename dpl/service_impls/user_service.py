@@ -1,3 +1,4 @@
+import functools
 import uuid
 
 from dpl.model.domain_id import TDomainId
@@ -110,7 +111,7 @@ class UserService(
         self._notify(
             object_id=user.domain_id,
             event_type=ServiceEventType.added,
-            object_dto=build_dto(user)
+            dto_factory=functools.partial(build_dto, user)
         )
 
         return user.domain_id
@@ -172,7 +173,7 @@ class UserService(
         self._notify(
             object_id=of_user,
             event_type=ServiceEventType.modified,
-            object_dto=build_dto(user)
+            dto_factory=functools.partial(build_dto, user)
         )
 
     def change_password(self, of_user: TDomainId, old_password: str, new_password: str) -> None:
@@ -1,4 +1,4 @@
-from typing import TypeVar, Optional, Generic
+from typing import TypeVar, Optional, Generic, Callable
 from enum import Enum
 
 from dpl.model.domain_id import TDomainId
@@ -27,7 +27,8 @@ class ObservableService(AbsEntityService[T], Observable):
     """
     def _notify(
             self, object_id: TDomainId, event_type: ServiceEventType,
-            object_dto: Optional[T]
+            object_dto: Optional[T] = None,
+            dto_factory: Callable[[], Optional[T]] = None
     ) -> None:
         """
         Notifies all of the subscribers that an object, controlled by this
@@ -37,6 +38,9 @@ class ObservableService(AbsEntityService[T], Observable):
         :param event_type: enum value, specifies what happened to the object
         :param object_dto: a DTO of the altered object or None if it was
                deleted
+        :param dto_factory: a function to build a DTO of the altered object
+               on demand; passed to subscribers instead of object_dto if
+               specified
         :return: None
         """
         raise NotImplementedError()
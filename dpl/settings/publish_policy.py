@@ -0,0 +1,247 @@
+"""
+This module contains definitions of PublishPolicy and Deadband - of rules
+which define what updates of a Thing are worth to be published to the rest
+of the system
+"""
+from numbers import Real
+from typing import Any, Dict, Mapping, Optional
+
+
+class Deadband(object):
+    """
+    Deadband defines the minimal change of a numeric field which is worth to
+    be published. A change is ignored if it exceeds neither the absolute
+    band nor the band relative to the last published value
+    """
+    __slots__ = ('_absolute', '_relative')
+
+    def __init__(self, absolute: float = 0, relative: float = 0):
+        """
+        Constructor
+
+        :param absolute: the maximum ignored absolute change of the value
+        :param relative: the maximum ignored change of the value as
+               a fraction of the last published value (i.e. 0.01 for 1%)
+        :raises ValueError: if any of the bands is negative
+        """
+        if absolute < 0 or relative < 0:
+            raise ValueError("Deadband values must to be non-negative")
+
+        self._absolute = absolute
+        self._relative = relative
+
+    @property
+    def absolute(self) -> float:
+        """
+        Returns the maximum ignored absolute change of the value
+
+        :return: the absolute band
+        """
+        return self._absolute
+
+    @property
+    def relative(self) -> float:
+        """
+        Returns the maximum ignored change of the value relative to the
+        last published value
+
+        :return: the relative band as a fraction of one
+        """
+        return self._relative
+
+    def is_exceeded(self, published: Real, current: Real) -> bool:
+        """
+        Checks if the change of the value is worth to be published
+
+        :param published: the last published value
+        :param current: the current value
+        :return: True if the change exceeds the band, False otherwise
+        """
+        band = max(self._absolute, self._relative * abs(published))
+
+        return abs(current - published) > band
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'Deadband':
+        """
+        Builds a Deadband from its dict-based representation
+
+        :param data: a mapping with optional 'absolute' and 'relative' keys
+        :return: an instance of Deadband
+        :raises ValueError: if the mapping contains unknown keys or invalid
+                values
+        """
+        unknown = set(data) - {'absolute', 'relative'}
+
+        if unknown:
+            raise ValueError(
+                "Unknown deadband parameters: %s" % ', '.join(sorted(unknown))
+            )
+
+        return cls(
+            absolute=_get_number(data, 'absolute'),
+            relative=_get_number(data, 'relative')
+        )
+
+    def to_dict(self) -> Dict[str, float]:
+        """
+        Returns a dict-based representation of the Deadband
+
+        :return: a dict with non-zero bands
+        """
+        result = {}
+
+        if self._absolute:
+            result['absolute'] = self._absolute
+
+        if self._relative:
+            result['relative'] = self._relative
+
+        return result
+
+
+class PublishPolicy(object):
+    """
+    PublishPolicy limits the rate of updates of a Thing:
+
+    - min_interval is the minimal time between two published updates; the
+      latest state is published at the end of the interval if there was an
+      update within it;
+    - max_interval is the time after which an update is published even if
+      it's ignored by deadbands (a heartbeat);
+    - deadbands define the minimal changes of numeric fields (like
+      'temperature_c' or 'value') which are worth to be published.
+
+    Zero intervals mean no limits
+    """
+    __slots__ = ('_min_interval', '_max_interval', '_deadbands')
+
+    def __init__(
+            self, min_interval: float = 0, max_interval: float = 0,
+            deadbands: Mapping[str, Deadband] = None
+    ):
+        """
+        Constructor
+
+        :param min_interval: the minimal time between two published
+               updates, seconds
+        :param max_interval: the maximal time between two published updates
+               if updates keep coming, seconds
+        :param deadbands: a mapping of names of numeric fields to their
+               deadbands
+        :raises ValueError: if the intervals are negative or inconsistent
+        """
+        if min_interval < 0 or max_interval < 0:
+            raise ValueError("Publish intervals must to be non-negative")
+
+        if max_interval and max_interval < min_interval:
+            raise ValueError(
+                "max_interval must to be greater than min_interval"
+            )
+
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._deadbands = dict(deadbands or {})  # type: Dict[str, Deadband]
+
+    @property
+    def min_interval(self) -> float:
+        """
+        Returns the minimal time between two published updates
+
+        :return: the interval, seconds; zero if not limited
+        """
+        return self._min_interval
+
+    @property
+    def max_interval(self) -> float:
+        """
+        Returns the maximal time between two published updates
+
+        :return: the interval, seconds; zero if there is no heartbeat
+        """
+        return self._max_interval
+
+    @property
+    def deadbands(self) -> Mapping[str, Deadband]:
+        """
+        Returns deadbands of numeric fields
+
+        :return: a mapping of field names to their deadbands
+        """
+        return self._deadbands
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'PublishPolicy':
+        """
+        Builds a PublishPolicy from its dict-based representation, like::
+
+            {
+                "min_interval": 1,
+                "max_interval": 300,
+                "deadbands": {
+                    "temperature_c": {"absolute": 0.1},
+                    "value": {"relative": 0.01}
+                }
+            }
+
+        :param data: a dict-based representation of the policy
+        :return: an instance of PublishPolicy
+        :raises ValueError: if the mapping contains unknown keys or invalid
+                values
+        """
+        unknown = set(data) - {'min_interval', 'max_interval', 'deadbands'}
+
+        if unknown:
+            raise ValueError(
+                "Unknown publish policy parameters: %s" %
+                ', '.join(sorted(unknown))
+            )
+
+        deadbands = data.get('deadbands') or {}
+
+        if not isinstance(deadbands, Mapping):
+            raise ValueError("deadbands must to be a mapping")
+
+        return cls(
+            min_interval=_get_number(data, 'min_interval'),
+            max_interval=_get_number(data, 'max_interval'),
+            deadbands={
+                field: Deadband.from_dict(band)
+                for field, band in deadbands.items()
+            }
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns a dict-based representation of the policy
+
+        :return: a dict to be saved in ThingSettings
+        """
+        return {
+            'min_interval': self._min_interval,
+            'max_interval': self._max_interval,
+            'deadbands': {
+                field: band.to_dict()
+                for field, band in self._deadbands.items()
+            }
+        }
+
+
+def _get_number(data: Mapping[str, Any], key: str) -> float:
+    """
+    Returns a non-negative number saved in the mapping
+
+    :param data: a mapping to be checked
+    :param key: a key of the number
+    :return: the number; zero if the key is absent or is None
+    :raises ValueError: if the value is not a non-negative number
+    """
+    value = data.get(key)  # type: Optional[Any]
+
+    if value is None:
+        return 0
+
+    if isinstance(value, bool) or not isinstance(value, Real) or value < 0:
+        raise ValueError("%s must to be a non-negative number" % key)
+
+    return value
@@ -3,6 +3,7 @@ from types import MappingProxyType
 
 from dpl.model.base_entity import BaseEntity
 from dpl.model.domain_id import TDomainId
+from .publish_policy import PublishPolicy
 
 
 class ThingSettings(BaseEntity):
@@ -18,7 +19,8 @@ class ThingSettings(BaseEntity):
             integration: str, thing_type: str,
             con_id: TDomainId, con_params: Mapping[str, Any],
             friendly_name: Optional[str],
-            placement_id: Optional[TDomainId]
+            placement_id: Optional[TDomainId],
+            publish_policy: Optional[PublishPolicy] = None
     ):
         """
         Constructor. Receives all data needed to store in
@@ -40,6 +42,9 @@ class ThingSettings(BaseEntity):
                where this Thing is physically located; can be
                None if the specified Thing is not yet assigned
                to any Placement
+        :param publish_policy: a policy which limits the rate of
+               published updates of the Thing; None if every update
+               must to be published
         """
         super().__init__(domain_id)
 
@@ -49,6 +54,8 @@ class ThingSettings(BaseEntity):
         self._con_params = con_params
         self._friendly_name = friendly_name
         self._placement_id = placement_id
+        self._publish_policy = None  # type: Optional[Mapping[str, Any]]
+        self.publish_policy = publish_policy
 
     @property
     def integration(self) -> str:
@@ -139,3 +146,32 @@ class ThingSettings(BaseEntity):
         :return: None
         """
         self._placement_id = new_placement
+
+    @property
+    def publish_policy(self) -> Optional[PublishPolicy]:
+        """
+        Returns a policy which limits the rate of published updates
+        of this Thing
+
+        :return: an instance of PublishPolicy or None if every
+                 update of the Thing must to be published
+        :raises ValueError: if the stored policy is invalid
+        """
+        if self._publish_policy is None:
+            return None
+
+        return PublishPolicy.from_dict(self._publish_policy)
+
+    @publish_policy.setter
+    def publish_policy(self, new_policy: Optional[PublishPolicy]) -> None:
+        """
+        Allows to set a new publish policy for this Thing
+
+        :param new_policy: a new policy to be set or None to
+               publish every update of the Thing
+        :return: None
+        """
+        if new_policy is None:
+            self._publish_policy = None
+        else:
+            self._publish_policy = new_policy.to_dict()
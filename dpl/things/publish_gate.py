@@ -0,0 +1,273 @@
+"""
+This module contains a definition of PublishGate - of a filter of updates
+of a Thing which enforces a PublishPolicy
+"""
+import asyncio
+import time
+from numbers import Real
+from typing import Callable, Dict, Optional, Tuple
+
+from dpl.dtos.thing_dto import DtoFillerType, dto_filler_registry
+from dpl.settings.publish_policy import PublishPolicy
+from .thing import Thing
+
+
+class PublishGate(object):
+    """
+    PublishGate is placed between a Thing and a callback which publishes its
+    updates (like ThingRepository._thing_modified_callback) and passes only
+    the updates allowed by a PublishPolicy:
+
+    - the first update is always passed;
+    - an update is passed if any of the fields of the Thing was changed
+      since the last passed update; changes of numeric fields with
+      deadbands are taken into account only if they exceed the deadband;
+    - if an update is passed less than min_interval after the previous one,
+      then it's delayed until the end of the interval and the latest state
+      of the Thing is published at this moment;
+    - if updates keep coming, then an update is passed at least once in
+      max_interval even if there were no significant changes (a heartbeat).
+
+    Only notifications are filtered, the Thing itself always keeps its
+    current state. Fields are compared only if deadbands are specified,
+    otherwise updates are just rate-limited. Only the fields of ThingDto
+    which describe the state of the Thing are compared; its identifier,
+    capabilities and metadata don't change between updates
+    """
+    def __init__(
+            self, policy: PublishPolicy, callback: Callable[[Thing], None],
+            loop: asyncio.AbstractEventLoop = None,
+            clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Constructor
+
+        :param policy: a policy to be enforced
+        :param callback: a callback to be called with a Thing for each
+               passed update
+        :param loop: an event loop to be used for delayed updates; the
+               current event loop if not specified
+        :param clock: a function which returns the current time, seconds
+        """
+        self._policy = policy
+        self._callback = callback
+        self._loop = loop
+        self._clock = clock
+
+        self._last_published_at = None  # type: Optional[float]
+        self._published_state = None  # type: Optional[Dict]
+        # DTO fillers of capabilities of the Thing, determined on the first
+        # update
+        self._fillers = None  # type: Optional[Tuple[DtoFillerType, ...]]
+        self._pending = None  # type: Optional[Thing]
+        self._timer = None  # type: Optional[asyncio.Handle]
+
+        self._received_count = 0
+        self._published_count = 0
+
+    @property
+    def policy(self) -> PublishPolicy:
+        """
+        Returns the enforced policy
+
+        :return: an instance of PublishPolicy
+        """
+        return self._policy
+
+    @property
+    def received_count(self) -> int:
+        """
+        Returns the total number of updates received from the Thing
+
+        :return: the number of received updates
+        """
+        return self._received_count
+
+    @property
+    def published_count(self) -> int:
+        """
+        Returns the total number of passed updates
+
+        :return: the number of published updates
+        """
+        return self._published_count
+
+    def __call__(self, thing: Thing) -> None:
+        """
+        Handles an update of the Thing. Has the same signature as the
+        on_update callback of a Thing
+
+        :param thing: an updated Thing
+        :return: None
+        """
+        self._received_count += 1
+
+        if self._timer is not None:
+            # the latest state will be published at the end of the interval
+            self._pending = thing
+            return
+
+        last_published_at = self._last_published_at
+
+        if last_published_at is None:
+            self._publish(thing)
+            return
+
+        elapsed = self._clock() - last_published_at
+        max_interval = self._policy.max_interval
+
+        if max_interval and elapsed >= max_interval:
+            self._publish(thing)
+            return
+
+        state = None
+
+        if self._published_state is not None:
+            state = self._take_state(thing)
+
+            if not self._is_changed(state):
+                return
+
+        min_interval = self._policy.min_interval
+
+        if elapsed < min_interval:
+            # the state will be taken again at the end of the interval
+            self._pending = thing
+            self._timer = self._get_loop().call_later(
+                min_interval - elapsed, self._on_timer
+            )
+            return
+
+        self._publish(thing, state)
+
+    def flush(self) -> None:
+        """
+        Publishes a delayed update immediately if there is any
+
+        :return: None
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._on_timer()
+
+    def close(self) -> None:
+        """
+        Cancels a delayed update if there is any
+
+        :return: None
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        self._pending = None
+
+    def _on_timer(self) -> None:
+        """
+        Publishes a delayed update at the end of min_interval
+
+        :return: None
+        """
+        thing = self._pending
+        self._timer = None
+        self._pending = None
+
+        if thing is not None:
+            self._publish(thing)
+
+    def _publish(self, thing: Thing, state: Optional[Dict] = None) -> None:
+        """
+        Remembers the published state and passes the update to the callback
+
+        :param thing: an updated Thing
+        :param state: the current state of the Thing if it was already taken
+        :return: None
+        """
+        self._last_published_at = self._clock()
+
+        if self._policy.deadbands:
+            if state is None:
+                state = self._take_state(thing)
+
+            self._published_state = state
+
+        self._published_count += 1
+        self._callback(thing)
+
+    def _is_changed(self, current: Dict) -> bool:
+        """
+        Checks if the Thing was significantly changed since the last
+        published update
+
+        :param current: the current state of the Thing
+        :return: True if the update must to be published
+        """
+        published = self._published_state
+
+        if current.keys() != published.keys():
+            return True
+
+        deadbands = self._policy.deadbands
+
+        for field, value in current.items():
+            old_value = published[field]
+            deadband = deadbands.get(field)
+
+            if deadband is not None and \
+                    _is_number(value) and _is_number(old_value):
+                if deadband.is_exceeded(old_value, value):
+                    return True
+            elif value != old_value:
+                return True
+
+        return False
+
+    def _take_state(self, thing: Thing) -> Dict:
+        """
+        Returns the current state of the Thing to be compared: the fields of
+        its DTO which may change on updates (except of last_updated which
+        changes on each update)
+
+        :param thing: a Thing to be checked
+        :return: a part of the DTO of the Thing
+        """
+        fillers = self._fillers
+
+        if fillers is None:
+            fillers = tuple(
+                dto_filler_registry[capability]
+                for capability in thing.capabilities
+                if capability in dto_filler_registry
+            )
+            self._fillers = fillers
+
+        state = {
+            'is_enabled': thing.is_enabled,
+            'is_available': thing.is_available
+        }
+
+        for filler in fillers:
+            filler(thing, state)
+
+        return state
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Returns the event loop to be used for delayed updates
+
+        :return: an event loop
+        """
+        if self._loop is None:
+            self._loop = asyncio.get_event_loop()
+
+        return self._loop
+
+
+def _is_number(value) -> bool:
+    """
+    Checks if the value is a number and not a boolean
+
+    :param value: a value to be checked
+    :return: True if the value is a number
+    """
+    return isinstance(value, Real) and not isinstance(value, bool)
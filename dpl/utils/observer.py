@@ -21,3 +21,26 @@ class Observer(Generic[T]):
         :return: None
         """
         raise NotImplementedError()
+
+
+class SelectiveObserver(Observer[T]):
+    """
+    SelectiveObserver is an Observer which is able to tell in advance if
+    it's interested in an event. Observables may ask it before preparing
+    any heavy data for the event and skip the event altogether if nobody
+    is interested in it
+    """
+    def is_interested(self, source: T, *args, **kwargs) -> bool:
+        """
+        Checks if an event described by the specified arguments will be
+        handled by this Observer
+
+        :param source: mandatory, a weak reference to the event source
+        :param args: optional positional arguments which identify the
+               event, a subset of arguments to be passed to update
+        :param kwargs: optional keyword arguments which identify the
+               event, a subset of arguments to be passed to update
+        :return: True if the event will be handled, False if it may be
+                 skipped
+        """
+        return True
@@ -0,0 +1,357 @@
+"""
+This module contains definitions of StageTimings - of a registry of latency
+histograms of the stages of the event pipeline - and of its helpers.
+
+An update of a Thing passes through a chain of stages: the Thing itself,
+ThingRepository, ThingService, EventHub, StreamingApiProvider,
+DeliveryManager and, finally, a WebSocket connection. If the timing is
+enabled, then each sampled update receives a StageTrace which is marked by
+each of the stages, and the time elapsed between consecutive marks is saved
+to a histogram of the stage.
+
+All the stages are executed by the thread of the event loop, so histograms
+are updated without any locks. The timing is disabled by default, each
+instrumented place checks the ``enabled`` flag or the presence of a trace
+only
+"""
+import time
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+
+T = TypeVar('T')
+
+# names of stages, in order of their execution
+
+# from an update of a Thing to its receipt by ThingRepository, including the
+# time an update was delayed by PublishGate
+REPOSITORY = 'repository'
+
+# from ThingRepository to ThingService
+SERVICE = 'service'
+
+# the time spent by EventHub in the queue of events (if the queue is enabled)
+HUB_QUEUE = 'hub_queue'
+
+# from ThingService to an Event built by EventHub
+HUB_CONVERT = 'hub_convert'
+
+# from an Event built by EventHub to resolved subscribers of its topic,
+# including coalescing windows, journaling and building of a DTO
+ROUTE = 'route'
+
+# the time of building of a DTO of a Thing, measured separately
+DTO_BUILD = 'dto_build'
+
+# from resolved subscribers to a message taken from the queue of pending
+# messages of a Session by DeliveryManager
+DELIVERY_QUEUE = 'delivery_queue'
+
+# the time of encoding and writing of a message to a WebSocket connection,
+# measured separately
+SOCKET_WRITE = 'socket_write'
+
+# from an update of a Thing to a message written to a WebSocket connection
+TOTAL = 'total'
+
+# the number of buckets of a histogram; bucket i counts durations from
+# 2 ** (i - 1) to 2 ** i microseconds, the last one counts all the rest
+NUM_BUCKETS = 32
+
+
+class LatencyHistogram(object):
+    """
+    LatencyHistogram counts durations in buckets with exponentially growing
+    (power of two) bounds, in microseconds. Percentiles are estimated by the
+    upper bound of the corresponding bucket, so their error never exceeds
+    a factor of two
+    """
+    __slots__ = ('_buckets', '_count', '_sum', '_max')
+
+    def __init__(self):
+        """
+        Constructor. Creates an empty histogram
+        """
+        self._buckets = [0] * NUM_BUCKETS  # type: List[int]
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+
+    @property
+    def count(self) -> int:
+        """
+        Returns the number of recorded durations
+
+        :return: the number of durations
+        """
+        return self._count
+
+    def record(self, seconds: float) -> None:
+        """
+        Records a duration
+
+        :param seconds: a duration to be recorded, seconds
+        :return: None
+        """
+        index = int(seconds * 1000000).bit_length()
+
+        if index >= NUM_BUCKETS:
+            index = NUM_BUCKETS - 1
+
+        self._buckets[index] += 1
+        self._count += 1
+        self._sum += seconds
+
+        if seconds > self._max:
+            self._max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Estimates a percentile of the recorded durations
+
+        :param fraction: a fraction of durations which are less or equal to
+               the result (i.e. 0.99 for the 99th percentile)
+        :return: the estimated percentile, seconds; zero if there are no
+                 recorded durations
+        """
+        count = self._count
+
+        if not count:
+            return 0.0
+
+        rank = fraction * count
+        seen = 0
+
+        for index, bucket_count in enumerate(self._buckets):
+            seen += bucket_count
+
+            if seen >= rank and index < NUM_BUCKETS - 1:
+                return min((1 << index) / 1000000, self._max)
+
+        # the last bucket has no upper bound
+        return self._max
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        Returns a summary of the recorded durations
+
+        :return: a dict with the number of durations, the mean, the maximum
+                 and percentiles of the durations, milliseconds
+        """
+        count = self._count
+
+        return {
+            'count': count,
+            'mean_ms': self._sum / count * 1000 if count else 0.0,
+            'p50_ms': self.percentile(0.5) * 1000,
+            'p90_ms': self.percentile(0.9) * 1000,
+            'p99_ms': self.percentile(0.99) * 1000,
+            'max_ms': self._max * 1000
+        }
+
+
+class StageTrace(object):
+    """
+    StageTrace accompanies a single update of a Thing through the stages of
+    the pipeline and remembers when the update was started and when it
+    passed the last stage
+    """
+    __slots__ = ('_timings', 'origin', 'last')
+
+    def __init__(self, timings: 'StageTimings', origin: float = None):
+        """
+        Constructor
+
+        :param timings: a registry of histograms to be updated
+        :param origin: a moment when the update was started, in terms of
+               time.perf_counter; the current moment if not specified
+        """
+        if origin is None:
+            origin = time.perf_counter()
+
+        self._timings = timings
+        self.origin = self.last = origin
+
+    def mark(self, stage: str) -> None:
+        """
+        Records the time elapsed since the previous mark as a duration of
+        the specified stage
+
+        :param stage: a name of the passed stage
+        :return: None
+        """
+        now = time.perf_counter()
+        self._timings.record(stage, now - self.last)
+        self.last = now
+
+
+class StageTimings(object):
+    """
+    StageTimings is a registry of latency histograms of the stages of the
+    event pipeline. The stages from ThingRepository to EventHub are executed
+    synchronously, one by one, so the trace of an update being processed is
+    available to all of them as the current trace.
+
+    Recording of a duration costs about as much as a stage itself, so only
+    one of each sample_interval updates is traced
+    """
+    def __init__(self, enabled: bool = False, sample_interval: int = 1):
+        """
+        Constructor
+
+        :param enabled: True if durations must to be recorded
+        :param sample_interval: one of how many updates must to be traced
+        :raises ValueError: if the sample interval is less than one
+        """
+        self.enabled = enabled
+        self._sample_interval = 1
+        self._countdown = 1
+        self._histograms = dict()  # type: Dict[str, LatencyHistogram]
+
+        # the trace of an update being processed; None if the update is not
+        # sampled or there is no such update. It's a plain attribute because
+        # it's checked by each stage of each update
+        self.current = None  # type: Optional[StageTrace]
+
+        self.sample_interval = sample_interval
+
+    @property
+    def sample_interval(self) -> int:
+        """
+        Returns one of how many updates are traced
+
+        :return: the sample interval
+        """
+        return self._sample_interval
+
+    @sample_interval.setter
+    def sample_interval(self, new_value: int) -> None:
+        """
+        Sets one of how many updates must to be traced
+
+        :param new_value: a new sample interval
+        :return: None
+        :raises ValueError: if the sample interval is less than one
+        """
+        if new_value < 1:
+            raise ValueError("sample_interval must to be a positive number")
+
+        self._sample_interval = new_value
+        self._countdown = 1
+
+    def call_traced(
+            self, func: Callable[[Any], T], arg: Any, stage: str,
+            started_at: float
+    ) -> T:
+        """
+        Calls the function which processes an update. The update is traced
+        if it was sampled: the time since the start of the update is
+        recorded as a duration of the specified stage and the trace is
+        available to the rest of synchronous stages as the current trace
+
+        :param func: a function to be called
+        :param arg: an argument to be passed to the function
+        :param stage: a name of the first stage
+        :param started_at: a moment when the update was started, in UNIX
+               time format (like Thing.last_updated)
+        :return: a value returned by the function
+        """
+        self._countdown -= 1
+
+        if self._countdown > 0:
+            return func(arg)
+
+        self._countdown = self._sample_interval
+
+        # UNIX time is converted to time.perf_counter once per trace
+        now = time.perf_counter()
+        trace = StageTrace(self, now - max(0.0, time.time() - started_at))
+        trace.mark(stage)
+        self.current = trace
+
+        try:
+            return func(arg)
+        finally:
+            self.current = None
+
+    def record(self, stage: str, seconds: float) -> None:
+        """
+        Records a duration of the specified stage
+
+        :param stage: a name of the stage
+        :param seconds: a duration, seconds
+        :return: None
+        """
+        histogram = self._histograms.get(stage)
+
+        if histogram is None:
+            histogram = LatencyHistogram()
+            self._histograms[stage] = histogram
+
+        histogram.record(seconds)
+
+    def record_delivery(
+            self, traces: List[StageTrace], started: float
+    ) -> None:
+        """
+        Records the last stages of delivery of messages to a client
+
+        :param traces: traces of the delivered messages
+        :param started: a moment when the messages were taken from the
+               queue of pending messages, in terms of time.perf_counter
+        :return: None
+        """
+        now = time.perf_counter()
+        record = self.record
+
+        for trace in traces:
+            record(DELIVERY_QUEUE, started - trace.last)
+            record(SOCKET_WRITE, now - started)
+            record(TOTAL, now - trace.origin)
+
+    def timed(self, stage: str, func: Callable[[], T]) -> Callable[[], T]:
+        """
+        Wraps a function without arguments so that the time of its
+        execution is recorded as a duration of the specified stage
+
+        :param stage: a name of the stage
+        :param func: a function to be wrapped
+        :return: a wrapped function
+        """
+        def _timed() -> T:
+            started = time.perf_counter()
+
+            try:
+                return func()
+            finally:
+                self.record(stage, time.perf_counter() - started)
+
+        return _timed
+
+    def snapshot(self) -> Dict:
+        """
+        Returns summaries of histograms of all stages
+
+        :return: a dict with the 'enabled' flag, the 'sample_interval' and
+                 a 'stages' mapping of names of stages to summaries of their
+                 histograms
+        """
+        return {
+            'enabled': self.enabled,
+            'sample_interval': self._sample_interval,
+            'stages': {
+                stage: histogram.snapshot()
+                for stage, histogram in self._histograms.items()
+            }
+        }
+
+    def reset(self) -> None:
+        """
+        Removes all the recorded durations
+
+        :return: None
+        """
+        self._histograms = dict()
+
+
+# a registry of stages of the event pipeline of this process
+STAGE_TIMINGS = StageTimings()
@@ -0,0 +1,91 @@
+"""
+This module contains unit tests for AdmissionController
+"""
+import unittest
+
+from dpl.api.streaming_api.admission_control import (
+    AdmissionController, AdmissionRejectedError
+)
+
+
+class TestAdmissionController(unittest.TestCase):
+    def test_unlimited_by_default(self):
+        controller = AdmissionController()
+
+        for _ in range(100):
+            controller.admit('10.0.0.1')
+
+        self.assertEqual(100, controller.connections)
+        self.assertEqual(0, controller.rejected_count)
+
+    def test_max_connections(self):
+        controller = AdmissionController(max_connections=2)
+        first = controller.admit()
+        second = controller.admit()
+        second.mark_authenticated()
+
+        with self.assertRaises(AdmissionRejectedError):
+            controller.admit()
+
+        first.release()
+        controller.admit()
+
+        self.assertEqual(2, controller.connections)
+        self.assertEqual(1, controller.rejected_count)
+
+    def test_max_unauthenticated(self):
+        controller = AdmissionController(max_unauthenticated=1)
+        ticket = controller.admit()
+
+        with self.assertRaises(AdmissionRejectedError):
+            controller.admit()
+
+        ticket.mark_authenticated()
+        controller.admit()
+
+        self.assertEqual(2, controller.connections)
+        self.assertEqual(1, controller.unauthenticated)
+
+    def test_max_per_peer(self):
+        controller = AdmissionController(max_per_peer=1)
+        ticket = controller.admit('10.0.0.1')
+        controller.admit('10.0.0.2')
+        controller.admit()
+        controller.admit()
+
+        with self.assertRaises(AdmissionRejectedError):
+            controller.admit('10.0.0.1')
+
+        ticket.release()
+        controller.admit('10.0.0.1')
+
+    def test_release_is_idempotent(self):
+        controller = AdmissionController()
+        ticket = controller.admit('10.0.0.1')
+        ticket.mark_authenticated()
+        ticket.release()
+        ticket.release()
+        ticket.mark_authenticated()
+
+        self.assertEqual(0, controller.connections)
+        self.assertEqual(0, controller.unauthenticated)
+
+    def test_release_unauthenticated(self):
+        controller = AdmissionController()
+        controller.admit().release()
+
+        self.assertEqual(0, controller.connections)
+        self.assertEqual(0, controller.unauthenticated)
+
+    def test_suggest_retry_delay(self):
+        controller = AdmissionController(
+            min_retry_delay=5, max_retry_delay=10
+        )
+        delays = [controller.suggest_retry_delay() for _ in range(100)]
+
+        self.assertTrue(all(5 <= d <= 10 for d in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
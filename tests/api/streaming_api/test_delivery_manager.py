@@ -0,0 +1,435 @@
+"""
+This module contains unit tests for acknowledgements of Tracked Messages
+in DeliveryManager
+"""
+import asyncio
+import unittest
+from unittest.mock import Mock
+
+from dpl.api.streaming_api.delivery_manager import DeliveryManager
+from dpl.api.streaming_api.message import Message
+from dpl.api.streaming_api.retained_store import InMemoryRetainedStore
+from dpl.api.streaming_api.timer_wheel import TimerWheel
+
+
+SESSION_ID = 's1'
+
+
+class TestDeliveryAcknowledgements(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.store = InMemoryRetainedStore()
+        self.wheel = TimerWheel(loop=self.loop)
+        self.manager = DeliveryManager(
+            loop=self.loop, timer_wheel=self.wheel,
+            retained_store=self.store
+        )
+
+        self._run(self.manager.resume_for(SESSION_ID))
+
+    def tearDown(self):
+        self.manager.close()
+        self.wheel.close()
+        self.loop.close()
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def _put_messages(self, count: int) -> list:
+        messages = []
+
+        for _ in range(count):
+            message = Message(
+                timestamp=1.5, type_="data", topic="t", body={}
+            )
+            self._run(self.manager.put_message(
+                SESSION_ID, message, ensure_delivery=True
+            ))
+            messages.append(message.message_id)
+
+        return messages
+
+    def _retained_ids(self) -> list:
+        return list(self.manager._retained[SESSION_ID].messages.keys())
+
+    def test_ack_single(self):
+        self._put_messages(3)
+
+        self._run(self.manager.ack_delivery(SESSION_ID, 2))
+
+        self.assertEqual([1, 3], self._retained_ids())
+        self.assertIsNone(self.store.get(SESSION_ID, 2))
+
+    def test_ack_up_to(self):
+        self._put_messages(5)
+
+        acked = self._run(self.manager.ack_delivery_ranges(
+            SESSION_ID, up_to=3
+        ))
+
+        self.assertEqual(3, acked)
+        self.assertEqual([4, 5], self._retained_ids())
+        self.assertIsNone(self.store.get(SESSION_ID, 1))
+        self.assertIsNotNone(self.store.get(SESSION_ID, 4))
+
+    def test_ack_ranges(self):
+        self._put_messages(10)
+
+        acked = self._run(self.manager.ack_delivery_ranges(
+            SESSION_ID, ranges=[(2, 4), (8, 100)]
+        ))
+
+        self.assertEqual(6, acked)
+        self.assertEqual([1, 5, 6, 7], self._retained_ids())
+
+        # already acknowledged messages are ignored
+        acked = self._run(self.manager.ack_delivery_ranges(
+            SESSION_ID, ranges=[(2, 5)]
+        ))
+        self.assertEqual(1, acked)
+
+    def test_wraparound(self):
+        max_id = DeliveryManager.MAX_MESSAGE_ID
+        self.manager._retained[SESSION_ID].last_message_number = max_id - 3
+
+        ids = self._put_messages(6)
+        self.assertEqual([max_id - 2, max_id - 1, 0, 1, 2, 3], ids)
+
+        # the range wraps around MAX_MESSAGE_ID
+        acked = self._run(self.manager.ack_delivery_ranges(
+            SESSION_ID, ranges=[(max_id - 1, 0)]
+        ))
+        self.assertEqual(2, acked)
+        self.assertIsNone(self.store.get(SESSION_ID, 0))
+
+        # identifiers sent before the wraparound are older
+        acked = self._run(self.manager.ack_delivery_ranges(
+            SESSION_ID, up_to=1
+        ))
+        self.assertEqual(2, acked)
+        self.assertEqual([2, 3], self._retained_ids())
+
+    def test_retransmissions_stopped_when_all_acked(self):
+        self._put_messages(3)
+        self.assertIsNotNone(
+            self.manager._retained[SESSION_ID].retransmission_timer
+        )
+
+        self._run(self.manager.ack_delivery_ranges(SESSION_ID, up_to=3))
+
+        self.assertIsNone(
+            self.manager._retained[SESSION_ID].retransmission_timer
+        )
+
+        for message_id in range(1, 4):
+            self.assertIsNone(self.store.get(SESSION_ID, message_id))
+
+
+class TestRetransmissions(unittest.TestCase):
+    _run = TestDeliveryAcknowledgements._run
+    _put_messages = TestDeliveryAcknowledgements._put_messages
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.now = 100.0
+        self.wheel = TimerWheel(loop=self.loop)
+        # retransmission rounds are triggered manually, on a fake clock
+        self.wheel.time = Mock(side_effect=lambda: self.now)
+        self.manager = None
+
+    def tearDown(self):
+        self.manager.close()
+        self.wheel.close()
+        self.loop.close()
+
+    def _start(self, **kwargs) -> None:
+        self.manager = DeliveryManager(
+            loop=self.loop, timer_wheel=self.wheel,
+            retained_store=InMemoryRetainedStore(), **kwargs
+        )
+        self._run(self.manager.resume_for(SESSION_ID))
+
+    def _items(self) -> list:
+        return list(self.manager._retained[SESSION_ID].messages.values())
+
+    def _take_pending(self) -> list:
+        queue = self.manager._pending_messages[SESSION_ID]
+        messages = [queue.get_nowait() for _ in range(queue.qsize())]
+
+        return [message.message_id for message in messages]
+
+    def _retransmission_round(self) -> None:
+        self.manager._on_retransmission_timer(
+            SESSION_ID, self.manager._retained[SESSION_ID]
+        )
+
+    def test_exponential_backoff(self):
+        self._start()
+        self._put_messages(1)
+        self._take_pending()
+        item = self._items()[0]
+
+        self.assertEqual(101.0, item.next_attempt)
+
+        # delays are doubled after each attempt: 2, 4, 8 seconds
+        for now, next_attempt in ((101.0, 103.0), (103.0, 107.0),
+                                  (107.0, 115.0)):
+            self.now = now
+            self._retransmission_round()
+
+            self.assertEqual([1], self._take_pending())
+            self.assertEqual(next_attempt, item.next_attempt)
+            self.assertEqual(now, item.last_sent)
+
+        # the message is not re-sent before its next attempt
+        self.now = 110.0
+        self._retransmission_round()
+        self.assertEqual([], self._take_pending())
+        self.assertEqual(3, item.number_of_reschedules)
+
+    def test_backoff_is_per_message(self):
+        self._start()
+        self._put_messages(1)
+        self.now = 101.0
+        self._retransmission_round()
+        self._put_messages(1)
+        self._take_pending()
+
+        first, second = self._items()
+        self.assertEqual(103.0, first.next_attempt)
+        self.assertEqual(102.0, second.next_attempt)
+
+        # only the second message is due
+        self.now = 102.0
+        self._retransmission_round()
+
+        self.assertEqual([2], self._take_pending())
+        self.assertEqual(1, first.number_of_reschedules)
+        self.assertEqual(1, second.number_of_reschedules)
+
+    def test_resume_replays_all_immediately(self):
+        self._start()
+        self._put_messages(3)
+        self.now = 101.0
+        self._retransmission_round()
+        self._run(self.manager.ack_delivery(SESSION_ID, 2))
+
+        self.now = 102.0
+        self._run(self.manager.pause_for(SESSION_ID))
+        self._run(self.manager.resume_for(SESSION_ID))
+
+        # all unacknowledged messages are re-sent without waiting for their
+        # next attempts and their backoff is reset
+        self.assertEqual([1, 3], self._take_pending())
+
+        for item in self._items():
+            self.assertEqual(0, item.number_of_reschedules)
+            self.assertEqual(103.0, item.next_attempt)
+            self.assertEqual(102.0, item.last_sent)
+
+        self.assertIsNotNone(
+            self.manager._retained[SESSION_ID].retransmission_timer
+        )
+
+    def test_retransmission_batch_size(self):
+        self._start(retransmission_batch_size=2)
+        self._put_messages(5)
+        self._take_pending()
+
+        rounds = []
+
+        for now in (101.0, 102.0, 103.0):
+            self.now = now
+            self._retransmission_round()
+            rounds.append(self._take_pending())
+
+        # the rest of messages are re-sent on the next rounds; the message
+        # which is overdue for the longest time goes before the ones which
+        # became due again
+        self.assertEqual([[1, 2], [3, 4], [5, 1]], rounds)
+        self.assertEqual(
+            6, self.manager.describe_session(SESSION_ID)['retransmitted']
+        )
+        self.assertIsNotNone(
+            self.manager._retained[SESSION_ID].retransmission_timer
+        )
+
+    def test_unlimited_batch_size(self):
+        self._start()
+        self._put_messages(5)
+        self._take_pending()
+
+        self.now = 101.0
+        self._retransmission_round()
+
+        self.assertEqual([1, 2, 3, 4, 5], self._take_pending())
+
+
+class TestDeliveryStats(unittest.TestCase):
+    setUp = TestDeliveryAcknowledgements.setUp
+    tearDown = TestDeliveryAcknowledgements.tearDown
+    _run = TestDeliveryAcknowledgements._run
+    _put_messages = TestDeliveryAcknowledgements._put_messages
+
+    def test_counters(self):
+        self._put_messages(3)
+        self._run(self.manager.put_message(
+            SESSION_ID,
+            Message(timestamp=1.5, type_="data", topic="t", body={})
+        ))
+
+        self._run(self.manager.ack_delivery(SESSION_ID, 1))
+        self._run(self.manager.ack_delivery_ranges(SESSION_ID, up_to=2))
+
+        stats = self.manager.describe_session(SESSION_ID)
+
+        self.assertEqual(4, stats['queued'])
+        self.assertEqual(4, stats['pending'])
+        self.assertEqual(2, stats['acked'])
+        self.assertEqual(1, stats['retained'])
+        self.assertEqual(0, stats['retransmitted'])
+        self.assertEqual(0, stats['write_pauses'])
+        self.assertGreaterEqual(stats['ack_rtt'], 0)
+        self.assertIsNotNone(stats['last_ack_rtt'])
+
+    def test_retransmissions_counted(self):
+        self._put_messages(2)
+        self._run(self.manager.pause_for(SESSION_ID))
+        self._run(self.manager.resume_for(SESSION_ID))
+
+        self._run(self.manager.ack_delivery(SESSION_ID, 1))
+
+        stats = self.manager.describe_session(SESSION_ID)
+
+        self.assertEqual(2, stats['retransmitted'])
+        self.assertEqual(1, stats['acked'])
+
+    def test_lost_retained_counted(self):
+        self._put_messages(2)
+        self._run(self.manager.pause_for(SESSION_ID))
+
+        # the message disappears behind the back of DeliveryManager
+        self.store.remove(SESSION_ID, 1)
+
+        with self.assertLogs(
+                'dpl.api.streaming_api.delivery_manager', level='WARNING'
+        ):
+            self._run(self.manager.resume_for(SESSION_ID))
+
+        stats = self.manager.describe_session(SESSION_ID)
+
+        self.assertEqual(1, stats['retained_lost'])
+        self.assertEqual(1, stats['retransmitted'])
+        self.assertEqual(1, stats['retained'])
+
+    def test_set_conflate_all(self):
+        self.manager.set_conflate_all(SESSION_ID, True)
+
+        for _ in range(3):
+            self._run(self.manager.put_message(
+                SESSION_ID,
+                Message(timestamp=1.5, type_="data", topic="t", body={})
+            ))
+
+        stats = self.manager.describe_session(SESSION_ID)
+
+        self.assertEqual(1, stats['pending'])
+        self.assertEqual(2, stats['conflated'])
+
+    def test_discarded_with_session(self):
+        self._put_messages(1)
+        self.assertEqual({SESSION_ID}, self.manager.list_sessions())
+
+        self._run(self.manager.discard_for(SESSION_ID))
+
+        self.assertEqual(set(), self.manager.list_sessions())
+        self.assertEqual(0, self.manager.describe_session(SESSION_ID)['acked'])
+
+
+
+class TestSessionExpiration(unittest.TestCase):
+    _run = TestDeliveryAcknowledgements._run
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.store = InMemoryRetainedStore()
+        self.wheel = TimerWheel(loop=self.loop)
+        self.on_session_expired = Mock()
+        self.manager = DeliveryManager(
+            loop=self.loop, timer_wheel=self.wheel,
+            retained_store=self.store, session_ttl=10,
+            on_session_expired=self.on_session_expired
+        )
+
+        self._run(self.manager.resume_for(SESSION_ID))
+        self._run(self.manager.pause_for(SESSION_ID))
+
+    tearDown = TestDeliveryAcknowledgements.tearDown
+
+    def _expire(self) -> None:
+        self.manager._on_expiration_timer(
+            SESSION_ID, self.manager._retained[SESSION_ID]
+        )
+
+    def _put_retained(self) -> Message:
+        message = Message(timestamp=1.5, type_="data", topic="t", body={})
+        self._run(self.manager.put_message(
+            SESSION_ID, message, ensure_delivery=True
+        ))
+
+        return message
+
+    def test_expired(self):
+        self._put_retained()
+        self._expire()
+
+        self.on_session_expired.assert_called_once_with(SESSION_ID)
+        self.assertEqual(set(), self.manager.list_sessions())
+        self.assertIsNone(self.store.get(SESSION_ID, 1))
+
+    def test_not_resurrected_by_message_routed_after_expiration(self):
+        self._expire()
+
+        # the message was routed before subscriptions were removed
+        message = self._put_retained()
+
+        self.assertIsNone(message.message_id)
+        self.assertEqual(set(), self.manager.list_sessions())
+        self.assertIsNone(self.store.get(SESSION_ID, 1))
+
+    def test_not_resurrected_by_message_waiting_for_lock(self):
+        session_retained = self.manager._retained[SESSION_ID]
+
+        async def _test():
+            async with session_retained.messages_lock:
+                putter = asyncio.ensure_future(
+                    self.manager.put_message(
+                        SESSION_ID,
+                        Message(
+                            timestamp=1.5, type_="data", topic="t", body={}
+                        ),
+                        ensure_delivery=True
+                    ), loop=self.loop
+                )
+                await asyncio.sleep(0)
+                self._expire()
+
+            await putter
+
+        self._run(_test())
+
+        self.assertEqual(set(), self.manager.list_sessions())
+        self.assertIsNone(self.store.get(SESSION_ID, 1))
+
+    def test_resumed_after_expiration(self):
+        self._expire()
+        self._run(self.manager.resume_for(SESSION_ID))
+
+        message = self._put_retained()
+
+        self.assertEqual(1, message.message_id)
+        self.assertEqual({SESSION_ID}, self.manager.list_sessions())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+This module contains unit tests for DeltaEncoder
+"""
+import unittest
+
+from dpl.api.streaming_api.delta_encoder import DeltaEncoder
+from dpl.api.streaming_api.message import Message
+from dpl.events.topic_tree import TopicTree
+
+
+TOPIC = 'things/L1/modified'
+
+
+def build_message(body, topic=TOPIC, message_id=None, type_="data"):
+    return Message(
+        timestamp=1.5, type_=type_, topic=topic, body=body,
+        message_id=message_id
+    )
+
+
+class TestDeltaEncoder(unittest.TestCase):
+    def setUp(self):
+        topics = TopicTree()
+        topics.add('things/+/modified', key=None)
+
+        self.encoder = DeltaEncoder(topics=topics, snapshot_interval=2)
+
+    def test_snapshot_then_patches(self):
+        first = self.encoder.encode(build_message({'a': 1, 'b': 2}))
+        second = self.encoder.encode(build_message({'a': 1, 'b': 3}))
+        third = self.encoder.encode(build_message({'a': 2, 'c': 4}))
+
+        self.assertEqual({'seq': 0, 'snapshot': {'a': 1, 'b': 2}}, first.body)
+        self.assertEqual({'seq': 1, 'patch': {'b': 3}}, second.body)
+        self.assertEqual(
+            {'seq': 2, 'patch': {'a': 2, 'c': 4}, 'removed': ['b']},
+            third.body
+        )
+        self.assertEqual(TOPIC, third.topic)
+        self.assertEqual(1.5, third.timestamp)
+
+    def test_periodic_snapshots(self):
+        bodies = [
+            self.encoder.encode(build_message({'a': i})).body
+            for i in range(7)
+        ]
+
+        snapshots = [body['seq'] for body in bodies if 'snapshot' in body]
+
+        self.assertEqual([0, 3, 6], snapshots)
+
+    def test_topics_are_independent(self):
+        self.encoder.encode(build_message({'a': 1}))
+        other = self.encoder.encode(
+            build_message({'a': 1}, topic='things/L2/modified')
+        )
+
+        self.assertEqual({'seq': 0, 'snapshot': {'a': 1}}, other.body)
+
+    def test_not_applicable_messages(self):
+        for message in (
+                build_message({'a': 1}, topic='things/L1/deleted'),
+                build_message({'a': 1}, message_id=5),
+                build_message({'a': 1}, type_="control")
+        ):
+            self.assertIs(message, self.encoder.encode(message))
+
+        # tracked messages don't affect the state
+        first = self.encoder.encode(build_message({'a': 2}))
+        self.assertIn('snapshot', first.body)
+
+    def test_resync(self):
+        self.encoder.encode(build_message({'a': 1}))
+        self.encoder.encode(build_message({'a': 2}))
+
+        snapshots = self.encoder.resync(TOPIC)
+
+        self.assertEqual(1, len(snapshots))
+        self.assertEqual({'seq': 2, 'snapshot': {'a': 2}}, snapshots[0].body)
+
+        # the snapshot interval is restarted after resync
+        self.assertEqual(
+            {'seq': 3, 'patch': {'a': 3}},
+            self.encoder.encode(build_message({'a': 3})).body
+        )
+
+    def test_resync_all(self):
+        self.encoder.encode(build_message({'a': 1}))
+        self.encoder.encode(
+            build_message({'a': 1}, topic='things/L2/modified')
+        )
+
+        self.assertEqual(2, len(self.encoder.resync()))
+        self.assertEqual([], self.encoder.resync('things/L3/modified'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+This module contains unit tests for Streaming API message codecs
+"""
+import json
+import unittest
+
+from dpl.api.streaming_api.message import (
+    Message, MessageFormatViolationError
+)
+from dpl.api.streaming_api.message_codecs import (
+    JsonCodec, MessagePackCodec, MessageDecodeError, create_codec
+)
+from dpl.api.streaming_api.msgpack_format import packb, unpackb
+from dpl.api.streaming_api.prepared_frame import PreparedFrame
+
+
+TOPIC = 'things/L1/modified'
+BODY = {'id': 'L1', 'is_enabled': True, 'brightness': 75}
+
+
+def build_message(message_id=None, frame=None, topic=TOPIC):
+    return Message(
+        timestamp=1.5, type_="data", topic=topic, body=BODY,
+        message_id=message_id, frame=frame
+    )
+
+
+class TestJsonCodec(unittest.TestCase):
+    def test_round_trip(self):
+        codec = JsonCodec()
+        message = codec.decode(codec.encode(build_message()))
+
+        self.assertEqual(TOPIC, message.topic)
+        self.assertEqual(BODY, message.body)
+
+    def test_batch(self):
+        codec = JsonCodec()
+        data = codec.encode_batch([build_message(), build_message(3)])
+
+        self.assertEqual(2, len(json.loads(data)))
+
+
+class TestMessagePackCodec(unittest.TestCase):
+    def setUp(self):
+        self.codec = create_codec('msgpack')
+
+    def test_topics_interned(self):
+        first = unpackb(self.codec.encode(build_message()))
+        second = unpackb(self.codec.encode(build_message(message_id=7)))
+        other = unpackb(self.codec.encode(build_message(topic='other')))
+
+        self.assertEqual([1, [0, TOPIC], 1.5, BODY], first)
+        self.assertEqual([1, 0, 1.5, BODY, 7], second)
+        self.assertEqual([1, 'other'], other[1])
+
+    def test_event_seq(self):
+        message = Message(
+            timestamp=1.5, type_="data", topic=TOPIC, body=BODY, event_seq=9
+        )
+        retained = Message(
+            timestamp=1.5, type_="data", topic=TOPIC, body=BODY,
+            message_id=7, event_seq=10
+        )
+
+        self.assertEqual(
+            [1, [0, TOPIC], 1.5, BODY, None, 9],
+            unpackb(self.codec.encode(message))
+        )
+        self.assertEqual(
+            [1, 0, 1.5, BODY, 7, 10], unpackb(self.codec.encode(retained))
+        )
+
+    def test_interned_topics_limit(self):
+        self.codec.MAX_INTERNED_TOPICS = 1
+        self.codec.encode(build_message(topic='a'))
+
+        encoded = unpackb(self.codec.encode(build_message(topic='b')))
+
+        self.assertEqual('b', encoded[1])
+
+    def test_batch(self):
+        data = unpackb(self.codec.encode_batch(
+            [build_message(), build_message()]
+        ))
+
+        self.assertEqual([[1, [0, TOPIC], 1.5, BODY], [1, 0, 1.5, BODY]], data)
+
+    def test_body_encoded_once_for_frame(self):
+        frame = PreparedFrame(
+            timestamp=1.5, type_="data", topic=TOPIC, body=BODY
+        )
+
+        other_codec = MessagePackCodec()
+        self.codec.encode(build_message(frame=frame))
+        encoded_body = frame.get_encoded_body(MessagePackCodec.name, None)
+
+        data = other_codec.encode(build_message(frame=frame))
+
+        self.assertIn(encoded_body, data)
+        self.assertEqual(BODY, unpackb(data)[3])
+
+    def test_decode(self):
+        codec = self.codec
+
+        first = codec.decode(packb([0, [0, 'subscribe'], 1.5, {'a': 1}]))
+        second = codec.decode(packb([0, 0, 2.5, {}]))
+        plain = codec.decode(packb([1, 'some/topic', 3.5, {}]))
+
+        self.assertEqual(('control', 'subscribe'), (first.type, first.topic))
+        self.assertEqual({'a': 1}, first.body)
+        self.assertEqual(('control', 'subscribe'), (second.type, second.topic))
+        self.assertEqual(('data', 'some/topic'), (plain.type, plain.topic))
+
+    def test_decode_errors(self):
+        for raw in (
+                {'type': 0}, [0, 'a', 1.5], [5, 'a', 1.5, {}],
+                [0, 3, 1.5, {}], [0, [1, 'a'], 1.5, {}], [0, [0, 1], 1.5, {}]
+        ):
+            with self.assertRaises(MessageDecodeError, msg=raw):
+                self.codec.decode(packb(raw))
+
+        with self.assertRaises(MessageDecodeError):
+            self.codec.decode(b'\xc1')
+
+    def test_decode_invalid_content(self):
+        with self.assertRaises(MessageFormatViolationError):
+            self.codec.decode(packb([0, 'a', 'not a timestamp', {}]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+This module contains unit tests for a pure-Python MessagePack implementation
+"""
+import unittest
+
+from dpl.api.streaming_api.msgpack_format import (
+    packb, unpackb, MsgPackDecodeError
+)
+
+
+class TestMsgPackFormat(unittest.TestCase):
+    def test_known_encodings(self):
+        # examples are taken from the MessagePack specification
+        samples = (
+            (None, b'\xc0'),
+            (False, b'\xc2'),
+            (True, b'\xc3'),
+            (0, b'\x00'),
+            (127, b'\x7f'),
+            (-1, b'\xff'),
+            (-32, b'\xe0'),
+            (-33, b'\xd0\xdf'),
+            (128, b'\xcc\x80'),
+            (65535, b'\xcd\xff\xff'),
+            (65536, b'\xce\x00\x01\x00\x00'),
+            (2 ** 32, b'\xcf\x00\x00\x00\x01\x00\x00\x00\x00'),
+            (-129, b'\xd1\xff\x7f'),
+            (1.5, b'\xcb\x3f\xf8\x00\x00\x00\x00\x00\x00'),
+            ('', b'\xa0'),
+            ('abc', b'\xa3abc'),
+            ('a' * 32, b'\xd9\x20' + b'a' * 32),
+            (b'\x01', b'\xc4\x01\x01'),
+            ([], b'\x90'),
+            ([1, 2], b'\x92\x01\x02'),
+            ({'a': 1}, b'\x81\xa1a\x01'),
+        )
+
+        for obj, encoded in samples:
+            self.assertEqual(encoded, packb(obj), obj)
+            self.assertEqual(obj, unpackb(encoded), obj)
+
+    def test_round_trip(self):
+        obj = {
+            'id': 'L1',
+            'is_enabled': True,
+            'placement': None,
+            'brightness': 75,
+            'last_updated': 1517232368.30256,
+            'capabilities': ['actuator', 'has_state'] * 20,
+            'nested': {str(i): -i * 1000 for i in range(20)},
+            'text': 'x' * 70000,
+            'unicode': 'Кухня',
+            'big': 2 ** 63,
+            'small': -2 ** 63
+        }
+
+        self.assertEqual(obj, unpackb(packb(obj)))
+
+    def test_tuples_encoded_as_arrays(self):
+        self.assertEqual([1, 'a'], unpackb(packb((1, 'a'))))
+
+    def test_unsupported_types(self):
+        with self.assertRaises(TypeError):
+            packb(object())
+
+        with self.assertRaises(OverflowError):
+            packb(2 ** 64)
+
+    def test_invalid_data(self):
+        for data in (
+                b'', b'\x92\x01', b'\xa3ab', b'\xc1', b'\x01\x02',
+                b'\xd4\x00\x00', b'\xa2\xff\xfe', b'\x81\x90\x01'
+        ):
+            with self.assertRaises(MsgPackDecodeError, msg=data):
+                unpackb(data)
+
+
+if __name__ == '__main__':
+    unittest.main()
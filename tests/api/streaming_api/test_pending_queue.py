@@ -0,0 +1,359 @@
+"""
+This module contains unit tests for PendingQueue
+"""
+import asyncio
+import unittest
+
+from dpl.api.streaming_api.message import Message
+from dpl.api.streaming_api.pending_queue import (
+    PendingQueue, OverflowPolicy, SlowConsumerError
+)
+from dpl.events.topic_tree import TopicTree
+
+
+def build_message(topic: str, type_: str = "data", message_id: int = None):
+    return Message(
+        timestamp=1.0, type_=type_, topic=topic, body={},
+        message_id=message_id
+    )
+
+
+class TestPendingQueue(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _build_queue(self, max_size=0, policy=OverflowPolicy.drop_oldest):
+        return PendingQueue(
+            max_size=max_size, overflow_policy=policy, loop=self.loop
+        )
+
+    def _drain(self, queue: PendingQueue) -> list:
+        result = []
+
+        while not queue.empty():
+            result.append(queue.get_nowait().topic)
+
+        return result
+
+    def test_fifo_order(self):
+        queue = self._build_queue()
+
+        for topic in ('a', 'b', 'c'):
+            queue.put_nowait(build_message(topic))
+
+        self.assertEqual(3, queue.qsize())
+        self.assertEqual(['a', 'b', 'c'], self._drain(queue))
+
+    def test_unlimited_by_default(self):
+        queue = self._build_queue()
+
+        for i in range(10000):
+            queue.put_nowait(build_message('t%d' % i))
+
+        self.assertEqual(10000, queue.qsize())
+        self.assertEqual(0, queue.dropped_count)
+
+    def test_get_nowait_empty(self):
+        queue = self._build_queue()
+
+        with self.assertRaises(asyncio.QueueEmpty):
+            queue.get_nowait()
+
+    def test_drop_oldest(self):
+        queue = self._build_queue(2, OverflowPolicy.drop_oldest)
+
+        for topic in ('a', 'b', 'c'):
+            queue.put_nowait(build_message(topic))
+
+        self.assertEqual(3, queue.queued_count)
+        self.assertEqual(1, queue.dropped_count)
+        self.assertEqual(['b', 'c'], self._drain(queue))
+
+    def test_drop_newest(self):
+        queue = self._build_queue(2, OverflowPolicy.drop_newest)
+
+        for topic in ('a', 'b', 'c'):
+            queue.put_nowait(build_message(topic))
+
+        self.assertEqual(1, queue.dropped_count)
+        self.assertEqual(['a', 'b'], self._drain(queue))
+
+    def test_coalesce_by_topic(self):
+        queue = self._build_queue(2, OverflowPolicy.coalesce_by_topic)
+        newer_a = build_message('a')
+
+        queue.put_nowait(build_message('a'))
+        queue.put_nowait(build_message('b'))
+        queue.put_nowait(newer_a)
+
+        self.assertEqual(1, queue.dropped_count)
+        self.assertIs(newer_a, queue.get_nowait())
+        self.assertEqual('b', queue.get_nowait().topic)
+
+    def test_coalesce_falls_back_to_drop_oldest(self):
+        queue = self._build_queue(2, OverflowPolicy.coalesce_by_topic)
+
+        for topic in ('a', 'b', 'c'):
+            queue.put_nowait(build_message(topic))
+
+        self.assertEqual(['b', 'c'], self._drain(queue))
+
+    def test_tracked_and_control_messages_not_coalesced(self):
+        queue = self._build_queue(2, OverflowPolicy.coalesce_by_topic)
+
+        queue.put_nowait(build_message('a', message_id=1))
+        queue.put_nowait(build_message('b', type_="control"))
+        queue.put_nowait(build_message('a', message_id=2))
+        queue.put_nowait(build_message('b', type_="control"))
+
+        self.assertEqual(1, queue.dropped_count)
+        self.assertEqual(['b', 'a', 'b'], self._drain(queue))
+
+    def _fill_with_control(self, policy: OverflowPolicy) -> PendingQueue:
+        queue = self._build_queue(3, policy)
+
+        queue.put_nowait(build_message('snapshot', type_="control"))
+        queue.put_nowait(build_message('a'))
+        queue.put_nowait(build_message('b'))
+
+        return queue
+
+    def test_drop_oldest_keeps_control_messages(self):
+        queue = self._fill_with_control(OverflowPolicy.drop_oldest)
+
+        queue.put_nowait(build_message('c'))
+        queue.put_nowait(build_message('resync_needed', type_="control"))
+
+        self.assertEqual(1, queue.dropped_count)
+        self.assertEqual(
+            ['snapshot', 'b', 'c', 'resync_needed'], self._drain(queue)
+        )
+
+    def test_coalesce_by_topic_keeps_control_messages(self):
+        queue = self._fill_with_control(OverflowPolicy.coalesce_by_topic)
+
+        queue.put_nowait(build_message('c'))
+        queue.put_nowait(build_message('b'))
+        queue.put_nowait(build_message('subscribe_ack', type_="control"))
+
+        self.assertEqual(2, queue.dropped_count)
+        self.assertEqual(
+            ['snapshot', 'b', 'c', 'subscribe_ack'], self._drain(queue)
+        )
+
+    def test_drop_newest_keeps_control_messages(self):
+        queue = self._fill_with_control(OverflowPolicy.drop_newest)
+
+        queue.put_nowait(build_message('c'))
+        queue.put_nowait(build_message('session_stats', type_="control"))
+
+        self.assertEqual(1, queue.dropped_count)
+        self.assertEqual(
+            ['snapshot', 'a', 'b', 'session_stats'], self._drain(queue)
+        )
+
+    def test_data_dropped_if_only_control_messages_pending(self):
+        queue = self._build_queue(2, OverflowPolicy.drop_oldest)
+
+        queue.put_nowait(build_message('subscribe_ack', type_="control"))
+        queue.put_nowait(build_message('snapshot', type_="control"))
+        queue.put_nowait(build_message('a'))
+
+        self.assertEqual(1, queue.dropped_count)
+        self.assertEqual(['subscribe_ack', 'snapshot'], self._drain(queue))
+
+    def test_removed_data_message_not_coalesced(self):
+        queue = self._fill_with_control(OverflowPolicy.coalesce_by_topic)
+        newer_a = build_message('a')
+
+        queue.put_nowait(build_message('c'))
+        queue.put_nowait(newer_a)
+
+        self.assertEqual(
+            ['snapshot', 'c'], [queue.get_nowait().topic for _ in range(2)]
+        )
+        self.assertIs(newer_a, queue.get_nowait())
+
+    def test_disconnect(self):
+        queue = self._build_queue(2, OverflowPolicy.disconnect)
+
+        for topic in ('a', 'b', 'c', 'd'):
+            queue.put_nowait(build_message(topic))
+
+        self.assertTrue(queue.is_overflowed)
+        self.assertEqual(0, queue.qsize())
+        self.assertEqual(4, queue.dropped_count)
+
+        with self.assertRaises(SlowConsumerError):
+            queue.get_nowait()
+
+        queue.clear()
+        queue.put_nowait(build_message('e'))
+
+        self.assertFalse(queue.is_overflowed)
+        self.assertEqual(['e'], self._drain(queue))
+
+    def test_get_waits_for_message(self):
+        queue = self._build_queue()
+
+        async def _test():
+            getter = asyncio.ensure_future(queue.get(), loop=self.loop)
+            await asyncio.sleep(0)
+            self.assertFalse(getter.done())
+
+            queue.put_nowait(build_message('a'))
+
+            return await getter
+
+        result = self.loop.run_until_complete(_test())
+        self.assertEqual('a', result.topic)
+
+    def test_waiting_get_raises_on_disconnect(self):
+        queue = self._build_queue(1, OverflowPolicy.disconnect)
+
+        async def _test():
+            queue.put_nowait(build_message('a'))
+            queue.get_nowait()
+
+            getter = asyncio.ensure_future(queue.get(), loop=self.loop)
+            await asyncio.sleep(0)
+
+            queue.put_nowait(build_message('b'))
+            queue.put_nowait(build_message('c'))
+
+            await getter
+
+        with self.assertRaises(SlowConsumerError):
+            self.loop.run_until_complete(_test())
+
+    def test_cancelled_get(self):
+        queue = self._build_queue()
+
+        async def _test():
+            getter = asyncio.ensure_future(queue.get(), loop=self.loop)
+            await asyncio.sleep(0)
+            getter.cancel()
+            await asyncio.sleep(0)
+
+            queue.put_nowait(build_message('a'))
+
+            return await queue.get()
+
+        self.assertEqual('a', self.loop.run_until_complete(_test()).topic)
+
+    def test_get_batch(self):
+        queue = self._build_queue()
+
+        for topic in ('a', 'b', 'c'):
+            queue.put_nowait(build_message(topic))
+
+        batch = self.loop.run_until_complete(queue.get_batch(max_count=2))
+
+        self.assertEqual(['a', 'b'], [m.topic for m in batch])
+        self.assertEqual(1, queue.qsize())
+
+    def test_get_batch_waits_for_flush_interval(self):
+        queue = self._build_queue()
+
+        async def _test():
+            getter = asyncio.ensure_future(
+                queue.get_batch(max_count=10, flush_interval=0.05),
+                loop=self.loop
+            )
+            await asyncio.sleep(0)
+
+            queue.put_nowait(build_message('a'))
+            await asyncio.sleep(0.01)
+            queue.put_nowait(build_message('b'))
+
+            return await getter
+
+        batch = self.loop.run_until_complete(_test())
+        self.assertEqual(['a', 'b'], [m.topic for m in batch])
+
+
+class TestPendingQueueConflation(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+        conflated_topics = TopicTree()
+        conflated_topics.add('things/+/modified', key=None)
+
+        self.queue = PendingQueue(
+            loop=self.loop, conflated_topics=conflated_topics
+        )
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_last_value_replaces_in_place(self):
+        queue = self.queue
+
+        first = build_message('things/L1/modified')
+        last = build_message('things/L1/modified')
+
+        queue.put_nowait(first)
+        queue.put_nowait(build_message('things/L2/modified'))
+        queue.put_nowait(last)
+
+        self.assertEqual(2, queue.qsize())
+        self.assertEqual(1, queue.conflated_count)
+        self.assertEqual(0, queue.dropped_count)
+        self.assertIs(last, queue.get_nowait())
+        self.assertEqual('things/L2/modified', queue.get_nowait().topic)
+
+    def test_other_topics_not_conflated(self):
+        queue = self.queue
+
+        queue.put_nowait(build_message('placements/R1/modified'))
+        queue.put_nowait(build_message('placements/R1/modified'))
+
+        self.assertEqual(2, queue.qsize())
+        self.assertEqual(0, queue.conflated_count)
+
+    def test_conflate_all(self):
+        queue = self.queue
+        queue.conflate_all = True
+
+        queue.put_nowait(build_message('placements/R1/modified'))
+        queue.put_nowait(build_message('placements/R1/modified'))
+        queue.put_nowait(build_message('placements/R1/modified', message_id=1))
+
+        self.assertEqual(2, queue.qsize())
+        self.assertEqual(1, queue.conflated_count)
+
+        queue.conflate_all = False
+        queue.put_nowait(build_message('placements/R2/modified'))
+        queue.put_nowait(build_message('placements/R2/modified'))
+
+        self.assertEqual(4, queue.qsize())
+
+    def test_tracked_and_control_messages_not_conflated(self):
+        queue = self.queue
+        topic = 'things/L1/modified'
+
+        queue.put_nowait(build_message(topic, message_id=1))
+        queue.put_nowait(build_message(topic, message_id=2))
+        queue.put_nowait(build_message(topic, type_="control"))
+        queue.put_nowait(build_message(topic, type_="control"))
+
+        self.assertEqual(4, queue.qsize())
+        self.assertEqual(0, queue.conflated_count)
+
+    def test_delivered_message_not_replaced(self):
+        queue = self.queue
+        topic = 'things/L1/modified'
+
+        queue.put_nowait(build_message(topic))
+        queue.get_nowait()
+        queue.put_nowait(build_message(topic))
+
+        self.assertEqual(1, queue.qsize())
+        self.assertEqual(0, queue.conflated_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
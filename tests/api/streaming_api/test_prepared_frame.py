@@ -0,0 +1,92 @@
+"""
+This module contains unit tests for PreparedFrame and a shared encoding
+of Streaming API messages
+"""
+import json
+import unittest
+
+from dpl.api.streaming_api.message import Message
+from dpl.api.streaming_api.message_json import (
+    message_dumps, message_to_text, messages_to_text
+)
+from dpl.api.streaming_api.prepared_frame import PreparedFrame
+
+
+class TestPreparedFrame(unittest.TestCase):
+    TIMESTAMP = 1517232368.30256
+    TOPIC = 'things/L1/modified'
+    BODY = {'id': 'L1', 'is_enabled': True, 'brightness': 75}
+
+    def setUp(self):
+        self.frame = PreparedFrame(
+            timestamp=self.TIMESTAMP, type_="data", topic=self.TOPIC,
+            body=self.BODY
+        )
+
+    def _build_message(self, message_id=None, frame=None) -> Message:
+        return Message(
+            timestamp=self.TIMESTAMP, type_="data", topic=self.TOPIC,
+            body=self.BODY, message_id=message_id, frame=frame
+        )
+
+    def test_text_equal_to_message_dumps(self):
+        self.assertEqual(
+            message_dumps(self._build_message()), self.frame.text
+        )
+
+    def test_spliced_message_id_equal_to_message_dumps(self):
+        for message_id in (0, 1, 65535):
+            self.assertEqual(
+                message_dumps(self._build_message(message_id=message_id)),
+                self.frame.with_message_id(message_id)
+            )
+
+    def test_spliced_message_id_is_valid_json(self):
+        decoded = json.loads(self.frame.with_message_id(12))
+
+        self.assertEqual(decoded['message_id'], 12)
+        self.assertEqual(decoded['body'], self.BODY)
+
+    def test_event_seq_equal_to_message_dumps(self):
+        frame = PreparedFrame(
+            timestamp=self.TIMESTAMP, type_="data", topic=self.TOPIC,
+            body=self.BODY, event_seq=42
+        )
+        message = Message(
+            timestamp=self.TIMESTAMP, type_="data", topic=self.TOPIC,
+            body=self.BODY, message_id=5, event_seq=42
+        )
+
+        self.assertEqual(message_dumps(message), frame.with_message_id(5))
+
+    def test_encoded_once(self):
+        self.assertIs(self.frame.text, self.frame.text)
+
+    def test_message_to_text_uses_frame(self):
+        message = self._build_message(message_id=3, frame=self.frame)
+
+        self.assertEqual(
+            message_to_text(message), self.frame.with_message_id(3)
+        )
+
+    def test_message_to_text_without_frame(self):
+        message = self._build_message(message_id=3)
+
+        self.assertEqual(message_to_text(message), message_dumps(message))
+
+    def test_messages_to_text_is_json_array(self):
+        messages = [
+            self._build_message(frame=self.frame),
+            self._build_message(message_id=7, frame=self.frame),
+            self._build_message(message_id=8)
+        ]
+
+        decoded = json.loads(messages_to_text(messages))
+
+        self.assertEqual(
+            [json.loads(message_dumps(m)) for m in messages], decoded
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,238 @@
+"""
+This module contains unit tests for retained message stores
+"""
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from dpl.api.streaming_api.message import Message
+from dpl.api.streaming_api.retained_store import (
+    InMemoryRetainedStore, SqliteRetainedStore
+)
+
+
+def build_message(message_id: int, value: int = 0) -> Message:
+    return Message(
+        timestamp=1.5, type_="data", topic="things/L1/modified",
+        body={'value': value}, message_id=message_id
+    )
+
+
+# an estimated size of each message built by build_message
+MESSAGE_SIZE = len(
+    '{"timestamp": 1.5, "type": "data", "topic": "things/L1/modified", '
+    '"body": {"value": 0}, "message_id": 1}'
+)
+
+
+class TestInMemoryRetainedStore(unittest.TestCase):
+    def test_add_get_remove(self):
+        store = InMemoryRetainedStore()
+        message = build_message(1)
+
+        store.add('s1', message)
+
+        self.assertIs(message, store.get('s1', 1))
+        self.assertIsNone(store.get('s2', 1))
+
+        store.remove('s1', 1)
+        store.remove('s1', 1)
+
+        self.assertIsNone(store.get('s1', 1))
+
+    def test_no_eviction(self):
+        store = InMemoryRetainedStore()
+
+        for i in range(1, 6):
+            store.add('s%d' % (i % 2), build_message(i))
+
+        # retained messages are never dropped by the store itself
+        for i in range(1, 6):
+            self.assertIsNotNone(store.get('s%d' % (i % 2), i))
+
+    def test_remove_range(self):
+        store = InMemoryRetainedStore()
+
+        for i in range(1, 6):
+            store.add('s1', build_message(i))
+
+        store.add('s2', build_message(3))
+
+        store.remove_range('s1', 2, 4)
+        store.remove_range('s1', 5, 1000)
+
+        self.assertEqual(
+            [1], [i for i in range(1, 6) if store.get('s1', i) is not None]
+        )
+        self.assertIsNotNone(store.get('s2', 3))
+
+    def test_remove_all_for(self):
+        store = InMemoryRetainedStore()
+        store.add('s1', build_message(1))
+        store.add('s2', build_message(1))
+
+        store.remove_all_for('s1')
+
+        self.assertIsNone(store.get('s1', 1))
+        self.assertIsNotNone(store.get('s2', 1))
+        self.assertEqual({}, store.restore())
+
+
+class TestSqliteRetainedStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'retained.sqlite')
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _open(self, **kwargs) -> SqliteRetainedStore:
+        return SqliteRetainedStore(self.path, loop=self.loop, **kwargs)
+
+    def _count_saved(self) -> int:
+        connection = sqlite3.connect(self.path)
+
+        try:
+            return connection.execute(
+                "SELECT COUNT(*) FROM retained_messages"
+            ).fetchone()[0]
+        finally:
+            connection.close()
+
+    def test_restore_after_reopen(self):
+        store = self._open()
+
+        for i in range(1, 5):
+            store.add('s1', build_message(i, value=i))
+
+        store.add('s2', build_message(7))
+        store.remove('s1', 2)
+        store.mark_seen('s1', 100.5)
+        store.close()
+
+        store = self._open()
+        restored = store.restore()
+        store.close()
+
+        last_seen, messages = restored['s1']
+        self.assertEqual(100.5, last_seen)
+        self.assertEqual([1, 3, 4], [m.message_id for m in messages])
+        self.assertEqual({'value': 3}, messages[1].body)
+
+        last_seen, messages = restored['s2']
+        self.assertIsNone(last_seen)
+        self.assertEqual([7], [m.message_id for m in messages])
+
+    def test_writes_batched(self):
+        store = self._open(flush_interval=0.01)
+
+        for i in range(1, 6):
+            store.add('s1', build_message(i))
+
+        store.remove('s1', 2)
+        store.mark_seen('s1', 1.0)
+
+        # nothing is written until the scheduled flush
+        self.assertEqual(7, store.pending_writes)
+        self.assertEqual(0, self._count_saved())
+
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+
+        self.assertEqual(0, store.pending_writes)
+        self.assertEqual(4, self._count_saved())
+        store.close()
+
+    def test_memory_usage(self):
+        store = self._open()
+
+        for i in range(1, 4):
+            store.add('s%d' % (i % 2), build_message(i))
+
+        self.assertEqual(MESSAGE_SIZE * 3, store.memory_usage)
+
+        # a message with the same identifier replaces the old one
+        store.add('s1', build_message(1))
+        self.assertEqual(MESSAGE_SIZE * 3, store.memory_usage)
+
+        store.remove('s1', 1)
+        self.assertEqual(MESSAGE_SIZE * 2, store.memory_usage)
+
+        store.remove_all_for('s1')
+        self.assertEqual(MESSAGE_SIZE, store.memory_usage)
+        store.close()
+
+    def test_get_flushes_pending_writes(self):
+        store = self._open(memory_budget=MESSAGE_SIZE)
+        store.add('s1', build_message(1, value=1))
+        store.add('s1', build_message(2))
+
+        # the first message was evicted from the cache before it was saved
+        self.assertEqual({'value': 1}, store.get('s1', 1).body)
+        self.assertEqual(0, store.pending_writes)
+        store.close()
+
+    def test_spilled_messages_loaded_from_disk(self):
+        store = self._open(memory_budget=MESSAGE_SIZE * 2)
+
+        for i in range(1, 6):
+            store.add('s1', build_message(i, value=i))
+
+        self.assertEqual(MESSAGE_SIZE * 2, store.memory_usage)
+
+        message = store.get('s1', 1)
+        self.assertEqual(1, message.message_id)
+        self.assertEqual({'value': 1}, message.body)
+
+        # loaded messages are not cached back
+        self.assertEqual(MESSAGE_SIZE * 2, store.memory_usage)
+
+        store.remove('s1', 1)
+        self.assertIsNone(store.get('s1', 1))
+        store.close()
+
+    def test_reused_message_id_moved_to_the_end(self):
+        store = self._open()
+        store.add('s1', build_message(1, value=1))
+        store.add('s1', build_message(2))
+        store.add('s1', build_message(1, value=2))
+
+        messages = store.restore()['s1'][1]
+        store.close()
+
+        self.assertEqual([2, 1], [m.message_id for m in messages])
+        self.assertEqual({'value': 2}, messages[1].body)
+
+    def test_remove_range(self):
+        store = self._open(memory_budget=MESSAGE_SIZE)
+
+        for i in range(1, 6):
+            store.add('s1', build_message(i))
+
+        store.remove_range('s1', 2, 5)
+
+        self.assertIsNone(store.get('s1', 5))
+        self.assertEqual(
+            [1], [m.message_id for m in store.restore()['s1'][1]]
+        )
+        store.close()
+
+    def test_remove_all_for(self):
+        store = self._open()
+        store.add('s1', build_message(1))
+        store.mark_seen('s1', 1.0)
+        store.add('s2', build_message(1))
+
+        store.remove_all_for('s1')
+
+        self.assertIsNone(store.get('s1', 1))
+        self.assertEqual(['s2'], list(store.restore().keys()))
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
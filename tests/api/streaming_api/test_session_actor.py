@@ -0,0 +1,113 @@
+"""
+This module contains unit tests for SessionActor
+"""
+import asyncio
+import unittest
+
+from dpl.api.streaming_api.session_actor import SessionActor
+
+
+class TestSessionActor(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.idle = []
+        self.actor = SessionActor('S1', on_idle=self.idle.append)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_sync_and_async_calls(self):
+        async def double(value):
+            await asyncio.sleep(0)
+            return value * 2
+
+        futures = [
+            self.actor.call(lambda: 1),
+            self.actor.call(double, 2),
+            self.actor.call(double, value=3)
+        ]
+
+        self.assertFalse(self.actor.is_idle)
+        self.assertEqual([1, 4, 6], self._run(asyncio.gather(*futures)))
+        self._run(asyncio.sleep(0))
+
+        self.assertTrue(self.actor.is_idle)
+        self.assertEqual([self.actor], self.idle)
+
+    def test_operations_never_interleave(self):
+        log = []
+
+        async def operation(name):
+            log.append(('start', name))
+            await asyncio.sleep(0.01)
+            log.append(('end', name))
+
+        futures = [self.actor.call(operation, n) for n in ('a', 'b', 'c')]
+        self._run(asyncio.gather(*futures))
+
+        self.assertEqual(
+            [
+                ('start', 'a'), ('end', 'a'), ('start', 'b'), ('end', 'b'),
+                ('start', 'c'), ('end', 'c')
+            ],
+            log
+        )
+
+    def test_actors_run_concurrently(self):
+        other = SessionActor('S2')
+        log = []
+
+        async def operation(name):
+            log.append(('start', name))
+            await asyncio.sleep(0.01)
+            log.append(('end', name))
+
+        self._run(asyncio.gather(
+            self.actor.call(operation, 'S1'), other.call(operation, 'S2')
+        ))
+
+        self.assertEqual(
+            [('start', 'S1'), ('start', 'S2')], log[:2]
+        )
+
+    def test_exception_is_propagated(self):
+        def fail():
+            raise ValueError()
+
+        failed = self.actor.call(fail)
+        succeeded = self.actor.call(lambda: 'ok')
+
+        with self.assertRaises(ValueError):
+            self._run(failed)
+
+        self.assertEqual('ok', self._run(succeeded))
+
+    def test_cancelled_call_is_skipped(self):
+        called = []
+
+        first = self.actor.call(asyncio.sleep, 0.01)
+        skipped = self.actor.call(called.append, 1)
+        skipped.cancel()
+
+        self._run(first)
+        self._run(asyncio.sleep(0))
+
+        self.assertEqual([], called)
+        self.assertTrue(self.actor.is_idle)
+
+    def test_restarted_on_demand(self):
+        self.assertEqual(1, self._run(self.actor.call(lambda: 1)))
+        self._run(asyncio.sleep(0))
+        self.assertEqual(2, self._run(self.actor.call(lambda: 2)))
+        self._run(asyncio.sleep(0))
+
+        self.assertEqual(2, len(self.idle))
+
+
+if __name__ == '__main__':
+    unittest.main()
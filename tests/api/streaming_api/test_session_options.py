@@ -0,0 +1,144 @@
+"""
+This module contains unit tests for SessionOptionsNegotiator
+"""
+import unittest
+
+from dpl.api.streaming_api.session_options import SessionOptionsNegotiator
+from dpl.api.streaming_api.streaming_flow_error import StreamingFlowError
+
+
+class TestSessionOptionsNegotiator(unittest.TestCase):
+    def setUp(self):
+        self.negotiator = SessionOptionsNegotiator(
+            max_batch_flush_interval=0.005, max_batch_messages=100
+        )
+
+    def test_nothing_requested(self):
+        options = self.negotiator.negotiate({'access_token': 'token'})
+
+        self.assertIsNone(options.batching)
+        self.assertEqual({}, options.to_dict())
+
+    def test_batching_defaults(self):
+        options = self.negotiator.negotiate({'batching': True})
+
+        self.assertEqual(0.005, options.batching.flush_interval)
+        self.assertEqual(100, options.batching.max_messages)
+        self.assertEqual(
+            {'batching': {'flush_interval': 5, 'max_messages': 100}},
+            options.to_dict()
+        )
+
+    def test_batching_disabled(self):
+        options = self.negotiator.negotiate({'batching': False})
+
+        self.assertIsNone(options.batching)
+
+    def test_batching_parameters_limited(self):
+        options = self.negotiator.negotiate({
+            'batching': {'flush_interval': 1000, 'max_messages': 10000}
+        })
+
+        self.assertEqual(0.005, options.batching.flush_interval)
+        self.assertEqual(100, options.batching.max_messages)
+
+        options = self.negotiator.negotiate({
+            'batching': {'flush_interval': 2, 'max_messages': 10}
+        })
+
+        self.assertEqual(0.002, options.batching.flush_interval)
+        self.assertEqual(10, options.batching.max_messages)
+
+    def test_single_message_batches_not_accepted(self):
+        options = self.negotiator.negotiate({
+            'batching': {'max_messages': 1}
+        })
+
+        self.assertIsNone(options.batching)
+
+        negotiator = SessionOptionsNegotiator(max_batch_messages=1)
+        self.assertIsNone(negotiator.negotiate({'batching': True}).batching)
+
+    def test_invalid_batching_parameters(self):
+        for batching in (
+                'yes', 1, [], {'flush_interval': -1},
+                {'flush_interval': 'fast'}, {'max_messages': 0},
+                {'max_messages': 1.5}, {'max_messages': True}
+        ):
+            with self.assertRaises(StreamingFlowError):
+                self.negotiator.negotiate({'batching': batching})
+
+    def test_encoding_accepted(self):
+        options = self.negotiator.negotiate({'encoding': 'msgpack'})
+
+        self.assertEqual('msgpack', options.codec.name)
+        self.assertTrue(options.codec.is_binary)
+        self.assertEqual({'encoding': 'msgpack'}, options.to_dict())
+
+    def test_unknown_encoding_falls_back_to_json(self):
+        for body in ({}, {'encoding': 'json'}, {'encoding': 'cbor'}):
+            options = self.negotiator.negotiate(body)
+
+            self.assertEqual('json', options.codec.name)
+            self.assertNotIn('encoding', options.to_dict())
+
+    def test_invalid_encoding(self):
+        with self.assertRaises(StreamingFlowError):
+            self.negotiator.negotiate({'encoding': 1})
+
+    def test_delta_disabled_without_topics(self):
+        options = self.negotiator.negotiate({'delta': True})
+
+        self.assertIsNone(options.delta)
+
+    def test_delta_accepted(self):
+        negotiator = SessionOptionsNegotiator(
+            delta_topics=['things/+/modified'], max_delta_snapshot_interval=10
+        )
+
+        options = negotiator.negotiate({'delta': True})
+        self.assertEqual(
+            {'delta': {'snapshot_interval': 10}}, options.to_dict()
+        )
+
+        options = negotiator.negotiate({'delta': {'snapshot_interval': 100}})
+        self.assertEqual(10, options.delta.snapshot_interval)
+
+        options = negotiator.negotiate({'delta': {'snapshot_interval': 0}})
+        self.assertIsNone(options.delta)
+
+        # each connection receives its own encoder
+        self.assertIsNot(
+            negotiator.negotiate({'delta': True}).delta,
+            negotiator.negotiate({'delta': True}).delta
+        )
+
+    def test_invalid_delta_parameters(self):
+        for delta in ('yes', 1, {'snapshot_interval': -1},
+                      {'snapshot_interval': 1.5}):
+            with self.assertRaises(StreamingFlowError):
+                self.negotiator.negotiate({'delta': delta})
+
+    def test_replay(self):
+        self.assertIsNone(self.negotiator.negotiate({}).replay)
+
+        options = self.negotiator.negotiate(
+            {'replay': {'epoch': 'abc', 'last_seq': 12}}
+        )
+
+        self.assertEqual('abc', options.replay.epoch)
+        self.assertEqual(12, options.replay.last_seq)
+        # the replay is not a capability
+        self.assertEqual({}, options.to_dict())
+
+    def test_invalid_replay_parameters(self):
+        for replay in (True, 12, {'last_seq': 1},
+                       {'epoch': 'abc', 'last_seq': -1},
+                       {'epoch': 'abc', 'last_seq': '1'},
+                       {'epoch': 1, 'last_seq': 1}):
+            with self.assertRaises(StreamingFlowError):
+                self.negotiator.negotiate({'replay': replay})
+
+
+if __name__ == '__main__':
+    unittest.main()
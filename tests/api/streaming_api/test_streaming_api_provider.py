@@ -0,0 +1,343 @@
+"""
+This module contains unit tests for snapshots on subscription, replay fences
+and expiration of Sessions in StreamingApiProvider
+"""
+import asyncio
+import unittest
+from collections import deque
+from unittest.mock import Mock
+
+from dpl.auth.abs_auth_service import AbsAuthService
+from dpl.auth.auth_context import AuthContext
+from dpl.events.event import Event
+from dpl.events.event_hub import EventHub
+from dpl.events.event_journal import EventJournal
+from dpl.events.object_related_event import ObjectRelatedEvent
+from dpl.services.abs_entity_service import AbsEntityService
+from dpl.api.streaming_api.message import Message
+from dpl.api.streaming_api.message_utils import build_message
+from dpl.api.streaming_api.session_options import (
+    SessionOptions, ReplayRequest
+)
+from dpl.api.streaming_api.streaming_api_provider import StreamingApiProvider
+
+
+SESSION_ID = 's1'
+
+
+class Thing(object):
+    pass
+
+
+def convert_thing(source: Thing, topic: str) -> Event:
+    return ObjectRelatedEvent(topic=topic, object_dto={'id': 'T1'})
+
+
+def build_source(*object_ids) -> AbsEntityService:
+    source = Mock(spec_set=AbsEntityService)
+    source.view_all.return_value = [
+        {'id': object_id} for object_id in object_ids
+    ]
+
+    return source
+
+
+def build_data_message(topic: str, event_seq: int) -> Message:
+    return Message(
+        timestamp=1.5, type_="data", topic=topic, body={},
+        event_seq=event_seq
+    )
+
+
+class TestSnapshots(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.journal = EventJournal(capacity=100)
+        self.provider = self._build_provider(self.journal)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _build_provider(
+            self, journal: EventJournal = None
+    ) -> StreamingApiProvider:
+        provider = StreamingApiProvider(
+            auth_context=AuthContext(),
+            auth_service=Mock(spec_set=AbsAuthService),
+            loop=self.loop,
+            event_journal=journal,
+            snapshot_sources={
+                'things': build_source('T1', 'T2'),
+                'placements': build_source('P1')
+            }
+        )
+
+        # messages are recorded instead of being queued for delivery
+        self.delivered = []
+
+        async def _put_message(session_id, message, ensure_delivery=False):
+            self.delivered.append(message)
+
+        provider._delivery_manager.put_message = _put_message
+
+        return provider
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def _journal_events(self, count: int) -> None:
+        for _ in range(count):
+            self.journal.append(Event(topic='things/T1/modified'))
+
+    def _subscribe(self, target_topic: str, **kwargs) -> None:
+        body = {'target_topic': target_topic}
+        body.update(kwargs)
+
+        self._run(self.provider._handle_subscription_message(
+            build_message(type_="control", topic="subscribe", body=body),
+            SESSION_ID
+        ))
+
+    def test_subscribe_with_snapshot(self):
+        self._journal_events(2)
+        self._subscribe('things/#', with_snapshot=True)
+
+        ack, snapshot = self.delivered
+
+        self.assertEqual('subscribe_ack', ack.topic)
+        self.assertEqual('snapshot', snapshot.topic)
+        self.assertEqual('things/#', snapshot.body['target_topic'])
+        self.assertEqual(
+            {'things/T1/modified', 'things/T2/modified'},
+            set(snapshot.body['objects'])
+        )
+        self.assertEqual({'id': 'T2'}, snapshot.body['objects'][
+            'things/T2/modified'
+        ])
+        self.assertEqual(2, snapshot.event_seq)
+
+    def test_subscribe_without_snapshot(self):
+        self._subscribe('things/#')
+
+        self.assertEqual(
+            ['subscribe_ack'], [m.topic for m in self.delivered]
+        )
+        self.assertNotIn(SESSION_ID, self.provider._snapshot_fences)
+
+    def test_patterns_across_sources(self):
+        cases = (
+            ('+/+/modified', {
+                'things/T1/modified', 'things/T2/modified',
+                'placements/P1/modified'
+            }),
+            ('#', {
+                'things/T1/modified', 'things/T2/modified',
+                'placements/P1/modified'
+            }),
+            ('placements/+/added', {'placements/P1/added'}),
+            ('things/T1/#', {'things/T1/modified'}),
+            ('things/+/deleted', set()),
+            ('users/#', set())
+        )
+
+        for target_topic, expected in cases:
+            snapshot = self.provider._build_snapshot(
+                SESSION_ID, target_topic
+            )
+
+            self.assertEqual(
+                expected, set(snapshot.body['objects']), target_topic
+            )
+
+    def test_no_event_seq_without_journal(self):
+        provider = self._build_provider()
+
+        snapshot = provider._build_snapshot(SESSION_ID, 'things/#')
+
+        self.assertIsNone(snapshot.event_seq)
+        self.assertNotIn(SESSION_ID, provider._snapshot_fences)
+
+    def test_events_up_to_fence_suppressed(self):
+        self._journal_events(2)
+        self._subscribe('things/#', retain_messages=True, with_snapshot=True)
+        self.delivered.clear()
+
+        for topic, event_seq in (('things/T1/modified', 1),
+                                 ('things/T2/modified', 2),
+                                 ('things/T1/modified', 3)):
+            self._run(self.provider._send_data_to_all(
+                1.5, topic, {}, event_seq
+            ))
+
+        self.assertEqual([3], [m.event_seq for m in self.delivered])
+
+    def test_fence_applies_to_snapshot_patterns_only(self):
+        self._journal_events(2)
+        self._subscribe(
+            'things/T1/#', retain_messages=True, with_snapshot=True
+        )
+        self._subscribe('placements/#', retain_messages=True)
+        self.delivered.clear()
+
+        self._run(self.provider._send_data_to_all(
+            1.5, 'placements/P1/modified', {}, 2
+        ))
+        self._run(self.provider._send_data_to_all(
+            1.5, 'things/T1/modified', {}, 2
+        ))
+
+        self.assertEqual(
+            ['placements/P1/modified'], [m.topic for m in self.delivered]
+        )
+
+    def test_held_back_events_filtered_by_fence(self):
+        self._journal_events(2)
+        self.provider._build_snapshot(SESSION_ID, 'things/#')
+
+        # events received while the snapshot was being sent
+        self.provider._replay_buffers[SESSION_ID] = deque(
+            (build_data_message('things/T1/modified', seq), True)
+            for seq in (1, 2, 3, 4)
+        )
+        self._run(self.provider._flush_replay_buffer(SESSION_ID))
+
+        self.assertEqual([3, 4], [m.event_seq for m in self.delivered])
+        self.assertNotIn(SESSION_ID, self.provider._replay_buffers)
+
+    def test_pending_retained_events_not_fenced_by_replay(self):
+        self._subscribe('things/#', retain_messages=True)
+        self._subscribe('placements/#')
+        self.journal.append(Event(topic='things/T1/modified'))
+        self.journal.append(Event(topic='placements/P1/modified'))
+        self.delivered.clear()
+
+        # the Session reconnects while both events are still being routed
+        self._run(self.provider._replay_events(
+            SESSION_ID, Mock(), SessionOptions(replay=ReplayRequest(
+                epoch=self.journal.epoch, last_seq=0
+            ))
+        ))
+        self._run(self.provider._send_data_to_all(
+            1.5, 'things/T1/modified', {}, 1
+        ))
+        self._run(self.provider._send_data_to_all(
+            1.5, 'placements/P1/modified', {}, 2
+        ))
+
+        self.assertEqual(
+            [('placements/P1/modified', 2), ('things/T1/modified', 1)],
+            [(m.topic, m.event_seq) for m in self.delivered]
+        )
+
+
+class TestSnapshotFence(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.journal = EventJournal(capacity=100)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _build_provider(self, **kwargs) -> StreamingApiProvider:
+        return StreamingApiProvider(
+            auth_context=AuthContext(),
+            auth_service=Mock(spec_set=AbsAuthService),
+            loop=self.loop,
+            event_journal=self.journal,
+            snapshot_sources={'things': build_source('T1')},
+            **kwargs
+        )
+
+    def test_coalesced_events_flushed_before_fence(self):
+        hub = EventHub(
+            journal=self.journal, coalesce_windows={'things': 10},
+            loop=self.loop
+        )
+        hub.register_handler(Thing, convert_thing)
+        provider = self._build_provider(event_hub=hub)
+
+        # the update is already reflected by the state of the Thing, but
+        # it's still held by the coalescing window
+        hub.update(Thing(), 'things/T1/modified')
+        self.assertEqual(0, self.journal.last_seq)
+
+        snapshot = provider._build_snapshot(SESSION_ID, 'things/#')
+
+        self.assertEqual(1, self.journal.last_seq)
+        self.assertEqual(1, snapshot.event_seq)
+
+    def test_queued_events_flushed_before_fence(self):
+        hub = EventHub(
+            journal=self.journal, max_queue_size=100, loop=self.loop
+        )
+        hub.register_handler(Thing, convert_thing)
+        provider = self._build_provider(event_hub=hub)
+
+        hub.update(Thing(), 'things/T1/modified')
+        hub.update(Thing(), 'things/T1/modified')
+
+        snapshot = provider._build_snapshot(SESSION_ID, 'things/+/modified')
+
+        self.assertEqual(2, snapshot.event_seq)
+
+
+class TestSessionExpiration(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.provider = StreamingApiProvider(
+            auth_context=AuthContext(),
+            auth_service=Mock(spec_set=AbsAuthService),
+            loop=self.loop, retained_session_ttl=10
+        )
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_subscriptions_removed(self):
+        self.provider._subs_storage.add_subscription(
+            session_id=SESSION_ID, topic='things/#', is_retained=True
+        )
+
+        self.provider._on_session_expired(SESSION_ID)
+
+        self.assertEqual(
+            {}, self.provider._subs_storage.resolve_subscribers(
+                'things/T1/modified'
+            )
+        )
+
+    def test_failure_logged(self):
+        self.provider._subs_storage = Mock()
+        self.provider._subs_storage.remove_all_for.side_effect = KeyError()
+
+        with self.assertLogs(
+                'dpl.api.streaming_api.streaming_api_provider',
+                level='ERROR'
+        ) as logs:
+            self.provider._on_session_expired(SESSION_ID)
+
+        self.assertIn(SESSION_ID, logs.output[0])
+
+    def test_not_resurrected_by_retained_event(self):
+        manager = self.provider._delivery_manager
+        self.provider._subs_storage.add_subscription(
+            session_id=SESSION_ID, topic='things/#', is_retained=True
+        )
+        self._run(manager.resume_for(SESSION_ID))
+        self._run(manager.pause_for(SESSION_ID))
+
+        manager._on_expiration_timer(
+            SESSION_ID, manager._retained[SESSION_ID]
+        )
+        self._run(self.provider._send_data_to_all(
+            1.5, 'things/T1/modified', {}
+        ))
+
+        self.assertEqual(set(), manager.list_sessions())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+This module contains unit tests for SubscriptionStorage
+"""
+import unittest
+
+from dpl.api.streaming_api.subscription_storage import SubscriptionStorage
+
+
+class TestSubscriptionStorage(unittest.TestCase):
+    TOPIC = 'things/L1/modified'
+
+    def setUp(self):
+        self.storage = SubscriptionStorage()
+
+    def test_no_subscribers(self):
+        self.assertEqual({}, self.storage.resolve_subscribers(self.TOPIC))
+        self.assertIsNone(
+            self.storage.resolve_subscription_params('S1', self.TOPIC)
+        )
+
+    def test_only_matching_sessions_resolved(self):
+        self.storage.add_subscription('S1', 'things/+/modified')
+        self.storage.add_subscription('S2', 'things/#', is_retained=True)
+        self.storage.add_subscription('S3', 'placements/#')
+
+        self.assertEqual(
+            {'S1': False, 'S2': True},
+            self.storage.resolve_subscribers(self.TOPIC)
+        )
+
+    def test_retention_of_any_matching_subscription(self):
+        self.storage.add_subscription('S1', 'things/+/modified')
+        self.storage.add_subscription('S1', 'things/#', is_retained=True)
+
+        self.assertEqual(
+            {'S1': True}, self.storage.resolve_subscribers(self.TOPIC)
+        )
+        self.assertTrue(
+            self.storage.resolve_subscription_params('S1', self.TOPIC)
+        )
+
+    def test_resubscription_updates_retention(self):
+        self.storage.add_subscription('S1', 'things/#', is_retained=True)
+        self.storage.add_subscription('S1', 'things/#', is_retained=False)
+
+        self.assertIs(
+            False, self.storage.resolve_subscription_params('S1', self.TOPIC)
+        )
+
+    def test_remove_subscription(self):
+        self.storage.add_subscription('S1', 'things/#')
+        self.storage.add_subscription('S2', 'things/#')
+
+        self.storage.remove_subscription('S1', 'things/#')
+
+        self.assertEqual(
+            {'S2': False}, self.storage.resolve_subscribers(self.TOPIC)
+        )
+        self.assertFalse(self.storage.is_subscribed('S1', self.TOPIC))
+        self.assertNotIn('S1', self.storage.list_sessions())
+
+    def test_remove_unknown_subscription(self):
+        self.storage.remove_subscription('S1', 'things/#')
+        self.storage.add_subscription('S1', 'things/#')
+        self.storage.remove_subscription('S1', 'placements/#')
+
+        self.assertTrue(self.storage.is_subscribed('S1', self.TOPIC))
+
+    def test_remove_all_for(self):
+        self.storage.add_subscription('S1', 'things/#')
+        self.storage.add_subscription('S1', 'things/+/modified')
+        self.storage.add_subscription('S2', 'things/+/modified')
+
+        self.storage.remove_all_for('S1')
+        self.storage.remove_all_for('S3')
+
+        self.assertEqual(
+            {'S2': False}, self.storage.resolve_subscribers(self.TOPIC)
+        )
+        self.assertEqual(['S2'], list(self.storage.list_sessions()))
+
+    def test_count_for(self):
+        self.storage.add_subscription('S1', 'things/#')
+        self.storage.add_subscription('S1', 'things/+/modified')
+        self.storage.add_subscription('S1', 'things/#', is_retained=True)
+
+        self.assertEqual(2, self.storage.count_for('S1'))
+        self.assertEqual(0, self.storage.count_for('S2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+This module contains unit tests for TimerWheel
+"""
+import asyncio
+import unittest
+
+from dpl.api.streaming_api.timer_wheel import TimerWheel
+
+
+class TestTimerWheel(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        # small wheel to make cascading between levels happen quickly
+        self.wheel = TimerWheel(
+            resolution=0.01, slots_per_level=4, levels=3, loop=self.loop
+        )
+
+    def tearDown(self):
+        self.wheel.close()
+        self.loop.close()
+
+    def _run_for(self, seconds: float):
+        self.loop.run_until_complete(asyncio.sleep(seconds))
+
+    def test_callback_called_after_deadline(self):
+        called = []
+        handle = self.wheel.call_later(
+            0.05, lambda arg: called.append((self.loop.time(), arg)), 'x'
+        )
+
+        self.assertEqual(1, len(self.wheel))
+        self._run_for(0.1)
+
+        self.assertEqual(1, len(called))
+        fired_at, arg = called[0]
+        self.assertEqual('x', arg)
+        self.assertGreaterEqual(fired_at, handle.when)
+        self.assertEqual(0, len(self.wheel))
+
+    def test_cancel(self):
+        called = []
+        handle = self.wheel.call_later(0.03, called.append, 1)
+        handle.cancel()
+
+        self.assertTrue(handle.cancelled())
+        self.assertEqual(0, len(self.wheel))
+
+        self._run_for(0.06)
+        self.assertEqual([], called)
+
+    def test_cascading_levels(self):
+        # deadlines span all levels and exceed the top level range
+        delays = (0.01, 0.03, 0.05, 0.17, 0.33, 0.7, 0.9)
+        called = []
+
+        for delay in delays:
+            self.wheel.call_later(
+                delay, lambda d: called.append((d, self.loop.time())), delay
+            )
+
+        started = self.loop.time()
+        self._run_for(1.0)
+
+        self.assertEqual(sorted(delays), [d for d, _ in called])
+
+        for delay, fired_at in called:
+            self.assertGreaterEqual(fired_at - started, delay)
+
+    def test_callback_cancels_another_timer(self):
+        called = []
+        second = None
+
+        def _first():
+            called.append(1)
+            second.cancel()
+
+        self.wheel.call_later(0.02, _first)
+        second = self.wheel.call_later(0.02, called.append, 2)
+
+        self._run_for(0.05)
+
+        # callbacks on the same tick are called in an arbitrary order
+        self.assertIn(1, called)
+        self.assertEqual(0, len(self.wheel))
+
+    def test_reuse_after_idle(self):
+        called = []
+
+        self.wheel.call_later(0.01, called.append, 1)
+        self._run_for(0.1)
+        self.wheel.call_later(0.01, called.append, 2)
+        self._run_for(0.05)
+
+        self.assertEqual([1, 2], called)
+
+    def test_wait_for(self):
+        async def _result():
+            await asyncio.sleep(0.01)
+            return 42
+
+        result = self.loop.run_until_complete(
+            self.wheel.wait_for(_result(), timeout=1)
+        )
+
+        self.assertEqual(42, result)
+        self.assertEqual(0, len(self.wheel))
+
+    def test_wait_for_timeout(self):
+        with self.assertRaises(asyncio.TimeoutError):
+            self.loop.run_until_complete(
+                self.wheel.wait_for(asyncio.sleep(1), timeout=0.02)
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+This module contains unit tests for WriteBufferMonitor
+"""
+import asyncio
+import unittest
+
+from dpl.api.streaming_api.timer_wheel import TimerWheel
+from dpl.api.streaming_api.write_buffer_monitor import WriteBufferMonitor
+
+
+class FakeTransport(object):
+    def __init__(self):
+        self.buffer_size = 0
+        self.limits = None
+        self.closing = False
+
+    def set_write_buffer_limits(self, high=None, low=None):
+        self.limits = (high, low)
+
+    def get_write_buffer_size(self):
+        return self.buffer_size
+
+    def is_closing(self):
+        return self.closing
+
+
+class TestWriteBufferMonitor(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.wheel = TimerWheel(resolution=0.01, loop=self.loop)
+        self.transport = FakeTransport()
+        self.monitor = WriteBufferMonitor(
+            transport=self.transport, timer_wheel=self.wheel,
+            high_water_mark=1000
+        )
+
+    def tearDown(self):
+        self.wheel.close()
+        self.loop.close()
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_limits_applied(self):
+        self.assertEqual(250, self.monitor.low_water_mark)
+        self.assertEqual((1000, 250), self.transport.limits)
+
+    def test_above_high_water_mark(self):
+        self.assertFalse(self.monitor.is_above_high_water_mark())
+
+        self.transport.buffer_size = 1001
+        self.assertTrue(self.monitor.is_above_high_water_mark())
+
+        self.transport.closing = True
+        self.assertFalse(self.monitor.is_above_high_water_mark())
+
+    def test_wait_drained(self):
+        self.transport.buffer_size = 2000
+
+        def _drain():
+            self.transport.buffer_size = 250
+
+        self.loop.call_later(0.03, _drain)
+        started = self.loop.time()
+
+        self.assertTrue(self._run(self.monitor.wait_drained(timeout=1)))
+        self.assertGreaterEqual(self.loop.time() - started, 0.03)
+        self.assertEqual(0, len(self.wheel))
+
+    def test_wait_drained_below_high_water_mark(self):
+        # the buffer must to drop to the low water mark
+        self.transport.buffer_size = 500
+        self.assertFalse(self._run(self.monitor.wait_drained(timeout=0.03)))
+        self.assertEqual(0, len(self.wheel))
+
+    def test_wait_drained_on_close(self):
+        self.transport.buffer_size = 2000
+
+        def _close():
+            self.transport.closing = True
+
+        self.loop.call_later(0.02, _close)
+
+        self.assertTrue(self._run(self.monitor.wait_drained()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+This module contains unit tests for EventBusServer and EventBusClient
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+from dpl.events.event_bus import (
+    EventBusServer, EventBusClient, EventBusError
+)
+from dpl.events.event_journal import EventJournal
+from dpl.events.object_related_event import ObjectRelatedEvent
+from dpl.utils.observer import Observer
+
+
+class EventCollector(Observer):
+    def __init__(self):
+        self.events = []
+
+    def update(self, source, *args, **kwargs):
+        self.events.append(args[0])
+
+
+class TestEventBus(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        self.journal = EventJournal()
+        self.server = EventBusServer(
+            path=os.path.join(self.directory, 'bus.sock'),
+            journal=self.journal
+        )
+        self.client = EventBusClient(path=self.server.path)
+        self.collector = EventCollector()
+        self.client.subscribe(self.collector)
+
+        self._run(self.server.start())
+
+    def tearDown(self):
+        self._run(self.client.close())
+        self._run(self.server.close())
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        shutil.rmtree(self.directory)
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def _publish(self, value: int) -> ObjectRelatedEvent:
+        event = ObjectRelatedEvent(
+            topic="things/L1/modified", object_dto={'value': value}
+        )
+        self.journal.append(event)
+        self.server.update(None, event)
+
+        return event
+
+    def test_hello(self):
+        self._publish(0)
+        self._run(self.client.connect())
+
+        self.assertEqual(self.journal.epoch, self.client.epoch)
+        self.assertEqual(1, self.client.last_seq)
+
+    def test_events_delivered(self):
+        self._run(self.client.connect())
+        # wait for the registration of the client on the server
+        self._run(asyncio.sleep(0.01))
+
+        published = [self._publish(i) for i in range(3)]
+        self._run(asyncio.sleep(0.01))
+
+        received = self.collector.events
+
+        self.assertEqual([1, 2, 3], [e.seq for e in received])
+        self.assertEqual(
+            [e.timestamp for e in published], [e.timestamp for e in received]
+        )
+        self.assertEqual({'value': 2}, received[2].object_dto)
+        self.assertEqual("things/L1/modified", received[0].topic)
+
+    def test_lagging_worker_disconnected(self):
+        self.server._max_write_buffer = 1024
+        self._run(self.client.connect())
+        self._run(asyncio.sleep(0.01))
+
+        # the worker stops reading and its outgoing buffer grows
+        writer = next(iter(self.server._writers))
+        writer.transport.get_write_buffer_size = lambda: 4096
+
+        with self.assertLogs('dpl.events.event_bus', level='WARNING'):
+            self._publish(0)
+
+        self.assertEqual(set(), self.server._writers)
+        self._run(asyncio.wait_for(self.client.wait_closed(), 1))
+
+        # the worker connects again and continues from the current position
+        self._publish(1)
+        self._run(self.client.connect())
+
+        self.assertEqual(self.journal.epoch, self.client.epoch)
+        self.assertEqual(2, self.client.last_seq)
+
+    def test_requests(self):
+        def view_session(access_token):
+            if access_token != 'valid':
+                raise KeyError()
+
+            return {'domain_id': 's1'}
+
+        self.server.register_handler('view_session', view_session)
+        self._run(self.client.connect())
+
+        result = self._run(
+            self.client.request('view_session', access_token='valid')
+        )
+        self.assertEqual({'domain_id': 's1'}, result)
+
+        with self.assertRaises(EventBusError) as context:
+            self._run(
+                self.client.request('view_session', access_token='invalid')
+            )
+
+        self.assertEqual('KeyError', context.exception.error)
+
+        with self.assertRaises(EventBusError):
+            self._run(self.client.request('unknown'))
+
+
+if __name__ == '__main__':
+    unittest.main()
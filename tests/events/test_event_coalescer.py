@@ -0,0 +1,85 @@
+"""
+This module contains unit tests for EventCoalescer
+"""
+import asyncio
+import unittest
+
+from dpl.events.event import Event
+from dpl.events.event_coalescer import EventCoalescer
+from dpl.events.object_related_event import ObjectRelatedEvent
+
+
+def build_event(topic: str, value=None) -> ObjectRelatedEvent:
+    return ObjectRelatedEvent(topic=topic, object_dto={'value': value})
+
+
+class TestEventCoalescer(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.emitted = []
+        self.coalescer = EventCoalescer(
+            windows={'things': 0.01, 'users': 0},
+            emit=self.emitted.extend, loop=self.loop
+        )
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _wait_windows(self):
+        self.loop.run_until_complete(asyncio.sleep(0.03))
+
+    def test_modifications_merged(self):
+        events = [
+            build_event('things/L1/modified', 1),
+            build_event('things/L1/modified', 2),
+            build_event('things/L2/modified', 3)
+        ]
+
+        self.assertEqual([], self.coalescer.process(events))
+        self.assertEqual(2, self.coalescer.held_count)
+
+        self._wait_windows()
+
+        self.assertEqual(
+            [2, 3], [e.object_dto['value'] for e in self.emitted]
+        )
+        self.assertEqual(
+            {'things': {'received': 3, 'emitted': 2}},
+            self.coalescer.get_stats()
+        )
+
+    def test_order_kept(self):
+        modified = build_event('things/L1/modified')
+        deleted = build_event('things/L1/deleted')
+        added = build_event('things/L1/added')
+
+        result = self.coalescer.process([modified, deleted, added])
+
+        self.assertEqual([modified, deleted, added], result)
+        self.assertEqual(0, self.coalescer.held_count)
+
+        self._wait_windows()
+        self.assertEqual([], self.emitted)
+
+    def test_other_events_passed(self):
+        events = [
+            build_event('users/U1/modified'),
+            build_event('placements/R1/modified'),
+            Event(topic='things/L1/modified'),
+            build_event('things/modified')
+        ]
+
+        self.assertEqual(events, self.coalescer.process(events))
+
+    def test_flush(self):
+        event = build_event('things/L1/modified')
+        self.coalescer.process([event])
+
+        self.assertEqual([event], self.coalescer.flush())
+
+        self._wait_windows()
+        self.assertEqual([], self.emitted)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,263 @@
+"""
+This module contains unit tests for EventHub
+"""
+import asyncio
+import unittest
+
+from dpl.events.event import Event
+from dpl.events.event_hub import EventHub, BatchObserver, QueueFullPolicy
+from dpl.events.event_journal import EventJournal
+from dpl.events.object_related_event import ObjectRelatedEvent
+from dpl.utils.observer import Observer, SelectiveObserver
+
+
+class Source(object):
+    pass
+
+
+def convert(source: Source, topic: str) -> Event:
+    return Event(topic=topic)
+
+
+class Thing(object):
+    pass
+
+
+def convert_thing(source: Thing, topic: str) -> Event:
+    return ObjectRelatedEvent(topic=topic, object_dto=None)
+
+
+class RecordingObserver(Observer):
+    def __init__(self):
+        self.topics = []
+
+    def update(self, source, *args, **kwargs):
+        self.topics.append(args[0].topic)
+
+
+class PickyObserver(RecordingObserver, SelectiveObserver):
+    def __init__(self, topics):
+        super().__init__()
+        self.interesting = set(topics)
+
+    def is_interested(self, source, *args, **kwargs):
+        return kwargs['topic'] in self.interesting
+
+
+class RecordingBatchObserver(BatchObserver):
+    def __init__(self):
+        self.batches = []
+
+    def update(self, source, *args, **kwargs):
+        self.batches.append([args[0].topic])
+
+    def update_batch(self, source, events):
+        self.batches.append([e.topic for e in events])
+
+
+class TestEventHub(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.source = Source()
+        self.observer = RecordingObserver()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _build_hub(self, **kwargs) -> EventHub:
+        hub = EventHub(loop=self.loop, **kwargs)
+        hub.register_handler(Source, convert)
+        hub.subscribe(self.observer)
+
+        return hub
+
+    def _run_pending(self):
+        self.loop.run_until_complete(asyncio.sleep(0))
+
+    def test_synchronous_by_default(self):
+        hub = self._build_hub()
+        hub.update(self.source, 'a')
+
+        self.assertEqual(['a'], self.observer.topics)
+
+    def test_queued_events_dispatched_later(self):
+        journal = EventJournal()
+        hub = self._build_hub(max_queue_size=10, journal=journal)
+        hub.update(self.source, 'a')
+        hub.update(self.source, 'b')
+
+        self.assertEqual([], self.observer.topics)
+        self.assertEqual(2, hub.qsize())
+        self.assertEqual(0, journal.last_seq)
+
+        self._run_pending()
+
+        self.assertEqual(['a', 'b'], self.observer.topics)
+        self.assertEqual(0, hub.qsize())
+        self.assertEqual(2, journal.last_seq)
+
+    def test_batches(self):
+        batch_observer = RecordingBatchObserver()
+        hub = self._build_hub(max_queue_size=10, batch_size=2)
+        hub.subscribe(batch_observer)
+
+        for topic in 'abcde':
+            hub.update(self.source, topic)
+
+        self.loop.run_until_complete(asyncio.sleep(0.01))
+
+        self.assertEqual(
+            [['a', 'b'], ['c', 'd'], ['e']], batch_observer.batches
+        )
+        self.assertEqual(list('abcde'), self.observer.topics)
+
+    def test_block_policy(self):
+        hub = self._build_hub(max_queue_size=2, batch_size=1)
+
+        for topic in 'abc':
+            hub.update(self.source, topic)
+
+        # the oldest event was dispatched in the context of the producer
+        self.assertEqual(['a'], self.observer.topics)
+
+        self.loop.run_until_complete(asyncio.sleep(0.01))
+        self.assertEqual(['a', 'b', 'c'], self.observer.topics)
+        self.assertEqual(0, hub.dropped_count)
+
+    def test_drop_policy(self):
+        hub = self._build_hub(
+            max_queue_size=2, queue_full_policy=QueueFullPolicy.drop
+        )
+
+        for topic in 'abc':
+            hub.update(self.source, topic)
+
+        hub.flush()
+
+        self.assertEqual(['a', 'b'], self.observer.topics)
+        self.assertEqual(1, hub.dropped_count)
+
+    def test_coalesce_policy(self):
+        hub = self._build_hub(
+            max_queue_size=2, queue_full_policy=QueueFullPolicy.coalesce
+        )
+
+        for topic in ('a', 'b', 'a', 'c'):
+            hub.update(self.source, topic)
+
+        hub.flush()
+
+        # 'a' was replaced in place, then the oldest event was dropped
+        self.assertEqual(['b', 'c'], self.observer.topics)
+        self.assertEqual(1, hub.coalesced_count)
+        self.assertEqual(1, hub.dropped_count)
+
+    def test_failed_conversion_skipped(self):
+        hub = self._build_hub(max_queue_size=10)
+        hub.update(object(), 'a')
+        hub.update(self.source, 'b')
+
+        hub.flush()
+
+        self.assertEqual(['b'], self.observer.topics)
+
+    def test_coalesce_windows(self):
+        hub = self._build_hub(coalesce_windows={'things': 0.01})
+        hub.register_handler(Thing, convert_thing)
+        thing = Thing()
+
+        hub.update(thing, 'things/L1/modified')
+        hub.update(thing, 'things/L1/modified')
+        hub.update(self.source, 'a')
+
+        self.assertEqual(['a'], self.observer.topics)
+
+        self.loop.run_until_complete(asyncio.sleep(0.03))
+
+        self.assertEqual(['a', 'things/L1/modified'], self.observer.topics)
+        self.assertEqual(
+            {'things': {'received': 2, 'emitted': 1}},
+            hub.get_stats()['windows']
+        )
+
+        hub.update(thing, 'things/L1/modified')
+        hub.flush()
+
+        self.assertEqual(3, len(self.observer.topics))
+
+    def test_topic_patterns(self):
+        hub = self._build_hub()
+        filtered = RecordingObserver()
+        hub.subscribe(filtered, ('things/+/modified', 'users/#'))
+
+        for topic in ('things/L1/modified', 'things/L1/added', 'users/U1'):
+            hub.update(self.source, topic)
+
+        self.assertEqual(
+            ['things/L1/modified', 'users/U1'], filtered.topics
+        )
+        self.assertEqual(3, len(self.observer.topics))
+
+    def test_topic_patterns_batch(self):
+        hub = self._build_hub(max_queue_size=10)
+        hub.unsubscribe(self.observer)
+        batch_observer = RecordingBatchObserver()
+        hub.subscribe(batch_observer, ('things/#', ))
+
+        for topic in ('things/L1/modified', 'users/U1', 'things/L2/added'):
+            hub.update(self.source, topic)
+
+        hub.flush()
+
+        self.assertEqual(
+            [['things/L1/modified', 'things/L2/added']],
+            batch_observer.batches
+        )
+
+    def test_has_interest(self):
+        hub = self._build_hub()
+        hub.unsubscribe(self.observer)
+
+        self.assertFalse(hub.has_interest('things/L1/modified'))
+
+        hub.subscribe(self.observer, ('things/+/modified', ))
+
+        self.assertTrue(hub.has_interest('things/L1/modified'))
+        self.assertFalse(hub.has_interest('things/L1/added'))
+
+        # patterns are replaced on a repeated subscription
+        hub.subscribe(self.observer, ('things/+/added', ))
+
+        self.assertFalse(hub.has_interest('things/L1/modified'))
+        self.assertTrue(hub.has_interest('things/L1/added'))
+
+        hub.unsubscribe(self.observer)
+
+        self.assertFalse(hub.has_interest('things/L1/added'))
+
+    def test_is_interested(self):
+        hub = self._build_hub()
+        hub.unsubscribe(self.observer)
+        hub.register_handler(
+            Thing, convert_thing, topic_builder=lambda source, topic: topic
+        )
+        thing = Thing()
+
+        # no topic builder, the hub can't tell in advance
+        self.assertTrue(hub.is_interested(self.source, 'a'))
+        self.assertFalse(hub.is_interested(thing, 'things/L1/modified'))
+
+        picky = PickyObserver(('things/L1/modified', ))
+        hub.subscribe(picky, ('things/#', ))
+
+        self.assertTrue(hub.is_interested(thing, 'things/L1/modified'))
+        self.assertFalse(hub.is_interested(thing, 'things/L2/modified'))
+
+        hub.subscribe(self.observer, ('things/+/modified', ))
+
+        self.assertTrue(hub.is_interested(thing, 'things/L2/modified'))
+        self.assertFalse(hub.is_interested(thing, 'things/L2/added'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+"""
+This module contains unit tests for EventJournal
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from dpl.events.event import Event
+from dpl.events.event_journal import EventJournal
+from dpl.events.object_related_event import ObjectRelatedEvent
+
+
+def build_event(value: int = 0) -> Event:
+    return ObjectRelatedEvent(
+        topic="things/L1/modified", object_dto={'value': value}
+    )
+
+
+class TestEventJournal(unittest.TestCase):
+    def test_sequence_numbers(self):
+        journal = EventJournal()
+        self.assertEqual(0, journal.last_seq)
+        self.assertEqual(1, journal.first_seq)
+
+        events = [build_event(i) for i in range(3)]
+
+        for event in events:
+            journal.append(event)
+
+        self.assertEqual([1, 2, 3], [e.seq for e in events])
+        self.assertEqual(3, journal.last_seq)
+        self.assertEqual(1, journal.first_seq)
+
+    def test_read_since(self):
+        journal = EventJournal()
+
+        for i in range(5):
+            journal.append(build_event(i))
+
+        entries = journal.read_since(2)
+
+        self.assertEqual([3, 4, 5], [e.seq for e in entries])
+        self.assertEqual({'value': 2}, entries[0].body)
+        self.assertEqual("things/L1/modified", entries[0].topic)
+        self.assertEqual([], journal.read_since(5))
+
+        # sequence numbers from the future
+        self.assertIsNone(journal.read_since(6))
+
+    def test_events_without_objects(self):
+        journal = EventJournal()
+        journal.append(Event(topic="system/started"))
+
+        self.assertIsNone(journal.read_since(0)[0].body)
+
+    def test_gap_older_than_journal(self):
+        journal = EventJournal(capacity=3)
+
+        for i in range(5):
+            journal.append(build_event(i))
+
+        self.assertEqual(3, journal.first_seq)
+        self.assertEqual([3, 4, 5], [e.seq for e in journal.read_since(2)])
+        self.assertIsNone(journal.read_since(1))
+
+    def test_unique_epochs(self):
+        self.assertNotEqual(EventJournal().epoch, EventJournal().epoch)
+
+    def test_mirrored_journal(self):
+        journal = EventJournal(epoch='core', last_seq=10)
+        self.assertEqual('core', journal.epoch)
+        self.assertIsNone(journal.read_since(9))
+
+        for seq in (11, 12):
+            event = build_event(seq)
+            event.seq = seq
+            journal.append(event)
+
+        self.assertEqual(12, journal.last_seq)
+        self.assertEqual([11, 12], [e.seq for e in journal.read_since(10)])
+
+    def test_restart_mirrored_journal(self):
+        journal = EventJournal(epoch='core', last_seq=10)
+        event = build_event()
+        event.seq = 11
+        journal.append(event)
+
+        # events 12-19 were missed
+        journal.restart('core', 19)
+
+        self.assertEqual(19, journal.last_seq)
+        self.assertEqual(20, journal.first_seq)
+        self.assertIsNone(journal.read_since(11))
+        self.assertEqual([], journal.read_since(19))
+
+
+class TestEventJournalSegments(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _build_journal(self, **kwargs) -> EventJournal:
+        params = dict(
+            capacity=2, segment_dir=self.directory, segment_size=256,
+            max_segments=3
+        )
+        params.update(kwargs)
+
+        journal = EventJournal(**params)
+        self.addCleanup(journal.close)
+
+        return journal
+
+    def test_history_longer_than_ring(self):
+        journal = self._build_journal()
+
+        for i in range(6):
+            journal.append(build_event(i))
+
+        entries = journal.read_since(1)
+
+        self.assertEqual([2, 3, 4, 5, 6], [e.seq for e in entries])
+        self.assertEqual({'value': 1}, entries[0].body)
+
+    def test_oldest_segments_deleted(self):
+        journal = self._build_journal()
+
+        for i in range(50):
+            journal.append(build_event(i))
+
+        segments = [
+            name for name in os.listdir(self.directory)
+            if name.endswith('.seg')
+        ]
+
+        self.assertEqual(3, len(segments))
+        self.assertGreater(journal.first_seq, 1)
+        self.assertIsNone(journal.read_since(0))
+
+        entries = journal.read_since(journal.first_seq - 1)
+        self.assertEqual(
+            list(range(journal.first_seq, 51)), [e.seq for e in entries]
+        )
+
+    def test_restart_not_allowed(self):
+        journal = self._build_journal()
+
+        with self.assertRaises(ValueError):
+            journal.restart('core', 10)
+
+    def test_restored_after_restart(self):
+        journal = self._build_journal()
+
+        for i in range(4):
+            journal.append(build_event(i))
+
+        epoch = journal.epoch
+        journal.close()
+
+        restored = self._build_journal()
+
+        self.assertEqual(epoch, restored.epoch)
+        self.assertEqual(4, restored.last_seq)
+        self.assertEqual(
+            [2, 3, 4], [e.seq for e in restored.read_since(1)]
+        )
+
+        event = build_event()
+        restored.append(event)
+        self.assertEqual(5, event.seq)
+
+    def test_new_epoch_without_epoch_file(self):
+        journal = self._build_journal()
+        journal.append(build_event())
+        epoch = journal.epoch
+        journal.close()
+
+        os.remove(os.path.join(self.directory, 'epoch'))
+
+        restored = self._build_journal()
+
+        self.assertNotEqual(epoch, restored.epoch)
+        self.assertEqual(0, restored.last_seq)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+"""
+This module contains unit tests for ObjectRelatedEvent
+"""
+import unittest
+
+from dpl.events.object_related_event import ObjectRelatedEvent
+
+
+class TestObjectRelatedEvent(unittest.TestCase):
+    def test_eager_dto(self):
+        event = ObjectRelatedEvent(
+            topic='things/L1/modified', object_dto={'id': 'L1'}
+        )
+
+        self.assertEqual({'id': 'L1'}, event.object_dto)
+
+    def test_lazy_dto(self):
+        calls = []
+
+        def build():
+            calls.append(None)
+            return {'id': 'L1'}
+
+        event = ObjectRelatedEvent(
+            topic='things/L1/modified', dto_factory=build
+        )
+
+        self.assertEqual([], calls)
+        self.assertEqual({'id': 'L1'}, event.object_dto)
+        self.assertEqual({'id': 'L1'}, event.object_dto)
+        self.assertEqual(1, len(calls))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+"""
+This module contains unit tests for TopicTree and FrozenTopicTree
+"""
+import unittest
+
+from dpl.events.topic_tree import TopicTree, FrozenTopicTree
+
+
+class TestTopicTree(unittest.TestCase):
+    def setUp(self):
+        self.tree = TopicTree()
+
+    def _match(self, topic: str) -> dict:
+        result = {}
+
+        for values in self.tree.iter_matching(topic):
+            for key, value in values.items():
+                result.setdefault(key, []).append(value)
+
+        return result
+
+    def test_empty(self):
+        self.assertTrue(self.tree.is_empty())
+        self.assertEqual({}, self._match('things/L1/modified'))
+        self.assertFalse(self.tree.has_matching('things/L1/modified'))
+
+    def test_exact_match(self):
+        self.tree.add('things/L1/modified', 'S1', 1)
+
+        self.assertEqual({'S1': [1]}, self._match('things/L1/modified'))
+        self.assertEqual({}, self._match('things/L2/modified'))
+        self.assertEqual({}, self._match('things/L1'))
+        self.assertEqual({}, self._match('things/L1/modified/more'))
+
+    def test_plus_wildcard(self):
+        self.tree.add('things/+/modified', 'S1')
+
+        self.assertIn('S1', self._match('things/L1/modified'))
+        self.assertIn('S1', self._match('things/L2/modified'))
+        self.assertNotIn('S1', self._match('things/L1/deleted'))
+        self.assertNotIn('S1', self._match('things/L1'))
+
+    def test_hash_wildcard(self):
+        self.tree.add('things/#', 'S1')
+
+        self.assertIn('S1', self._match('things/L1'))
+        self.assertIn('S1', self._match('things/L1/modified'))
+        self.assertNotIn('S1', self._match('placements/P1/modified'))
+        self.assertNotIn('S1', self._match('things'))
+
+    def test_root_hash_wildcard(self):
+        self.tree.add('#', 'S1')
+
+        self.assertIn('S1', self._match('things/L1/modified'))
+        self.assertIn('S1', self._match('users'))
+
+    def test_all_matching_patterns_found(self):
+        self.tree.add('things/L1/modified', 'S1', 'exact')
+        self.tree.add('things/+/modified', 'S1', 'plus')
+        self.tree.add('things/#', 'S1', 'hash')
+        self.tree.add('+/+/+', 'S2', 'plus')
+
+        self.assertEqual(
+            {'S1': ['exact', 'hash', 'plus'], 'S2': ['plus']},
+            {k: sorted(v) for k, v in self._match('things/L1/modified').items()}
+        )
+
+    def test_remove(self):
+        self.tree.add('things/+/modified', 'S1')
+        self.tree.add('things/+/modified', 'S2')
+
+        self.assertTrue(self.tree.remove('things/+/modified', 'S1'))
+        self.assertEqual(['S2'], list(self._match('things/L1/modified')))
+
+        self.assertTrue(self.tree.remove('things/+/modified', 'S2'))
+        self.assertTrue(self.tree.is_empty())
+
+    def test_remove_missing(self):
+        self.tree.add('things/+/modified', 'S1')
+
+        self.assertFalse(self.tree.remove('things/+/modified', 'S2'))
+        self.assertFalse(self.tree.remove('things/#', 'S1'))
+        self.assertFalse(self.tree.remove('placements/+/modified', 'S1'))
+
+    def test_remove_keeps_shared_nodes(self):
+        self.tree.add('things/+/modified', 'S1')
+        self.tree.add('things/+', 'S2')
+
+        self.tree.remove('things/+/modified', 'S1')
+
+        self.assertIn('S2', self._match('things/L1'))
+        self.assertFalse(self.tree.is_empty())
+
+
+class TestFrozenTopicTree(unittest.TestCase):
+    def setUp(self):
+        self.tree = FrozenTopicTree()
+
+    _match = TestTopicTree._match
+
+    def test_with_added(self):
+        updated = self.tree.with_added('things/+/modified', 'S1', True)
+
+        self.assertTrue(self.tree.is_empty())
+        self.assertFalse(updated.is_empty())
+
+        self.tree = updated
+        self.assertEqual({'S1': [True]}, self._match('things/L1/modified'))
+
+    def test_original_unchanged(self):
+        first = self.tree.with_added('things/+/modified', 'S1')
+        second = first.with_added('things/L1/modified', 'S2')
+        third = second.with_added('things/+/modified', 'S3')
+
+        self.tree = first
+        self.assertEqual(['S1'], list(self._match('things/L1/modified')))
+
+        self.tree = second
+        self.assertEqual(
+            {'S1', 'S2'}, set(self._match('things/L1/modified'))
+        )
+
+        self.tree = third
+        self.assertEqual(
+            {'S1', 'S2', 'S3'}, set(self._match('things/L1/modified'))
+        )
+
+    def test_with_removed(self):
+        full = self.tree.with_added(
+            'things/+/modified', 'S1'
+        ).with_added(
+            'things/+', 'S2'
+        )
+
+        self.tree = full.with_removed('things/+/modified', 'S1')
+        self.assertEqual({}, self._match('things/L1/modified'))
+        self.assertIn('S2', self._match('things/L1'))
+
+        self.tree = self.tree.with_removed('things/+', 'S2')
+        self.assertTrue(self.tree.is_empty())
+
+        self.tree = full
+        self.assertIn('S1', self._match('things/L1/modified'))
+        self.assertIn('S2', self._match('things/L1'))
+
+    def test_with_removed_missing(self):
+        self.tree = self.tree.with_added('things/+/modified', 'S1')
+
+        self.assertIs(
+            self.tree, self.tree.with_removed('things/+/modified', 'S2')
+        )
+        self.assertIs(self.tree, self.tree.with_removed('things/#', 'S1'))
+
+    def test_many_keys_on_one_pattern(self):
+        versions = [self.tree]
+
+        for i in range(1000):
+            versions.append(
+                versions[-1].with_added('things/+/modified', 'S%d' % i, i)
+            )
+
+        self.tree = versions[-1]
+        matched = self._match('things/L1/modified')
+        self.assertEqual(1000, len(matched))
+        self.assertEqual([999], matched['S999'])
+
+        self.tree = versions[500]
+        self.assertEqual(500, len(self._match('things/L1/modified')))
+        self.assertNotIn('S500', self._match('things/L1/modified'))
+
+        self.tree = versions[-1]
+
+        for i in range(0, 1000, 2):
+            self.tree = self.tree.with_removed(
+                'things/+/modified', 'S%d' % i
+            )
+
+        self.assertEqual(
+            {'S%d' % i: [i] for i in range(1, 1000, 2)},
+            self._match('things/L1/modified')
+        )
+
+        for i in range(1, 1000, 2):
+            self.tree = self.tree.with_removed(
+                'things/+/modified', 'S%d' % i
+            )
+
+        self.assertTrue(self.tree.is_empty())
+        self.tree = versions[1000]
+        self.assertEqual(1000, len(self._match('things/L1/modified')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@
 This module contains unit tests for an in-memory ThingRepository implementation
 """
 
+import asyncio
 import unittest
 import uuid
 import weakref
@@ -12,6 +13,7 @@ from dpl.things.thing import Thing
 from dpl.repo_impls.in_memory.thing_repository import ThingRepository
 from dpl.utils.observer import Observer
 from dpl.repos.observable_repository import RepositoryEventType
+from dpl.settings.publish_policy import PublishPolicy
 
 
 class TestThingRepository(unittest.TestCase):
@@ -107,3 +109,28 @@ class TestThingRepository(unittest.TestCase):
             object_id=self.thing_id,
             object_ref=self.thing_ins
         )
+
+    def test_publish_policy(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.addCleanup(loop.close)
+        self.addCleanup(asyncio.set_event_loop, None)
+
+        self.filled_thing_repo.set_publish_policy(
+            self.thing_id, PublishPolicy(min_interval=60)
+        )
+
+        self.thing_ins._apply_update()
+        self.thing_ins._apply_update()
+
+        self.assertEqual(1, self.observer_callback.call_count)
+
+        # the delayed update is published on removal of the policy
+        self.filled_thing_repo.set_publish_policy(self.thing_id, None)
+
+        self.assertEqual(2, self.observer_callback.call_count)
+
+        self.thing_ins._apply_update()
+
+        self.assertEqual(3, self.observer_callback.call_count)
+
@@ -0,0 +1,76 @@
+"""
+This module contains unit tests for PublishPolicy and Deadband
+"""
+import unittest
+
+from dpl.settings.publish_policy import PublishPolicy, Deadband
+
+
+class TestDeadband(unittest.TestCase):
+    def test_absolute(self):
+        band = Deadband(absolute=0.1)
+
+        self.assertFalse(band.is_exceeded(20.0, 20.05))
+        self.assertFalse(band.is_exceeded(20.0, 19.95))
+        self.assertTrue(band.is_exceeded(20.0, 20.2))
+
+    def test_relative(self):
+        band = Deadband(relative=0.01)
+
+        self.assertFalse(band.is_exceeded(1000, 1009))
+        self.assertTrue(band.is_exceeded(1000, 1011))
+        self.assertTrue(band.is_exceeded(0, 0.001))
+
+    def test_both(self):
+        band = Deadband(absolute=1, relative=0.01)
+
+        self.assertFalse(band.is_exceeded(10, 10.5))
+        self.assertFalse(band.is_exceeded(1000, 1009))
+        self.assertTrue(band.is_exceeded(1000, 1011))
+
+
+class TestPublishPolicy(unittest.TestCase):
+    def test_dict_round_trip(self):
+        data = {
+            'min_interval': 1,
+            'max_interval': 300,
+            'deadbands': {
+                'temperature_c': {'absolute': 0.1},
+                'value': {'relative': 0.01}
+            }
+        }
+
+        policy = PublishPolicy.from_dict(data)
+
+        self.assertEqual(1, policy.min_interval)
+        self.assertEqual(300, policy.max_interval)
+        self.assertEqual(0.1, policy.deadbands['temperature_c'].absolute)
+        self.assertEqual(0.01, policy.deadbands['value'].relative)
+        self.assertEqual(data, policy.to_dict())
+
+    def test_defaults(self):
+        policy = PublishPolicy.from_dict({})
+
+        self.assertEqual(0, policy.min_interval)
+        self.assertEqual(0, policy.max_interval)
+        self.assertEqual({}, policy.deadbands)
+
+    def test_invalid(self):
+        invalid = (
+            {'min_interval': -1},
+            {'min_interval': 'fast'},
+            {'min_interval': True},
+            {'min_interval': 10, 'max_interval': 5},
+            {'unknown': 1},
+            {'deadbands': ['value']},
+            {'deadbands': {'value': {'absolute': -1}}},
+            {'deadbands': {'value': {'percent': 1}}}
+        )
+
+        for data in invalid:
+            with self.assertRaises(ValueError, msg=str(data)):
+                PublishPolicy.from_dict(data)
+
+
+if __name__ == '__main__':
+    unittest.main()
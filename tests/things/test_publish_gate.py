@@ -0,0 +1,141 @@
+"""
+This module contains unit tests for PublishGate
+"""
+import asyncio
+import unittest
+from unittest.mock import Mock, patch
+
+from dpl.connections import Connection
+from dpl.things.capabilities import HasValue
+from dpl.things.thing import Thing
+from dpl.things.publish_gate import PublishGate
+from dpl.settings.publish_policy import PublishPolicy, Deadband
+
+
+class FakeSensor(Thing, HasValue):
+    _type = 'value_sensor'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._value = 20.0
+        self._is_available = True
+
+    @property
+    def is_available(self) -> bool:
+        return self._is_available
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def set_value(self, value: float) -> None:
+        self._value = value
+        self._apply_update()
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestPublishGate(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.clock = FakeClock()
+        self.published = []
+        self.sensor = FakeSensor(
+            domain_id='S1', con_instance=Mock(spec_set=Connection),
+            con_params={}, metadata={}
+        )
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _set_policy(self, **kwargs) -> PublishGate:
+        gate = PublishGate(
+            PublishPolicy(**kwargs),
+            lambda thing: self.published.append(thing.value),
+            loop=self.loop, clock=self.clock
+        )
+        self.sensor.on_update = gate
+
+        return gate
+
+    def test_deadband(self):
+        gate = self._set_policy(deadbands={'value': Deadband(absolute=0.1)})
+
+        for value in (20.0, 20.01, 19.95, 20.05, 20.2, 20.25):
+            self.sensor.set_value(value)
+
+        self.assertEqual([20.0, 20.2], self.published)
+        self.assertEqual(6, gate.received_count)
+        self.assertEqual(2, gate.published_count)
+        # the Thing itself always keeps the current state
+        self.assertEqual(20.25, self.sensor.value)
+
+    def test_other_fields_published(self):
+        self._set_policy(deadbands={'value': Deadband(absolute=0.1)})
+
+        self.sensor.set_value(20.0)
+        self.sensor._is_available = False
+        self.sensor.set_value(20.01)
+
+        self.assertEqual([20.0, 20.01], self.published)
+
+    def test_state_taken_once_per_update(self):
+        gate = self._set_policy(deadbands={'value': Deadband(absolute=0.1)})
+
+        with patch.object(
+                gate, '_take_state', wraps=gate._take_state
+        ) as take_state:
+            for value in (20.0, 20.01, 20.2):
+                self.sensor.set_value(value)
+
+        # the state compared with the published one is saved as is
+        self.assertEqual(3, take_state.call_count)
+        self.assertEqual([20.0, 20.2], self.published)
+        self.assertEqual(
+            {'is_enabled': False, 'is_available': True, 'value': 20.2},
+            gate._published_state
+        )
+
+    def test_heartbeat(self):
+        self._set_policy(
+            max_interval=60, deadbands={'value': Deadband(absolute=0.1)}
+        )
+
+        self.sensor.set_value(20.0)
+        self.clock.now = 30
+        self.sensor.set_value(20.01)
+        self.clock.now = 61
+        self.sensor.set_value(20.02)
+
+        self.assertEqual([20.0, 20.02], self.published)
+
+    def test_min_interval(self):
+        gate = self._set_policy(min_interval=0.01)
+
+        self.sensor.set_value(1)
+        self.sensor.set_value(2)
+        self.sensor.set_value(3)
+
+        self.assertEqual([1], self.published)
+
+        self.clock.now = 0.01
+        self.loop.run_until_complete(asyncio.sleep(0.02))
+
+        # the latest state is published at the end of the interval
+        self.assertEqual([1, 3], self.published)
+
+        self.sensor.set_value(4)
+        gate.close()
+        self.loop.run_until_complete(asyncio.sleep(0.02))
+
+        self.assertEqual([1, 3], self.published)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+"""
+This module contains unit tests for StageTimings and LatencyHistogram
+"""
+import functools
+import time
+import unittest
+from unittest.mock import Mock
+
+from dpl.connections import Connection
+from dpl.events.build_object_related_event import build_object_related_event
+from dpl.events.event_hub import EventHub
+from dpl.repo_impls.in_memory.thing_repository import ThingRepository
+from dpl.service_impls.thing_service import ThingService
+from dpl.things.capabilities import HasValue
+from dpl.things.thing import Thing
+from dpl.utils.observer import Observer
+from dpl.utils import stage_timing
+from dpl.utils.stage_timing import (
+    LatencyHistogram, StageTimings, STAGE_TIMINGS
+)
+
+
+class FakeSensor(Thing, HasValue):
+    _type = 'value_sensor'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._value = 20.0
+
+    @property
+    def is_available(self) -> bool:
+        return True
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def set_value(self, value: float) -> None:
+        self._value = value
+        self._apply_update()
+
+
+class RecordingObserver(Observer):
+    def __init__(self):
+        self.events = []
+
+    def update(self, source, *args, **kwargs):
+        self.events.append(args[0])
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_empty(self):
+        histogram = LatencyHistogram()
+
+        self.assertEqual(histogram.percentile(0.99), 0.0)
+        self.assertEqual(histogram.snapshot()['count'], 0)
+        self.assertEqual(histogram.snapshot()['mean_ms'], 0.0)
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+
+        # 90 durations of 10 us and 10 durations of 1 ms
+        for _ in range(90):
+            histogram.record(0.00001)
+
+        for _ in range(10):
+            histogram.record(0.001)
+
+        self.assertEqual(histogram.count, 100)
+
+        # percentiles are rounded up to power-of-two bounds of buckets
+        self.assertAlmostEqual(histogram.percentile(0.5), 0.000016)
+        self.assertAlmostEqual(histogram.percentile(0.9), 0.000016)
+        self.assertAlmostEqual(histogram.percentile(0.99), 0.001)
+
+        snapshot = histogram.snapshot()
+        self.assertAlmostEqual(snapshot['mean_ms'], 0.109)
+        self.assertAlmostEqual(snapshot['max_ms'], 1.0)
+
+    def test_huge_duration(self):
+        histogram = LatencyHistogram()
+        histogram.record(1000000.0)
+
+        self.assertEqual(histogram.percentile(0.5), 1000000.0)
+
+
+class TestStageTimings(unittest.TestCase):
+    def test_call_traced(self):
+        timings = StageTimings(enabled=True)
+        traces = []
+
+        def _stage(arg):
+            traces.append(timings.current)
+            timings.current.mark('second')
+            return arg
+
+        self.assertEqual(
+            timings.call_traced(_stage, 42, 'first', time.time() - 0.5), 42
+        )
+        self.assertIsNone(timings.current)
+
+        trace = traces[0]
+        self.assertAlmostEqual(trace.last - trace.origin, 0.5, delta=0.1)
+
+        stages = timings.snapshot()['stages']
+        self.assertEqual(set(stages), {'first', 'second'})
+        self.assertEqual(stages['first']['count'], 1)
+
+    def test_sampling(self):
+        timings = StageTimings(enabled=True, sample_interval=3)
+        traces = []
+
+        for _ in range(7):
+            timings.call_traced(
+                lambda arg: traces.append(timings.current), None, 'first',
+                time.time()
+            )
+
+        self.assertEqual(
+            [trace is not None for trace in traces],
+            [True, False, False, True, False, False, True]
+        )
+        self.assertEqual(timings.snapshot()['stages']['first']['count'], 3)
+
+    def test_invalid_sample_interval(self):
+        with self.assertRaises(ValueError):
+            StageTimings(sample_interval=0)
+
+    def test_record_delivery(self):
+        timings = StageTimings(enabled=True)
+        traces = [stage_timing.StageTrace(timings)] * 2
+
+        timings.record_delivery(traces, time.perf_counter())
+
+        stages = timings.snapshot()['stages']
+
+        for stage in (stage_timing.DELIVERY_QUEUE, stage_timing.SOCKET_WRITE,
+                      stage_timing.TOTAL):
+            self.assertEqual(stages[stage]['count'], 2)
+
+    def test_timed(self):
+        timings = StageTimings(enabled=True)
+        func = timings.timed('build', lambda: 42)
+
+        self.assertEqual(func(), 42)
+        self.assertEqual(timings.snapshot()['stages']['build']['count'], 1)
+
+        timings.reset()
+        self.assertEqual(timings.snapshot()['stages'], {})
+
+
+class TestPipelineTiming(unittest.TestCase):
+    def setUp(self):
+        self.repo = ThingRepository()
+        self.service = ThingService(self.repo)
+        self.hub = EventHub()
+        self.hub.register_handler(
+            source_type=ThingService,
+            handler=functools.partial(
+                build_object_related_event, target_root_topic='things'
+            )
+        )
+        self.service.subscribe(self.hub)
+        self.observer = RecordingObserver()
+        self.hub.subscribe(self.observer)
+
+        self.sensor = FakeSensor(
+            domain_id='S1', con_instance=Mock(spec_set=Connection),
+            con_params={}, metadata={}
+        )
+        self.repo.add(self.sensor)
+        self.observer.events.clear()
+
+    def tearDown(self):
+        STAGE_TIMINGS.enabled = False
+        STAGE_TIMINGS.sample_interval = 1
+        STAGE_TIMINGS.reset()
+
+    def test_disabled(self):
+        self.sensor.set_value(21.0)
+
+        event = self.observer.events[0]
+        self.assertIsNone(event.trace)
+        self.assertEqual(STAGE_TIMINGS.snapshot()['stages'], {})
+
+    def test_enabled(self):
+        STAGE_TIMINGS.enabled = True
+        STAGE_TIMINGS.sample_interval = 1
+        self.sensor.set_value(21.0)
+
+        event = self.observer.events[0]
+        self.assertIsNotNone(event.trace)
+        self.assertIsNone(STAGE_TIMINGS.current)
+
+        self.assertEqual(event.object_dto['value'], 21.0)
+
+        stages = STAGE_TIMINGS.snapshot()['stages']
+
+        for stage in (stage_timing.REPOSITORY, stage_timing.SERVICE,
+                      stage_timing.HUB_CONVERT, stage_timing.DTO_BUILD):
+            self.assertEqual(stages[stage]['count'], 1)